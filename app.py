@@ -1,17 +1,23 @@
 # -*- coding: utf-8 -*-
 # app.py - SISTEMA INTEGRAL DE GESTIÓN DE FLOTA - VERSIÓN COMPLETA
 import streamlit as st
+import os
 import sqlite3
-from datetime import date, datetime
+from datetime import datetime
 import pandas as pd
 
 # Importar módulos propios
 from models import init_db
 from utils.helpers import get_db_connection
+from utils.cache import estadisticas_cache
+from utils.perfilador import iniciar_rerun, finalizar_rerun
 
-# Inicializar base de datos
+# Inicializar base de datos (solo la primera ejecución del proceso)
 init_db()
 
+# Medir cada sentencia SQL de este rerun (las lentas quedan en consultas_lentas)
+iniciar_rerun()
+
 # ==========================================
 # CONFIGURACIÓN DE PÁGINA
 # ==========================================
@@ -69,78 +75,29 @@ menu = st.sidebar.radio("📋 Menú Principal", [
 if menu == "🏠 Dashboard":
     st.header("📊 Centro de Control de Flota")
     
+    from services.kpis import obtener_resumen_flota, obtener_alertas_proximas
+    
     conn = get_db_connection()
     
     try:
-        # KPIs principales
-        total = conn.execute("SELECT COUNT(*) FROM vehiculos").fetchone()[0]
-        activos = conn.execute("SELECT COUNT(*) FROM vehiculos WHERE estado = 'activo'").fetchone()[0]
-        reparacion = conn.execute("SELECT COUNT(*) FROM vehiculos WHERE estado = 'en_reparacion'").fetchone()[0]
-        detenidos = conn.execute("SELECT COUNT(*) FROM vehiculos WHERE estado = 'detenido'").fetchone()[0]
-        
-        # Cumplimiento
-        vencidos = conn.execute("""
-            SELECT COUNT(*) FROM vencimientos v
-            JOIN vehiculos ve ON v.vehiculo_id = ve.id
-            WHERE ve.estado != 'baja' AND v.fecha_vencimiento < date('now')
-        """).fetchone()[0]
-        
-        total_docs = conn.execute("""
-            SELECT COUNT(*) FROM vencimientos v
-            JOIN vehiculos ve ON v.vehiculo_id = ve.id
-            WHERE ve.estado != 'baja'
-        """).fetchone()[0]
-        
-        cumplimiento = 100 if total_docs == 0 else round((total_docs - vencidos) / total_docs * 100, 1)
+        # KPIs principales y cumplimiento en una sola consulta
+        resumen = obtener_resumen_flota(conn)
         
         # Mostrar KPIs
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("🚛 Total Unidades", total)
-        col2.metric("✅ Operativas", activos, delta=f"{reparacion} en taller")
-        col3.metric("🛑 Detenidas", detenidos)
-        col4.metric("📌 Cumplimiento", f"{cumplimiento}%")
+        col1.metric("🚛 Total Unidades", resumen.total)
+        col2.metric("✅ Operativas", resumen.activos, delta=f"{resumen.en_reparacion} en taller")
+        col3.metric("🛑 Detenidas", resumen.detenidos)
+        col4.metric("📌 Cumplimiento", f"{resumen.cumplimiento}%")
         
         st.divider()
         
         # Alertas críticas
         st.subheader("🚨 Alertas Críticas - Próximos 30 Días")
         
-        df_alertas = pd.read_sql_query("""
-            SELECT 
-                v.patente,
-                'Vencimiento' as tipo,
-                ve.tipo as item,
-                ve.fecha_vencimiento as fecha,
-                julianday(ve.fecha_vencimiento) - julianday('now') as dias
-            FROM vencimientos ve
-            JOIN vehiculos v ON ve.vehiculo_id = v.id
-            WHERE v.estado = 'activo' 
-            AND julianday(ve.fecha_vencimiento) - julianday('now') <= 30
-            
-            UNION ALL
-            
-            SELECT 
-                v.patente,
-                'Mantenimiento' as tipo,
-                m.tipo as item,
-                m.prox_fecha as fecha,
-                julianday(m.prox_fecha) - julianday('now') as dias
-            FROM mantenimientos m
-            JOIN vehiculos v ON m.vehiculo_id = v.id
-            WHERE v.estado = 'activo' 
-            AND m.prox_fecha IS NOT NULL
-            AND julianday(m.prox_fecha) - julianday('now') <= 30
-            
-            ORDER BY dias
-        """, conn)
+        df_alertas = obtener_alertas_proximas(conn, dias=30)
         
         if not df_alertas.empty:
-            # Agregar estado
-            df_alertas['Estado'] = df_alertas['dias'].apply(
-                lambda x: "🔴 VENCIDO" if x < 0 else "🟠 URGENTE" if x < 7 else "🟡 PRÓXIMO"
-            )
-            df_alertas['Días'] = df_alertas['dias'].apply(lambda x: f"{int(x)} días")
-            
             st.dataframe(
                 df_alertas[['Estado', 'patente', 'tipo', 'item', 'fecha', 'Días']],
                 use_container_width=True,
@@ -220,6 +177,8 @@ elif menu == "👤 Ficha de Conductor":
 # ==========================================
 elif menu == "🔔 Alertas por Email":
     from services.email_alerts import SistemaAlertas, obtener_destinatarios_activos
+    from services.correo import resumen_lote
+    from repositories import notificaciones, tareas
     
     st.header("🔔 Sistema de Alertas Automáticas por Email")
     
@@ -243,34 +202,94 @@ elif menu == "🔔 Alertas por Email":
                 st.session_state['email_from'] = email_from
                 st.session_state['email_password'] = password
                 st.success("✅ Configuración guardada exitosamente")
+        
+        st.markdown("---")
+        st.subheader("⏰ Envío Automático")
+        st.caption("Lo ejecuta el proceso `python -m services.programador` (contraseña en FLOTA_SMTP_PASSWORD)")
+        
+        dias_nombres = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+        with st.form("envio_automatico"):
+            col1, col2 = st.columns([1, 3])
+            hora_envio = col1.time_input("Hora", value=datetime.strptime("08:00", "%H:%M").time())
+            dias_sel = col2.multiselect("Días", dias_nombres, default=dias_nombres[:5])
+            
+            if st.form_submit_button("💾 Programar Envío"):
+                if 'email_from' not in st.session_state:
+                    st.warning("⚠️ Primero configura el email de envío")
+                else:
+                    sistema = SistemaAlertas()
+                    sistema.configurar_email(st.session_state['email_from'], None)
+                    config = sistema.programar_envio_automatico(
+                        hora_envio.strftime("%H:%M"),
+                        [dias_nombres.index(d) for d in dias_sel]
+                    )
+                    st.success(f"✅ {config['estado']}")
+        
+        tarea = tareas.obtener("alertas_email")
+        if tarea:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Próximo envío", tarea.proxima_ejecucion or "-")
+            col2.metric("Último envío", tarea.ultima_ejecucion or "-")
+            col3.metric("Último estado", tarea.ultimo_estado or "-")
+            if tarea.ultimo_resultado:
+                st.caption(tarea.ultimo_resultado)
     
     with tab2:
         st.subheader("📧 Enviar Alertas Ahora")
         
+        incluir_todas = st.checkbox("Incluir alertas ya notificadas sin cambios",
+                                    help="Por defecto solo se detallan alertas nuevas o que escalaron de prioridad")
+        
+        # A pedido: calcular y clasificar las alertas tiene costo y no debe pagarse en cada rerun
+        if st.toggle("👁️ Vista previa del email", key="vista_previa_email"):
+            html = SistemaAlertas().vista_previa_html(solo_novedades=not incluir_todas)
+            if html is None:
+                st.info("✅ Sin alertas nuevas ni escaladas: ahora no se enviaría email.")
+            else:
+                st.components.v1.html(html, height=600, scrolling=True)
+        
         if 'email_from' not in st.session_state:
             st.warning("⚠️ Primero configura las credenciales de email en la pestaña 'Configuración'")
         else:
-            destinatarios = obtener_destinatarios_activos()
+            destinatarios = obtener_destinatarios_activos(con_nombre=True)
             
             if destinatarios:
-                st.info(f"📬 Se enviará a: {', '.join(destinatarios)}")
+                st.info(f"📬 Se enviará a: {', '.join(d['email'] for d in destinatarios)}")
                 
                 if st.button("📤 Enviar Alertas por Email", use_container_width=True):
-                    with st.spinner("Enviando..."):
-                        sistema = SistemaAlertas()
-                        sistema.configurar_email(
-                            st.session_state['email_from'],
-                            st.session_state['email_password']
-                        )
-                        
-                        exito, mensaje = sistema.enviar_alerta_email(destinatarios)
-                        
-                        if exito:
-                            st.success(mensaje)
-                        else:
-                            st.error(mensaje)
+                    sistema = SistemaAlertas()
+                    sistema.configurar_email(
+                        st.session_state['email_from'],
+                        st.session_state['email_password']
+                    )
+                    # El envío corre en hilos del despachador: la página no espera al SMTP
+                    st.session_state['envio_alertas'] = sistema.enviar_alerta_email_en_segundo_plano(
+                        destinatarios, solo_novedades=not incluir_todas
+                    )
+                
+                if 'envio_alertas' in st.session_state:
+                    lote, futuros = st.session_state['envio_alertas']
+                    terminados, total, enviados, fallidos = resumen_lote(futuros)
+                    if total == 0:
+                        st.info("✅ Sin alertas nuevas ni escaladas: no se envió email.")
+                    elif terminados < total:
+                        st.progress(terminados / total, text=f"Enviando... {enviados} enviados, {fallidos} fallidos")
+                        if st.button("🔄 Actualizar estado"):
+                            st.rerun()
+                    elif fallidos:
+                        st.error(f"❌ {fallidos} envíos fallidos, {enviados} enviados (lote {lote})")
+                    else:
+                        st.success(f"✅ Email enviado exitosamente a {enviados} destinatarios.")
             else:
                 st.warning("⚠️ No hay destinatarios activos. Agrega contactos en la pestaña 'Destinatarios'")
+        
+        # Registro de entregas
+        with st.expander("📜 Últimos envíos"):
+            df_envios = notificaciones.envios_recientes(limite=50)
+            if df_envios.empty:
+                st.caption("Sin envíos registrados")
+            else:
+                st.dataframe(df_envios, use_container_width=True, hide_index=True)
     
     with tab3:
         st.subheader("📋 Gestión de Destinatarios")
@@ -287,112 +306,120 @@ elif menu == "🔔 Alertas por Email":
             submitted = st.form_submit_button("➕ Agregar Destinatario")
             
             if submitted and nombre and email:
-                conn = get_db_connection()
                 try:
-                    conn.execute("""
-                        INSERT INTO notificaciones (nombre, email, telefono, cargo)
-                        VALUES (?, ?, ?, ?)
-                    """, (nombre, email, telefono, cargo))
-                    conn.commit()
+                    notificaciones.agregar_destinatario(nombre, email, telefono, cargo)
                     st.success("✅ Destinatario agregado")
                     st.rerun()
                 except sqlite3.IntegrityError:
                     st.error("❌ El email ya está registrado")
-                finally:
-                    conn.close()
         
         # Listado
-        conn = get_db_connection()
-        try:
-            df = pd.read_sql_query("SELECT * FROM notificaciones WHERE activo = 1", conn)
-            if not df.empty:
-                st.dataframe(df[['nombre', 'email', 'telefono', 'cargo']], 
-                           use_container_width=True, hide_index=True)
-        finally:
-            conn.close()
+        df = notificaciones.destinatarios()
+        if not df.empty:
+            st.dataframe(df[['nombre', 'email', 'telefono', 'cargo']], 
+                       use_container_width=True, hide_index=True)
 
 # ==========================================
 # 📄 REPORTES
 # ==========================================
 elif menu == "📄 Reportes":
-    from reports.exporter import exportar_flota_a_excel
+    from reports.exporter import HOJAS
+    from reports.cola_exportacion import MIME, encolar, hay_pendientes, trabajos_recientes
     
     st.header("📄 Exportar Reportes")
-    st.write("Descarga toda la información de la flota en formato Excel.")
+    st.write("Los reportes se generan en segundo plano; la descarga aparece abajo cuando están listos.")
+    st.caption("Requiere el proceso de exportación: `python -m reports.cola_exportacion`")
+    
+    hojas_sel = st.multiselect(
+        "Hojas a incluir", list(HOJAS), default=list(HOJAS),
+        format_func=lambda clave: HOJAS[clave][0]
+    )
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("📥 Reporte Completo", use_container_width=True):
-            excel_data = exportar_flota_a_excel()
-            st.download_button(
-                label="⬇️ Descargar Excel",
-                data=excel_data,
-                file_name=f"reporte_flota_{date.today().strftime('%Y%m%d')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        if st.button("📥 Reporte Completo", use_container_width=True, disabled=not hojas_sel):
+            id_trabajo = encolar("excel", {"hojas": hojas_sel})
+            st.success(f"✅ Reporte encolado (trabajo #{id_trabajo})")
     
     with col2:
         if st.button("📊 Reporte de Mantenimientos", use_container_width=True):
-            conn = get_db_connection()
-            try:
-                df = pd.read_sql_query("""
-                    SELECT 
-                        v.patente,
-                        m.tipo,
-                        m.fecha,
-                        m.km,
-                        m.costo,
-                        m.taller,
-                        m.prox_km,
-                        m.prox_fecha
-                    FROM mantenimientos m
-                    JOIN vehiculos v ON m.vehiculo_id = v.id
-                    ORDER BY m.fecha DESC
-                """, conn)
-                
-                st.dataframe(df, use_container_width=True, hide_index=True)
-                
-                # Convertir a CSV
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="⬇️ Descargar CSV",
-                    data=csv,
-                    file_name=f"mantenimientos_{date.today().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
-            finally:
-                conn.close()
+            id_trabajo = encolar("csv", {"reporte": "mantenimientos"})
+            st.success(f"✅ Reporte encolado (trabajo #{id_trabajo})")
     
     with col3:
         if st.button("⛽ Reporte de Combustible", use_container_width=True):
-            conn = get_db_connection()
+            id_trabajo = encolar("csv", {"reporte": "combustible"})
+            st.success(f"✅ Reporte encolado (trabajo #{id_trabajo})")
+    
+    # Solo este bloque se vuelve a ejecutar mientras haya trabajos en curso
+    sondeando = hay_pendientes()
+    
+    @st.fragment(run_every=2 if sondeando else None)
+    def mostrar_trabajos():
+        st.subheader("📦 Exportaciones recientes")
+        trabajos = trabajos_recientes()
+        if not trabajos:
+            st.info("Todavía no se pidió ningún reporte")
+            return
+        for trabajo in trabajos:
+            titulo = f"#{trabajo['id']} · {trabajo['tipo'].upper()} · {trabajo['creado']}"
+            if trabajo['estado'] in ('pendiente', 'ejecutando'):
+                st.progress(trabajo['progreso'], text=f"{titulo} · {trabajo['detalle'] or trabajo['estado']}")
+            elif trabajo['estado'] == 'listo':
+                st.write(f"✅ {titulo} · {trabajo['tamano_bytes'] / 1e6:.1f} MB · vence {trabajo['expira']}")
+            elif trabajo['estado'] == 'error':
+                st.error(f"❌ {titulo} · {trabajo['error']}")
+            else:
+                st.caption(f"⌛ {titulo} · expirado")
+        pendientes = [t['creado'] for t in trabajos if t['estado'] == 'pendiente']
+        # Sin proceso de exportación los pedidos quedan pendientes para siempre
+        if pendientes and (datetime.now() - datetime.strptime(min(pendientes), "%Y-%m-%d %H:%M:%S")).total_seconds() > 30:
+            st.warning("⚠️ Hay reportes esperando hace más de 30 segundos. ¿Está corriendo el proceso de exportación?")
+        if sondeando and not hay_pendientes():
+            st.rerun()  # Terminó todo: rerun completo para dejar de sondear
+    
+    mostrar_trabajos()
+    
+    # Descarga fuera del fragmento y a pedido: st.download_button copia el archivo
+    # entero a la memoria del proceso cada vez que se dibuja, así que solo se arma
+    # para el trabajo elegido y nunca en los redibujos del sondeo
+    listos = {t['id']: t for t in trabajos_recientes() if t['estado'] == 'listo'}
+    if listos:
+        col_sel, col_boton = st.columns([3, 1])
+        id_elegido = col_sel.selectbox(
+            "Reporte a descargar", list(listos),
+            format_func=lambda id_t: f"#{id_t} · {listos[id_t]['nombre_archivo']}"
+        )
+        if col_boton.button("📦 Preparar descarga", use_container_width=True):
+            st.session_state['descarga_preparada'] = id_elegido
+        if st.session_state.get('descarga_preparada') == id_elegido:
+            trabajo = listos[id_elegido]
             try:
-                df = pd.read_sql_query("""
-                    SELECT 
-                        v.patente,
-                        c.fecha,
-                        c.km,
-                        c.litros,
-                        c.costo_total,
-                        c.rendimiento,
-                        c.estacion
-                    FROM combustible c
-                    JOIN vehiculos v ON c.vehiculo_id = v.id
-                    ORDER BY c.fecha DESC
-                """, conn)
-                
-                st.dataframe(df, use_container_width=True, hide_index=True)
-                
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="⬇️ Descargar CSV",
-                    data=csv,
-                    file_name=f"combustible_{date.today().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
-            finally:
-                conn.close()
+                with open(trabajo['ruta'], "rb") as archivo:
+                    st.download_button(
+                        "⬇️ Descargar", data=archivo, file_name=trabajo['nombre_archivo'],
+                        mime=MIME[trabajo['tipo']], key=f"descarga_{trabajo['id']}"
+                    )
+            except FileNotFoundError:
+                st.caption("Archivo no disponible")
+    
+    with st.expander("🗂️ Snapshot analítico (Parquet)"):
+        from reports.snapshot import formato_disponible, leer_manifiesto
+        
+        st.caption(
+            "Tablas de historial en Parquet particionado por mes y tipo de vehículo para BI. "
+            f"Formato disponible: {formato_disponible()}. "
+            "Se regenera con `python -m reports.snapshot` o con la tarea programada `snapshot_analitico`."
+        )
+        manifiesto = leer_manifiesto()
+        if manifiesto:
+            st.dataframe(
+                pd.DataFrame.from_dict(manifiesto["tablas"], orient="index"),
+                use_container_width=True
+            )
+        else:
+            st.info("Todavía no se generó ningún snapshot")
 
 # ==========================================
 # FOOTER
@@ -400,4 +427,34 @@ elif menu == "📄 Reportes":
 st.sidebar.markdown("---")
 st.sidebar.caption("💡 Sistema desarrollado por Gustavo Sánchez")
 st.sidebar.caption("📍 San Miguel de Tucumán, Argentina")
-st.sidebar.caption(f"🕐 {datetime.now().strftime('%d/%m/%Y %H:%M')}")
\ No newline at end of file
+st.sidebar.caption(f"🕐 {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+_cache = estadisticas_cache()
+st.sidebar.caption(f"⚡ Caché: {_cache['tasa_aciertos']}% aciertos ({_cache['aciertos']}/{_cache['aciertos'] + _cache['fallos']}), {_cache['entradas']} consultas")
+
+# ==========================================
+# 🛠️ PERFILADOR DE CONSULTAS (ADMINISTRADOR)
+# ==========================================
+_registro = finalizar_rerun()
+if os.environ.get("FLOTA_ADMIN") == "1" and st.sidebar.toggle("🛠️ Perfilador de consultas", key="perfilador"):
+    from utils.perfilador import UMBRAL_LENTA_MS, desglose, listar_lentas, mas_lentas
+    
+    st.sidebar.caption(
+        f"⏱️ Rerun: {_registro.duracion_ms:.0f} ms · SQL: {_registro.total_sql_ms:.0f} ms "
+        f"en {len(_registro.sentencias) + _registro.descartadas} sentencias"
+    )
+    st.sidebar.dataframe(
+        desglose(_registro)[['vista', 'origen', 'sentencias', 'total_ms', 'max_ms', 'filas']],
+        use_container_width=True, hide_index=True
+    )
+    st.sidebar.caption("Más lentas del rerun (🔴 = recorrido completo de una tabla)")
+    for _sentencia, _detalles, _recorridos in mas_lentas(_registro):
+        with st.sidebar.expander(f"{'🔴' if _recorridos else '🟢'} {_sentencia.duracion_ms:.0f} ms · {_sentencia.origen}"):
+            st.code(" ".join(_sentencia.sql.split()), language="sql")
+            st.text("\n".join(_detalles) or "Plan no disponible")
+    with st.sidebar.expander(f"🐢 Consultas lentas registradas (≥ {UMBRAL_LENTA_MS:.0f} ms)"):
+        _lentas = listar_lentas(20)
+        if _lentas.empty:
+            st.caption("Sin registros")
+        else:
+            st.dataframe(_lentas[['fecha', 'vista', 'duracion_ms', 'recorridos', 'sql']],
+                         use_container_width=True, hide_index=True)
\ No newline at end of file
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# benchmarks/bench_costos.py - REGRESIÓN DEL ANÁLISIS DE COSTOS POR VEHÍCULO
+#
+# Genera bases temporales con historial creciente y mide la consulta de
+# services/costos.py contra la versión anterior (JOIN cruzado). Verifica que
+# los totales sean correctos y que el tiempo crezca linealmente con el historial.
+#
+# Uso: python -m benchmarks.bench_costos [--vehiculos 50] [--incluir-anterior]
+
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from models.migraciones import migrar
+from services.costos import SQL_COSTOS_VEHICULO
+
+SQL_ANTERIOR = """
+    SELECT
+        v.patente,
+        COALESCE(SUM(m.costo), 0) as costo_mantenimiento,
+        COALESCE(SUM(c.costo_total), 0) as costo_combustible,
+        v.km_actual
+    FROM vehiculos v
+    LEFT JOIN mantenimientos m ON v.id = m.vehiculo_id
+    LEFT JOIN combustible c ON v.id = c.vehiculo_id
+    WHERE v.estado = 'activo'
+    GROUP BY v.id
+"""
+
+CARGAS_POR_VEHICULO = (10, 50, 200, 800)
+MANTENIMIENTOS_POR_CARGA = 0.25
+# El tiempo por fila del tamaño mayor no debe superar este múltiplo del menor
+TOLERANCIA_LINEAL = 3.0
+
+
+def generar_base(ruta, vehiculos, cargas, semilla=42):
+    """Crea una base con 'cargas' cargas de combustible por vehículo"""
+    rnd = random.Random(semilla)
+    migrar(ruta)
+    conn = sqlite3.connect(ruta)
+    conn.executemany(
+        "INSERT INTO vehiculos (patente, tipo, km_actual, estado) VALUES (?, 'camion', ?, 'activo')",
+        [(f"BM{i:05d}", 100000 + i) for i in range(vehiculos)]
+    )
+    mant = max(1, int(cargas * MANTENIMIENTOS_POR_CARGA))
+    conn.executemany(
+        "INSERT INTO combustible (vehiculo_id, fecha, km, litros, costo_total) VALUES (?, '2024-01-01', ?, ?, ?)",
+        [(v + 1, k * 500, 200.0, round(rnd.uniform(80000, 120000), 2))
+         for v in range(vehiculos) for k in range(cargas)]
+    )
+    conn.executemany(
+        "INSERT INTO mantenimientos (vehiculo_id, tipo, fecha, costo) VALUES (?, 'Aceite de Motor', '2024-01-01', ?)",
+        [(v + 1, round(rnd.uniform(5000, 50000), 2)) for v in range(vehiculos) for _ in range(mant)]
+    )
+    conn.commit()
+    return conn
+
+
+def medir(conn, sql, repeticiones=5):
+    """Mejor tiempo (segundos) de varias ejecuciones completas"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conn.execute(sql).fetchall()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def verificar_totales(conn):
+    """Compara la consulta nueva contra sumas directas por tabla"""
+    esperado_comb = dict(conn.execute("SELECT vehiculo_id, SUM(costo_total) FROM combustible GROUP BY vehiculo_id"))
+    esperado_mant = dict(conn.execute("SELECT vehiculo_id, SUM(costo) FROM mantenimientos GROUP BY vehiculo_id"))
+    ids = dict(conn.execute("SELECT patente, id FROM vehiculos"))
+    for fila in conn.execute(SQL_COSTOS_VEHICULO):
+        veh_id = ids[fila[0]]
+        if abs(fila[4] - esperado_mant.get(veh_id, 0)) > 1e-6 or abs(fila[5] - esperado_comb.get(veh_id, 0)) > 1e-6:
+            return False
+    return True
+
+
+def ejecutar(vehiculos=50, incluir_anterior=False):
+    resultados = []
+    directorio = Path(tempfile.mkdtemp())
+    try:
+        for cargas in CARGAS_POR_VEHICULO:
+            conn = generar_base(directorio / f"costos_{cargas}.db", vehiculos, cargas)
+            filas = conn.execute("SELECT (SELECT COUNT(*) FROM combustible) + (SELECT COUNT(*) FROM mantenimientos)").fetchone()[0]
+            resultado = {
+                "cargas_por_vehiculo": cargas,
+                "filas_historial": filas,
+                "seg_nueva": medir(conn, SQL_COSTOS_VEHICULO),
+                "totales_ok": verificar_totales(conn),
+            }
+            if incluir_anterior:
+                resultado["seg_anterior"] = medir(conn, SQL_ANTERIOR, repeticiones=1)
+            resultados.append(resultado)
+            conn.close()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+
+def es_lineal(resultados, tolerancia=TOLERANCIA_LINEAL):
+    por_fila = [r["seg_nueva"] / r["filas_historial"] for r in resultados]
+    return por_fila[-1] <= por_fila[0] * tolerancia
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark del análisis de costos por vehículo")
+    parser.add_argument("--vehiculos", type=int, default=50)
+    parser.add_argument("--incluir-anterior", action="store_true",
+                        help="Medir también la consulta anterior con JOIN cruzado (lenta)")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.vehiculos, args.incluir_anterior)
+    for r in resultados:
+        linea = (f"{r['cargas_por_vehiculo']:>5} cargas/veh | {r['filas_historial']:>8,} filas | "
+                 f"nueva {r['seg_nueva'] * 1000:8.2f} ms | {r['seg_nueva'] / r['filas_historial'] * 1e6:6.3f} µs/fila")
+        if "seg_anterior" in r:
+            linea += f" | anterior {r['seg_anterior'] * 1000:10.2f} ms"
+        linea += " | totales OK" if r["totales_ok"] else " | 🔴 TOTALES INCORRECTOS"
+        print(linea)
+
+    ok = es_lineal(resultados) and all(r["totales_ok"] for r in resultados)
+    print("✅ Crecimiento lineal y totales correctos" if ok else "🔴 Regresión detectada")
+    sys.exit(0 if ok else 1)
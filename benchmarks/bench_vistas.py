@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+# benchmarks/bench_vistas.py - BENCHMARK DE VISTAS Y SERVICIOS
+#
+# Corre sin navegador el acceso a datos de cada vista (con el AppTest de
+# Streamlit, que ejecuta la vista real) y las funciones de servicio sobre
+# bases generadas con cargar_datos_demo.generar_flota_sintetica de varios
+# tamaños. Por caso informa p50/p95 de latencia (con la caché de consultas
+# vacía en cada repetición), pico de memoria de Python (tracemalloc) y
+# cantidad de sentencias SQL ejecutadas, y guarda todo en un JSON para
+# comparar entre commits. Las bases se generan una vez y se reutilizan.
+#
+# Uso: python -m benchmarks.bench_vistas [--tamanos 1k 100k] [--casos combustible costos]
+#                                        [--repeticiones 5] [--comparar resultados/anterior.json]
+
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+import models
+import utils.helpers
+from utils.cache import limpiar_cache
+from utils.db import al_abrir_conexion, obtener_pool
+
+RAIZ = Path(__file__).parent.parent
+DIR_BASES = RAIZ / "data" / "benchmarks"
+DIR_RESULTADOS = Path(__file__).parent / "resultados"
+
+# Tamaño -> parámetros del generador (cantidad aproximada de cargas de combustible)
+TAMANOS = {
+    "1k": dict(vehiculos=10, anios=1, cargas_por_mes=8),
+    "100k": dict(vehiculos=350, anios=3, cargas_por_mes=8),
+    "10M": dict(vehiculos=21000, anios=5, cargas_por_mes=8),
+}
+SEMILLA = 42
+REPETICIONES = 5
+TIMEOUT_VISTA_SEG = 600
+# Una regresión es un p50 mayor a este múltiplo del anterior (y al menos MIN_DIFERENCIA_MS más lento)
+TOLERANCIA_REGRESION = 1.25
+MIN_DIFERENCIA_MS = 5.0
+
+
+class Caso(NamedTuple):
+    nombre: str
+    tipo: str  # 'vista' o 'servicio'
+    funcion: Callable[[], object]
+    # Tamaño más grande en el que se corre (None = todos); los exportadores a Excel no escalan a 10M
+    tamano_maximo: Optional[str] = None
+
+
+# ==========================================
+# CONTEO DE SENTENCIAS
+# ==========================================
+class _ContadorSentencias:
+    """Cuenta las sentencias de todas las conexiones del pool (de cualquier hilo) mientras está activo"""
+
+    def __init__(self):
+        self.activo = False
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def _traza(self, sql):
+        # Las sentencias dentro de triggers llegan como comentarios "-- TRIGGER ..."
+        if self.activo and not sql.startswith("--"):
+            with self._lock:
+                self.total += 1
+
+    def conectar(self, conn):
+        conn.set_trace_callback(self._traza)
+
+
+_contador = _ContadorSentencias()
+al_abrir_conexion(_contador.conectar)
+
+
+# ==========================================
+# CASOS
+# ==========================================
+def _vista(modulo, funcion):
+    def ejecutar():
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_string(f"from {modulo} import {funcion}\n{funcion}()\n", default_timeout=TIMEOUT_VISTA_SEG)
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return ejecutar
+
+
+def _dashboard_principal():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=TIMEOUT_VISTA_SEG)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def _dashboard_avanzado_completo():
+    """Dashboard avanzado con todas las secciones abiertas y la memoria de la sesión vacía"""
+    from streamlit.testing.v1 import AppTest
+    from views.dashboard_avanzado import SECCIONES
+
+    at = AppTest.from_string(
+        "from views.dashboard_avanzado import mostrar_dashboard_avanzado\nmostrar_dashboard_avanzado()\n",
+        default_timeout=TIMEOUT_VISTA_SEG,
+    )
+    for seccion in SECCIONES:
+        at.session_state[f"dash_avanzado_{seccion.clave}"] = True
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def _alertas_criticas():
+    from services.email_alerts import SistemaAlertas
+    return SistemaAlertas().obtener_alertas_criticas()
+
+
+def _calcular_alertas():
+    from services.motor_alertas import calcular_alertas
+    return calcular_alertas()
+
+
+def _resumen_flota():
+    from services.kpis import obtener_resumen_flota
+    return obtener_resumen_flota()
+
+
+def _alertas_proximas():
+    from services.kpis import obtener_alertas_proximas
+    return obtener_alertas_proximas()
+
+
+def _costos_por_vehiculo():
+    from services.costos import obtener_costos_por_vehiculo
+    return obtener_costos_por_vehiculo()
+
+
+def _historial_pagina():
+    from services.historial_combustible import obtener_pagina
+    return obtener_pagina()
+
+
+def _historial_totales():
+    from services.historial_combustible import obtener_totales
+    return obtener_totales()
+
+
+def _rendimiento():
+    from services.rendimiento import recalcular_rendimiento
+    return recalcular_rendimiento(dry_run=True)
+
+
+def _anomalias():
+    from services.anomalias_combustible import detectar_anomalias
+    return detectar_anomalias(completo=True)
+
+
+def _exportar_excel():
+    from reports.exporter import exportar_flota_a_excel
+    return exportar_flota_a_excel()
+
+
+def _exportar_csv():
+    from reports.exporter import exportar_csv_a_archivo
+    exportar_csv_a_archivo("combustible").unlink()
+
+
+def _snapshot():
+    from reports.snapshot import generar_snapshot
+    with tempfile.TemporaryDirectory() as directorio:
+        generar_snapshot(Path(directorio) / "snapshot")
+
+
+CASOS = [
+    Caso("dashboard", "vista", _dashboard_principal),
+    Caso("dashboard_avanzado", "vista", _vista("views.dashboard_avanzado", "mostrar_dashboard_avanzado")),
+    Caso("dashboard_avanzado_completo", "vista", _dashboard_avanzado_completo),
+    Caso("combustible", "vista", _vista("views.combustible", "modulo_combustible")),
+    Caso("mantenimientos", "vista", _vista("views.mantenimientos", "modulo_mantenimientos")),
+    Caso("vencimientos", "vista", _vista("views.vencimientos", "modulo_vencimientos")),
+    Caso("historial_unidad", "vista", _vista("views.historial_unidad", "vista_historial_unidad")),
+    Caso("ficha_unidad", "vista", _vista("views.unidad_detalle", "mostrar_ficha_unidad")),
+    Caso("ficha_conductor", "vista", _vista("views.conductor_detalle", "mostrar_ficha_conductor")),
+    Caso("abm_vehiculos", "vista", _vista("views.abm_vehiculos", "abm_vehiculos")),
+    Caso("abm_conductores", "vista", _vista("views.abm_conductores", "abm_conductores")),
+    Caso("alertas_criticas", "servicio", _alertas_criticas),
+    Caso("calcular_alertas", "servicio", _calcular_alertas),
+    Caso("resumen_flota", "servicio", _resumen_flota),
+    Caso("alertas_proximas", "servicio", _alertas_proximas),
+    Caso("costos_por_vehiculo", "servicio", _costos_por_vehiculo),
+    Caso("historial_pagina", "servicio", _historial_pagina),
+    Caso("historial_totales", "servicio", _historial_totales),
+    Caso("rendimiento_dry_run", "servicio", _rendimiento),
+    Caso("anomalias_completo", "servicio", _anomalias),
+    Caso("exportar_excel", "servicio", _exportar_excel, tamano_maximo="100k"),
+    Caso("exportar_csv", "servicio", _exportar_csv),
+    Caso("snapshot", "servicio", _snapshot),
+]
+
+
+# ==========================================
+# BASES Y MEDICIÓN
+# ==========================================
+def preparar_base(tamano, directorio=DIR_BASES, semilla=SEMILLA):
+    """Ruta de la base del tamaño pedido; la genera si todavía no existe"""
+    from cargar_datos_demo import generar_flota_sintetica
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / f"flota_{tamano}_s{semilla}.db"
+    if not ruta.exists():
+        temporal = ruta.with_suffix(".tmp")
+        temporal.unlink(missing_ok=True)
+        generar_flota_sintetica(temporal, semilla=semilla, **TAMANOS[tamano])
+        temporal.rename(ruta)
+    return ruta
+
+
+def usar_base(ruta):
+    """Apunta get_db_connection / init_db a la base del benchmark"""
+    obtener_pool(utils.helpers.DB_PATH).cerrar_todas()
+    utils.helpers.DB_PATH = Path(ruta)
+    models.DB_PATH = Path(ruta)
+    limpiar_cache()
+
+
+def contar_filas(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        return {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                for tabla in ("vehiculos", "conductores", "combustible", "mantenimientos", "fallas", "vencimientos")}
+    finally:
+        conn.close()
+
+
+def medir(caso, repeticiones=REPETICIONES):
+    """Una corrida de calentamiento, 'repeticiones' cronometradas y una con tracemalloc y conteo de SQL"""
+    limpiar_cache()
+    caso.funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        limpiar_cache()
+        inicio = time.perf_counter()
+        caso.funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    limpiar_cache()
+    _contador.total = 0
+    _contador.activo = True
+    tracemalloc.start()
+    try:
+        caso.funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        _contador.activo = False
+
+    return {
+        "tipo": caso.tipo,
+        "repeticiones": repeticiones,
+        "p50_ms": round(float(np.percentile(tiempos, 50)), 3),
+        "p95_ms": round(float(np.percentile(tiempos, 95)), 3),
+        "min_ms": round(min(tiempos), 3),
+        "max_ms": round(max(tiempos), 3),
+        "memoria_pico_mb": round(pico / 2 ** 20, 2),
+        "sentencias": _contador.total,
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(tamanos=("1k", "100k"), casos=None, repeticiones=REPETICIONES, directorio=DIR_BASES):
+    """Corre los casos en cada tamaño; devuelve el dict de resultados (el mismo formato del JSON)"""
+    seleccion = [c for c in CASOS if casos is None or c.nombre in casos]
+    orden_tamanos = list(TAMANOS)
+    resultados = {
+        "commit": _commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeticiones": repeticiones,
+        "tamanos": {},
+    }
+    for tamano in tamanos:
+        ruta = preparar_base(tamano, directorio)
+        usar_base(ruta)
+        por_caso = {}
+        for caso in seleccion:
+            if caso.tamano_maximo and orden_tamanos.index(tamano) > orden_tamanos.index(caso.tamano_maximo):
+                continue
+            try:
+                por_caso[caso.nombre] = medir(caso, repeticiones)
+            except Exception as e:
+                por_caso[caso.nombre] = {"tipo": caso.tipo, "error": f"{type(e).__name__}: {e}"}
+            print(f"  {_linea(tamano, caso.nombre, por_caso[caso.nombre])}")
+        resultados["tamanos"][tamano] = {"filas": contar_filas(ruta), "casos": por_caso}
+    return resultados
+
+
+def guardar(resultados, directorio=DIR_RESULTADOS):
+    directorio.mkdir(parents=True, exist_ok=True)
+    marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ruta = directorio / f"{marca}_{resultados['commit'] or 'sin_commit'}.json"
+    ruta.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    return ruta
+
+
+def comparar(anterior, actual, tolerancia=TOLERANCIA_REGRESION, min_diferencia_ms=MIN_DIFERENCIA_MS):
+    """[(tamaño, caso, p50 anterior, p50 actual, es_regresion)] de los casos medidos en ambos"""
+    filas = []
+    for tamano, datos in actual["tamanos"].items():
+        previos = anterior.get("tamanos", {}).get(tamano, {}).get("casos", {})
+        for nombre, r in datos["casos"].items():
+            previo = previos.get(nombre)
+            if not previo or "p50_ms" not in previo or "p50_ms" not in r:
+                continue
+            regresion = (r["p50_ms"] > previo["p50_ms"] * tolerancia
+                         and r["p50_ms"] - previo["p50_ms"] > min_diferencia_ms)
+            filas.append((tamano, nombre, previo["p50_ms"], r["p50_ms"], regresion))
+    return filas
+
+
+def _linea(tamano, nombre, r):
+    if "error" in r:
+        return f"{tamano:>5} | {nombre:<22} | 🔴 {r['error']}"
+    return (f"{tamano:>5} | {nombre:<22} | p50 {r['p50_ms']:10.1f} ms | p95 {r['p95_ms']:10.1f} ms | "
+            f"{r['memoria_pico_mb']:8.1f} MB | {r['sentencias']:>6} SQL")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de vistas y servicios sobre bases generadas")
+    parser.add_argument("--tamanos", nargs="+", default=["1k", "100k"], choices=list(TAMANOS))
+    parser.add_argument("--casos", nargs="+", help=f"Subconjunto de: {', '.join(c.nombre for c in CASOS)}")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--bases", default=str(DIR_BASES), help="Directorio de las bases generadas")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+    args = parser.parse_args()
+
+    desconocidos = set(args.casos or ()) - {c.nombre for c in CASOS}
+    if desconocidos:
+        parser.error(f"Casos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultados = ejecutar(args.tamanos, args.casos, args.repeticiones, Path(args.bases))
+    print(f"💾 Resultados en {guardar(resultados)}")
+
+    regresiones = []
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        for tamano, nombre, antes, ahora, regresion in comparar(anterior, resultados):
+            regresiones.append(regresion)
+            print(f"{'🔴' if regresion else '  '} {tamano:>5} | {nombre:<22} | {antes:10.1f} -> {ahora:10.1f} ms "
+                  f"({ahora / antes if antes else float('inf'):.2f}x)")
+        print("🔴 Regresiones detectadas" if any(regresiones) else "✅ Sin regresiones")
+    errores = [n for t in resultados["tamanos"].values() for n, r in t["casos"].items() if "error" in r]
+    sys.exit(1 if any(regresiones) or errores else 0)
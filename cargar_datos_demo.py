@@ -1,13 +1,64 @@
 # -*- coding: utf-8 -*-
 # cargar_datos_demo.py - DATOS DE PRUEBA REALISTAS PARA DEMOSTRACIÓN
+#
+# Uso: python cargar_datos_demo.py                       (10 vehículos de demo)
+#      python cargar_datos_demo.py --vehiculos 5000 --anios 3 --db data/carga.db
 
 import sqlite3
+import time
 from pathlib import Path
 from datetime import date, timedelta
+from typing import NamedTuple
 import random
 
+import numpy as np
+
 DB_PATH = Path(__file__).parent / "data" / "flota.db"
 
+# ==========================================
+# CATÁLOGOS (compartidos con el generador sintético)
+# ==========================================
+TIPOS_MANTENIMIENTO = [
+    "Aceite de Motor",
+    "Filtro de Aceite",
+    "Filtro de Aire",
+    "Filtro de Gasoil",
+    "Filtro Separador de Agua",
+    "Trampa de Agua",
+    "Pastillas de Freno",
+    "Aceite de Caja",
+    "Aceite de Diferencial"
+]
+
+INTERVALOS_KM = {
+    "Aceite de Motor": 10000,
+    "Filtro de Aceite": 10000,
+    "Filtro de Aire": 20000,
+    "Filtro de Gasoil": 20000,
+    "Filtro Separador de Agua": 15000,
+    "Trampa de Agua": 10000,
+    "Pastillas de Freno": 40000,
+    "Aceite de Caja": 50000,
+    "Aceite de Diferencial": 50000
+}
+
+TALLERES = ["Taller Scania Tucumán", "Mecánica del Norte", "Service Total", "Taller Mercedes-Benz"]
+
+TIPOS_VENCIMIENTO = ["VTV", "Seguro", "Patente", "Habilitación Municipal", "Transporte de Cargas Peligrosas"]
+
+ESTACIONES = ["YPF Ruta 9", "Shell Centro", "Petrobras Norte", "Axion San Miguel"]
+
+TIPOS_FALLA = [
+    "Falla en sistema de inyección",
+    "Pérdida de potencia en motor",
+    "Problemas en caja de cambios",
+    "Fuga de aceite",
+    "Problemas eléctricos",
+    "Falla en turbo",
+    "Sobrecalentamiento"
+]
+
+
 def cargar_datos_demo():
     """Carga datos de prueba realistas para demostración"""
     
@@ -91,39 +142,13 @@ def cargar_datos_demo():
     # ==========================================
     print("🔧 Cargando mantenimientos...")
     
-    tipos_mantenimiento = [
-        "Aceite de Motor",
-        "Filtro de Aceite",
-        "Filtro de Aire",
-        "Filtro de Gasoil",
-        "Filtro Separador de Agua",
-        "Trampa de Agua",
-        "Pastillas de Freno",
-        "Aceite de Caja",
-        "Aceite de Diferencial"
-    ]
-    
-    intervales_km = {
-        "Aceite de Motor": 10000,
-        "Filtro de Aceite": 10000,
-        "Filtro de Aire": 20000,
-        "Filtro de Gasoil": 20000,
-        "Filtro Separador de Agua": 15000,
-        "Trampa de Agua": 10000,
-        "Pastillas de Freno": 40000,
-        "Aceite de Caja": 50000,
-        "Aceite de Diferencial": 50000
-    }
-    
-    talleres = ["Taller Scania Tucumán", "Mecánica del Norte", "Service Total", "Taller Mercedes-Benz"]
-    
     # Cargar mantenimientos para cada vehículo
     for veh in vehiculos[:6]:  # Solo primeros 6 vehículos para demo
         patente, tipo, marca, modelo, anio, chasis, motor, centro, km_actual, estado = veh
         veh_id = cursor.execute("SELECT id FROM vehiculos WHERE patente=?", (patente,)).fetchone()[0]
         
-        for tipo_mant in tipos_mantenimiento:
-            intervalo = intervales_km[tipo_mant]
+        for tipo_mant in TIPOS_MANTENIMIENTO:
+            intervalo = INTERVALOS_KM[tipo_mant]
             
             # Calcular último mantenimiento
             km_ultimo = km_actual - random.randint(500, 5000)
@@ -134,7 +159,7 @@ def cargar_datos_demo():
             fecha_prox = date.today() + timedelta(days=random.randint(30, 180))
             
             costo = random.uniform(5000, 50000)
-            taller = random.choice(talleres)
+            taller = random.choice(TALLERES)
             
             cursor.execute("""
                 INSERT INTO mantenimientos 
@@ -151,13 +176,11 @@ def cargar_datos_demo():
     # ==========================================
     print("📅 Cargando vencimientos...")
     
-    tipos_venc = ["VTV", "Seguro", "Patente", "Habilitación Municipal", "Transporte de Cargas Peligrosas"]
-    
     for veh in vehiculos[:7]:  # Primeros 7 vehículos
         patente = veh[0]
         veh_id = cursor.execute("SELECT id FROM vehiculos WHERE patente=?", (patente,)).fetchone()[0]
         
-        for tipo_venc in tipos_venc:
+        for tipo_venc in TIPOS_VENCIMIENTO:
             # Crear algunos vencimientos próximos y otros OK
             dias_random = random.choice([15, 25, 45, 90, 180, 365])
             fecha_venc = date.today() + timedelta(days=dias_random)
@@ -180,8 +203,6 @@ def cargar_datos_demo():
     # ==========================================
     print("⛽ Cargando registros de combustible...")
     
-    estaciones = ["YPF Ruta 9", "Shell Centro", "Petrobras Norte", "Axion San Miguel"]
-    
     for veh in vehiculos[:6]:
         patente = veh[0]
         km_actual = veh[8]
@@ -215,7 +236,7 @@ def cargar_datos_demo():
             else:
                 rendimiento = random.uniform(2.0, 3.5)
             
-            estacion = random.choice(estaciones)
+            estacion = random.choice(ESTACIONES)
             
             cursor.execute("""
                 INSERT INTO combustible 
@@ -232,16 +253,6 @@ def cargar_datos_demo():
     # ==========================================
     print("⚠️ Cargando historial de fallas...")
     
-    tipos_falla = [
-        "Falla en sistema de inyección",
-        "Pérdida de potencia en motor",
-        "Problemas en caja de cambios",
-        "Fuga de aceite",
-        "Problemas eléctricos",
-        "Falla en turbo",
-        "Sobrecalentamiento"
-    ]
-    
     # Solo 3 vehículos con fallas
     for veh in vehiculos[5:8]:  # Vehículos problemáticos
         patente = veh[0]
@@ -251,7 +262,7 @@ def cargar_datos_demo():
         num_fallas = random.randint(2, 4)
         
         for i in range(num_fallas):
-            tipo_falla = random.choice(tipos_falla)
+            tipo_falla = random.choice(TIPOS_FALLA)
             fecha_falla = date.today() - timedelta(days=random.randint(10, 180))
             km_falla = random.randint(100000, 200000)
             gravedad = random.choice(["leve", "moderada", "grave"])
@@ -330,5 +341,393 @@ def cargar_datos_demo():
     conn.close()
 
 
+# ==========================================
+# GENERADOR SINTÉTICO PARA PRUEBAS DE CARGA
+# ==========================================
+# Arma flotas del tamaño de producción (miles de vehículos, millones de
+# cargas) para reproducir localmente las páginas lentas. Todo se calcula con
+# arrays de NumPy por lotes de vehículos a partir de una semilla: los mismos
+# parámetros (y la misma fecha 'hoy') dan la misma base. La carga va en una
+# sola transacción con executemany; los índices secundarios y los triggers de
+# resúmenes se suspenden mientras tanto y al final se recrean, y
+# resumen_vehiculo / resumen_vehiculo_mes se reconstruyen de una vez.
+
+# Tipo -> (proporción de la flota, km/l, capacidad del tanque en L, combustible, factor de km anuales)
+PERFILES = {
+    "camion": (0.45, 2.8, 400, "diesel", 1.0),
+    "camioneta": (0.30, 9.0, 80, "diesel", 0.6),
+    "utilitario": (0.15, 10.0, 60, "diesel", 0.5),
+    "auto": (0.10, 12.5, 50, "nafta", 0.4),
+}
+
+MARCAS = {
+    "camion": [("Scania", "R450"), ("Mercedes-Benz", "Actros 2041"), ("Volvo", "FH 460"), ("Iveco", "Stralis 460")],
+    "camioneta": [("Ford", "Ranger XLT"), ("Toyota", "Hilux SR"), ("Nissan", "Frontier")],
+    "utilitario": [("Renault", "Kangoo"), ("Fiat", "Fiorino"), ("Peugeot", "Partner")],
+    "auto": [("Chevrolet", "Cruze"), ("Toyota", "Corolla"), ("Volkswagen", "Vento")],
+}
+
+CENTROS = ["Depósito Norte", "Depósito Sur", "Administración", "Operaciones", "Gerencia"]
+
+NOMBRES = ["Juan", "María", "Roberto", "Ana", "Carlos", "Patricia", "Jorge", "Lucía", "Diego", "Sofía"]
+APELLIDOS = ["Gómez", "Fernández", "Díaz", "Rojas", "Sánchez", "López", "Martínez", "Pérez", "Romero", "Acosta"]
+
+PRECIO_BASE = {"diesel": 480.0, "nafta": 520.0}
+INFLACION_MENSUAL = 0.03
+
+# Gravedad -> (probabilidad, horas inmovilizado (min, max), costo de reparación (min, max))
+GRAVEDADES = {
+    "leve": (0.50, (2, 8), (10000, 40000)),
+    "moderada": (0.30, (8, 24), (30000, 90000)),
+    "grave": (0.15, (24, 96), (80000, 250000)),
+    "critica": (0.05, (96, 480), (200000, 800000)),
+}
+
+# Forma de la distribución gamma de los días entre cargas (más alta = más regular)
+FORMA_INTERVALO = 6
+
+VEHICULOS_POR_LOTE = 2000
+# Separa vehículos en las claves ordenadas (vehículo, km) y (vehículo, día) de np.interp
+_ESCALA_CLAVE = 1e8
+
+TABLAS_HISTORIAL = ("combustible", "mantenimientos", "fallas", "vencimientos")
+
+
+class ResultadoGeneracion(NamedTuple):
+    vehiculos: int
+    conductores: int
+    combustible: int
+    mantenimientos: int
+    fallas: int
+    vencimientos: int
+    duracion_seg: float
+
+
+def _patentes(n):
+    """Patentes únicas con formato AA000AA a partir de un índice"""
+    letras = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    i = np.arange(n)
+    resto = i // 1000
+    a, b, c, d = (letras[(resto // 26 ** k) % 26] for k in (3, 2, 1, 0))
+    return [f"{w}{x}{num:03d}{y}{z}" for w, x, num, y, z in zip(a, b, i % 1000, c, d)]
+
+
+def _filas(*columnas):
+    """Filas para executemany a partir de arrays alineados (NaN -> NULL)"""
+    listas = []
+    for col in columnas:
+        col = np.asarray(col)
+        if col.dtype.kind == "f" and np.isnan(col).any():
+            col = np.where(np.isnan(col), None, col)
+        listas.append(col.tolist())
+    return zip(*listas)
+
+
+def _fechas(base, dias):
+    return (np.datetime64(base, "D") + np.asarray(dias).astype("timedelta64[D]")).astype(str)
+
+
+def _suspender(conn, tablas):
+    """Borra los índices secundarios y triggers de las tablas; devuelve su DDL para recrearlos"""
+    marcas = ",".join("?" * len(tablas))
+    objetos = conn.execute(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND tbl_name IN ({marcas}) AND sql IS NOT NULL
+    """, tablas).fetchall()
+    for tipo, nombre, _ in objetos:
+        conn.execute(f"DROP {tipo.upper()} {nombre}")
+    return [sql for _, _, sql in objetos]
+
+
+def _generar_vehiculos(rng, n):
+    """(índice de tipo en PERFILES por vehículo, filas para vehiculos)"""
+    tipos = list(PERFILES)
+    tipo = rng.choice(len(tipos), n, p=[PERFILES[t][0] for t in tipos])
+    modelo = rng.integers(0, 12, n)
+    anio = rng.integers(2010, 2025, n)
+    centro = rng.integers(len(CENTROS), size=n)
+    filas = []
+    for i, patente in enumerate(_patentes(n)):
+        nombre_tipo = tipos[tipo[i]]
+        marca, nombre_modelo = MARCAS[nombre_tipo][modelo[i] % len(MARCAS[nombre_tipo])]
+        filas.append((patente, nombre_tipo, marca, nombre_modelo, int(anio[i]), f"CH{i:08d}", f"MO{i:08d}",
+                      CENTROS[centro[i]], PERFILES[nombre_tipo][2]))
+    return tipo, filas
+
+
+def _generar_conductores(rng, n, vehiculo_ids, hoy):
+    nombre = rng.integers(len(NOMBRES), size=n)
+    apellido = rng.integers(len(APELLIDOS), size=n)
+    nacimiento = _fechas(hoy, -rng.integers(8000, 20000, n))
+    vencimientos = [_fechas(hoy, rng.integers(-30, 720, n)) for _ in range(4)]
+    filas = []
+    for i in range(n):
+        asignado = int(vehiculo_ids[i]) if i < len(vehiculo_ids) else None
+        filas.append((f"{NOMBRES[nombre[i]]} {APELLIDOS[apellido[i]]}", str(20000000 + i), nacimiento[i],
+                      f"+54 381 {5000000 + i % 5000000}", f"conductor{i}@empresa.com", "D2 - Más de 3500kg",
+                      vencimientos[0][i], vencimientos[1][i], vencimientos[2][i], vencimientos[3][i],
+                      asignado, "activo"))
+    return filas
+
+
+def _lote_historial(rng, tipo, conductor_de, conductores_ids, dias_periodo, cargas_por_mes, km_anuales,
+                    fallas_por_anio):
+    """Historial de un lote de vehículos (índices locales 0..n-1): dict tabla -> columnas, y el km final"""
+    from services.rendimiento import calcular_rendimiento
+
+    perfiles = [PERFILES[t] for t in PERFILES]
+    n = len(tipo)
+    rend_base = np.array([perfiles[t][1] for t in tipo]) * rng.normal(1, 0.08, n)
+    capacidad = np.array([perfiles[t][2] for t in tipo], dtype=float)
+    combustible = np.array([perfiles[t][3] for t in tipo])
+    km_diario = km_anuales * np.array([perfiles[t][4] for t in tipo]) * rng.lognormal(0, 0.3, n) / 365
+    km_inicio = rng.integers(0, 200000, n).astype(float)
+
+    # ----- Combustible: intervalos gamma entre cargas, km según el uso diario del vehículo -----
+    # Se generan de más y se descartan las que caen después del período
+    intervalo_medio = 30.44 / cargas_por_mes
+    esperadas = int(np.ceil(dias_periodo / intervalo_medio * 1.5)) + 5
+    veh = np.repeat(np.arange(n), esperadas)
+    huecos = rng.gamma(FORMA_INTERVALO, intervalo_medio / FORMA_INTERVALO, len(veh))
+    huecos[::esperadas] = rng.uniform(0, intervalo_medio, n)
+    acumulado = np.cumsum(huecos)
+    dia = acumulado - np.repeat(acumulado[::esperadas] - huecos[::esperadas], esperadas)
+    dentro = dia < dias_periodo
+    # Al menos dos cargas por vehículo (para que haya un rendimiento)
+    dentro[::esperadas] = dentro[1::esperadas] = True
+    veh, dia = veh[dentro], np.minimum(dia[dentro], dias_periodo - 1)
+    cargas = np.bincount(veh, minlength=n)
+    total = len(veh)
+    primera = np.cumsum(cargas) - cargas
+    ultima = primera + cargas - 1
+    es_primera = np.zeros(total, dtype=bool)
+    es_primera[primera] = True
+    hueco = np.where(es_primera, dia, np.diff(dia, prepend=0.0))
+    # Entre dos cargas no se recorre más de lo que rinde un tanque
+    tramo = np.minimum(hueco * km_diario[veh] * rng.lognormal(0, 0.15, total), capacidad[veh] * rend_base[veh] * 0.85)
+    acumulado = np.cumsum(tramo)
+    km = np.round(km_inicio[veh] + acumulado - np.repeat(acumulado[primera] - tramo[primera], cargas))
+    recorrido = np.where(es_primera, tramo, np.diff(km, prepend=0.0))
+    litros = np.round(np.clip(recorrido / (rend_base[veh] * rng.normal(1, 0.06, total)),
+                              5, capacidad[veh] * 0.98), 2)
+    rendimiento = calcular_rendimiento(veh, km, litros, np.zeros(total, dtype=bool))
+
+    dia_carga = dia.astype(int)
+    estacion = rng.integers(len(ESTACIONES), size=total)
+    precio = np.array([PRECIO_BASE[c] for c in combustible])[veh]
+    precio = np.round(precio * (1 + INFLACION_MENSUAL) ** (dia_carga / 30.44)
+                      * (1 + (estacion - 1.5) * 0.01) * rng.normal(1, 0.005, total), 2)
+    asignado = conductor_de[veh]
+    otro = conductores_ids[rng.integers(len(conductores_ids), size=total)] if len(conductores_ids) else asignado
+    conductor = np.where((asignado > 0) & (rng.random(total) < 0.8), asignado, otro).astype(float)
+    conductor[conductor <= 0] = np.nan
+
+    # Claves ordenadas para pasar de km a día (mantenimientos) y de día a km (fallas)
+    clave_km = veh * _ESCALA_CLAVE + km
+    clave_dia = veh * _ESCALA_CLAVE + dia
+    km_primera, km_fin = km[primera], km[ultima]
+
+    # ----- Mantenimientos preventivos: uno cada intervalo de km de cada tipo -----
+    mant = {c: [] for c in ("veh", "tipo", "dia", "km", "costo", "taller", "prox_dia", "prox_km")}
+    for tipo_mant in TIPOS_MANTENIMIENTO:
+        intervalo = INTERVALOS_KM[tipo_mant]
+        desde = km_primera + rng.uniform(0, intervalo, n)
+        cantidad = np.where(desde <= km_fin, (km_fin - desde) // intervalo + 1, 0).astype(int)
+        v = np.repeat(np.arange(n), cantidad)
+        orden = np.arange(len(v)) - np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+        km_serv = np.round(np.clip(desde[v] + orden * intervalo + rng.normal(0, 0.03 * intervalo, len(v)),
+                                   km_primera[v], km_fin[v]))
+        dia_serv = np.interp(v * _ESCALA_CLAVE + km_serv, clave_km, dia).astype(int)
+        mant["veh"].append(v)
+        mant["tipo"].append(np.full(len(v), tipo_mant, dtype=object))
+        mant["dia"].append(dia_serv)
+        mant["km"].append(km_serv)
+        mant["costo"].append(np.round(rng.uniform(5000, 50000, len(v)), 2))
+        mant["taller"].append(np.array(TALLERES, dtype=object)[rng.integers(len(TALLERES), size=len(v))])
+        mant["prox_dia"].append(dia_serv + (intervalo / km_diario[v]).astype(int))
+        mant["prox_km"].append(km_serv + intervalo)
+    mant = {c: np.concatenate(partes) for c, partes in mant.items()}
+
+    # ----- Fallas: proceso de Poisson por vehículo dentro de su período de uso -----
+    cantidad = rng.poisson(fallas_por_anio * dias_periodo / 365, n)
+    v = np.repeat(np.arange(n), cantidad)
+    dia_falla = np.clip(rng.uniform(0, dias_periodo, len(v)), dia[primera][v], dia[ultima][v])
+    gravedades = list(GRAVEDADES)
+    gravedad = rng.choice(len(gravedades), len(v), p=[GRAVEDADES[g][0] for g in gravedades])
+    horas = np.array([GRAVEDADES[g][1] for g in gravedades])[gravedad]
+    costos = np.array([GRAVEDADES[g][2] for g in gravedades])[gravedad]
+    tipo_falla = np.array(TIPOS_FALLA, dtype=object)[rng.integers(len(TIPOS_FALLA), size=len(v))]
+    fallas = {
+        "veh": v,
+        "dia": dia_falla.astype(int),
+        "km": np.round(np.interp(v * _ESCALA_CLAVE + dia_falla, clave_dia, km)),
+        "tipo": tipo_falla,
+        "descripcion": "Falla detectada durante operación normal. " + tipo_falla,
+        "gravedad": np.array(gravedades, dtype=object)[gravedad],
+        "horas": rng.integers(horas[:, 0], horas[:, 1] + 1),
+        "costo": np.round(rng.uniform(costos[:, 0], costos[:, 1]), 2),
+    }
+
+    # Las cargas se insertan en orden cronológico (los ids crecen con la fecha, como en producción)
+    orden = np.argsort(dia_carga, kind="stable")
+    combustible_cols = {
+        "veh": veh[orden], "dia": dia_carga[orden], "km": km[orden], "litros": litros[orden],
+        "costo_total": np.round(litros * precio, 2)[orden], "precio_litro": precio[orden],
+        "tipo_combustible": combustible[veh][orden], "estacion": np.array(ESTACIONES)[estacion][orden],
+        "conductor_id": conductor[orden], "rendimiento": rendimiento[orden],
+    }
+    return {"combustible": combustible_cols, "mantenimientos": mant, "fallas": fallas}, km_fin
+
+
+def generar_flota_sintetica(db_path=DB_PATH, vehiculos=1000, conductores=None, anios=3, cargas_por_mes=8,
+                            fallas_por_anio=1.0, km_anuales=60000, semilla=42, hoy=None,
+                            vehiculos_por_lote=VEHICULOS_POR_LOTE):
+    """Crea una flota sintética reproducible en una base sin vehículos; devuelve ResultadoGeneracion.
+
+    cargas_por_mes: cargas promedio por vehículo y mes.
+    fallas_por_anio: fallas promedio por vehículo y año (Poisson).
+    km_anuales: km/año de un camión promedio (los demás tipos según PERFILES).
+    """
+    from models.migraciones import migrar
+    from models.resumenes import reconstruir_resumenes
+
+    inicio = time.perf_counter()
+    hoy = hoy or date.today()
+    conductores = max(1, round(vehiculos * 0.7)) if conductores is None else conductores
+    dias_periodo = max(int(anios * 365), 1)
+    base = hoy - timedelta(days=dias_periodo)
+    rng = np.random.default_rng(semilla)
+
+    migrar(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    totales = dict.fromkeys(TABLAS_HISTORIAL, 0)
+    try:
+        if conn.execute("SELECT COUNT(*) FROM vehiculos").fetchone()[0]:
+            raise ValueError(f"{db_path} ya tiene vehículos: el generador necesita una base vacía")
+        # Solo para esta conexión: la base se descarta si la carga se interrumpe
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -262144")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ddl = _suspender(conn, TABLAS_HISTORIAL)
+
+            print(f"📦 Generando {vehiculos:,} vehículos y {conductores:,} conductores...")
+            tipo, filas = _generar_vehiculos(rng, vehiculos)
+            conn.executemany("""
+                INSERT INTO vehiculos (patente, tipo, marca, modelo, anio, chasis, motor,
+                                       centro_operativo, capacidad_tanque, estado)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'activo')
+            """, filas)
+            vehiculo_ids = np.array([f[0] for f in conn.execute("SELECT id FROM vehiculos ORDER BY id")])
+            conn.executemany("""
+                INSERT INTO conductores (nombre, dni, fecha_nacimiento, telefono, email, licencia_tipo,
+                                         licencia_venc, licencia_cargas_peligrosas, examen_psicofisico,
+                                         curso_iram, vehiculo_asignado, estado)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, _generar_conductores(rng, conductores, vehiculo_ids, hoy))
+            conductores_ids = np.array([f[0] for f in conn.execute("SELECT id FROM conductores ORDER BY id")])
+            conductor_de = np.zeros(vehiculos, dtype=np.int64)
+            asignados = min(vehiculos, conductores)
+            conductor_de[:asignados] = conductores_ids[:asignados]
+
+            for b0 in range(0, vehiculos, vehiculos_por_lote):
+                b1 = min(b0 + vehiculos_por_lote, vehiculos)
+                ids = vehiculo_ids[b0:b1]
+                historial, km_fin = _lote_historial(
+                    rng, tipo[b0:b1], conductor_de[b0:b1], conductores_ids, dias_periodo,
+                    cargas_por_mes, km_anuales, fallas_por_anio
+                )
+                c = historial["combustible"]
+                conn.executemany("""
+                    INSERT INTO combustible (vehiculo_id, fecha, km, litros, costo_total, precio_litro,
+                                             tipo_combustible, estacion, conductor_id, rendimiento)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, _filas(ids[c["veh"]], _fechas(base, c["dia"]), c["km"].astype(np.int64), c["litros"],
+                            c["costo_total"], c["precio_litro"], c["tipo_combustible"], c["estacion"],
+                            c["conductor_id"], c["rendimiento"]))
+                m = historial["mantenimientos"]
+                conn.executemany("""
+                    INSERT INTO mantenimientos (vehiculo_id, tipo, categoria, fecha, km, costo, taller,
+                                                prox_fecha, prox_km, alerta_km, observaciones)
+                    VALUES (?, ?, 'preventivo', ?, ?, ?, ?, ?, ?, 1000, 'Mantenimiento preventivo programado')
+                """, _filas(ids[m["veh"]], m["tipo"], _fechas(base, m["dia"]), m["km"].astype(np.int64),
+                            m["costo"], m["taller"], _fechas(base, m["prox_dia"]), m["prox_km"].astype(np.int64)))
+                f = historial["fallas"]
+                conn.executemany("""
+                    INSERT INTO fallas (vehiculo_id, fecha, km, tipo_falla, descripcion, gravedad,
+                                        tiempo_inmovilizado_hrs, costo_reparacion, solucion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'Reparación en taller autorizado. Reemplazo de componentes necesarios.')
+                """, _filas(ids[f["veh"]], _fechas(base, f["dia"]), f["km"].astype(np.int64), f["tipo"],
+                            f["descripcion"], f["gravedad"], f["horas"], f["costo"]))
+                conn.executemany("UPDATE vehiculos SET km_actual = ? WHERE id = ?",
+                                 _filas(km_fin.astype(np.int64), ids))
+
+                # Un vencimiento vigente (o recién vencido) de cada tipo por vehículo
+                v = np.repeat(ids, len(TIPOS_VENCIMIENTO))
+                tipo_venc = np.tile(np.array(TIPOS_VENCIMIENTO, dtype=object), len(ids))
+                dias_venc = rng.integers(-30, 365, len(v))
+                principal = np.isin(tipo_venc, ["VTV", "Seguro"])
+                conn.executemany("""
+                    INSERT INTO vencimientos (vehiculo_id, tipo, fecha_vencimiento, fecha_ultimo,
+                                              alerta_dias, costo_renovacion)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, _filas(v, tipo_venc, _fechas(hoy, dias_venc), _fechas(hoy, dias_venc - 365),
+                            np.where(principal, 30, 15),
+                            np.round(np.where(principal, rng.uniform(10000, 80000, len(v)),
+                                              rng.uniform(5000, 30000, len(v))), 2)))
+
+                totales["combustible"] += len(c["veh"])
+                totales["mantenimientos"] += len(m["veh"])
+                totales["fallas"] += len(f["veh"])
+                totales["vencimientos"] += len(v)
+                print(f"  ⛽ {b1:,}/{vehiculos:,} vehículos · {totales['combustible']:,} cargas "
+                      f"({time.perf_counter() - inicio:.1f}s)")
+
+            print("🗂️ Recreando índices y resúmenes...")
+            for sql in ddl:
+                conn.execute(sql)
+            reconstruir_resumenes(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    return ResultadoGeneracion(
+        vehiculos=vehiculos,
+        conductores=conductores,
+        combustible=totales["combustible"],
+        mantenimientos=totales["mantenimientos"],
+        fallas=totales["fallas"],
+        vencimientos=totales["vencimientos"],
+        duracion_seg=round(time.perf_counter() - inicio, 3),
+    )
+
+
 if __name__ == "__main__":
-    cargar_datos_demo()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Datos de demostración o flota sintética para pruebas de carga")
+    parser.add_argument("--vehiculos", type=int, help="Generar una flota sintética de N vehículos (sin esto: datos de demo)")
+    parser.add_argument("--db", default=str(DB_PATH), help="Base destino (debe no tener vehículos)")
+    parser.add_argument("--conductores", type=int, help="Cantidad de conductores (por defecto 70%% de los vehículos)")
+    parser.add_argument("--anios", type=float, default=3, help="Años de historial")
+    parser.add_argument("--cargas-mes", type=float, default=8, help="Cargas de combustible por vehículo y mes")
+    parser.add_argument("--fallas-anio", type=float, default=1.0, help="Fallas por vehículo y año")
+    parser.add_argument("--km-anuales", type=float, default=60000, help="Km por año de un camión promedio")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.vehiculos is None:
+        cargar_datos_demo()
+    else:
+        try:
+            r = generar_flota_sintetica(Path(args.db), args.vehiculos, args.conductores, args.anios,
+                                        args.cargas_mes, args.fallas_anio, args.km_anuales, args.semilla)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"✅ {r.vehiculos:,} vehículos, {r.conductores:,} conductores, {r.combustible:,} cargas, "
+              f"{r.mantenimientos:,} mantenimientos, {r.fallas:,} fallas y {r.vencimientos:,} vencimientos "
+              f"en {r.duracion_seg}s")
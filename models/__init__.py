@@ -1,17 +1,51 @@
 # -*- coding: utf-8 -*-
 # models/__init__.py - ESTRUCTURA DE BASE DE DATOS
 import sqlite3
+import threading
 from pathlib import Path
 
 DB_PATH = Path(__file__).parent.parent / "data" / "flota.db"
 
-def init_db():
-    """Inicializa la base de datos con todas las tablas necesarias"""
+_schema_lista = False
+_schema_lock = threading.Lock()
+
+def init_db(forzar=False):
+    """Inicializa la base de datos una sola vez por proceso.
+
+    Streamlit re-ejecuta app.py en cada interacción: tras la primera llamada
+    exitosa se retorna de inmediato. Si PRAGMA user_version ya coincide con
+    SCHEMA_VERSION no se ejecuta ningún DDL; si no, se aplican las
+    migraciones pendientes (ver models/migraciones.py).
+    """
+    global _schema_lista
+    
+    if _schema_lista and not forzar:
+        return
     
-    # Crear directorio si no existe
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    from models.migraciones import SCHEMA_VERSION, migrar, version_actual
+    
+    with _schema_lock:
+        if _schema_lista and not forzar:
+            return
+        
+        # Crear directorio si no existe
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            version = version_actual(conn)
+        finally:
+            conn.close()
+        
+        if forzar or version < SCHEMA_VERSION:
+            pasos = migrar(DB_PATH, desde=0 if forzar else None)
+            print(f"✅ Base de datos inicializada (esquema v{SCHEMA_VERSION}, {len(pasos)} pasos aplicados).")
+        
+        _schema_lista = True
+
+def crear_esquema(conn):
+    """Crea todas las tablas e índices que falten (idempotente)"""
     
-    conn = sqlite3.connect(DB_PATH)
     conn.execute("PRAGMA foreign_keys = ON")
     cursor = conn.cursor()
 
@@ -150,9 +184,6 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_combustible_fecha ON combustible(fecha)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_fallas_vehiculo ON fallas(vehiculo_id)")
 
-    conn.commit()
-    conn.close()
-    print("✅ Base de datos inicializada exitosamente con todas las tablas.")
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+# models/migraciones.py - MIGRACIONES VERSIONADAS DEL ESQUEMA
+
+import math
+import sqlite3
+import time
+from pathlib import Path
+
+from models import resumenes
+
+DB_PATH = Path(__file__).parent.parent / "data" / "flota.db"
+
+# Filas usadas para medir el costo real de un índice en modo simulación
+MUESTRA_FILAS = 20000
+
+
+class Migracion:
+    """Paso numerado del esquema.
+
+    sentencias: DDL que se ejecuta en una sola transacción.
+    indices: tuplas (nombre, tabla, columnas) construidas de a una, cada una
+             en su propia transacción corta, para no bloquear a los lectores.
+    funcion: callable(conn) para pasos que no son DDL puro.
+    tablas: tablas recorridas por sentencias/funcion (para la estimación).
+    """
+
+    def __init__(self, version, descripcion, sentencias=(), indices=(), funcion=None, tablas=()):
+        self.version = version
+        self.descripcion = descripcion
+        self.sentencias = tuple(sentencias)
+        self.indices = tuple(indices)
+        self.funcion = funcion
+        self.tablas = tuple(tablas)
+
+
+def _esquema_base(conn):
+    from models import crear_esquema
+    crear_esquema(conn)
+
+
+def _columna_parcial(conn):
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(combustible)")}
+    if "parcial" not in columnas:
+        conn.execute("ALTER TABLE combustible ADD COLUMN parcial INTEGER NOT NULL DEFAULT 0")
+    # Hasta ahora la única señal de carga parcial era el texto de observaciones
+    conn.execute("UPDATE combustible SET parcial = 1 WHERE parcial = 0 AND observaciones LIKE '%parcial%'")
+
+
+def _columna_capacidad_tanque(conn):
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(vehiculos)")}
+    if "capacidad_tanque" not in columnas:
+        # NULL = desconocida: el motor de anomalías la estima con el historial de cargas
+        conn.execute("ALTER TABLE vehiculos ADD COLUMN capacidad_tanque REAL")
+
+
+# ==========================================
+# LISTA DE MIGRACIONES (agregar siempre al final)
+# ==========================================
+MIGRACIONES = [
+    Migracion(1, "Esquema base: tablas e índices iniciales", funcion=_esquema_base),
+    Migracion(
+        2, "Índices compuestos y de cobertura para joins y filtros por vehículo/fecha",
+        indices=[
+            # Cubre la última carga por vehículo y los agregados por unidad sin tocar la tabla
+            ("idx_combustible_vehiculo_fecha", "combustible",
+             ("vehiculo_id", "fecha", "km", "litros", "costo_total", "rendimiento")),
+            ("idx_combustible_conductor_fecha", "combustible", ("conductor_id", "fecha")),
+            ("idx_mantenimientos_vehiculo_tipo_fecha", "mantenimientos", ("vehiculo_id", "tipo", "fecha")),
+            # Tendencias por período: rango de fechas + SUM(costo) desde el índice
+            ("idx_mantenimientos_fecha_costo", "mantenimientos", ("fecha", "costo")),
+            ("idx_vencimientos_vehiculo_fecha", "vencimientos", ("vehiculo_id", "fecha_vencimiento")),
+            ("idx_fallas_vehiculo_fecha", "fallas", ("vehiculo_id", "fecha")),
+            ("idx_conductores_vehiculo", "conductores", ("vehiculo_asignado",)),
+        ],
+        # Prefijo de idx_fallas_vehiculo_fecha: solo encarece las escrituras
+        sentencias=["DROP INDEX IF EXISTS idx_fallas_vehiculo"],
+    ),
+    Migracion(
+        3, "Tablas resumen por vehículo y por vehículo/mes mantenidas por triggers",
+        sentencias=resumenes.sentencias_esquema(),
+        funcion=resumenes.reconstruir_resumenes,
+        tablas=tuple(resumenes.ORIGENES),
+    ),
+    Migracion(
+        4, "Índice (fecha, km) para la paginación por clave del historial de combustible",
+        indices=[
+            # Con el rowid implícito al final cubre ORDER BY fecha, km, id sin ordenar
+            ("idx_combustible_fecha_km", "combustible", ("fecha", "km")),
+        ],
+        # Prefijo de idx_combustible_fecha_km
+        sentencias=["DROP INDEX IF EXISTS idx_combustible_fecha"],
+    ),
+    Migracion(
+        5, "Registro de entregas de email (envios_email)",
+        sentencias=[
+            """
+            CREATE TABLE IF NOT EXISTS envios_email (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                lote TEXT NOT NULL,
+                destinatario TEXT NOT NULL,
+                asunto TEXT,
+                estado TEXT NOT NULL CHECK(estado IN ('enviado', 'fallido')),
+                intentos INTEGER NOT NULL DEFAULT 1,
+                error TEXT,
+                fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_envios_email_lote ON envios_email(lote)",
+            "CREATE INDEX IF NOT EXISTS idx_envios_email_fecha ON envios_email(fecha_hora)",
+        ],
+    ),
+    Migracion(
+        6, "Tareas programadas y registro de ejecuciones del programador",
+        sentencias=[
+            """
+            CREATE TABLE IF NOT EXISTS tareas_programadas (
+                nombre TEXT PRIMARY KEY,
+                hora TEXT NOT NULL,
+                dias_semana TEXT NOT NULL,
+                parametros TEXT,
+                activo BOOLEAN DEFAULT 1,
+                proxima_ejecucion TIMESTAMP,
+                ultima_ejecucion TIMESTAMP,
+                ultimo_estado TEXT,
+                ultimo_resultado TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS ejecuciones_tareas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tarea TEXT NOT NULL,
+                inicio TIMESTAMP NOT NULL,
+                fin TIMESTAMP,
+                estado TEXT NOT NULL CHECK(estado IN ('ejecutando', 'ok', 'error')),
+                resultado TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_ejecuciones_tareas_tarea_inicio ON ejecuciones_tareas(tarea, inicio)",
+        ],
+    ),
+    Migracion(
+        7, "Estado de alertas notificadas para enviar solo novedades",
+        sentencias=[
+            """
+            CREATE TABLE IF NOT EXISTS estado_alertas (
+                clave TEXT PRIMARY KEY,
+                categoria TEXT NOT NULL,
+                prioridad TEXT,
+                primera_notificacion TIMESTAMP NOT NULL,
+                ultima_notificacion TIMESTAMP NOT NULL
+            ) WITHOUT ROWID
+            """,
+        ],
+    ),
+    Migracion(
+        8, "Cola de trabajos de exportación en segundo plano",
+        sentencias=[
+            """
+            CREATE TABLE IF NOT EXISTS trabajos_exportacion (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL CHECK(tipo IN ('excel', 'csv')),
+                parametros TEXT,
+                estado TEXT NOT NULL DEFAULT 'pendiente'
+                    CHECK(estado IN ('pendiente', 'ejecutando', 'listo', 'error', 'expirado')),
+                progreso REAL NOT NULL DEFAULT 0,
+                detalle TEXT,
+                ruta TEXT,
+                nombre_archivo TEXT,
+                tamano_bytes INTEGER,
+                error TEXT,
+                creado TIMESTAMP NOT NULL,
+                inicio TIMESTAMP,
+                fin TIMESTAMP,
+                expira TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_trabajos_exportacion_estado ON trabajos_exportacion(estado, id)",
+        ],
+    ),
+    Migracion(
+        9, "Marca de carga parcial en combustible para el cálculo de rendimiento",
+        funcion=_columna_parcial,
+        tablas=("combustible",),
+    ),
+    Migracion(
+        10, "Anomalías de combustible persistidas y capacidad de tanque por vehículo",
+        sentencias=[
+            """
+            CREATE TABLE IF NOT EXISTS anomalias_combustible (
+                combustible_id INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                vehiculo_id INTEGER NOT NULL,
+                fecha DATE NOT NULL,
+                severidad TEXT NOT NULL CHECK(severidad IN ('media', 'alta')),
+                valor REAL,
+                referencia REAL,
+                detalle TEXT,
+                estado TEXT NOT NULL DEFAULT 'abierta'
+                    CHECK(estado IN ('abierta', 'revisada', 'descartada')),
+                detectada TIMESTAMP NOT NULL,
+                PRIMARY KEY (combustible_id, tipo),
+                FOREIGN KEY(combustible_id) REFERENCES combustible(id) ON DELETE CASCADE,
+                FOREIGN KEY(vehiculo_id) REFERENCES vehiculos(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_anomalias_combustible_estado ON anomalias_combustible(estado, fecha)",
+            """
+            CREATE TABLE IF NOT EXISTS procesos_incrementales (
+                proceso TEXT PRIMARY KEY,
+                ultimo_id INTEGER NOT NULL DEFAULT 0,
+                actualizado TIMESTAMP
+            )
+            """,
+        ],
+        funcion=_columna_capacidad_tanque,
+    ),
+    Migracion(
+        11, "Registro rotativo de consultas lentas del perfilador",
+        sentencias=[
+            """
+            CREATE TABLE IF NOT EXISTS consultas_lentas (
+                id INTEGER PRIMARY KEY,
+                fecha TIMESTAMP NOT NULL,
+                vista TEXT,
+                origen TEXT,
+                sql TEXT NOT NULL,
+                duracion_ms REAL NOT NULL,
+                filas INTEGER,
+                plan TEXT,
+                recorridos TEXT
+            )
+            """,
+        ],
+    ),
+]
+
+SCHEMA_VERSION = MIGRACIONES[-1].version
+
+
+def version_actual(conn):
+    """Versión del esquema registrada en el archivo"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _contar_filas(conn, tabla):
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)
+    ).fetchone()
+    if not existe:
+        return 0
+    return conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+
+def _escalar(segundos_muestra, muestra, filas):
+    """Extrapola un costo medido en 'muestra' filas a 'filas' con crecimiento n·log n"""
+    if muestra <= 1 or filas <= muestra:
+        return segundos_muestra
+    return segundos_muestra * (filas / muestra) * (math.log2(filas) / math.log2(muestra))
+
+
+def _estimar_indice(conn, tabla, columnas, filas):
+    if filas == 0:
+        return 0.0
+    muestra = min(filas, MUESTRA_FILAS)
+    cols = ", ".join(columnas)
+    conn.execute("DROP TABLE IF EXISTS temp._muestra_migracion")
+    conn.execute(f"CREATE TEMP TABLE _muestra_migracion AS SELECT {cols} FROM {tabla} LIMIT {muestra}")
+    inicio = time.perf_counter()
+    conn.execute(f"CREATE INDEX temp._idx_muestra_migracion ON _muestra_migracion({cols})")
+    medido = time.perf_counter() - inicio
+    conn.execute("DROP TABLE temp._muestra_migracion")
+    return _escalar(medido, muestra, filas)
+
+
+def _estimar_recorrido(conn, tabla, filas):
+    if filas == 0:
+        return 0.0
+    muestra = min(filas, MUESTRA_FILAS)
+    inicio = time.perf_counter()
+    conn.execute(f"SELECT * FROM {tabla} LIMIT {muestra}").fetchall()
+    medido = time.perf_counter() - inicio
+    return medido * filas / muestra
+
+
+def estimar(conn, migracion):
+    """Estimación (filas involucradas, segundos) de un paso sobre la base actual"""
+    filas_total = 0
+    segundos = 0.0
+    for _, tabla, columnas in migracion.indices:
+        filas = _contar_filas(conn, tabla)
+        filas_total += filas
+        segundos += _estimar_indice(conn, tabla, columnas, filas)
+    for tabla in migracion.tablas:
+        filas = _contar_filas(conn, tabla)
+        filas_total += filas
+        segundos += _estimar_recorrido(conn, tabla, filas)
+    return filas_total, round(segundos, 3)
+
+
+def _aplicar(conn, migracion):
+    # Índices: una transacción corta por índice (en WAL los lectores siguen leyendo).
+    # No se corre ANALYZE: con estadísticas tomadas sobre tablas chicas el
+    # planificador seguiría eligiendo SCAN cuando el historial crezca.
+    for nombre, tabla, columnas in migracion.indices:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla}({', '.join(columnas)})")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for sql in migracion.sentencias:
+            conn.execute(sql)
+        if migracion.funcion is not None:
+            migracion.funcion(conn)
+        conn.execute(f"PRAGMA user_version = {migracion.version}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def migrar(db_path=DB_PATH, hasta=None, dry_run=False, desde=None):
+    """Aplica en orden las migraciones pendientes.
+
+    Devuelve una lista de dicts con version, descripcion, filas, estimado_seg,
+    estado y (si se aplicó) duracion_seg. Con dry_run=True no modifica la base.
+    desde permite reaplicar pasos ya registrados (todos son idempotentes).
+    """
+    hasta = SCHEMA_VERSION if hasta is None else hasta
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    reporte = []
+    try:
+        actual = version_actual(conn) if desde is None else desde
+        for migracion in MIGRACIONES:
+            if migracion.version <= actual or migracion.version > hasta:
+                continue
+            filas, estimado = estimar(conn, migracion)
+            paso = {
+                "version": migracion.version,
+                "descripcion": migracion.descripcion,
+                "filas": filas,
+                "estimado_seg": estimado,
+                "estado": "pendiente",
+            }
+            if not dry_run:
+                inicio = time.perf_counter()
+                _aplicar(conn, migracion)
+                paso["duracion_seg"] = round(time.perf_counter() - inicio, 3)
+                paso["estado"] = "aplicada"
+            reporte.append(paso)
+    finally:
+        conn.close()
+    return reporte
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de flota.db")
+    parser.add_argument("--db", default=str(DB_PATH), help="Ruta de la base de datos")
+    parser.add_argument("--hasta", type=int, default=None, help="Versión destino")
+    parser.add_argument("--dry-run", action="store_true", help="Solo estimar, no aplicar")
+    args = parser.parse_args()
+
+    pasos = migrar(args.db, hasta=args.hasta, dry_run=args.dry_run)
+    if not pasos:
+        print(f"✅ Esquema al día (versión {SCHEMA_VERSION})")
+    for paso in pasos:
+        linea = f"v{paso['version']:03d} {paso['descripcion']} | {paso['filas']:,} filas | ~{paso['estimado_seg']}s"
+        if "duracion_seg" in paso:
+            linea += f" | aplicada en {paso['duracion_seg']}s"
+        print(("🔎 " if args.dry_run else "✅ ") + linea)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# models/resumenes.py - TABLAS RESUMEN MANTENIDAS POR TRIGGERS
+#
+# resumen_vehiculo y resumen_vehiculo_mes acumulan por unidad (y por mes) los
+# totales de combustible, mantenimientos y fallas. Los triggers aplican el
+# delta de cada INSERT/UPDATE/DELETE, así los dashboards leen O(vehículos)
+# filas en lugar de recorrer todo el historial.
+#
+# Uso: python -m models.resumenes [--reconstruir] [--verificar]
+
+import sqlite3
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent.parent / "data" / "flota.db"
+
+# Columna del resumen -> expresión sobre la fila de origen ({r} = NEW/OLD)
+ORIGENES = {
+    "combustible": {
+        "comb_cargas": "1",
+        "comb_litros": "COALESCE({r}.litros, 0)",
+        "comb_costo": "COALESCE({r}.costo_total, 0)",
+        "rend_suma": "COALESCE({r}.rendimiento, 0)",
+        "rend_cargas": "({r}.rendimiento IS NOT NULL)",
+    },
+    "mantenimientos": {
+        "mant_cantidad": "1",
+        "mant_costo": "COALESCE({r}.costo, 0)",
+    },
+    "fallas": {
+        "fallas_cantidad": "1",
+        "fallas_criticas": "({r}.gravedad = 'critica')",
+        "horas_inmovilizado": "COALESCE({r}.tiempo_inmovilizado_hrs, 0)",
+        "costo_reparaciones": "COALESCE({r}.costo_reparacion, 0)",
+    },
+}
+
+COLUMNAS = [col for exprs in ORIGENES.values() for col in exprs]
+
+# Tabla resumen -> columnas clave (el mes se deriva de la fecha de la fila)
+RESUMENES = {
+    "resumen_vehiculo": {"vehiculo_id": "{r}.vehiculo_id"},
+    "resumen_vehiculo_mes": {"vehiculo_id": "{r}.vehiculo_id", "mes": "strftime('%Y-%m', {r}.fecha)"},
+}
+
+_TIPOS_CLAVE = {"vehiculo_id": "INTEGER NOT NULL", "mes": "TEXT NOT NULL"}
+
+
+def _ddl_tablas():
+    sentencias = []
+    for tabla, claves in RESUMENES.items():
+        columnas = [f"{c} {_TIPOS_CLAVE[c]}" for c in claves]
+        columnas += [f"{c} REAL NOT NULL DEFAULT 0" for c in COLUMNAS]
+        sentencias.append(
+            f"CREATE TABLE IF NOT EXISTS {tabla} (\n    "
+            + ",\n    ".join(columnas)
+            + f",\n    PRIMARY KEY ({', '.join(claves)})\n) WITHOUT ROWID"
+        )
+    return sentencias
+
+
+def _upsert(tabla, claves, exprs, fila, signo):
+    """INSERT ... ON CONFLICT que suma (signo=+1) o resta (signo=-1) la fila"""
+    cols_clave = list(claves)
+    cols_valor = list(exprs)
+    valores = [e.format(r=fila) for e in claves.values()]
+    valores += [f"{'-' if signo < 0 else ''}({e.format(r=fila)})" for e in exprs.values()]
+    asignaciones = ", ".join(f"{c} = {c} + excluded.{c}" for c in cols_valor)
+    return (
+        f"INSERT INTO {tabla} ({', '.join(cols_clave + cols_valor)}) "
+        f"VALUES ({', '.join(valores)}) "
+        f"ON CONFLICT({', '.join(cols_clave)}) DO UPDATE SET {asignaciones};"
+    )
+
+
+def _ddl_triggers():
+    sentencias = []
+    for origen, exprs in ORIGENES.items():
+        cuerpos = {
+            "insert": [("NEW", 1)],
+            "delete": [("OLD", -1)],
+            "update": [("OLD", -1), ("NEW", 1)],
+        }
+        for evento, pasos in cuerpos.items():
+            cuerpo = "\n    ".join(
+                _upsert(tabla, claves, exprs, fila, signo)
+                for fila, signo in pasos
+                for tabla, claves in RESUMENES.items()
+            )
+            sentencias.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_resumen_{origen}_{evento}\n"
+                f"AFTER {evento.upper()} ON {origen}\nBEGIN\n    {cuerpo}\nEND"
+            )
+    return sentencias
+
+
+def sentencias_esquema():
+    """DDL de tablas resumen + triggers (para la migración)"""
+    return _ddl_tablas() + _ddl_triggers()
+
+
+def _sql_agregado(tabla, claves, origen, exprs):
+    """SELECT agregado del historial completo con la misma forma que el resumen"""
+    sel_claves = [e.format(r=origen) for e in claves.values()]
+    sel_valores = [f"SUM({e.format(r=origen)})" for e in exprs.values()]
+    return (
+        f"SELECT {', '.join(sel_claves + sel_valores)} FROM {origen} "
+        f"GROUP BY {', '.join(sel_claves)}"
+    )
+
+
+def reconstruir_resumenes(conn):
+    """Vacía y recalcula las tablas resumen desde el historial (no hace commit)"""
+    for tabla, claves in RESUMENES.items():
+        conn.execute(f"DELETE FROM {tabla}")
+        for origen, exprs in ORIGENES.items():
+            cols = list(claves) + list(exprs)
+            asignaciones = ", ".join(f"{c} = {c} + excluded.{c}" for c in exprs)
+            conn.execute(
+                f"INSERT INTO {tabla} ({', '.join(cols)}) "
+                f"SELECT * FROM ({_sql_agregado(tabla, claves, origen, exprs)}) WHERE true "
+                f"ON CONFLICT({', '.join(claves)}) DO UPDATE SET {asignaciones}"
+            )
+
+
+def verificar_resumenes(conn, tolerancia=1e-6):
+    """Compara los resúmenes contra el historial; devuelve lista de diferencias"""
+    diferencias = []
+    for tabla, claves in RESUMENES.items():
+        esperado = {}
+        for origen, exprs in ORIGENES.items():
+            n = len(claves)
+            for fila in conn.execute(_sql_agregado(tabla, claves, origen, exprs)):
+                valores = esperado.setdefault(tuple(fila[:n]), dict.fromkeys(COLUMNAS, 0.0))
+                for col, valor in zip(exprs, fila[n:]):
+                    valores[col] += valor or 0
+
+        actual = {}
+        n = len(claves)
+        for fila in conn.execute(f"SELECT {', '.join(list(claves) + COLUMNAS)} FROM {tabla}"):
+            actual[tuple(fila[:n])] = dict(zip(COLUMNAS, fila[n:]))
+
+        vacio = dict.fromkeys(COLUMNAS, 0.0)
+        for clave in esperado.keys() | actual.keys():
+            fila_esperada = esperado.get(clave, vacio)
+            fila_actual = actual.get(clave, vacio)
+            for col in COLUMNAS:
+                e, a = fila_esperada[col], fila_actual[col]
+                if abs(e - a) > tolerancia * max(1.0, abs(e)):
+                    diferencias.append({"tabla": tabla, "clave": clave, "columna": col,
+                                        "esperado": e, "actual": a})
+    return diferencias
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tablas resumen de flota")
+    parser.add_argument("--db", default=str(DB_PATH), help="Ruta de la base de datos")
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcular desde el historial")
+    parser.add_argument("--verificar", action="store_true", help="Comparar contra el historial")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    try:
+        if args.reconstruir:
+            reconstruir_resumenes(conn)
+            conn.commit()
+            print("✅ Resúmenes reconstruidos")
+        if args.verificar or not args.reconstruir:
+            diferencias = verificar_resumenes(conn)
+            if diferencias:
+                print(f"🔴 {len(diferencias)} diferencias encontradas")
+                for d in diferencias[:20]:
+                    print(f"   {d['tabla']} {d['clave']} {d['columna']}: esperado {d['esperado']}, actual {d['actual']}")
+            else:
+                print("✅ Resúmenes consistentes con el historial")
+    finally:
+        conn.close()
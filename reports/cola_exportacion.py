@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+# reports/cola_exportacion.py - COLA DE EXPORTACIONES EN SEGUNDO PLANO
+#
+# La app solo encola el pedido en trabajos_exportacion y consulta su estado;
+# un proceso aparte toma los trabajos pendientes de a uno, arma el archivo con
+# reports.exporter (en streaming), va guardando el progreso y deja el archivo
+# en data/exportaciones hasta que vence. Así un reporte grande no bloquea el
+# proceso de Streamlit que atiende a los demás usuarios.
+#
+# Uso: python -m reports.cola_exportacion [--una-vez] [--intervalo 2]
+
+import json
+import os
+import signal
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from reports.exporter import HOJAS, REPORTES_CSV, contar_filas, exportar_a_archivo, exportar_csv_a_archivo
+from utils.helpers import DB_PATH, conexion_db
+
+DIR_EXPORTACIONES = DB_PATH.parent / "exportaciones"
+EXPIRA_HORAS = 24
+INTERVALO_SEG = 2.0
+# Mínimo entre dos escrituras de progreso de un mismo trabajo
+INTERVALO_PROGRESO_SEG = 0.5
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+MIME = {
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+
+def _texto(momento):
+    return momento.strftime(FORMATO_FECHA)
+
+
+# ==========================================
+# LADO DE LA APP
+# ==========================================
+def encolar(tipo, parametros=None):
+    """Registra un pedido de exportación y devuelve su id.
+
+    tipo 'excel': parametros {"hojas": [claves de HOJAS]} (todas por defecto).
+    tipo 'csv': parametros {"reporte": clave de REPORTES_CSV}.
+    """
+    parametros = parametros or {}
+    if tipo == "excel":
+        desconocidas = [h for h in parametros.get("hojas") or () if h not in HOJAS]
+        if desconocidas:
+            raise ValueError(f"Hojas desconocidas: {', '.join(desconocidas)}")
+    elif tipo == "csv":
+        if parametros.get("reporte") not in REPORTES_CSV:
+            raise ValueError(f"Reporte desconocido: {parametros.get('reporte')}")
+    else:
+        raise ValueError(f"Tipo de exportación desconocido: {tipo}")
+
+    with conexion_db() as conn:
+        id_trabajo = conn.execute(
+            "INSERT INTO trabajos_exportacion (tipo, parametros, creado) VALUES (?, ?, ?)",
+            (tipo, json.dumps(parametros), _texto(datetime.now()))
+        ).lastrowid
+        conn.commit()
+    return id_trabajo
+
+
+def obtener_trabajo(id_trabajo):
+    with conexion_db() as conn:
+        fila = conn.execute("SELECT * FROM trabajos_exportacion WHERE id = ?", (id_trabajo,)).fetchone()
+    return dict(fila) if fila else None
+
+
+def trabajos_recientes(limite=10):
+    """Últimos trabajos, del más nuevo al más viejo, como lista de dicts"""
+    with conexion_db() as conn:
+        filas = conn.execute(
+            "SELECT * FROM trabajos_exportacion ORDER BY id DESC LIMIT ?", (limite,)
+        ).fetchall()
+    return [dict(fila) for fila in filas]
+
+
+def hay_pendientes():
+    with conexion_db() as conn:
+        fila = conn.execute(
+            "SELECT 1 FROM trabajos_exportacion WHERE estado IN ('pendiente', 'ejecutando') LIMIT 1"
+        ).fetchone()
+    return fila is not None
+
+
+# ==========================================
+# LADO DEL PROCESO DE EXPORTACIÓN
+# ==========================================
+class _Progreso:
+    """Callback de reports.exporter que guarda el avance con escrituras espaciadas"""
+
+    def __init__(self, conn, id_trabajo, totales):
+        self.conn = conn
+        self.id_trabajo = id_trabajo
+        # Nombre de hoja/reporte -> filas esperadas, en el orden en que se escriben
+        self.totales = totales
+        self.orden = list(totales)
+        self._ultima = 0.0
+
+    def __call__(self, nombre, filas):
+        ahora = time.monotonic()
+        if ahora - self._ultima < INTERVALO_PROGRESO_SEG:
+            return
+        self._ultima = ahora
+        indice = self.orden.index(nombre)
+        fraccion = min(filas / self.totales[nombre], 1.0) if self.totales[nombre] else 1.0
+        self.conn.execute(
+            "UPDATE trabajos_exportacion SET progreso = ?, detalle = ? WHERE id = ?",
+            ((indice + fraccion) / len(self.orden), f"{nombre}: {filas:,} filas", self.id_trabajo)
+        )
+        self.conn.commit()
+
+
+def _generar(conn, trabajo, destino):
+    """Arma el archivo del trabajo en 'destino'; devuelve el nombre de descarga"""
+    parametros = json.loads(trabajo['parametros'] or "{}")
+    hoy = date.today().strftime('%Y%m%d')
+    if trabajo['tipo'] == "excel":
+        hojas = parametros.get("hojas") or list(HOJAS)
+        totales = {HOJAS[h][0]: contar_filas(HOJAS[h][1], conn) for h in hojas}
+        exportar_a_archivo(destino, hojas, progreso=_Progreso(conn, trabajo['id'], totales))
+        return f"reporte_flota_{hoy}.xlsx"
+    reporte = parametros["reporte"]
+    totales = {reporte: contar_filas(REPORTES_CSV[reporte][1], conn)}
+    exportar_csv_a_archivo(reporte, destino, progreso=_Progreso(conn, trabajo['id'], totales))
+    return f"{REPORTES_CSV[reporte][0]}_{hoy}.csv"
+
+
+def _reclamar(conn, id_trabajo):
+    """Marca el trabajo como 'ejecutando' solo si sigue pendiente (evita que lo tomen dos procesos)"""
+    cursor = conn.execute("""
+        UPDATE trabajos_exportacion SET estado = 'ejecutando', inicio = ?, progreso = 0
+        WHERE id = ? AND estado = 'pendiente'
+    """, (_texto(datetime.now()), id_trabajo))
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def ejecutar_trabajo(conn, trabajo, expira_horas=EXPIRA_HORAS):
+    """Genera el archivo y registra el resultado; devuelve el estado final"""
+    DIR_EXPORTACIONES.mkdir(parents=True, exist_ok=True)
+    extension = ".xlsx" if trabajo['tipo'] == "excel" else ".csv"
+    destino = DIR_EXPORTACIONES / f"trabajo_{trabajo['id']}{extension}"
+    try:
+        nombre = _generar(conn, trabajo, destino)
+    except Exception as e:
+        destino.unlink(missing_ok=True)
+        conn.execute("""
+            UPDATE trabajos_exportacion SET estado = 'error', error = ?, fin = ? WHERE id = ?
+        """, (f"{type(e).__name__}: {e}", _texto(datetime.now()), trabajo['id']))
+        conn.commit()
+        return "error"
+
+    fin = datetime.now()
+    conn.execute("""
+        UPDATE trabajos_exportacion
+        SET estado = 'listo', progreso = 1, detalle = NULL, ruta = ?, nombre_archivo = ?,
+            tamano_bytes = ?, fin = ?, expira = ?
+        WHERE id = ?
+    """, (str(destino), nombre, destino.stat().st_size, _texto(fin),
+          _texto(fin + timedelta(hours=expira_horas)), trabajo['id']))
+    conn.commit()
+    return "listo"
+
+
+def expirar_artefactos(ahora=None):
+    """Borra los archivos vencidos y marca sus trabajos como 'expirado'; devuelve cuántos"""
+    ahora = ahora or datetime.now()
+    with conexion_db() as conn:
+        vencidos = conn.execute("""
+            SELECT id, ruta FROM trabajos_exportacion WHERE estado = 'listo' AND expira <= ?
+        """, (_texto(ahora),)).fetchall()
+        for trabajo in vencidos:
+            Path(trabajo['ruta']).unlink(missing_ok=True)
+        conn.executemany(
+            "UPDATE trabajos_exportacion SET estado = 'expirado', ruta = NULL WHERE id = ?",
+            [(trabajo['id'],) for trabajo in vencidos]
+        )
+        conn.commit()
+    return len(vencidos)
+
+
+def recuperar_interrumpidos():
+    """Vuelve a encolar los trabajos que quedaron 'ejecutando' porque el proceso se cortó"""
+    with conexion_db() as conn:
+        cursor = conn.execute("""
+            UPDATE trabajos_exportacion SET estado = 'pendiente', progreso = 0, detalle = NULL
+            WHERE estado = 'ejecutando'
+        """)
+        conn.commit()
+    return cursor.rowcount
+
+
+def procesar_pendientes():
+    """Ejecuta los trabajos pendientes por orden de llegada; devuelve [(id, estado)]"""
+    procesados = []
+    with conexion_db() as conn:
+        while True:
+            trabajo = conn.execute("""
+                SELECT * FROM trabajos_exportacion WHERE estado = 'pendiente' ORDER BY id LIMIT 1
+            """).fetchone()
+            if trabajo is None:
+                break
+            if _reclamar(conn, trabajo['id']):
+                procesados.append((trabajo['id'], ejecutar_trabajo(conn, trabajo)))
+    return procesados
+
+
+def bucle(intervalo=INTERVALO_SEG):
+    """Loop principal hasta SIGINT/SIGTERM (un solo proceso de exportación por base)"""
+    detener = []
+    signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+    signal.signal(signal.SIGINT, lambda *_: detener.append(True))
+
+    print(f"📄 Cola de exportación iniciada (pid {os.getpid()})")
+    recuperar_interrumpidos()
+    while not detener:
+        expirar_artefactos()
+        for id_trabajo, estado in procesar_pendientes():
+            print(f"{_texto(datetime.now())} {'✅' if estado == 'listo' else '❌'} trabajo {id_trabajo}: {estado}")
+        time.sleep(intervalo)
+    print("⏹️ Cola de exportación detenida")
+
+
+if __name__ == "__main__":
+    import argparse
+    from models import init_db
+
+    parser = argparse.ArgumentParser(description="Proceso de exportaciones en segundo plano")
+    parser.add_argument("--una-vez", action="store_true", help="Procesar lo pendiente y salir")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SEG,
+                        help="Segundos entre revisiones de la cola")
+    args = parser.parse_args()
+
+    init_db()
+    if args.una_vez:
+        expirar_artefactos()
+        for id_trabajo, estado in procesar_pendientes():
+            print(f"{'✅' if estado == 'listo' else '❌'} trabajo {id_trabajo}: {estado}")
+    else:
+        bucle(args.intervalo)
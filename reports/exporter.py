@@ -1,30 +1,191 @@
 # reports/exporter.py
-import pandas as pd
+#
+# Exportación a Excel en streaming: cada hoja se llena desde un cursor SQLite
+# de a TAMANO_LOTE filas en un workbook openpyxl de solo escritura, que vuelca
+# las filas a disco a medida que llegan. El .xlsx final se guarda en un
+# archivo temporal, así la memoria no crece con el historial. Los reportes
+# CSV se escriben igual, de a lotes, con el módulo csv.
+import csv
+import os
+import tempfile
+from pathlib import Path
+
+from openpyxl import Workbook
 from utils.helpers import get_db_connection
-from io import BytesIO
 
-def exportar_flota_a_excel():
-    conn = get_db_connection()
-    
-    # Cargar datos
-    df_vehiculos = pd.read_sql_query("SELECT * FROM vehiculos", conn)
-    df_vencimientos = pd.read_sql_query("""
-        SELECT v.patente, ve.tipo, ve.fecha_vencimiento, ve.observaciones
+TAMANO_LOTE = 5000
+# Límite de filas de una hoja de Excel (incluye el encabezado)
+MAX_FILAS_HOJA = 1048576
+
+# Clave -> (nombre de la hoja, consulta)
+HOJAS = {
+    "vehiculos": ("Vehículos", "SELECT * FROM vehiculos ORDER BY patente"),
+    "conductores": ("Conductores", """
+        SELECT c.*, v.patente AS vehiculo_patente
+        FROM conductores c
+        LEFT JOIN vehiculos v ON c.vehiculo_asignado = v.id
+        ORDER BY c.nombre
+    """),
+    "vencimientos": ("Vencimientos", """
+        SELECT v.patente, ve.tipo, ve.fecha_vencimiento, ve.fecha_ultimo, ve.estado, ve.observaciones
         FROM vencimientos ve
         JOIN vehiculos v ON ve.vehiculo_id = v.id
-    """, conn)
-    df_mant = pd.read_sql_query("""
-        SELECT v.patente, m.tipo, m.fecha, m.km, m.costo, m.taller
+    """),
+    "mantenimientos": ("Mantenimientos", """
+        SELECT v.patente, m.tipo, m.fecha, m.km, m.costo, m.taller, m.prox_km, m.prox_fecha, m.observaciones
+        FROM mantenimientos m
+        JOIN vehiculos v ON m.vehiculo_id = v.id
+    """),
+    "combustible": ("Combustible", """
+        SELECT v.patente, c.fecha, c.km, c.litros, c.costo_total, c.precio_litro,
+               c.tipo_combustible, c.estacion, co.nombre AS conductor, c.rendimiento, c.observaciones
+        FROM combustible c
+        JOIN vehiculos v ON c.vehiculo_id = v.id
+        LEFT JOIN conductores co ON c.conductor_id = co.id
+    """),
+    "fallas": ("Fallas", """
+        SELECT v.patente, f.*
+        FROM fallas f
+        JOIN vehiculos v ON f.vehiculo_id = v.id
+    """),
+    "notificaciones": ("Notificaciones", "SELECT * FROM notificaciones ORDER BY nombre"),
+}
+
+# Clave -> (prefijo del archivo, consulta) de los reportes CSV
+REPORTES_CSV = {
+    "mantenimientos": ("mantenimientos", """
+        SELECT v.patente, m.tipo, m.fecha, m.km, m.costo, m.taller, m.prox_km, m.prox_fecha
         FROM mantenimientos m
         JOIN vehiculos v ON m.vehiculo_id = v.id
-    """, conn)
+        ORDER BY m.fecha DESC
+    """),
+    "combustible": ("combustible", """
+        SELECT v.patente, c.fecha, c.km, c.litros, c.costo_total, c.rendimiento, c.estacion
+        FROM combustible c
+        JOIN vehiculos v ON c.vehiculo_id = v.id
+        ORDER BY c.fecha DESC
+    """),
+}
+
+
+def _volcar_hoja(wb, titulo, cursor, tamano_lote, progreso=None):
+    """Escribe el resultado del cursor en una o más hojas (si supera el límite de Excel)"""
+    encabezado = [col[0] for col in cursor.description]
+    parte = 1
+    ws = wb.create_sheet(titulo)
+    ws.append(encabezado)
+    filas_hoja = 1
+    total = 0
+    while True:
+        lote = cursor.fetchmany(tamano_lote)
+        if not lote:
+            break
+        for fila in lote:
+            if filas_hoja == MAX_FILAS_HOJA:
+                parte += 1
+                ws = wb.create_sheet(f"{titulo} ({parte})")
+                ws.append(encabezado)
+                filas_hoja = 1
+            ws.append(fila)
+            filas_hoja += 1
+        total += len(lote)
+        if progreso:
+            progreso(titulo, total)
+    return total
+
+
+def contar_filas(sql, conn=None):
+    """Cantidad de filas que devuelve una consulta de exportación (para el progreso)"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM ({sql})").fetchone()[0]
+    finally:
+        if propia:
+            conn.close()
+
+
+def _temporal(destino, sufijo):
+    if destino is not None:
+        return Path(destino), False
+    fd, destino = tempfile.mkstemp(prefix="flota_", suffix=sufijo)
+    os.close(fd)
+    return Path(destino), True
+
+
+def exportar_a_archivo(destino=None, hojas=None, tamano_lote=TAMANO_LOTE, progreso=None):
+    """Genera el .xlsx en 'destino' (o en un temporal) y devuelve su ruta.
+
+    hojas: claves de HOJAS a incluir (todas por defecto).
+    progreso: callable(hoja, filas_escritas) llamado después de cada lote.
+    """
+    claves = list(HOJAS) if hojas is None else list(hojas)
+    desconocidas = [h for h in claves if h not in HOJAS]
+    if desconocidas:
+        raise ValueError(f"Hojas desconocidas: {', '.join(desconocidas)}")
+
+    destino, temporal = _temporal(destino, ".xlsx")
+    wb = Workbook(write_only=True)
+    conn = get_db_connection()
+    try:
+        for clave in claves:
+            titulo, sql = HOJAS[clave]
+            cursor = conn.cursor()
+            cursor.row_factory = None  # tuplas: openpyxl no acepta sqlite3.Row
+            try:
+                _volcar_hoja(wb, titulo, cursor.execute(sql), tamano_lote, progreso)
+            finally:
+                cursor.close()
+        wb.save(destino)
+    except Exception:
+        if temporal:
+            destino.unlink(missing_ok=True)
+        raise
+    finally:
+        conn.close()
+    return destino
+
+
+def exportar_csv_a_archivo(reporte, destino=None, tamano_lote=TAMANO_LOTE, progreso=None):
+    """Escribe el reporte CSV 'reporte' (clave de REPORTES_CSV) y devuelve su ruta.
+
+    progreso: callable(reporte, filas_escritas) llamado después de cada lote.
+    """
+    if reporte not in REPORTES_CSV:
+        raise ValueError(f"Reporte desconocido: {reporte}")
+    destino, temporal = _temporal(destino, ".csv")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        cursor.execute(REPORTES_CSV[reporte][1])
+        with open(destino, "w", newline="", encoding="utf-8") as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(col[0] for col in cursor.description)
+            total = 0
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    break
+                escritor.writerows(lote)
+                total += len(lote)
+                if progreso:
+                    progreso(reporte, total)
+    except Exception:
+        if temporal:
+            destino.unlink(missing_ok=True)
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return destino
 
-    conn.close()
 
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_vehiculos.to_excel(writer, sheet_name="Vehículos", index=False)
-        df_vencimientos.to_excel(writer, sheet_name="Vencimientos", index=False)
-        df_mant.to_excel(writer, sheet_name="Mantenimientos", index=False)
-    
-    return output.getvalue()
\ No newline at end of file
+def exportar_flota_a_excel(hojas=None):
+    """Bytes del .xlsx (compatibilidad); para exportaciones grandes usar exportar_a_archivo"""
+    ruta = exportar_a_archivo(hojas=hojas)
+    try:
+        return ruta.read_bytes()
+    finally:
+        ruta.unlink(missing_ok=True)
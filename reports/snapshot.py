@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+# reports/snapshot.py - SNAPSHOTS COLUMNARES PARA ANÁLISIS
+#
+# Vuelca las tablas de historial a Parquet comprimido (zstd) con tipos
+# explícitos, particionado por mes y tipo de vehículo en formato hive
+# (combustible/mes=2025-05/tipo_vehiculo=camion/part-0.parquet). Las tablas
+# chicas (vehículos, conductores) van en un solo archivo. Sin pyarrow se
+# escribe la misma estructura en CSV. cargar_snapshot lee el Parquet con
+# memory map y poda particiones por filtros, sin pasar por SQLite.
+#
+# Uso: python -m reports.snapshot [--destino data/snapshots] [--tablas combustible fallas]
+
+import csv
+import json
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from utils.helpers import DB_PATH, get_db_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Sin pyarrow: CSV particionado
+    pa = None
+
+DIR_SNAPSHOTS = DB_PATH.parent / "snapshots"
+MANIFIESTO = "manifiesto.json"
+TAMANO_LOTE = 100000
+PARTICIONES = ("mes", "tipo_vehiculo")
+
+# Tabla -> (consulta, [(columna, tipo)]); tipos: entero, real, texto, fecha.
+# Las tablas con las columnas de PARTICIONES al final se particionan.
+TABLAS = {
+    "combustible": ("""
+        SELECT c.id, c.vehiculo_id, v.patente, DATE(c.fecha) AS fecha, c.km, c.litros, c.costo_total,
+               c.precio_litro, c.tipo_combustible, c.estacion, c.conductor_id, c.rendimiento,
+               COALESCE(strftime('%Y-%m', c.fecha), 'sin_fecha') AS mes, v.tipo AS tipo_vehiculo
+        FROM combustible c
+        JOIN vehiculos v ON c.vehiculo_id = v.id
+        ORDER BY c.fecha
+    """, [("id", "entero"), ("vehiculo_id", "entero"), ("patente", "texto"), ("fecha", "fecha"),
+          ("km", "entero"), ("litros", "real"), ("costo_total", "real"), ("precio_litro", "real"),
+          ("tipo_combustible", "texto"), ("estacion", "texto"), ("conductor_id", "entero"),
+          ("rendimiento", "real"), ("mes", "texto"), ("tipo_vehiculo", "texto")]),
+    "mantenimientos": ("""
+        SELECT m.id, m.vehiculo_id, v.patente, m.tipo, m.categoria, DATE(m.fecha) AS fecha, m.km, m.costo,
+               m.taller, DATE(m.prox_fecha) AS prox_fecha, m.prox_km,
+               COALESCE(strftime('%Y-%m', m.fecha), 'sin_fecha') AS mes, v.tipo AS tipo_vehiculo
+        FROM mantenimientos m
+        JOIN vehiculos v ON m.vehiculo_id = v.id
+        ORDER BY m.fecha
+    """, [("id", "entero"), ("vehiculo_id", "entero"), ("patente", "texto"), ("tipo", "texto"),
+          ("categoria", "texto"), ("fecha", "fecha"), ("km", "entero"), ("costo", "real"),
+          ("taller", "texto"), ("prox_fecha", "fecha"), ("prox_km", "entero"),
+          ("mes", "texto"), ("tipo_vehiculo", "texto")]),
+    "fallas": ("""
+        SELECT f.id, f.vehiculo_id, v.patente, DATE(f.fecha) AS fecha, f.km, f.tipo_falla, f.gravedad,
+               f.tiempo_inmovilizado_hrs, f.costo_reparacion,
+               COALESCE(strftime('%Y-%m', f.fecha), 'sin_fecha') AS mes, v.tipo AS tipo_vehiculo
+        FROM fallas f
+        JOIN vehiculos v ON f.vehiculo_id = v.id
+        ORDER BY f.fecha
+    """, [("id", "entero"), ("vehiculo_id", "entero"), ("patente", "texto"), ("fecha", "fecha"),
+          ("km", "entero"), ("tipo_falla", "texto"), ("gravedad", "texto"),
+          ("tiempo_inmovilizado_hrs", "entero"), ("costo_reparacion", "real"),
+          ("mes", "texto"), ("tipo_vehiculo", "texto")]),
+    "vehiculos": ("""
+        SELECT id, patente, tipo, marca, modelo, anio, estado, centro_operativo, km_actual,
+               DATE(fecha_alta) AS fecha_alta
+        FROM vehiculos
+    """, [("id", "entero"), ("patente", "texto"), ("tipo", "texto"), ("marca", "texto"),
+          ("modelo", "texto"), ("anio", "entero"), ("estado", "texto"), ("centro_operativo", "texto"),
+          ("km_actual", "entero"), ("fecha_alta", "fecha")]),
+    "conductores": ("""
+        SELECT id, nombre, dni, licencia_tipo, DATE(licencia_venc) AS licencia_venc,
+               vehiculo_asignado, estado
+        FROM conductores
+    """, [("id", "entero"), ("nombre", "texto"), ("dni", "texto"), ("licencia_tipo", "texto"),
+          ("licencia_venc", "fecha"), ("vehiculo_asignado", "entero"), ("estado", "texto")]),
+}
+
+_DTYPES_PANDAS = {"entero": "Int64", "real": "float64"}
+
+
+def formato_disponible():
+    return "parquet" if pa is not None else "csv"
+
+
+def _particionada(columnas):
+    return tuple(nombre for nombre, _ in columnas[-len(PARTICIONES):]) == PARTICIONES
+
+
+def _lotes(cursor, tamano_lote):
+    while True:
+        lote = cursor.fetchmany(tamano_lote)
+        if not lote:
+            return
+        yield lote
+
+
+# ==========================================
+# ESCRITURA
+# ==========================================
+def _esquema_arrow(columnas):
+    tipos = {"entero": pa.int64(), "real": pa.float64(), "texto": pa.string(), "fecha": pa.date32()}
+    return pa.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas])
+
+
+def _lote_arrow(filas, esquema):
+    arrays = []
+    for campo, valores in zip(esquema, zip(*filas)):
+        if campo.type == pa.date32():
+            # SQLite guarda las fechas como texto ISO
+            arrays.append(pa.array(valores, pa.string()).cast(pa.date32()))
+        else:
+            arrays.append(pa.array(valores, campo.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=esquema)
+
+
+class _ArchivoParquet:
+    def __init__(self, ruta, columnas):
+        self.esquema = _esquema_arrow(columnas)
+        self.escritor = pq.ParquetWriter(ruta.with_suffix(".parquet"), self.esquema, compression="zstd")
+
+    def escribir(self, filas):
+        self.escritor.write_batch(_lote_arrow(filas, self.esquema))
+
+    def cerrar(self):
+        self.escritor.close()
+
+
+class _ArchivoCSV:
+    def __init__(self, ruta, columnas):
+        self.archivo = open(ruta.with_suffix(".csv"), "w", newline="", encoding="utf-8")
+        self.escritor = csv.writer(self.archivo)
+        self.escritor.writerow(nombre for nombre, _ in columnas)
+
+    def escribir(self, filas):
+        self.escritor.writerows(filas)
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+def _volcar(cursor, columnas, destino, tamano_lote, clase_archivo):
+    """Reparte las filas del cursor en un archivo por partición (mes, tipo de vehículo)"""
+    n_particion = len(PARTICIONES) if _particionada(columnas) else 0
+    propias = columnas[:len(columnas) - n_particion]
+    abiertos = {}
+    partes = {}
+    total = 0
+    destino.mkdir(parents=True)
+    try:
+        for lote in _lotes(cursor, tamano_lote):
+            total += len(lote)
+            grupos = {}
+            for fila in lote:
+                grupos.setdefault(fila[len(propias):], []).append(fila[:len(propias)])
+            # Las consultas vienen ordenadas por fecha: un mes anterior al
+            # menor del lote ya no recibe filas y su archivo se puede cerrar
+            if n_particion:
+                mes_actual = min(clave[0] for clave in grupos)
+                for clave in [c for c in abiertos if c[0] < mes_actual]:
+                    abiertos.pop(clave).cerrar()
+            for clave, filas in grupos.items():
+                archivo = abiertos.get(clave)
+                if archivo is None:
+                    carpeta = destino.joinpath(*(f"{p}={v}" for p, v in zip(PARTICIONES, clave)))
+                    carpeta.mkdir(parents=True, exist_ok=True)
+                    # Si una partición se reabre, va a un archivo nuevo
+                    partes[clave] = partes.get(clave, -1) + 1
+                    archivo = abiertos[clave] = clase_archivo(carpeta / f"part-{partes[clave]}", propias)
+                archivo.escribir(filas)
+    finally:
+        for archivo in abiertos.values():
+            archivo.cerrar()
+    return total
+
+
+def generar_snapshot(destino=DIR_SNAPSHOTS, tablas=None, tamano_lote=TAMANO_LOTE):
+    """Escribe un snapshot de cada tabla y el manifiesto; devuelve el manifiesto como dict.
+
+    Cada tabla se arma en una carpeta temporal y reemplaza a la anterior al
+    terminar, así un lector nunca ve un snapshot a medio escribir.
+    """
+    destino = Path(destino)
+    claves = list(TABLAS) if tablas is None else list(tablas)
+    desconocidas = [t for t in claves if t not in TABLAS]
+    if desconocidas:
+        raise ValueError(f"Tablas desconocidas: {', '.join(desconocidas)}")
+
+    formato = formato_disponible()
+    clase_archivo = _ArchivoParquet if formato == "parquet" else _ArchivoCSV
+    ruta_manifiesto = destino / MANIFIESTO
+    manifiesto = json.loads(ruta_manifiesto.read_text()) if ruta_manifiesto.exists() else {"tablas": {}}
+    destino.mkdir(parents=True, exist_ok=True)
+
+    conn = get_db_connection()
+    try:
+        for tabla in claves:
+            sql, columnas = TABLAS[tabla]
+            inicio = time.perf_counter()
+            temporal = destino / f".{tabla}.tmp"
+            shutil.rmtree(temporal, ignore_errors=True)
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            try:
+                filas = _volcar(cursor.execute(sql), columnas, temporal, tamano_lote, clase_archivo)
+            except Exception:
+                shutil.rmtree(temporal, ignore_errors=True)
+                raise
+            finally:
+                cursor.close()
+            final = destino / tabla
+            anterior = destino / f".{tabla}.old"
+            shutil.rmtree(anterior, ignore_errors=True)
+            if final.exists():
+                final.rename(anterior)
+            temporal.rename(final)
+            shutil.rmtree(anterior, ignore_errors=True)
+            manifiesto["tablas"][tabla] = {
+                "formato": formato,
+                "generado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "filas": filas,
+                "bytes": sum(f.stat().st_size for f in final.rglob("*") if f.is_file()),
+                "duracion_seg": round(time.perf_counter() - inicio, 3),
+            }
+    finally:
+        conn.close()
+    ruta_manifiesto.write_text(json.dumps(manifiesto, indent=2))
+    return manifiesto
+
+
+# ==========================================
+# LECTURA
+# ==========================================
+def leer_manifiesto(directorio=DIR_SNAPSHOTS):
+    ruta = Path(directorio) / MANIFIESTO
+    return json.loads(ruta.read_text()) if ruta.exists() else None
+
+
+_OPERADORES = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a.isin(b) if hasattr(a, "isin") else a in b,
+}
+
+
+def _cargar_csv(carpeta, columnas_tabla, columnas, filtros):
+    particionada = _particionada(columnas_tabla)
+    filtros_particion = [f for f in filtros if f[0] in PARTICIONES] if particionada else []
+    partes = []
+    for archivo in sorted(carpeta.rglob("part-*.csv")):
+        valores = dict(p.split("=", 1) for p in archivo.relative_to(carpeta).parts[:-1])
+        # Poda por nombre de carpeta antes de leer el archivo
+        if not all(_OPERADORES[op](valores[col], valor) for col, op, valor in filtros_particion):
+            continue
+        df = pd.read_csv(archivo, dtype=str, keep_default_na=True)
+        for col, valor in valores.items():
+            df[col] = valor
+        partes.append(df)
+    nombres = [nombre for nombre, _ in columnas_tabla]
+    df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=nombres)
+    for nombre, tipo in columnas_tabla:
+        if tipo == "fecha":
+            df[nombre] = pd.to_datetime(df[nombre]).dt.date
+        elif tipo != "texto":
+            df[nombre] = pd.to_numeric(df[nombre]).astype(_DTYPES_PANDAS[tipo])
+    for col, op, valor in filtros:
+        if col not in PARTICIONES or not particionada:
+            df = df[_OPERADORES[op](df[col], valor)]
+    return df[list(columnas) if columnas else nombres].reset_index(drop=True)
+
+
+def cargar_snapshot(tabla, columnas=None, filtros=None, directorio=DIR_SNAPSHOTS):
+    """DataFrame de un snapshot, o None si todavía no se generó.
+
+    columnas: subconjunto a leer (en Parquet solo se leen esas columnas).
+    filtros: [(columna, operador, valor)], p.ej. [("mes", ">=", "2025-01")];
+             los filtros sobre mes y tipo_vehiculo descartan particiones enteras.
+    """
+    manifiesto = leer_manifiesto(directorio)
+    carpeta = Path(directorio) / tabla
+    if not manifiesto or tabla not in manifiesto["tablas"] or not carpeta.exists():
+        return None
+    filtros = list(filtros or [])
+    columnas_tabla = TABLAS[tabla][1]
+
+    if manifiesto["tablas"][tabla]["formato"] == "csv":
+        return _cargar_csv(carpeta, columnas_tabla, columnas, filtros)
+    if pa is None:
+        raise RuntimeError("El snapshot está en Parquet y pyarrow no está instalado")
+
+    particionada = _particionada(columnas_tabla)
+    tabla_arrow = pq.read_table(
+        carpeta, columns=list(columnas) if columnas else None, filters=filtros or None,
+        memory_map=True, partitioning="hive" if particionada else None,
+    )
+    df = tabla_arrow.to_pandas()
+    # Las columnas de partición vuelven como categorías: se dejan como texto
+    for col in PARTICIONES:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Snapshot columnar de las tablas de la flota")
+    parser.add_argument("--destino", default=str(DIR_SNAPSHOTS))
+    parser.add_argument("--tablas", nargs="+", choices=list(TABLAS))
+    args = parser.parse_args()
+
+    print(f"📦 Formato: {formato_disponible()}")
+    for tabla, datos in generar_snapshot(args.destino, args.tablas)["tablas"].items():
+        print(f"✅ {tabla}: {datos['filas']:,} filas, {datos['bytes'] / 1e6:.1f} MB en {datos['duracion_seg']}s")
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# repositories/__init__.py - CAPA DE ACCESO A DATOS POR AGREGADO
+#
+# Cada módulo reúne las lecturas de un agregado (vehiculos, conductores,
+# combustible, mantenimientos, vencimientos, fallas, notificaciones, tareas)
+# como funciones parametrizadas que devuelven DataFrames (o un NamedTuple
+# para una sola fila). Las vistas no escriben SQL de lectura: piden los
+# datos acá, que es el único lugar donde se decide qué se cachea, qué índice
+# usa cada consulta y qué se instrumenta. Todas aceptan conn=None (usan una
+# del pool) o una conexión ya abierta para compartirla entre varias lecturas.
+#
+# Uso: from repositories import vehiculos
+#      df = vehiculos.listar(estado="activo")
+
+from repositories import (
+    combustible, conductores, fallas, mantenimientos, notificaciones, tareas, vehiculos, vencimientos,
+)
+
+__all__ = [
+    "combustible", "conductores", "fallas", "mantenimientos", "notificaciones", "tareas", "vehiculos",
+    "vencimientos",
+]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# repositories/_lectura.py - LECTURA COMÚN DE LOS REPOSITORIOS
+
+import pandas as pd
+from utils.cache import consulta_cacheada
+from utils.helpers import get_db_connection
+
+
+def leer(sql, params=(), conn=None, cache=False) -> pd.DataFrame:
+    """DataFrame de la consulta: con 'conn' si se pasa, si no por la caché (cache=True) o con una conexión del pool"""
+    if conn is None and cache:
+        return consulta_cacheada(sql, params)
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        if propia:
+            conn.close()
+
+
+def leer_fila(sql, params=(), conn=None):
+    """Primera fila de la consulta (sqlite3.Row) o None"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        return conn.execute(sql, params).fetchone()
+    finally:
+        if propia:
+            conn.close()
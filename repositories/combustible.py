@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# repositories/combustible.py - LECTURAS DE CARGAS DE COMBUSTIBLE
+#
+# Las agregaciones sobre todo el historial se cachean: la caché se invalida
+# al confirmar cualquier escritura en combustible (ver utils/cache.py).
+# consumo_por_vehiculo también puede calcularse sobre el snapshot columnar
+# (reports/snapshot.py), que no cambia con las escrituras.
+
+from typing import Optional
+
+import pandas as pd
+from repositories._lectura import leer, leer_fila
+
+# Diferencias de km/día fuera de este rango son errores de carga, no recorrido
+MAX_KM_DIA = 1000
+
+
+def de_vehiculo(vehiculo_id: int, limite: int = 20, conn=None) -> pd.DataFrame:
+    """Últimas cargas del vehículo (más recientes primero)"""
+    return leer("""
+        SELECT fecha, km, litros, costo_total, rendimiento, tipo_combustible, estacion
+        FROM combustible
+        WHERE vehiculo_id = ?
+        ORDER BY fecha DESC
+        LIMIT ?
+    """, (int(vehiculo_id), limite), conn, cache=True)
+
+
+def de_conductor(conductor_id: int, limite: int = 30, conn=None) -> pd.DataFrame:
+    """Últimas cargas hechas por el conductor, con la patente del vehículo"""
+    return leer("""
+        SELECT c.fecha, v.patente, c.km, c.litros, c.costo_total, c.rendimiento, c.estacion
+        FROM combustible c
+        JOIN vehiculos v ON c.vehiculo_id = v.id
+        WHERE c.conductor_id = ?
+        ORDER BY c.fecha DESC
+        LIMIT ?
+    """, (int(conductor_id), limite), conn, cache=True)
+
+
+def km_diario_promedio(vehiculo_id: int, conn=None) -> float:
+    """Promedio de km recorridos por día entre cargas consecutivas (0.0 sin datos)"""
+    fila = leer_fila("""
+        SELECT AVG(diferencia_km) AS prom_km_dia FROM (
+            SELECT
+                (km - LAG(km) OVER (ORDER BY fecha)) /
+                (julianday(fecha) - julianday(LAG(fecha) OVER (ORDER BY fecha))) AS diferencia_km
+            FROM combustible
+            WHERE vehiculo_id = ? AND km IS NOT NULL
+        ) WHERE diferencia_km > 0 AND diferencia_km < ?
+    """, (int(vehiculo_id), MAX_KM_DIA), conn)
+    return float(fila[0]) if fila and fila[0] else 0.0
+
+
+def _consumo_desde_snapshot() -> pd.DataFrame:
+    from reports.snapshot import cargar_snapshot
+
+    df = cargar_snapshot("combustible", columnas=[
+        "vehiculo_id", "patente", "tipo_vehiculo", "litros", "costo_total", "rendimiento", "precio_litro"
+    ])
+    return (
+        df.groupby("vehiculo_id")
+        .agg(
+            patente=("patente", "first"),
+            tipo=("tipo_vehiculo", "first"),
+            total_cargas=("vehiculo_id", "size"),
+            total_litros=("litros", "sum"),
+            total_gastado=("costo_total", "sum"),
+            rendimiento_promedio=("rendimiento", "mean"),
+            rendimiento_minimo=("rendimiento", "min"),
+            rendimiento_maximo=("rendimiento", "max"),
+            precio_promedio_litro=("precio_litro", "mean"),
+        )
+        .sort_values("total_gastado", ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def consumo_por_vehiculo(estado: Optional[str] = "activo", desde_snapshot: bool = False,
+                         conn=None) -> pd.DataFrame:
+    """Totales y rendimiento por vehículo con cargas, de mayor a menor gasto; cacheado.
+
+    estado=None: vehículos en cualquier estado. desde_snapshot: mismas columnas
+    calculadas sobre el snapshot de combustible (solo con estado=None).
+    """
+    if desde_snapshot:
+        if estado is not None:
+            raise ValueError("El snapshot de combustible no filtra por estado del vehículo")
+        return _consumo_desde_snapshot()
+    where, params = ("WHERE v.estado = ?", (estado,)) if estado is not None else ("", ())
+    return leer(f"""
+        SELECT
+            v.patente,
+            v.tipo,
+            COUNT(c.id) AS total_cargas,
+            SUM(c.litros) AS total_litros,
+            SUM(c.costo_total) AS total_gastado,
+            AVG(c.rendimiento) AS rendimiento_promedio,
+            MIN(c.rendimiento) AS rendimiento_minimo,
+            MAX(c.rendimiento) AS rendimiento_maximo,
+            AVG(c.precio_litro) AS precio_promedio_litro
+        FROM vehiculos v
+        LEFT JOIN combustible c ON v.id = c.vehiculo_id
+        {where}
+        GROUP BY v.id
+        HAVING total_cargas > 0
+        ORDER BY total_gastado DESC
+    """, params, conn, cache=True)
+
+
+def bajo_rendimiento(factor: float = 0.7, conn=None) -> pd.DataFrame:
+    """Vehículos cuyo rendimiento promedio es menor a factor × el promedio de la flota; cacheado"""
+    return leer("""
+        SELECT
+            v.patente,
+            AVG(c.rendimiento) AS rend_actual,
+            (SELECT AVG(rendimiento) FROM combustible WHERE rendimiento IS NOT NULL) AS rend_general
+        FROM vehiculos v
+        JOIN combustible c ON v.id = c.vehiculo_id
+        WHERE c.rendimiento IS NOT NULL
+        GROUP BY v.id
+        HAVING rend_actual < rend_general * ?
+    """, (factor,), conn, cache=True)
+
+
+def ultima_carga(vehiculo_id: int, conn=None):
+    """(km, fecha) de la carga más reciente del vehículo como sqlite3.Row, o None"""
+    return leer_fila("""
+        SELECT km, fecha FROM combustible
+        WHERE vehiculo_id = ?
+        ORDER BY fecha DESC, km DESC
+        LIMIT 1
+    """, (int(vehiculo_id),), conn)
+
+
+def rendimiento_promedio(vehiculo_id: int, conn=None) -> Optional[float]:
+    """Rendimiento promedio (km/l) de las cargas del vehículo que lo tienen calculado"""
+    fila = leer_fila("""
+        SELECT AVG(rendimiento) FROM combustible
+        WHERE vehiculo_id = ? AND rendimiento IS NOT NULL
+    """, (int(vehiculo_id),), conn)
+    return fila[0] if fila else None
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# repositories/conductores.py - LECTURAS DE CONDUCTORES
+
+from typing import Optional
+
+import pandas as pd
+from repositories._lectura import leer
+
+COLUMNAS = (
+    "id", "nombre", "dni", "fecha_nacimiento", "telefono", "email", "licencia_tipo", "licencia_venc",
+    "licencia_cargas_peligrosas", "examen_psicofisico", "curso_iram", "vehiculo_asignado", "estado",
+    "observaciones",
+)
+
+_ORDEN_ESTADO = """
+    CASE c.estado
+        WHEN 'activo' THEN 1
+        WHEN 'suspendido' THEN 2
+        WHEN 'inactivo' THEN 3
+    END
+"""
+
+
+def listar(estado: Optional[str] = None, por_estado: bool = False, conn=None) -> pd.DataFrame:
+    """Conductores (COLUMNAS + patente del vehículo asignado), por nombre o por estado y nombre; cacheado"""
+    where, params = ("WHERE c.estado = ?", (estado,)) if estado is not None else ("", ())
+    orden = f"{_ORDEN_ESTADO}, c.nombre" if por_estado else "c.nombre"
+    return leer(f"""
+        SELECT {', '.join(f'c.{col}' for col in COLUMNAS)}, v.patente
+        FROM conductores c
+        LEFT JOIN vehiculos v ON c.vehiculo_asignado = v.id
+        {where}
+        ORDER BY {orden}
+    """, params, conn, cache=True)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# repositories/fallas.py - LECTURAS DE FALLAS Y REPARACIONES
+#
+# Los totales por vehículo salen de resumen_vehiculo (mantenida por
+# triggers); las consultas por período dependen de la fecha actual y no se
+# cachean.
+
+import pandas as pd
+from repositories._lectura import leer
+
+
+def de_vehiculo(vehiculo_id: int, conn=None) -> pd.DataFrame:
+    """Fallas del vehículo, más recientes primero"""
+    return leer("""
+        SELECT fecha, tipo_falla, descripcion, gravedad, tiempo_inmovilizado_hrs, costo_reparacion, solucion
+        FROM fallas
+        WHERE vehiculo_id = ?
+        ORDER BY fecha DESC
+    """, (int(vehiculo_id),), conn, cache=True)
+
+
+def resumen_por_vehiculo(conn=None) -> pd.DataFrame:
+    """Fallas acumuladas de los vehículos activos o en reparación que tuvieron alguna, de más a menos; cacheado"""
+    # resumen_vehiculo: O(vehículos) en lugar de agrupar todas las fallas
+    return leer("""
+        SELECT
+            v.patente,
+            v.tipo,
+            CAST(r.fallas_cantidad AS INTEGER) AS total_fallas,
+            CAST(r.fallas_criticas AS INTEGER) AS fallas_criticas,
+            r.horas_inmovilizado,
+            r.costo_reparaciones
+        FROM vehiculos v
+        JOIN resumen_vehiculo r ON r.vehiculo_id = v.id
+        WHERE v.estado IN ('activo', 'en_reparacion')
+        AND r.fallas_cantidad > 0
+        ORDER BY total_fallas DESC
+    """, conn=conn, cache=True)
+
+
+def recurrentes(meses: int = 3, minimo: int = 3, conn=None) -> pd.DataFrame:
+    """Vehículos con al menos 'minimo' fallas en los últimos 'meses'"""
+    return leer("""
+        SELECT v.patente, COUNT(f.id) AS cant_fallas
+        FROM vehiculos v
+        JOIN fallas f ON v.id = f.vehiculo_id
+        WHERE f.fecha >= DATE('now', ?)
+        GROUP BY v.id
+        HAVING cant_fallas >= ?
+    """, (f"-{int(meses)} months", minimo), conn)
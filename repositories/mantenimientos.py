@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# repositories/mantenimientos.py - LECTURAS DE MANTENIMIENTOS
+#
+# Las consultas de pendientes y por período dependen de la fecha actual
+# (julianday('now')) y no se cachean.
+
+from typing import NamedTuple
+
+import pandas as pd
+from repositories._lectura import leer, leer_fila
+
+
+class ResumenPreventivos(NamedTuple):
+    """Mantenimientos de vehículos activos"""
+    con_prox_km: int   # con próximo service por km
+    vencidos_km: int   # ya pasados de ese km
+    atrasados: int     # pasados de km o de fecha
+
+
+def de_vehiculo(vehiculo_id: int, por_tipo: bool = False, conn=None) -> pd.DataFrame:
+    """Todos los mantenimientos del vehículo, más recientes primero (agrupados por tipo si por_tipo)"""
+    orden = "tipo, fecha DESC" if por_tipo else "fecha DESC"
+    return leer(f"""
+        SELECT tipo, fecha, km, prox_km, prox_fecha, costo, taller, observaciones
+        FROM mantenimientos
+        WHERE vehiculo_id = ?
+        ORDER BY {orden}
+    """, (int(vehiculo_id),), conn, cache=True)
+
+
+def recientes(limite: int = 100, conn=None) -> pd.DataFrame:
+    """Últimos mantenimientos de toda la flota con la patente; cacheado"""
+    return leer("""
+        SELECT
+            v.patente, m.fecha, m.tipo, m.categoria, m.km, m.costo, m.taller,
+            m.prox_km, m.prox_fecha, m.observaciones
+        FROM mantenimientos m
+        JOIN vehiculos v ON m.vehiculo_id = v.id
+        ORDER BY m.fecha DESC
+        LIMIT ?
+    """, (limite,), conn, cache=True)
+
+
+def pendientes_por_km(conn=None) -> pd.DataFrame:
+    """Mantenimientos de vehículos activos a menos de alerta_km de su próximo km, los más atrasados primero"""
+    return leer("""
+        SELECT
+            v.patente,
+            v.km_actual,
+            m.tipo,
+            m.km AS ultimo_km,
+            m.prox_km,
+            (m.prox_km - v.km_actual) AS km_faltantes,
+            m.alerta_km
+        FROM mantenimientos m
+        JOIN vehiculos v ON m.vehiculo_id = v.id
+        WHERE v.estado = 'activo'
+        AND m.prox_km IS NOT NULL
+        AND v.km_actual IS NOT NULL
+        AND (m.prox_km - v.km_actual) <= m.alerta_km
+        ORDER BY km_faltantes
+    """, conn=conn)
+
+
+def pendientes_por_fecha(dias: int = 30, conn=None) -> pd.DataFrame:
+    """Mantenimientos de vehículos activos con próxima fecha dentro de 'dias' (o ya vencida)"""
+    return leer("""
+        SELECT
+            v.patente,
+            m.tipo,
+            m.fecha AS ultimo_mant,
+            m.prox_fecha,
+            julianday(m.prox_fecha) - julianday('now') AS dias_faltantes
+        FROM mantenimientos m
+        JOIN vehiculos v ON m.vehiculo_id = v.id
+        WHERE v.estado = 'activo'
+        AND m.prox_fecha IS NOT NULL
+        AND julianday(m.prox_fecha) - julianday('now') <= ?
+        ORDER BY dias_faltantes
+    """, (dias,), conn)
+
+
+def por_dia(meses: int = 6, conn=None) -> pd.DataFrame:
+    """Cantidad y costo de mantenimientos por día de los últimos 'meses' (fecha como datetime)"""
+    df = leer("""
+        SELECT
+            DATE(fecha) AS fecha,
+            COUNT(*) AS cantidad_mantenimientos,
+            SUM(costo) AS costo_total
+        FROM mantenimientos
+        WHERE fecha >= DATE('now', ?)
+        GROUP BY DATE(fecha)
+        ORDER BY fecha
+    """, (f"-{int(meses)} months",), conn)
+    df["fecha"] = pd.to_datetime(df["fecha"])
+    return df
+
+
+def costo_mensual(meses: int = 6, conn=None) -> pd.DataFrame:
+    """Costo total de mantenimientos por mes ('YYYY-MM') de los últimos 'meses'"""
+    return leer("""
+        SELECT
+            strftime('%Y-%m', fecha) AS mes,
+            SUM(costo) AS costo_total
+        FROM mantenimientos
+        WHERE fecha >= DATE('now', ?)
+        GROUP BY strftime('%Y-%m', fecha)
+        ORDER BY mes
+    """, (f"-{int(meses)} months",), conn)
+
+
+def resumen_preventivos(conn=None) -> ResumenPreventivos:
+    """Conteos de cumplimiento de los mantenimientos preventivos, en una sola pasada"""
+    fila = leer_fila("""
+        SELECT
+            COALESCE(SUM(m.prox_km IS NOT NULL), 0),
+            COALESCE(SUM(m.prox_km IS NOT NULL AND v.km_actual IS NOT NULL AND (m.prox_km - v.km_actual) < 0), 0),
+            COALESCE(SUM((m.prox_km IS NOT NULL AND v.km_actual IS NOT NULL AND (m.prox_km - v.km_actual) < 0)
+                          OR (m.prox_fecha IS NOT NULL AND m.prox_fecha < DATE('now'))), 0)
+        FROM mantenimientos m
+        JOIN vehiculos v ON m.vehiculo_id = v.id
+        WHERE v.estado = 'activo'
+    """, conn=conn)
+    return ResumenPreventivos(*fila)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# repositories/notificaciones.py - DESTINATARIOS Y REGISTRO DE ENVÍOS DE EMAIL
+
+import pandas as pd
+from repositories._lectura import leer
+from utils.helpers import get_db_connection
+
+
+def destinatarios(solo_alertas_criticas: bool = False, conn=None) -> pd.DataFrame:
+    """Destinatarios activos (id, nombre, email, telefono, cargo) por nombre; cacheado"""
+    filtro = " AND recibe_alertas_criticas = 1" if solo_alertas_criticas else ""
+    return leer(f"""
+        SELECT id, nombre, email, telefono, cargo
+        FROM notificaciones
+        WHERE activo = 1{filtro}
+        ORDER BY nombre
+    """, (), conn, cache=True)
+
+
+def agregar_destinatario(nombre: str, email: str, telefono=None, cargo=None, conn=None) -> int:
+    """Da de alta un destinatario y devuelve su id; sqlite3.IntegrityError si el email ya existe"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        cursor = conn.execute("""
+            INSERT INTO notificaciones (nombre, email, telefono, cargo)
+            VALUES (?, ?, ?, ?)
+        """, (nombre, email, telefono, cargo))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        if propia:
+            conn.close()
+
+
+def envios_recientes(limite: int = 50, conn=None) -> pd.DataFrame:
+    """Últimas entregas de envios_email, de la más nueva a la más vieja (sin caché: las escribe el despachador)"""
+    return leer("""
+        SELECT fecha_hora, destinatario, asunto, estado, intentos, error
+        FROM envios_email
+        ORDER BY fecha_hora DESC
+        LIMIT ?
+    """, (limite,), conn)
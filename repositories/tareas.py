@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# repositories/tareas.py - LECTURAS DE TAREAS PROGRAMADAS
+
+from typing import NamedTuple, Optional
+
+from repositories._lectura import leer_fila
+
+
+class Tarea(NamedTuple):
+    """Una fila de tareas_programadas"""
+    nombre: str
+    hora: str
+    dias_semana: str
+    parametros: Optional[str]
+    activo: int
+    proxima_ejecucion: Optional[str]
+    ultima_ejecucion: Optional[str]
+    ultimo_estado: Optional[str]
+    ultimo_resultado: Optional[str]
+
+
+COLUMNAS = ", ".join(Tarea._fields)
+
+
+def obtener(nombre: str, conn=None) -> Optional[Tarea]:
+    """La tarea con ese nombre, o None (sin caché: la actualiza el proceso programador)"""
+    fila = leer_fila(f"SELECT {COLUMNAS} FROM tareas_programadas WHERE nombre = ?", (nombre,), conn)
+    return Tarea(*fila) if fila else None
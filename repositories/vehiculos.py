@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# repositories/vehiculos.py - LECTURAS DE VEHÍCULOS
+
+from typing import NamedTuple, Optional
+
+import pandas as pd
+from repositories._lectura import leer, leer_fila
+
+
+class Vehiculo(NamedTuple):
+    """Una fila de vehiculos"""
+    id: int
+    patente: str
+    tipo: str
+    marca: Optional[str]
+    modelo: Optional[str]
+    anio: Optional[int]
+    chasis: Optional[str]
+    motor: Optional[str]
+    estado: str
+    centro_operativo: Optional[str]
+    km_actual: Optional[int]
+    fecha_alta: Optional[str]
+    observaciones: Optional[str]
+    capacidad_tanque: Optional[float]
+
+
+COLUMNAS = ", ".join(Vehiculo._fields)
+
+# Listado completo: primero los operativos
+_ORDEN_ESTADO = """
+    CASE estado
+        WHEN 'activo' THEN 1
+        WHEN 'en_reparacion' THEN 2
+        WHEN 'detenido' THEN 3
+        WHEN 'baja' THEN 4
+    END
+"""
+
+
+def listar(estado: Optional[str] = None, excluir_bajas: bool = False, por_estado: bool = False,
+           conn=None) -> pd.DataFrame:
+    """Vehículos con las columnas de Vehiculo, por patente (o por estado y patente); cacheado"""
+    condiciones, params = [], []
+    if estado is not None:
+        condiciones.append("estado = ?")
+        params.append(estado)
+    if excluir_bajas:
+        condiciones.append("estado != 'baja'")
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    orden = f"{_ORDEN_ESTADO}, patente" if por_estado else "patente"
+    return leer(f"SELECT {COLUMNAS} FROM vehiculos {where} ORDER BY {orden}", params, conn, cache=True)
+
+
+def obtener(vehiculo_id: int, conn=None) -> Optional[Vehiculo]:
+    """El vehículo con ese id, o None"""
+    # int(): los ids tomados de un DataFrame son numpy.int64, que sqlite3 no sabe comparar
+    fila = leer_fila(f"SELECT {COLUMNAS} FROM vehiculos WHERE id = ?", (int(vehiculo_id),), conn)
+    return Vehiculo(*fila) if fila else None
+
+
+def disponibilidad_por_tipo(conn=None) -> pd.DataFrame:
+    """Vehículos no dados de baja por tipo y estado, con el % activo; cacheado"""
+    df = leer("""
+        SELECT
+            tipo,
+            COUNT(*) AS total,
+            SUM(CASE WHEN estado = 'activo' THEN 1 ELSE 0 END) AS activos,
+            SUM(CASE WHEN estado = 'en_reparacion' THEN 1 ELSE 0 END) AS en_reparacion,
+            SUM(CASE WHEN estado = 'detenido' THEN 1 ELSE 0 END) AS detenidos
+        FROM vehiculos
+        WHERE estado != 'baja'
+        GROUP BY tipo
+    """, conn=conn, cache=True)
+    df["disponibilidad_pct"] = (df["activos"] / df["total"] * 100).round(1)
+    return df
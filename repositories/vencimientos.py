@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# repositories/vencimientos.py - LECTURAS DE DOCUMENTACIÓN Y VENCIMIENTOS
+#
+# Las consultas con días faltantes dependen de la fecha actual
+# (julianday('now')) y no se cachean.
+
+from typing import NamedTuple
+
+import pandas as pd
+from repositories._lectura import leer, leer_fila
+
+
+class ResumenVencimientos(NamedTuple):
+    """Documentación de vehículos activos"""
+    total: int
+    vencidos: int
+    proximos: int  # vencen entre hoy y los días pedidos
+
+
+def de_vehiculo(vehiculo_id: int, conn=None) -> pd.DataFrame:
+    """Documentación del vehículo, la que vence antes primero"""
+    return leer("""
+        SELECT tipo, fecha_vencimiento, fecha_ultimo, alerta_dias, observaciones
+        FROM vencimientos
+        WHERE vehiculo_id = ?
+        ORDER BY fecha_vencimiento
+    """, (int(vehiculo_id),), conn, cache=True)
+
+
+def activos(conn=None) -> pd.DataFrame:
+    """Vencimientos activos de vehículos activos con los días que faltan"""
+    return leer("""
+        SELECT
+            v.patente,
+            ve.tipo,
+            ve.fecha_vencimiento,
+            ve.fecha_ultimo,
+            ve.alerta_dias,
+            ve.costo_renovacion,
+            julianday(ve.fecha_vencimiento) - julianday('now') AS dias_faltantes,
+            ve.observaciones
+        FROM vencimientos ve
+        JOIN vehiculos v ON ve.vehiculo_id = v.id
+        WHERE v.estado = 'activo' AND ve.estado = 'activo'
+        ORDER BY ve.fecha_vencimiento
+    """, conn=conn)
+
+
+def proximos(dias: int = 30, conn=None) -> pd.DataFrame:
+    """Vencimientos activos de vehículos activos que vencen entre hoy y 'dias'"""
+    return leer("""
+        SELECT
+            v.patente,
+            v.marca,
+            v.modelo,
+            ve.tipo,
+            ve.fecha_vencimiento,
+            julianday(ve.fecha_vencimiento) - julianday('now') AS dias_faltantes,
+            ve.costo_renovacion,
+            ve.observaciones
+        FROM vencimientos ve
+        JOIN vehiculos v ON ve.vehiculo_id = v.id
+        WHERE v.estado = 'activo'
+        AND ve.estado = 'activo'
+        AND julianday(ve.fecha_vencimiento) - julianday('now') BETWEEN 0 AND ?
+        ORDER BY dias_faltantes
+    """, (dias,), conn)
+
+
+def resumen(dias: int = 15, conn=None) -> ResumenVencimientos:
+    """Conteos de la documentación de vehículos activos: total, vencida y por vencer en 'dias'"""
+    fila = leer_fila("""
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(ve.fecha_vencimiento < date('now')), 0),
+            COALESCE(SUM(julianday(ve.fecha_vencimiento) - julianday('now') BETWEEN 0 AND ?), 0)
+        FROM vencimientos ve
+        JOIN vehiculos v ON ve.vehiculo_id = v.id
+        WHERE v.estado = 'activo'
+    """, (dias,), conn)
+    return ResumenVencimientos(*fila)
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+# services/anomalias_combustible.py - MOTOR DE ANOMALÍAS DE COMBUSTIBLE
+#
+# Recorre el historial completo de combustible como arrays ordenados por
+# (vehículo, fecha, km) y marca cada carga con cuatro detectores vectorizados:
+#   - rendimiento_bajo / rendimiento_alto: km/l fuera de mediana ± UMBRAL_Z
+#     MAD (desvío absoluto mediano) de las VENTANA cargas anteriores del mismo
+#     vehículo;
+#   - carga_frecuente: más de LITROS_FRECUENTE litros a menos de
+#     DIAS_FRECUENTE días de la carga anterior;
+#   - excede_tanque: más litros que la capacidad del tanque (la de vehiculos o,
+#     si no está cargada, una estimada con el historial del vehículo);
+#   - precio_atipico: precio por litro lejos de la mediana de las cargas del
+#     mismo día, estación y combustible.
+# Los eventos se guardan en anomalias_combustible. La corrida incremental solo
+# mira las cargas con id mayor al último procesado (procesos_incrementales):
+# reevalúa desde su fecha los vehículos afectados y los precios de esos días.
+# Las correcciones de cargas viejas se toman en la corrida completa.
+#
+# Uso: python -m services.anomalias_combustible [--completo]
+
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from utils.helpers import get_db_connection
+
+PROCESO = "anomalias_combustible"
+
+# Rendimiento: cargas anteriores que forman la referencia de cada carga
+VENTANA = 10
+MIN_PREVIAS = 5
+# 3.5 MAD "normalizadas" (z robusto de Iglewicz-Hoaglin)
+UMBRAL_Z = 3.5
+# Piso de la MAD como fracción de la mediana (evita dividir por ~0 con cargas idénticas)
+MAD_MINIMA = 0.02
+
+DIAS_FRECUENTE = 2
+LITROS_FRECUENTE = 50
+# Si los km recorridos no alcanzan para gastar esta fracción de lo cargado, la severidad es alta
+FRACCION_CONSUMO = 0.25
+
+# Capacidad estimada: percentil de los litros del vehículo con un margen
+PERCENTIL_TANQUE = 95
+MARGEN_ESTIMADA = 1.10
+TOLERANCIA_TANQUE = 1.05
+
+MIN_GRUPO_PRECIO = 3
+DESVIO_PRECIO = 0.15
+DESVIO_PRECIO_ALTO = 0.30
+
+# Filas por bloque en el cálculo de ventanas (VENTANA columnas float por fila)
+TAMANO_BLOQUE = 500000
+
+TIPOS_VEHICULO = ("rendimiento_bajo", "rendimiento_alto", "carga_frecuente", "excede_tanque")
+TIPOS_PRECIO = ("precio_atipico",)
+TIPOS = TIPOS_VEHICULO + TIPOS_PRECIO
+
+ETIQUETAS = {
+    "rendimiento_bajo": "📉 Rendimiento bajo",
+    "rendimiento_alto": "📈 Rendimiento alto",
+    "carga_frecuente": "⏱️ Carga frecuente",
+    "excede_tanque": "🛢️ Excede el tanque",
+    "precio_atipico": "💲 Precio atípico",
+}
+
+COLUMNAS = ["combustible_id", "tipo", "vehiculo_id", "fecha", "severidad", "valor", "referencia", "detalle"]
+
+
+class ResultadoAnomalias(NamedTuple):
+    cargas: int
+    anomalias: int
+    por_tipo: dict
+    completo: bool
+    duracion_seg: float
+
+
+# ==========================================
+# DETECTORES (arrays ordenados por vehículo, fecha, km)
+# ==========================================
+def _inicio_grupo(vehiculo_id):
+    """Índice de la primera fila del vehículo de cada fila"""
+    n = len(vehiculo_id)
+    inicio = np.ones(n, dtype=bool)
+    inicio[1:] = vehiculo_id[1:] != vehiculo_id[:-1]
+    return np.maximum.accumulate(np.where(inicio, np.arange(n), 0))
+
+
+def _mediana_filas(matriz, cantidad):
+    """Mediana de cada fila ignorando NaN, con 'cantidad' valores válidos por fila (np.sort deja los NaN al final)"""
+    ordenada = np.sort(matriz, axis=1)
+    k = np.maximum(cantidad, 1)[:, None]
+    bajo = np.take_along_axis(ordenada, (k - 1) // 2, axis=1)[:, 0]
+    alto = np.take_along_axis(ordenada, k // 2, axis=1)[:, 0]
+    return np.where(cantidad > 0, (bajo + alto) / 2, np.nan)
+
+
+def mediana_mad_previas(vehiculo_id, valores, ventana=VENTANA, min_previas=MIN_PREVIAS):
+    """Mediana y MAD de las 'ventana' filas anteriores del mismo vehículo (NaN si hay menos de min_previas)"""
+    n = len(valores)
+    mediana = np.full(n, np.nan)
+    mad = np.full(n, np.nan)
+    if n == 0:
+        return mediana, mad
+    inicio = _inicio_grupo(vehiculo_id)
+    atras = np.arange(1, ventana + 1)
+    for b0 in range(0, n, TAMANO_BLOQUE):
+        b1 = min(b0 + TAMANO_BLOQUE, n)
+        indices = np.arange(b0, b1)[:, None] - atras[None, :]
+        validos = indices >= inicio[b0:b1, None]
+        ventanas = np.where(validos, valores[np.maximum(indices, 0)], np.nan)
+        cantidad = validos.sum(axis=1)
+        med = _mediana_filas(ventanas, cantidad)
+        dispersion = _mediana_filas(np.abs(ventanas - med[:, None]), cantidad)
+        suficientes = cantidad >= min_previas
+        mediana[b0:b1] = np.where(suficientes, med, np.nan)
+        mad[b0:b1] = np.where(suficientes, dispersion, np.nan)
+    return mediana, mad
+
+
+def _eventos(df, marca, tipo, severidad, valor, referencia, detalle):
+    """Filas de evento de las cargas marcadas; detalle(marca) arma los textos solo para esas"""
+    if not marca.any():
+        return pd.DataFrame(columns=COLUMNAS)
+    return pd.DataFrame({
+        "combustible_id": df["id"].to_numpy()[marca],
+        "tipo": tipo,
+        "vehiculo_id": df["vehiculo_id"].to_numpy()[marca],
+        "fecha": df["fecha"].to_numpy()[marca],
+        "severidad": np.broadcast_to(severidad, len(df))[marca],
+        "valor": np.round(np.asarray(valor, dtype=float)[marca], 2),
+        "referencia": np.round(np.asarray(referencia, dtype=float)[marca], 2),
+        "detalle": detalle(marca),
+    })
+
+
+def _detectar_rendimiento(df):
+    con_rend = df[df["rendimiento"].notna()]
+    vehiculo = con_rend["vehiculo_id"].to_numpy()
+    rend = con_rend["rendimiento"].to_numpy(dtype=float)
+    mediana, mad = mediana_mad_previas(vehiculo, rend)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = 0.6745 * (rend - mediana) / np.maximum(mad, mediana * MAD_MINIMA)
+
+    def detalle(marca):
+        return [f"{r:.2f} km/l; mediana previa {m:.2f} (MAD {d:.2f})"
+                for r, m, d in zip(rend[marca], mediana[marca], mad[marca])]
+
+    return [
+        _eventos(con_rend, z < -UMBRAL_Z, "rendimiento_bajo", "alta", rend, mediana, detalle),
+        _eventos(con_rend, z > UMBRAL_Z, "rendimiento_alto", "media", rend, mediana, detalle),
+    ]
+
+
+def _detectar_frecuencia(df):
+    vehiculo = df["vehiculo_id"].to_numpy()
+    litros = df["litros"].to_numpy(dtype=float)
+
+    # Diferencias con la fila anterior, anuladas en el cambio de vehículo
+    mismo = np.zeros(len(df), dtype=bool)
+    mismo[1:] = vehiculo[1:] == vehiculo[:-1]
+    dias = pd.to_datetime(df["fecha"].str[:10], errors="coerce").diff().dt.days.to_numpy(dtype=float)
+    km_recorridos = df["km"].diff().to_numpy(dtype=float)
+    dias = np.where(mismo, dias, np.nan)
+    km_recorridos = np.where(mismo, km_recorridos, np.nan)
+
+    marca = (dias < DIAS_FRECUENTE) & (litros > LITROS_FRECUENTE)
+    # Litros que pudo haber gastado con los km hechos, al rendimiento mediano del vehículo
+    rend_vehiculo = df.groupby("vehiculo_id")["rendimiento"].transform("median").to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        consumo_posible = km_recorridos / rend_vehiculo
+    alta = consumo_posible < litros * FRACCION_CONSUMO
+
+    def detalle(marca):
+        return [f"{l:.0f} L a {d:.0f} días y {k:,.0f} km de la carga anterior"
+                for l, d, k in zip(litros[marca], dias[marca], km_recorridos[marca])]
+
+    return [_eventos(df, marca, "carga_frecuente", np.where(alta, "alta", "media"),
+                     dias, km_recorridos, detalle)]
+
+
+def _detectar_tanque(df):
+    litros = df["litros"].to_numpy(dtype=float)
+    grupos = df.groupby("vehiculo_id")["litros"]
+    estimada = (grupos.quantile(PERCENTIL_TANQUE / 100) * MARGEN_ESTIMADA).where(grupos.count() >= MIN_PREVIAS)
+    estimada = df["vehiculo_id"].map(estimada).to_numpy(dtype=float)
+    declarada = df["capacidad_tanque"].to_numpy(dtype=float)
+    capacidad = np.where(np.isnan(declarada), estimada, declarada)
+    marca = litros > capacidad * TOLERANCIA_TANQUE
+
+    def detalle(marca):
+        return [f"{l:.0f} L con tanque de {c:.0f} L" + (" (estimado)" if np.isnan(d) else "")
+                for l, c, d in zip(litros[marca], capacidad[marca], declarada[marca])]
+
+    return [_eventos(df, marca, "excede_tanque", np.where(np.isnan(declarada), "media", "alta"),
+                     litros, capacidad, detalle)]
+
+
+def _detectar_precio(df):
+    precio = df["precio_litro"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        calculado = df["costo_total"].to_numpy(dtype=float) / df["litros"].to_numpy(dtype=float)
+    df = df.assign(
+        _precio=np.where(np.isnan(precio) | (precio <= 0), calculado, precio),
+        _dia=df["fecha"].str[:10],
+        _estacion=df["estacion"].fillna("").str.strip().str.upper(),
+        _tipo=df["tipo_combustible"].fillna(""),
+    )
+    grupos = df[df["_estacion"] != ""].groupby(["_dia", "_estacion", "_tipo"])["_precio"]
+    mediana = grupos.transform("median").reindex(df.index).to_numpy(dtype=float)
+    cantidad = grupos.transform("count").reindex(df.index).to_numpy(dtype=float)
+    precio = df["_precio"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        desvio = precio / mediana - 1
+    marca = (cantidad >= MIN_GRUPO_PRECIO) & (np.abs(desvio) > DESVIO_PRECIO)
+    estacion = df["_estacion"].to_numpy()
+
+    def detalle(marca):
+        return [f"${p:,.2f}/L vs mediana ${m:,.2f} ({d:+.0%}) en {e}"
+                for p, m, d, e in zip(precio[marca], mediana[marca], desvio[marca], estacion[marca])]
+
+    return [_eventos(df, marca, "precio_atipico", np.where(np.abs(desvio) > DESVIO_PRECIO_ALTO, "alta", "media"),
+                     precio, mediana, detalle)]
+
+
+def detectar(df, tipos=TIPOS):
+    """Eventos (DataFrame con COLUMNAS) de las cargas de df; df debe traer el historial necesario"""
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+    df = df.sort_values(["vehiculo_id", "fecha", "km", "id"], kind="stable", ignore_index=True)
+    partes = []
+    if "rendimiento_bajo" in tipos or "rendimiento_alto" in tipos:
+        partes += _detectar_rendimiento(df)
+    if "carga_frecuente" in tipos:
+        partes += _detectar_frecuencia(df)
+    if "excede_tanque" in tipos:
+        partes += _detectar_tanque(df)
+    if "precio_atipico" in tipos:
+        partes += _detectar_precio(df)
+    partes = [p for p in partes if len(p) and p["tipo"].iloc[0] in tipos]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS)
+    return pd.concat(partes, ignore_index=True)
+
+
+# ==========================================
+# LECTURA DEL HISTORIAL
+# ==========================================
+SQL_CARGAS = """
+    SELECT c.id, c.vehiculo_id, c.fecha, c.km, c.litros, c.costo_total, c.precio_litro,
+           c.tipo_combustible, c.estacion, c.rendimiento, v.capacidad_tanque
+    FROM combustible c
+    JOIN vehiculos v ON v.id = c.vehiculo_id
+"""
+COLUMNAS_CARGAS = ["id", "vehiculo_id", "fecha", "km", "litros", "costo_total", "precio_litro",
+                   "tipo_combustible", "estacion", "rendimiento", "capacidad_tanque"]
+
+
+def _leer(conn, where="", parametros=()):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    filas = cursor.execute(f"{SQL_CARGAS} {where}", parametros).fetchall()
+    cursor.close()
+    df = pd.DataFrame(filas, columns=COLUMNAS_CARGAS)
+    df["fecha"] = df["fecha"].astype(str)
+    for columna in ("km", "litros", "costo_total", "precio_litro", "rendimiento", "capacidad_tanque"):
+        df[columna] = pd.to_numeric(df[columna], errors="coerce")
+    return df
+
+
+def ultimo_procesado(conn):
+    fila = conn.execute("SELECT ultimo_id, actualizado FROM procesos_incrementales WHERE proceso = ?",
+                        (PROCESO,)).fetchone()
+    return (fila[0], fila[1]) if fila else (0, None)
+
+
+def cargas_pendientes(conn=None):
+    """Cargas registradas después de la última corrida"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM combustible WHERE id > ?", (ultimo_procesado(conn)[0],)).fetchone()[0]
+    finally:
+        if propia:
+            conn.close()
+
+
+def _guardar(conn, eventos, alcance, completo, hasta_id):
+    """Reemplaza las anomalías abiertas del alcance; las revisadas/descartadas conservan su estado"""
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if completo:
+            conn.execute("DELETE FROM anomalias_combustible WHERE estado = 'abierta'")
+            conn.execute("DELETE FROM anomalias_combustible WHERE combustible_id NOT IN (SELECT id FROM combustible)")
+        else:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _alcance_anomalias (id INTEGER, grupo TEXT, PRIMARY KEY (id, grupo))")
+            conn.execute("DELETE FROM temp._alcance_anomalias")
+            conn.executemany("INSERT INTO temp._alcance_anomalias VALUES (?, ?)", alcance)
+            for grupo, tipos in (("vehiculo", TIPOS_VEHICULO), ("precio", TIPOS_PRECIO)):
+                marcas = ",".join("?" * len(tipos))
+                conn.execute(f"""
+                    DELETE FROM anomalias_combustible
+                    WHERE estado = 'abierta' AND tipo IN ({marcas})
+                      AND combustible_id IN (SELECT id FROM temp._alcance_anomalias WHERE grupo = ?)
+                """, (*tipos, grupo))
+        conn.executemany("""
+            INSERT INTO anomalias_combustible
+                (combustible_id, tipo, vehiculo_id, fecha, severidad, valor, referencia, detalle, detectada)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(combustible_id, tipo) DO UPDATE SET
+                severidad = excluded.severidad, valor = excluded.valor,
+                referencia = excluded.referencia, detalle = excluded.detalle
+        """, (
+            (int(e.combustible_id), e.tipo, int(e.vehiculo_id), e.fecha, e.severidad,
+             None if pd.isna(e.valor) else float(e.valor),
+             None if pd.isna(e.referencia) else float(e.referencia), e.detalle, ahora)
+            for e in eventos.itertuples(index=False)
+        ))
+        conn.execute("""
+            INSERT INTO procesos_incrementales (proceso, ultimo_id, actualizado) VALUES (?, ?, ?)
+            ON CONFLICT(proceso) DO UPDATE SET ultimo_id = excluded.ultimo_id, actualizado = excluded.actualizado
+        """, (PROCESO, hasta_id, ahora))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def detectar_anomalias(completo=False, conn=None):
+    """Corre el motor y persiste los eventos; devuelve ResultadoAnomalias.
+
+    completo=False: solo las cargas nuevas desde la última corrida (y lo que
+    ellas afectan). completo=True: todo el historial.
+    """
+    inicio = time.perf_counter()
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        hasta_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM combustible").fetchone()[0]
+        desde_id = 0 if completo else ultimo_procesado(conn)[0]
+        if completo or desde_id == 0:
+            completo = True
+            df = _leer(conn, "WHERE c.id <= ?", (hasta_id,))
+            eventos = detectar(df)
+            alcance = []
+        else:
+            nuevas = pd.read_sql_query("""
+                SELECT vehiculo_id, MIN(fecha) AS desde FROM combustible
+                WHERE id > ? AND id <= ? GROUP BY vehiculo_id
+            """, conn, params=(desde_id, hasta_id))
+            if nuevas.empty:
+                return ResultadoAnomalias(0, 0, {}, False, round(time.perf_counter() - inicio, 3))
+            dias = sorted({str(f)[:10] for (f,) in conn.execute(
+                "SELECT DISTINCT fecha FROM combustible WHERE id > ? AND id <= ?", (desde_id, hasta_id))})
+
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _vehiculos_anomalias (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp._vehiculos_anomalias")
+            conn.executemany("INSERT INTO temp._vehiculos_anomalias VALUES (?)",
+                             ((int(v),) for v in nuevas["vehiculo_id"]))
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _dias_anomalias (fecha TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM temp._dias_anomalias")
+            conn.executemany("INSERT INTO temp._dias_anomalias VALUES (?)", ((d,) for d in dias))
+
+            # Historial completo de los vehículos afectados (referencia de las ventanas y del tanque)
+            df_veh = _leer(conn, "WHERE c.vehiculo_id IN (SELECT id FROM temp._vehiculos_anomalias) AND c.id <= ?",
+                           (hasta_id,))
+            desde = df_veh["vehiculo_id"].map(nuevas.set_index("vehiculo_id")["desde"].astype(str).str[:10])
+            en_alcance = df_veh["fecha"].str[:10] >= desde
+            eventos_veh = detectar(df_veh, TIPOS_VEHICULO)
+            ids_veh = df_veh.loc[en_alcance, "id"]
+            eventos_veh = eventos_veh[eventos_veh["combustible_id"].isin(ids_veh)]
+
+            # Todas las cargas de la flota en los días afectados (mediana por estación)
+            df_dias = _leer(conn, "WHERE c.fecha IN (SELECT fecha FROM temp._dias_anomalias) AND c.id <= ?",
+                            (hasta_id,))
+            eventos_precio = detectar(df_dias, TIPOS_PRECIO)
+
+            eventos = pd.concat([e for e in (eventos_veh, eventos_precio) if len(e)] or
+                                [pd.DataFrame(columns=COLUMNAS)], ignore_index=True)
+            alcance = [(int(i), "vehiculo") for i in ids_veh] + [(int(i), "precio") for i in df_dias["id"]]
+            df = pd.concat([df_veh[en_alcance], df_dias]).drop_duplicates("id")
+
+        _guardar(conn, eventos, alcance, completo, hasta_id)
+        return ResultadoAnomalias(
+            cargas=len(df),
+            anomalias=len(eventos),
+            por_tipo=eventos["tipo"].value_counts().to_dict(),
+            completo=completo,
+            duracion_seg=round(time.perf_counter() - inicio, 3),
+        )
+    finally:
+        if propia:
+            conn.close()
+
+
+# ==========================================
+# CONSULTAS PARA LA VISTA
+# ==========================================
+def resumen_abiertas(conn=None):
+    """Anomalías abiertas por tipo y severidad"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        return pd.read_sql_query("""
+            SELECT tipo, severidad, COUNT(*) AS cantidad
+            FROM anomalias_combustible
+            WHERE estado = 'abierta'
+            GROUP BY tipo, severidad
+        """, conn)
+    finally:
+        if propia:
+            conn.close()
+
+
+def listar_anomalias(tipos=None, severidades=None, estado="abierta", limite=1000, conn=None):
+    """Anomalías más recientes con la patente y los datos de la carga"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        condiciones = ["a.estado = ?"]
+        parametros = [estado]
+        for columna, valores in (("a.tipo", tipos), ("a.severidad", severidades)):
+            if valores:
+                condiciones.append(f"{columna} IN ({','.join('?' * len(valores))})")
+                parametros.extend(valores)
+        parametros.append(limite)
+        return pd.read_sql_query(f"""
+            SELECT a.combustible_id, a.tipo, a.severidad, a.fecha, v.patente,
+                   c.litros, c.km, c.estacion, a.valor, a.referencia, a.detalle
+            FROM anomalias_combustible a
+            JOIN vehiculos v ON v.id = a.vehiculo_id
+            JOIN combustible c ON c.id = a.combustible_id
+            WHERE {' AND '.join(condiciones)}
+            ORDER BY a.fecha DESC, a.combustible_id DESC
+            LIMIT ?
+        """, conn, params=parametros)
+    finally:
+        if propia:
+            conn.close()
+
+
+def marcar_anomalias(claves, estado, conn=None):
+    """Cambia el estado de [(combustible_id, tipo)] a 'revisada', 'descartada' o 'abierta'"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        cursor = conn.executemany(
+            "UPDATE anomalias_combustible SET estado = ? WHERE combustible_id = ? AND tipo = ?",
+            [(estado, int(i), t) for i, t in claves]
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        if propia:
+            conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Motor de anomalías de combustible")
+    parser.add_argument("--completo", action="store_true", help="Reanalizar todo el historial")
+    args = parser.parse_args()
+
+    r = detectar_anomalias(completo=args.completo)
+    print(f"{'♻️' if r.completo else '✅'} {r.cargas:,} cargas analizadas, {r.anomalias:,} anomalías "
+          f"en {r.duracion_seg}s")
+    for tipo, cantidad in sorted(r.por_tipo.items()):
+        print(f"   {ETIQUETAS.get(tipo, tipo)}: {cantidad:,}")
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# services/correo.py - ENTREGA DE EMAILS CON SESIÓN SMTP PERSISTENTE
+#
+# Un Despachador mantiene sesiones SMTP ya autenticadas (STARTTLS + login una
+# sola vez) y reparte los mensajes en lotes entre un pool acotado de hilos:
+# cada hilo envía su lote por una sesión reutilizada. Los errores transitorios
+# se reintentan con espera exponencial y cada entrega queda en envios_email.
+#
+# Prueba local sin credenciales ni TLS:
+#   python -m aiosmtpd -n -l localhost:1025   (o python -m smtpd -n -c DebuggingServer localhost:1025)
+#   python -m services.correo --servidor localhost --puerto 1025 --sin-tls destino@ejemplo.com
+
+import queue
+import random
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from utils.helpers import conexion_db
+
+MAX_WORKERS = 4
+TAMANO_LOTE = 20
+INTENTOS = 3
+ESPERA_BASE_SEG = 1.0
+# Sesión ociosa más tiempo que esto: se verifica con NOOP antes de usarla
+MAX_INACTIVA_SEG = 60
+
+
+class ResultadoEnvio(NamedTuple):
+    destinatario: str
+    exito: bool
+    intentos: int
+    error: Optional[str] = None
+
+
+def _es_transitorio(error):
+    """True si reintentar tiene sentido: red, desconexión o respuestas 4xx"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class SesionSMTP:
+    """Conexión SMTP autenticada que se abre al primer envío y se reutiliza"""
+
+    def __init__(self, servidor, puerto, usuario=None, password=None, usar_tls=True, timeout=30):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.usuario = usuario
+        self.password = password
+        self.usar_tls = usar_tls
+        self.timeout = timeout
+        self._smtp = None
+        self._ultimo_uso = 0.0
+
+    def _conectar(self):
+        smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout)
+        try:
+            if self.usar_tls:
+                smtp.starttls()
+            if self.usuario and self.password:
+                smtp.login(self.usuario, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    def _activa(self):
+        if self._smtp is None:
+            return False
+        if time.monotonic() - self._ultimo_uso < MAX_INACTIVA_SEG:
+            return True
+        try:
+            return self._smtp.noop()[0] == 250
+        except OSError:
+            return False
+
+    def enviar(self, mensaje):
+        if not self._activa():
+            self.cerrar()
+            self._conectar()
+        self._smtp.send_message(mensaje)
+        self._ultimo_uso = time.monotonic()
+
+    def cerrar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except OSError:
+                self._smtp.close()
+            self._smtp = None
+
+
+class Despachador:
+    """Envía mensajes en lotes concurrentes reutilizando sesiones SMTP"""
+
+    def __init__(self, servidor, puerto, usuario=None, password=None, usar_tls=True,
+                 max_workers=MAX_WORKERS, tamano_lote=TAMANO_LOTE, intentos=INTENTOS,
+                 espera_base=ESPERA_BASE_SEG):
+        self._datos_sesion = (servidor, puerto, usuario, password, usar_tls)
+        self.tamano_lote = tamano_lote
+        self.intentos = intentos
+        self.espera_base = espera_base
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="smtp")
+        # Sesiones libres; nunca hay más que hilos en el pool
+        self._libres = queue.LifoQueue()
+
+    def _tomar_sesion(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            return SesionSMTP(*self._datos_sesion)
+
+    def _enviar_uno(self, sesion, destinatario, mensaje):
+        for intento in range(1, self.intentos + 1):
+            try:
+                sesion.enviar(mensaje)
+                return ResultadoEnvio(destinatario, True, intento)
+            except Exception as e:
+                # La sesión puede quedar en un estado inválido: se reabre en el próximo intento
+                sesion.cerrar()
+                if not _es_transitorio(e) or intento == self.intentos:
+                    return ResultadoEnvio(destinatario, False, intento, str(e))
+                time.sleep(self.espera_base * 2 ** (intento - 1) * random.uniform(0.8, 1.2))
+
+    def _enviar_lote(self, lote, asunto, pares):
+        sesion = self._tomar_sesion()
+        try:
+            resultados = [self._enviar_uno(sesion, destinatario, mensaje) for destinatario, mensaje in pares]
+        finally:
+            self._libres.put(sesion)
+        registrar_envios(lote, asunto, resultados)
+        return resultados
+
+    def enviar_en_segundo_plano(self, mensajes, asunto=None):
+        """Encola [(destinatario, mensaje), ...]; devuelve (id de lote, futuros por tanda)"""
+        lote = uuid.uuid4().hex[:12]
+        mensajes = list(mensajes)
+        futuros = [
+            self._executor.submit(self._enviar_lote, lote, asunto, mensajes[i:i + self.tamano_lote])
+            for i in range(0, len(mensajes), self.tamano_lote)
+        ]
+        return lote, futuros
+
+    def enviar(self, mensajes, asunto=None):
+        """Como enviar_en_segundo_plano pero espera y devuelve la lista de ResultadoEnvio"""
+        _, futuros = self.enviar_en_segundo_plano(mensajes, asunto)
+        return [r for futuro in futuros for r in futuro.result()]
+
+    def cerrar(self):
+        self._executor.shutdown(wait=True)
+        while not self._libres.empty():
+            self._libres.get_nowait().cerrar()
+
+
+_despachadores = {}
+_despachadores_lock = threading.Lock()
+
+
+def obtener_despachador(servidor, puerto, usuario=None, password=None, usar_tls=True):
+    """Despachador compartido por configuración (uno por proceso), así la sesión sobrevive a los reruns"""
+    clave = (servidor, puerto, usuario, password, usar_tls)
+    with _despachadores_lock:
+        despachador = _despachadores.get(clave)
+        if despachador is None:
+            despachador = Despachador(servidor, puerto, usuario, password, usar_tls)
+            _despachadores[clave] = despachador
+        return despachador
+
+
+def registrar_envios(lote, asunto, resultados):
+    """Guarda el resultado de cada entrega en envios_email"""
+    with conexion_db() as conn:
+        conn.executemany("""
+            INSERT INTO envios_email (lote, destinatario, asunto, estado, intentos, error)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(lote, r.destinatario, asunto, "enviado" if r.exito else "fallido", r.intentos, r.error)
+              for r in resultados])
+        conn.commit()
+
+
+def resumen_lote(futuros):
+    """Estado de un envío en segundo plano: (terminados, total, enviados, fallidos)"""
+    terminados = [f for f in futuros if f.done()]
+    resultados = [r for f in terminados if f.exception() is None for r in f.result()]
+    enviados = sum(r.exito for r in resultados)
+    return len(terminados), len(futuros), enviados, len(resultados) - enviados
+
+
+if __name__ == "__main__":
+    import argparse
+    from email.mime.text import MIMEText
+
+    parser = argparse.ArgumentParser(description="Envío de prueba contra un servidor SMTP")
+    parser.add_argument("destinatarios", nargs="+")
+    parser.add_argument("--servidor", default="localhost")
+    parser.add_argument("--puerto", type=int, default=1025)
+    parser.add_argument("--usuario")
+    parser.add_argument("--password")
+    parser.add_argument("--sin-tls", action="store_true")
+    args = parser.parse_args()
+
+    despachador = Despachador(args.servidor, args.puerto, args.usuario, args.password, not args.sin_tls)
+    mensajes = []
+    for destinatario in args.destinatarios:
+        msg = MIMEText("Prueba del sistema de gestión de flota", "plain", "utf-8")
+        msg['Subject'] = "Prueba de envío"
+        msg['From'] = args.usuario or "flota@localhost"
+        msg['To'] = destinatario
+        mensajes.append((destinatario, msg))
+    for r in despachador.enviar(mensajes, "Prueba de envío"):
+        print(f"{'✅' if r.exito else '❌'} {r.destinatario} ({r.intentos} intento/s){' - ' + r.error if r.error else ''}")
+    despachador.cerrar()
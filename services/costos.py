@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# services/costos.py - ANÁLISIS DE COSTOS POR VEHÍCULO
+
+import pandas as pd
+from utils.helpers import get_db_connection
+
+# Cada tabla se agrega por separado antes del JOIN: unir mantenimientos y
+# combustible crudos sobre el mismo vehículo multiplica filas (M × C por unidad)
+# e infla las sumas.
+SQL_COSTOS_VEHICULO = """
+    SELECT 
+        v.patente,
+        v.tipo,
+        v.marca,
+        v.modelo,
+        COALESCE(m.costo_mantenimiento, 0) as costo_mantenimiento,
+        COALESCE(c.costo_combustible, 0) as costo_combustible,
+        COALESCE(m.costo_mantenimiento, 0) + COALESCE(c.costo_combustible, 0) as costo_total,
+        v.km_actual
+    FROM vehiculos v
+    LEFT JOIN (
+        SELECT vehiculo_id, SUM(costo) as costo_mantenimiento
+        FROM mantenimientos
+        GROUP BY vehiculo_id
+    ) m ON m.vehiculo_id = v.id
+    LEFT JOIN (
+        SELECT vehiculo_id, SUM(costo_total) as costo_combustible
+        FROM combustible
+        GROUP BY vehiculo_id
+    ) c ON c.vehiculo_id = v.id
+    WHERE v.estado = 'activo'
+    ORDER BY costo_total DESC
+"""
+
+
+def obtener_costos_por_vehiculo(conn=None):
+    """Costos de mantenimiento y combustible por unidad activa, con costo por km"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        df = pd.read_sql_query(SQL_COSTOS_VEHICULO, conn)
+    finally:
+        if propia:
+            conn.close()
+
+    km = df['km_actual'].where(df['km_actual'] > 0)
+    df['costo_por_km'] = (df['costo_total'] / km).fillna(0)
+    return df
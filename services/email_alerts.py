@@ -1,19 +1,25 @@
 # -*- coding: utf-8 -*-
 # services/email_alerts.py - SISTEMA DE ALERTAS AUTOMÁTICAS
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import date, timedelta
-from utils.helpers import get_db_connection, dias_hasta
-import pandas as pd
+from repositories import notificaciones
+from services.motor_alertas import alertas_a_dict, calcular_alertas, dict_a_tabla
+from services.plantilla_email import renderizar_email
+from services.estado_alertas import (
+    SIN_CAMBIOS, clasificar_novedades, registrar_notificadas, resumen_sin_cambios
+)
+from services.correo import obtener_despachador
+from services.programador import programar_tarea
 
 class SistemaAlertas:
     """Sistema de envío automático de alertas por email"""
     
-    def __init__(self, smtp_server="smtp.gmail.com", smtp_port=587):
+    def __init__(self, smtp_server="smtp.gmail.com", smtp_port=587, usar_tls=True):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
+        self.usar_tls = usar_tls
         self.email_from = None
         self.email_password = None
     
@@ -22,459 +28,143 @@ class SistemaAlertas:
         self.email_from = email_from
         self.email_password = password
     
+    def obtener_tabla_alertas(self):
+        """Alertas como tabla columnar (una fila por alerta), ver services.motor_alertas"""
+        return calcular_alertas()
+    
     def obtener_alertas_criticas(self):
         """Obtiene todas las alertas críticas del sistema"""
-        conn = get_db_connection()
-        alertas = {
-            "vehiculos_vencidos": [],
-            "mantenimientos_urgentes": [],
-            "conductores_vencidos": [],
-            "vehiculos_detenidos": []
-        }
-        
-        try:
-            # 1. DOCUMENTACIÓN DE VEHÍCULOS VENCIDA O PRÓXIMA
-            df_venc = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    ve.tipo,
-                    ve.fecha_vencimiento,
-                    julianday(ve.fecha_vencimiento) - julianday('now') as dias_faltantes
-                FROM vencimientos ve
-                JOIN vehiculos v ON ve.vehiculo_id = v.id
-                WHERE v.estado = 'activo'
-                AND julianday(ve.fecha_vencimiento) - julianday('now') <= 30
-                ORDER BY dias_faltantes
-            """, conn)
-            
-            for _, row in df_venc.iterrows():
-                dias = int(row['dias_faltantes'])
-                prioridad = "CRÍTICO" if dias < 0 else "URGENTE" if dias < 7 else "ADVERTENCIA"
-                
-                alertas["vehiculos_vencidos"].append({
-                    "patente": row['patente'],
-                    "tipo": row['tipo'],
-                    "vencimiento": row['fecha_vencimiento'],
-                    "dias": dias,
-                    "prioridad": prioridad
-                })
-            
-            # 2. MANTENIMIENTOS PRÓXIMOS POR KM
-            df_mant_km = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    v.km_actual,
-                    m.tipo,
-                    m.prox_km,
-                    (m.prox_km - v.km_actual) as km_faltantes
-                FROM mantenimientos m
-                JOIN vehiculos v ON m.vehiculo_id = v.id
-                WHERE v.estado = 'activo'
-                AND m.prox_km IS NOT NULL
-                AND v.km_actual IS NOT NULL
-                AND (m.prox_km - v.km_actual) <= 2000
-                ORDER BY km_faltantes
-            """, conn)
-            
-            for _, row in df_mant_km.iterrows():
-                km = row['km_faltantes']
-                prioridad = "CRÍTICO" if km < 0 else "URGENTE" if km < 500 else "ADVERTENCIA"
-                
-                alertas["mantenimientos_urgentes"].append({
-                    "patente": row['patente'],
-                    "tipo": row['tipo'],
-                    "km_actual": row['km_actual'],
-                    "proximo": row['prox_km'],
-                    "faltantes": km,
-                    "prioridad": prioridad
-                })
-            
-            # 3. MANTENIMIENTOS PRÓXIMOS POR FECHA
-            df_mant_fecha = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    m.tipo,
-                    m.prox_fecha,
-                    julianday(m.prox_fecha) - julianday('now') as dias_faltantes
-                FROM mantenimientos m
-                JOIN vehiculos v ON m.vehiculo_id = v.id
-                WHERE v.estado = 'activo'
-                AND m.prox_fecha IS NOT NULL
-                AND julianday(m.prox_fecha) - julianday('now') <= 30
-                ORDER BY dias_faltantes
-            """, conn)
-            
-            for _, row in df_mant_fecha.iterrows():
-                dias = int(row['dias_faltantes'])
-                prioridad = "CRÍTICO" if dias < 0 else "URGENTE" if dias < 7 else "ADVERTENCIA"
-                
-                alertas["mantenimientos_urgentes"].append({
-                    "patente": row['patente'],
-                    "tipo": row['tipo'],
-                    "fecha": row['prox_fecha'],
-                    "dias": dias,
-                    "prioridad": prioridad
-                })
-            
-            # 4. CONDUCTORES CON DOCUMENTACIÓN VENCIDA
-            df_cond = pd.read_sql_query("""
-                SELECT 
-                    nombre,
-                    dni,
-                    licencia_venc,
-                    licencia_cargas_peligrosas,
-                    examen_psicofisico,
-                    curso_iram
-                FROM conductores
-                WHERE estado = 'activo'
-            """, conn)
-            
-            for _, cond in df_cond.iterrows():
-                docs_vencidos = []
-                
-                # Verificar cada documento
-                if cond['licencia_venc']:
-                    dias = dias_hasta(cond['licencia_venc'])
-                    if dias <= 30:
-                        docs_vencidos.append(("Licencia", cond['licencia_venc'], dias))
-                
-                if cond['licencia_cargas_peligrosas']:
-                    dias = dias_hasta(cond['licencia_cargas_peligrosas'])
-                    if dias <= 30:
-                        docs_vencidos.append(("Cargas Peligrosas", cond['licencia_cargas_peligrosas'], dias))
-                
-                if cond['examen_psicofisico']:
-                    dias = dias_hasta(cond['examen_psicofisico'])
-                    if dias <= 30:
-                        docs_vencidos.append(("Examen Psicofísico", cond['examen_psicofisico'], dias))
-                
-                if cond['curso_iram']:
-                    dias = dias_hasta(cond['curso_iram'])
-                    if dias <= 30:
-                        docs_vencidos.append(("Curso IRAM", cond['curso_iram'], dias))
-                
-                if docs_vencidos:
-                    for doc_tipo, fecha, dias in docs_vencidos:
-                        prioridad = "CRÍTICO" if dias < 0 else "URGENTE" if dias < 7 else "ADVERTENCIA"
-                        alertas["conductores_vencidos"].append({
-                            "nombre": cond['nombre'],
-                            "dni": cond['dni'],
-                            "documento": doc_tipo,
-                            "vencimiento": fecha,
-                            "dias": dias,
-                            "prioridad": prioridad
-                        })
-            
-            # 5. VEHÍCULOS DETENIDOS O EN REPARACIÓN
-            df_detenidos = pd.read_sql_query("""
-                SELECT patente, estado, observaciones
-                FROM vehiculos
-                WHERE estado IN ('detenido', 'en_reparacion')
-            """, conn)
-            
-            for _, veh in df_detenidos.iterrows():
-                alertas["vehiculos_detenidos"].append({
-                    "patente": veh['patente'],
-                    "estado": veh['estado'],
-                    "observaciones": veh['observaciones']
-                })
-        
-        finally:
-            conn.close()
-        
-        return alertas
+        return alertas_a_dict(self.obtener_tabla_alertas())
     
-    def generar_html_email(self, alertas, tipo="diario"):
-        """Genera el HTML del email de alertas"""
-        
-        total_alertas = (
-            len(alertas["vehiculos_vencidos"]) +
-            len(alertas["mantenimientos_urgentes"]) +
-            len(alertas["conductores_vencidos"]) +
-            len(alertas["vehiculos_detenidos"])
-        )
-        
-        html = f"""
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: #f4f4f4;
-                    margin: 0;
-                    padding: 20px;
-                }}
-                .container {{
-                    max-width: 800px;
-                    margin: 0 auto;
-                    background-color: white;
-                    padding: 30px;
-                    border-radius: 10px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 20px;
-                    border-radius: 10px;
-                    text-align: center;
-                    margin-bottom: 30px;
-                }}
-                .header h1 {{
-                    margin: 0;
-                    font-size: 28px;
-                }}
-                .alert-section {{
-                    margin-bottom: 25px;
-                    border-left: 4px solid #667eea;
-                    padding-left: 15px;
-                }}
-                .alert-section h2 {{
-                    color: #333;
-                    font-size: 20px;
-                    margin-bottom: 15px;
-                }}
-                .alert-item {{
-                    background-color: #f9f9f9;
-                    padding: 12px;
-                    margin-bottom: 10px;
-                    border-radius: 5px;
-                    border-left: 3px solid #ccc;
-                }}
-                .alert-critico {{
-                    border-left-color: #ff4444;
-                    background-color: #ffebee;
-                }}
-                .alert-urgente {{
-                    border-left-color: #ffaa00;
-                    background-color: #fff8e1;
-                }}
-                .alert-advertencia {{
-                    border-left-color: #ffdd00;
-                    background-color: #fffde7;
-                }}
-                .badge {{
-                    display: inline-block;
-                    padding: 3px 8px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                    font-weight: bold;
-                    margin-right: 5px;
-                }}
-                .badge-critico {{ background-color: #ff4444; color: white; }}
-                .badge-urgente {{ background-color: #ffaa00; color: white; }}
-                .badge-advertencia {{ background-color: #ffdd00; color: #333; }}
-                .resumen {{
-                    background-color: #e3f2fd;
-                    padding: 15px;
-                    border-radius: 5px;
-                    margin-bottom: 25px;
-                    text-align: center;
-                }}
-                .resumen h3 {{
-                    margin: 0;
-                    color: #1976d2;
-                    font-size: 18px;
-                }}
-                .footer {{
-                    text-align: center;
-                    color: #666;
-                    font-size: 12px;
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🚛 Sistema de Gestión de Flota</h1>
-                    <p>Reporte de Alertas - {date.today().strftime('%d/%m/%Y')}</p>
-                </div>
-                
-                <div class="resumen">
-                    <h3>📊 Total de Alertas: {total_alertas}</h3>
-                </div>
-        """
-        
-        # VEHÍCULOS CON DOCUMENTACIÓN VENCIDA
-        if alertas["vehiculos_vencidos"]:
-            html += """
-                <div class="alert-section">
-                    <h2>📅 Documentación de Vehículos</h2>
-            """
-            for alerta in alertas["vehiculos_vencidos"]:
-                clase = f"alert-{alerta['prioridad'].lower()}"
-                badge_clase = f"badge-{alerta['prioridad'].lower()}"
-                estado_texto = "VENCIDO" if alerta['dias'] < 0 else f"Vence en {alerta['dias']} días"
-                
-                html += f"""
-                    <div class="alert-item {clase}">
-                        <span class="badge {badge_clase}">{alerta['prioridad']}</span>
-                        <strong>{alerta['patente']}</strong> - {alerta['tipo'].upper()}<br>
-                        <small>Vencimiento: {alerta['vencimiento']} | {estado_texto}</small>
-                    </div>
-                """
-            html += "</div>"
-        
-        # MANTENIMIENTOS URGENTES
-        if alertas["mantenimientos_urgentes"]:
-            html += """
-                <div class="alert-section">
-                    <h2>🔧 Mantenimientos Preventivos</h2>
-            """
-            for alerta in alertas["mantenimientos_urgentes"]:
-                clase = f"alert-{alerta['prioridad'].lower()}"
-                badge_clase = f"badge-{alerta['prioridad'].lower()}"
-                
-                if 'faltantes' in alerta:  # Por kilometraje
-                    estado = f"Faltan {alerta['faltantes']:,} km" if alerta['faltantes'] > 0 else "VENCIDO POR KM"
-                    detalle = f"Actual: {alerta['km_actual']:,} km | Próximo: {alerta['proximo']:,} km"
-                else:  # Por fecha
-                    estado = f"Faltan {alerta['dias']} días" if alerta['dias'] > 0 else "VENCIDO POR FECHA"
-                    detalle = f"Fecha programada: {alerta['fecha']}"
-                
-                html += f"""
-                    <div class="alert-item {clase}">
-                        <span class="badge {badge_clase}">{alerta['prioridad']}</span>
-                        <strong>{alerta['patente']}</strong> - {alerta['tipo']}<br>
-                        <small>{detalle} | {estado}</small>
-                    </div>
-                """
-            html += "</div>"
-        
-        # CONDUCTORES CON DOCUMENTACIÓN VENCIDA
-        if alertas["conductores_vencidos"]:
-            html += """
-                <div class="alert-section">
-                    <h2>👨‍✈️ Documentación de Conductores</h2>
-            """
-            for alerta in alertas["conductores_vencidos"]:
-                clase = f"alert-{alerta['prioridad'].lower()}"
-                badge_clase = f"badge-{alerta['prioridad'].lower()}"
-                estado = "VENCIDO" if alerta['dias'] < 0 else f"Vence en {alerta['dias']} días"
-                
-                html += f"""
-                    <div class="alert-item {clase}">
-                        <span class="badge {badge_clase}">{alerta['prioridad']}</span>
-                        <strong>{alerta['nombre']}</strong> (DNI: {alerta['dni']})<br>
-                        <small>{alerta['documento']} | Vencimiento: {alerta['vencimiento']} | {estado}</small>
-                    </div>
-                """
-            html += "</div>"
-        
-        # VEHÍCULOS DETENIDOS
-        if alertas["vehiculos_detenidos"]:
-            html += """
-                <div class="alert-section">
-                    <h2>🛑 Vehículos Fuera de Servicio</h2>
-            """
-            for veh in alertas["vehiculos_detenidos"]:
-                estado_txt = "EN REPARACIÓN" if veh['estado'] == 'en_reparacion' else "DETENIDO"
-                html += f"""
-                    <div class="alert-item alert-advertencia">
-                        <span class="badge badge-advertencia">INFO</span>
-                        <strong>{veh['patente']}</strong> - {estado_txt}<br>
-                        <small>{veh['observaciones'] or 'Sin observaciones'}</small>
-                    </div>
-                """
-            html += "</div>"
-        
-        # Si no hay alertas
-        if total_alertas == 0:
-            html += """
-                <div style="text-align: center; padding: 40px;">
-                    <h2 style="color: #4caf50;">✅ ¡Excelente!</h2>
-                    <p>No hay alertas críticas en este momento. Toda la flota está operativa y con documentación al día.</p>
-                </div>
-            """
-        
-        html += """
-                <div class="footer">
-                    <p><strong>Sistema Integral de Gestión de Flota</strong></p>
-                    <p>Combustibles Tucumán - Argentina</p>
-                    <p>Este es un email automático, por favor no responder.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html
+    def generar_html_email(self, alertas, tipo="diario", destinatario=None, digest=None):
+        """Genera el HTML del email de alertas (tabla de alertas o formato dict legado)"""
+        if isinstance(alertas, dict):
+            alertas = dict_a_tabla(alertas)
+        return renderizar_email(alertas, destinatario, digest=digest)
     
-    def enviar_alerta_email(self, destinatarios, asunto=None):
-        """Envía el email de alertas a los destinatarios"""
-        
-        if not self.email_from or not self.email_password:
-            raise ValueError("❌ Debe configurar las credenciales de email primero.")
+    def _alertas_a_enviar(self, solo_novedades=True):
+        """(tabla a detallar, digest o None, tabla clasificada) según solo_novedades"""
+        clasificada = clasificar_novedades(self.obtener_tabla_alertas())
+        if solo_novedades:
+            tabla = clasificada[clasificada["novedad"] != SIN_CAMBIOS]
+            digest = resumen_sin_cambios(clasificada)
+        else:
+            tabla, digest = clasificada, None
+        # Sin columnas auxiliares: el hash del cuerpo cacheado depende solo de las alertas
+        return tabla.drop(columns=["clave", "novedad"]), digest, clasificada
+    
+    def vista_previa_html(self, solo_novedades=True):
+        """HTML del email tal como se enviaría ahora, o None si no se enviaría ninguno"""
+        tabla, digest, _ = self._alertas_a_enviar(solo_novedades)
+        if solo_novedades and tabla.empty:
+            return None
+        return self.generar_html_email(tabla, digest=digest)
+    
+    def preparar_mensajes(self, destinatarios, asunto=None, solo_novedades=True):
+        """Arma un mensaje por destinatario (email o dict con email/nombre).
         
-        alertas = self.obtener_alertas_criticas()
-        total_alertas = (
-            len(alertas["vehiculos_vencidos"]) +
-            len(alertas["mantenimientos_urgentes"]) +
-            len(alertas["conductores_vencidos"]) +
-            len(alertas["vehiculos_detenidos"])
-        )
+        Con solo_novedades se detallan las alertas nuevas o escaladas y el resto va
+        en un digest; si no hay novedades no se arma ningún mensaje.
+        Devuelve (asunto, [(email, msg)], tabla clasificada para registrar_notificadas).
+        """
+        tabla, digest, clasificada = self._alertas_a_enviar(solo_novedades)
+        if solo_novedades and tabla.empty:
+            return asunto, [], clasificada
+        total_alertas = len(tabla)
         
         if asunto is None:
             if total_alertas == 0:
                 asunto = f"✅ Flota OK - {date.today().strftime('%d/%m/%Y')}"
+            elif solo_novedades:
+                asunto = f"🚨 {total_alertas} Alertas Nuevas de Flota - {date.today().strftime('%d/%m/%Y')}"
             else:
                 asunto = f"🚨 {total_alertas} Alertas de Flota - {date.today().strftime('%d/%m/%Y')}"
         
-        html_content = self.generar_html_email(alertas)
-        
-        # Crear mensaje
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = asunto
-        msg['From'] = self.email_from
-        msg['To'] = ", ".join(destinatarios)
-        
-        html_part = MIMEText(html_content, 'html', 'utf-8')
-        msg.attach(html_part)
-        
-        try:
-            # Conectar y enviar
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_from, self.email_password)
-            server.send_message(msg)
-            server.quit()
+        mensajes = []
+        for destinatario in destinatarios:
+            if isinstance(destinatario, str):
+                email, nombre = destinatario, None
+            else:
+                email, nombre = destinatario['email'], destinatario.get('nombre')
             
-            return True, f"✅ Email enviado exitosamente a {len(destinatarios)} destinatarios."
-        
-        except Exception as e:
-            return False, f"❌ Error al enviar email: {str(e)}"
+            # Un mensaje por persona: nadie ve las direcciones de los demás
+            msg = MIMEMultipart('alternative')
+            msg['Subject'] = asunto
+            msg['From'] = self.email_from
+            msg['To'] = email
+            msg.attach(MIMEText(self.generar_html_email(tabla, destinatario=nombre, digest=digest), 'html', 'utf-8'))
+            mensajes.append((email, msg))
+        
+        return asunto, mensajes, clasificada
+    
+    def _despachador(self):
+        if not self.email_from or (self.usar_tls and not self.email_password):
+            raise ValueError("❌ Debe configurar las credenciales de email primero.")
+        return obtener_despachador(
+            self.smtp_server, self.smtp_port, self.email_from, self.email_password, self.usar_tls
+        )
+    
+    def enviar_alerta_email(self, destinatarios, asunto=None, solo_novedades=True):
+        """Envía el email de alertas a los destinatarios y espera el resultado"""
+        despachador = self._despachador()
+        asunto, mensajes, clasificada = self.preparar_mensajes(destinatarios, asunto, solo_novedades)
+        if not mensajes:
+            return True, "✅ Sin alertas nuevas ni escaladas: no se envió email."
+        resultados = despachador.enviar(mensajes, asunto)
+        
+        fallidos = [r for r in resultados if not r.exito]
+        # Con algún fallo no se registra: las novedades se vuelven a enviar en el próximo envío
+        if not fallidos:
+            registrar_notificadas(clasificada)
+            return True, f"✅ Email enviado exitosamente a {len(resultados)} destinatarios."
+        return False, f"❌ Error al enviar email a {len(fallidos)} de {len(resultados)} destinatarios: {fallidos[0].error}"
+    
+    def enviar_alerta_email_en_segundo_plano(self, destinatarios, asunto=None, solo_novedades=True):
+        """Encola el envío sin bloquear; devuelve (id de lote, futuros) para consultar el progreso"""
+        despachador = self._despachador()
+        asunto, mensajes, clasificada = self.preparar_mensajes(destinatarios, asunto, solo_novedades)
+        lote, futuros = despachador.enviar_en_segundo_plano(mensajes, asunto)
+        
+        def _registrar(_futuro):
+            # Cuando terminó la última tanda y solo si llegó a todos (idempotente si dos lo ven a la vez)
+            if all(f.done() for f in futuros) and all(
+                f.exception() is None and all(r.exito for r in f.result()) for f in futuros
+            ):
+                registrar_notificadas(clasificada)
+        
+        for futuro in futuros:
+            futuro.add_done_callback(_registrar)
+        return lote, futuros
     
     def programar_envio_automatico(self, hora="08:00", dias_semana=[0,1,2,3,4]):
         """
         Programa envío automático de alertas
         hora: Hora en formato "HH:MM"
         dias_semana: Lista de días (0=Lunes, 6=Domingo)
+        
+        El envío lo realiza el proceso programador (python -m services.programador),
+        fuera de Streamlit; la contraseña se toma de FLOTA_SMTP_PASSWORD.
         """
-        # Esta función requeriría un scheduler como APScheduler
-        # Por ahora solo devuelve la configuración
+        tarea = programar_tarea("alertas_email", hora, dias_semana, parametros={
+            "smtp_server": self.smtp_server,
+            "smtp_port": self.smtp_port,
+            "usar_tls": self.usar_tls,
+            "email_from": self.email_from,
+        })
         return {
             "hora": hora,
             "dias": dias_semana,
-            "estado": "Configurado (requiere scheduler activo)"
+            "estado": f"Programado (próximo envío: {tarea['proxima_ejecucion']})"
         }
 
 
 # Función helper para usar en Streamlit
-def obtener_destinatarios_activos():
-    """Obtiene la lista de emails activos de la base de datos"""
-    conn = get_db_connection()
-    try:
-        df = pd.read_sql_query("""
-            SELECT email, nombre 
-            FROM notificaciones 
-            WHERE activo = 1 AND recibe_alertas_criticas = 1
-        """, conn)
-        return df['email'].tolist()
-    finally:
-        conn.close()
+def obtener_destinatarios_activos(con_nombre=False):
+    """Obtiene la lista de emails activos (o dicts email/nombre/cargo) de la base de datos"""
+    df = notificaciones.destinatarios(solo_alertas_criticas=True)
+    if con_nombre:
+        return df[['email', 'nombre', 'cargo']].to_dict('records')
+    return df['email'].tolist()
 
 
 # Ejemplo de uso
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# services/estado_alertas.py - DEDUPLICACIÓN DE ALERTAS NOTIFICADAS
+#
+# Cada alerta se identifica por (categoría, criterio, unidad/conductor, ítem,
+# vencimiento). estado_alertas guarda la última prioridad notificada de cada
+# una: un envío solo detalla las alertas nuevas o que escalaron de prioridad
+# y resume en un digest las que siguen igual.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from utils.helpers import get_db_connection
+
+# Menor rango = más grave
+RANGO_PRIORIDAD = {"CRÍTICO": 0, "URGENTE": 1, "ADVERTENCIA": 2}
+
+NUEVA = "nueva"
+ESCALADA = "escalada"
+SIN_CAMBIOS = "sin_cambios"
+
+
+def claves_alertas(tabla):
+    """Identidad estable de cada alerta como texto (vectorizado)"""
+    def texto(col):
+        return tabla[col].astype(object).where(tabla[col].notna(), "").astype(str)
+
+    sujeto = texto("patente").where(tabla["patente"].notna(), texto("dni"))
+    # Vencimiento: fecha, o km programado en mantenimientos por km, o estado en detenidos
+    referencia = texto("fecha").where(tabla["fecha"].notna(), texto("proximo"))
+    referencia = referencia.where(referencia != "", texto("estado"))
+    return (texto("categoria") + "|" + texto("criterio") + "|" + sujeto + "|"
+            + texto("tipo") + "|" + referencia)
+
+
+def clasificar_novedades(tabla, conn=None):
+    """Agrega 'clave' y 'novedad' (nueva / escalada / sin_cambios) a la tabla de alertas"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        estado = pd.read_sql_query(
+            "SELECT clave, prioridad AS prioridad_anterior FROM estado_alertas", conn
+        )
+    finally:
+        if propia:
+            conn.close()
+
+    tabla = tabla.assign(clave=claves_alertas(tabla))
+    anterior = tabla[["clave"]].merge(estado, on="clave", how="left")["prioridad_anterior"]
+    conocida = tabla["clave"].isin(estado["clave"]).to_numpy()
+    rango_actual = tabla["prioridad"].map(RANGO_PRIORIDAD).to_numpy(dtype=float)
+    rango_anterior = anterior.map(RANGO_PRIORIDAD).to_numpy(dtype=float)
+    tabla["novedad"] = np.select(
+        [~conocida, rango_actual < rango_anterior],
+        [NUEVA, ESCALADA],
+        default=SIN_CAMBIOS,
+    )
+    return tabla
+
+
+def registrar_notificadas(tabla, conn=None):
+    """Guarda la prioridad notificada de nuevas/escaladas y olvida las alertas resueltas"""
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    notificadas = tabla[tabla["novedad"] != SIN_CAMBIOS]
+    filas = [
+        (clave, categoria, prioridad, ahora, ahora)
+        for clave, categoria, prioridad in zip(
+            notificadas["clave"], notificadas["categoria"],
+            notificadas["prioridad"].astype(object).where(notificadas["prioridad"].notna(), None)
+        )
+    ]
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        conn.executemany("""
+            INSERT INTO estado_alertas (clave, categoria, prioridad, primera_notificacion, ultima_notificacion)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(clave) DO UPDATE SET
+                prioridad = excluded.prioridad,
+                ultima_notificacion = excluded.ultima_notificacion
+        """, filas)
+        # Alerta que ya no está vigente: si reaparece se notifica como nueva
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _claves_vigentes (clave TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp._claves_vigentes")
+        conn.executemany("INSERT OR IGNORE INTO temp._claves_vigentes VALUES (?)", ((c,) for c in tabla["clave"]))
+        conn.execute("DELETE FROM estado_alertas WHERE clave NOT IN (SELECT clave FROM temp._claves_vigentes)")
+        conn.commit()
+    finally:
+        if propia:
+            conn.close()
+    return len(filas)
+
+
+def resumen_sin_cambios(tabla):
+    """Conteo de alertas sin cambios por categoría y prioridad (para el digest)"""
+    sin_cambios = tabla[tabla["novedad"] == SIN_CAMBIOS]
+    return sin_cambios.groupby(["categoria", sin_cambios["prioridad"].fillna("INFO")]).size()
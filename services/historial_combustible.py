@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# services/historial_combustible.py - HISTORIAL DE CARGAS CON FILTROS EN SQL
+#
+# Paginación por clave (keyset) sobre (fecha, km, id) en orden descendente:
+# cada página arranca donde terminó la anterior con una búsqueda en el índice,
+# sin OFFSET, así el costo no depende de cuán profundo navegue el usuario.
+
+from typing import NamedTuple, Optional
+
+import pandas as pd
+from utils.helpers import get_db_connection
+
+TIPOS_COMBUSTIBLE = ("diesel", "nafta", "gnc")
+TAMANO_PAGINA = 50
+
+
+class FiltroHistorial(NamedTuple):
+    """Filtros del historial; None = sin filtrar por ese campo"""
+    vehiculo_id: Optional[int] = None
+    tipo_combustible: Optional[str] = None
+    desde: Optional[str] = None
+    hasta: Optional[str] = None
+
+
+class Cursor(NamedTuple):
+    """Última fila mostrada: la página siguiente empieza estrictamente después"""
+    fecha: str
+    km: int
+    id: int
+
+
+class TotalesHistorial(NamedTuple):
+    cargas: int
+    litros: float
+    costo: float
+    rendimiento_prom: Optional[float]
+
+
+def _condiciones(filtro):
+    """WHERE parametrizado para el filtro (siempre sobre la tabla con alias c)"""
+    condiciones = []
+    params = {}
+    if filtro.vehiculo_id is not None:
+        condiciones.append("c.vehiculo_id = :vehiculo_id")
+        params["vehiculo_id"] = int(filtro.vehiculo_id)
+    if filtro.tipo_combustible:
+        condiciones.append("c.tipo_combustible = :tipo")
+        params["tipo"] = filtro.tipo_combustible
+    if filtro.desde:
+        condiciones.append("c.fecha >= :desde")
+        params["desde"] = str(filtro.desde)
+    if filtro.hasta:
+        # Cota abierta: incluye el día completo aunque la fecha traiga hora
+        condiciones.append("c.fecha < date(:hasta, '+1 day')")
+        params["hasta"] = str(filtro.hasta)
+    return condiciones, params
+
+
+def obtener_pagina(filtro=FiltroHistorial(), cursor=None, tamano=TAMANO_PAGINA, conn=None):
+    """Devuelve (DataFrame de la página, cursor de la siguiente o None si es la última)"""
+    condiciones, params = _condiciones(filtro)
+    if cursor is not None:
+        condiciones.append("(c.fecha, c.km, c.id) < (:c_fecha, :c_km, :c_id)")
+        params.update(c_fecha=cursor.fecha, c_km=cursor.km, c_id=cursor.id)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    # Se pide una fila extra para saber si hay página siguiente sin contar
+    params["limite"] = tamano + 1
+    sql = f"""
+        SELECT
+            c.id,
+            c.fecha,
+            v.patente,
+            c.km,
+            c.litros,
+            c.costo_total,
+            c.precio_litro,
+            c.rendimiento,
+            c.tipo_combustible,
+            c.estacion,
+            co.nombre as conductor
+        FROM combustible c
+        JOIN vehiculos v ON c.vehiculo_id = v.id
+        LEFT JOIN conductores co ON c.conductor_id = co.id
+        {where}
+        ORDER BY c.fecha DESC, c.km DESC, c.id DESC
+        LIMIT :limite
+    """
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        df = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        if propia:
+            conn.close()
+
+    if len(df) <= tamano:
+        return df, None
+    df = df.iloc[:tamano]
+    ultima = df.iloc[-1]
+    return df, Cursor(str(ultima['fecha']), int(ultima['km']), int(ultima['id']))
+
+
+def obtener_totales(filtro=FiltroHistorial(), conn=None):
+    """Agregados sobre todo el rango filtrado (no solo la página visible)"""
+    condiciones, params = _condiciones(filtro)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"""
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(c.litros), 0),
+            COALESCE(SUM(c.costo_total), 0),
+            AVG(c.rendimiento)
+        FROM combustible c
+        {where}
+    """
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        fila = conn.execute(sql, params).fetchone()
+    finally:
+        if propia:
+            conn.close()
+    return TotalesHistorial(int(fila[0]), float(fila[1]), float(fila[2]), fila[3])
@@ -0,0 +1,544 @@
+# -*- coding: utf-8 -*-
+# services/importacion_combustible.py - IMPORTACIÓN MASIVA DE CARGAS (TARJETA DE FLOTA)
+#
+# Lee resúmenes de tarjeta de combustible (CSV o XLSX) de a lotes y procesa
+# cada lote completo antes de leer el siguiente: traduce los encabezados
+# habituales, mapea patente -> vehiculo_id con un índice en memoria, valida
+# en forma vectorizada, descarta repetidas, calcula precio_litro y
+# rendimiento con services.rendimiento.calcular_rendimiento (cargas
+# parciales y retrocesos de odómetro incluidos) contra las cargas ya
+# registradas y las de lotes anteriores del archivo, y lo inserta con
+# executemany en transacciones de TAMANO_LOTE_INSERCION filas. Al final
+# services.rendimiento corrige las cargas que quedaron detrás de otras
+# importadas. Con dry_run=True solo se devuelve el reporte.
+#
+# Memoria: un lote y las primeras MAX_MUESTRA cargas del reporte (más las
+# filas con errores); las claves ya vistas para detectar repetidas y las
+# cargas aceptadas en lotes anteriores van a tablas temporales de SQLite.
+#
+# Uso: python -m services.importacion_combustible resumen.csv [--dry-run]
+
+import time
+import unicodedata
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from services.anomalias_combustible import detectar_anomalias
+from services.historial_combustible import TIPOS_COMBUSTIBLE
+from services.rendimiento import calcular_rendimiento, recalcular_rendimiento
+from utils.helpers import get_db_connection
+
+TAMANO_LOTE = 10000
+TAMANO_LOTE_INSERCION = 5000
+MAX_MUESTRA = 1000  # cargas válidas devueltas en el reporte
+
+OBLIGATORIAS = ("patente", "fecha", "km", "litros", "costo_total")
+OPCIONALES = ("tipo_combustible", "estacion", "dni_conductor", "observaciones")
+
+# Encabezado normalizado (minúsculas, sin acentos) -> columna
+ALIAS = {
+    "patente": "patente", "dominio": "patente", "vehiculo": "patente",
+    "fecha": "fecha", "fecha transaccion": "fecha", "fecha de carga": "fecha",
+    "km": "km", "kilometraje": "km", "odometro": "km",
+    "litros": "litros", "cantidad": "litros", "volumen": "litros",
+    "costo total": "costo_total", "importe": "costo_total", "monto": "costo_total", "total": "costo_total",
+    "tipo combustible": "tipo_combustible", "producto": "tipo_combustible", "combustible": "tipo_combustible",
+    "estacion": "estacion", "establecimiento": "estacion", "comercio": "estacion",
+    "dni conductor": "dni_conductor", "dni": "dni_conductor", "documento": "dni_conductor",
+    "observaciones": "observaciones",
+}
+
+
+class ResultadoImportacion(NamedTuple):
+    leidas: int
+    validas: int
+    insertadas: int
+    errores: pd.DataFrame       # fila, patente, motivo
+    advertencias: pd.DataFrame  # fila, patente, motivo (se importan igual)
+    cargas: pd.DataFrame        # primeras MAX_MUESTRA filas válidas, con el rendimiento que queda en la base
+    dry_run: bool
+    duracion_seg: float
+
+
+def _normalizar_encabezado(texto):
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return " ".join(texto.lower().replace("_", " ").split())
+
+
+def _renombrar(df):
+    columnas = {}
+    for original in df.columns:
+        destino = ALIAS.get(_normalizar_encabezado(original))
+        if destino and destino not in columnas.values():
+            columnas[original] = destino
+    df = df.rename(columns=columnas)
+    faltantes = [c for c in OBLIGATORIAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+    for columna in OPCIONALES:
+        if columna not in df.columns:
+            df[columna] = None
+    return df[list(OBLIGATORIAS + OPCIONALES)]
+
+
+# ==========================================
+# LECTURA EN LOTES
+# ==========================================
+def _separador(archivo):
+    """';' o ',' según la primera línea (los resúmenes locales suelen venir con ';')"""
+    inicio = archivo.tell()
+    linea = archivo.readline()
+    archivo.seek(inicio)
+    if isinstance(linea, bytes):
+        linea = linea.decode("utf-8", "ignore")
+    return ";" if linea.count(";") > linea.count(",") else ","
+
+
+def _lotes_xlsx(archivo, tamano_lote):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = wb.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == tamano_lote:
+                yield pd.DataFrame(lote, columns=encabezado)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=encabezado)
+    finally:
+        wb.close()
+
+
+def leer_lotes(archivo, nombre=None, tamano_lote=TAMANO_LOTE):
+    """DataFrames de hasta tamano_lote filas (columnas como texto) desde un CSV o XLSX.
+
+    archivo: ruta o archivo abierto en modo binario (p.ej. el de st.file_uploader).
+    """
+    nombre = str(nombre or getattr(archivo, "name", archivo)).lower()
+    if nombre.endswith((".xlsx", ".xlsm")):
+        yield from _lotes_xlsx(archivo, tamano_lote)
+        return
+    if isinstance(archivo, (str, Path)):
+        with open(archivo, "rb") as abierto:
+            yield from leer_lotes(abierto, nombre, tamano_lote)
+        return
+    yield from pd.read_csv(archivo, sep=_separador(archivo), dtype=str, chunksize=tamano_lote,
+                           encoding="utf-8-sig", skipinitialspace=True)
+
+
+# ==========================================
+# VALIDACIÓN (VECTORIZADA POR LOTE)
+# ==========================================
+def _numero(serie):
+    """Convierte texto con formato local (1.234,56) o estándar (1234.56) a float.
+
+    Siempre float64, aunque la columna traiga enteros: las claves de
+    deduplicación se comparan contra columnas REAL de la base.
+    """
+    if serie.dtype != object and not pd.api.types.is_string_dtype(serie):
+        return pd.to_numeric(serie, errors="coerce").astype(float)
+    texto = serie.astype(str).str.strip().str.replace(r"[$\s]", "", regex=True)
+    local = texto.str.contains(",", regex=False)
+    texto = texto.where(~local, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto.where(serie.notna()), errors="coerce").astype(float)
+
+
+def _fecha(serie):
+    """Fechas locales (dd/mm/aaaa) o ISO (aaaa-mm-dd, también las que trae openpyxl).
+
+    dayfirst=True con format="mixed" invierte día y mes de una fecha ISO
+    ambigua (2026-06-04 -> 6 de abril): las ISO se convierten aparte.
+    """
+    texto = serie.astype(object).where(serie.notna(), "").astype(str).str.strip()
+    iso = texto.str.match(r"\d{4}-\d{2}-\d{2}")
+    local = pd.to_datetime(texto.where(~iso), dayfirst=True, format="mixed", errors="coerce")
+    return local.where(~iso, pd.to_datetime(texto.where(iso), format="ISO8601", errors="coerce"))
+
+
+def _tipo_combustible(serie, tipo_vehiculo):
+    """Nombre de producto de la tarjeta -> diesel/nafta/gnc; vacío: según el tipo de vehículo"""
+    texto = serie.astype(object).where(serie.notna(), "").astype(str).str.lower()
+    por_defecto = np.where(tipo_vehiculo == "camion", "diesel", "nafta")
+    return pd.Series(np.select(
+        [texto.str.contains("gnc"),
+         texto.str.contains("diesel|gasoil|gas oil|euro"),
+         texto.str.contains("nafta|super|premium|infinia|v-power"),
+         texto == ""],
+        ["gnc", "diesel", "nafta", por_defecto],
+        default="desconocido",
+    ), index=serie.index)
+
+
+def _validar_lote(df, primera_fila, vehiculos, conductores):
+    """Devuelve (cargas válidas, errores) de un lote ya renombrado"""
+    df = df.reset_index(drop=True)
+    fila = np.arange(primera_fila, primera_fila + len(df))
+    patente = df["patente"].astype(object).where(df["patente"].notna(), "").astype(str) \
+        .str.upper().str.replace(r"[\s-]", "", regex=True)
+    vehiculo = patente.map(vehiculos)
+    vehiculo_id = vehiculo.map(lambda v: v[0], na_action="ignore")
+    tipo_vehiculo = vehiculo.map(lambda v: v[1], na_action="ignore")
+    fecha = _fecha(df["fecha"])
+    km = _numero(df["km"])
+    litros = _numero(df["litros"])
+    costo = _numero(df["costo_total"])
+    tipo = _tipo_combustible(df["tipo_combustible"], tipo_vehiculo.to_numpy())
+    dni = df["dni_conductor"].astype(object).where(df["dni_conductor"].notna(), "").astype(str) \
+        .str.replace(r"\D", "", regex=True)
+    conductor_id = dni.map(conductores)
+
+    motivo = np.select(
+        [vehiculo_id.isna(), fecha.isna(), km.isna() | (km < 0), litros.isna() | (litros <= 0),
+         costo.isna() | (costo <= 0), ~tipo.isin(TIPOS_COMBUSTIBLE), (dni != "") & conductor_id.isna()],
+        ["Patente desconocida", "Fecha inválida", "Kilometraje inválido", "Litros inválidos",
+         "Importe inválido", "Tipo de combustible desconocido", "DNI de conductor desconocido"],
+        default="",
+    )
+    valida = motivo == ""
+    errores = pd.DataFrame({"fila": fila, "patente": patente, "motivo": motivo})[~valida]
+    cargas = pd.DataFrame({
+        "fila": fila,
+        "patente": patente,
+        "vehiculo_id": vehiculo_id,
+        "fecha": fecha.dt.strftime("%Y-%m-%d"),
+        "km": km,
+        "litros": litros,
+        "costo_total": costo,
+        "tipo_combustible": tipo,
+        "estacion": df["estacion"],
+        "conductor_id": conductor_id,
+        "observaciones": df["observaciones"],
+    })[valida]
+    return cargas, errores
+
+
+# ==========================================
+# CONTEXTO EN LA BASE
+# ==========================================
+def _indices(conn):
+    """Índices en memoria: patente -> (id, tipo) y dni -> id"""
+    vehiculos = {
+        patente.upper().replace(" ", "").replace("-", ""): (vid, tipo)
+        for vid, patente, tipo in conn.execute("SELECT id, patente, tipo FROM vehiculos")
+    }
+    conductores = {
+        "".join(c for c in str(dni) if c.isdigit()): cid
+        for cid, dni in conn.execute("SELECT id, dni FROM conductores")
+    }
+    return vehiculos, conductores
+
+
+def _preparar_temporales(conn):
+    """Tablas temporales de la importación; claves vistas y cargas aceptadas se vacían en cada archivo"""
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS _claves_importacion (
+            vehiculo_id INTEGER, fecha TEXT, km INTEGER, litros REAL,
+            PRIMARY KEY (vehiculo_id, fecha, km, litros)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS _lote_importacion (
+            fila INTEGER, vehiculo_id INTEGER, fecha TEXT, km INTEGER, litros REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS _aceptadas_importacion (
+            fila INTEGER, vehiculo_id INTEGER, fecha TEXT, km INTEGER, litros REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS temp._idx_aceptadas_importacion ON _aceptadas_importacion(vehiculo_id, fecha)")
+    conn.execute("DELETE FROM temp._claves_importacion")
+    conn.execute("DELETE FROM temp._aceptadas_importacion")
+
+
+def _ids_temporales(conn, ids):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _vehiculos_importacion (id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp._vehiculos_importacion")
+    conn.executemany("INSERT INTO temp._vehiculos_importacion VALUES (?)", ((int(i),) for i in ids))
+
+
+def _contexto(conn, cargas, tope_id):
+    """Cargas de los vehículos del lote que ya estaban antes de la importación (id <= tope_id,
+    fila=-1) y las ya aceptadas del archivo (con su fila), en el orden en que
+    recalcular_rendimiento las desempata: desde la última carga completa anterior al
+    período, las del período y la primera registrada después"""
+    desde, hasta = cargas["fecha"].min(), cargas["fecha"].max()
+    _ids_temporales(conn, cargas["vehiculo_id"].unique())
+    # El rendimiento de la primera carga del período depende de la última completa anterior
+    # y de las parciales que haya en el medio; una búsqueda por vehículo en el índice
+    filas = conn.execute("""
+        WITH anclas AS (
+            SELECT t.id AS vehiculo_id, MAX(
+                COALESCE((SELECT MAX(c.fecha) FROM combustible c
+                          WHERE c.vehiculo_id = t.id AND c.fecha < :desde AND c.parcial = 0 AND c.id <= :tope), ''),
+                COALESCE((SELECT MAX(a.fecha) FROM temp._aceptadas_importacion a
+                          WHERE a.vehiculo_id = t.id AND a.fecha < :desde), '')
+            ) AS fecha
+            FROM temp._vehiculos_importacion t
+        )
+        SELECT * FROM (
+            SELECT c.vehiculo_id, c.fecha, c.km, c.litros, c.parcial, -1 AS fila
+            FROM anclas n
+            JOIN combustible c ON c.vehiculo_id = n.vehiculo_id
+            WHERE c.fecha >= n.fecha AND c.fecha < date(:hasta, '+1 day') AND c.id <= :tope
+            ORDER BY c.id
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT t.id, c.fecha, c.km, c.litros, c.parcial, -1
+            FROM temp._vehiculos_importacion t
+            JOIN combustible c ON c.id = (
+                SELECT c2.id FROM combustible c2
+                WHERE c2.vehiculo_id = t.id AND c2.fecha >= date(:hasta, '+1 day') AND c2.id <= :tope
+                ORDER BY c2.fecha, c2.km, c2.id LIMIT 1
+            )
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT a.vehiculo_id, a.fecha, a.km, a.litros, 0, a.fila
+            FROM anclas n
+            JOIN temp._aceptadas_importacion a ON a.vehiculo_id = n.vehiculo_id
+            WHERE a.fecha >= n.fecha AND a.fecha < date(:hasta, '+1 day')
+            ORDER BY a.rowid
+        )
+    """, {"desde": desde, "hasta": hasta, "tope": tope_id}).fetchall()
+    contexto = pd.DataFrame([tuple(f) for f in filas],
+                            columns=["vehiculo_id", "fecha", "km", "litros", "parcial", "fila"])
+    contexto["fecha"] = contexto["fecha"].astype(str).str[:10]
+    return contexto.astype({"vehiculo_id": "int64", "km": "int64", "litros": "float64", "parcial": "int64"})
+
+
+def _calcular(cargas, contexto):
+    """Agrega precio_litro y rendimiento; devuelve (cargas, advertencias, existentes afectadas).
+
+    El rendimiento es el de services.rendimiento.calcular_rendimiento sobre
+    el contexto más el lote (las importadas son cargas completas), el mismo
+    que deja recalcular_rendimiento después de insertar.
+    """
+    cargas = cargas.assign(precio_litro=(cargas["costo_total"] / cargas["litros"]).round(2))
+    columnas = ["vehiculo_id", "fecha", "km", "litros", "parcial", "fila"]
+    # Orden estable: a igual (vehículo, fecha, km) manda el id, y las importadas van detrás
+    importadas = cargas[["vehiculo_id", "fecha", "km", "litros", "fila"]].assign(parcial=0)
+    todas = pd.concat([contexto[columnas], importadas[columnas]], ignore_index=True) \
+        .sort_values(["vehiculo_id", "fecha", "km"], kind="stable")
+
+    rendimiento = calcular_rendimiento(
+        todas["vehiculo_id"].to_numpy(), todas["km"].to_numpy(),
+        todas["litros"].to_numpy(), todas["parcial"].to_numpy()
+    )
+    retrocede = todas["km"] < todas.groupby("vehiculo_id")["km"].shift()
+    nuevas = todas["fila"].isin(cargas["fila"]).to_numpy()
+    por_fila = pd.DataFrame({"fila": todas["fila"][nuevas], "rendimiento": rendimiento[nuevas],
+                             "retrocede": retrocede[nuevas]})
+    cargas = cargas.merge(por_fila, on="fila", how="left")
+
+    advertencias = cargas.loc[cargas["retrocede"], ["fila", "patente"]] \
+        .assign(motivo="Kilometraje menor al de la carga anterior (sin rendimiento)")
+    # Cargas ya registradas que quedan después de una importada: su rendimiento se calculó contra otra
+    despues = (todas["fila"] == -1).to_numpy() & todas.groupby("vehiculo_id")["fila"].shift().isin(cargas["fila"]).to_numpy()
+    return cargas.drop(columns="retrocede"), advertencias, int(despues.sum())
+
+
+def _aceptar(conn, cargas):
+    """Registra las cargas aceptadas del lote como contexto de los lotes siguientes"""
+    conn.executemany(
+        "INSERT INTO temp._aceptadas_importacion VALUES (?, ?, ?, ?, ?)",
+        zip(cargas["fila"].tolist(), cargas["vehiculo_id"].tolist(), cargas["fecha"].tolist(),
+            cargas["km"].tolist(), cargas["litros"].tolist())
+    )
+
+
+def _rendimiento_final(conn, muestra, tope_id):
+    """Rendimiento de la muestra del reporte con el archivo entero ya procesado.
+
+    Una carga puede quedar detrás de otras que llegan en lotes posteriores
+    (archivo desordenado); esto es lo que deja recalcular_rendimiento.
+    """
+    contexto = _contexto(conn, muestra, tope_id).sort_values(["vehiculo_id", "fecha", "km"], kind="stable")
+    rendimiento = calcular_rendimiento(
+        contexto["vehiculo_id"].to_numpy(), contexto["km"].to_numpy(),
+        contexto["litros"].to_numpy(), contexto["parcial"].to_numpy()
+    )
+    importadas = (contexto["fila"] >= 0).to_numpy()
+    por_fila = pd.Series(rendimiento[importadas], index=contexto["fila"].to_numpy()[importadas])
+    return muestra.assign(rendimiento=muestra["fila"].map(por_fila))
+
+
+def _repetidas_entre_lotes(conn, cargas):
+    """Máscara de cargas cuya clave apareció en un lote anterior; registra las claves del lote"""
+    conn.execute("DELETE FROM temp._lote_importacion")
+    conn.executemany(
+        "INSERT INTO temp._lote_importacion VALUES (?, ?, ?, ?, ?)",
+        zip(cargas["fila"].tolist(), cargas["vehiculo_id"].tolist(), cargas["fecha"].tolist(),
+            cargas["km"].tolist(), cargas["litros"].tolist())
+    )
+    vistas = {fila for fila, in conn.execute("""
+        SELECT l.fila FROM temp._lote_importacion l
+        JOIN temp._claves_importacion c USING (vehiculo_id, fecha, km, litros)
+    """)}
+    conn.execute("""
+        INSERT OR IGNORE INTO temp._claves_importacion
+        SELECT vehiculo_id, fecha, km, litros FROM temp._lote_importacion
+    """)
+    return cargas["fila"].isin(vistas).to_numpy()
+
+
+def _duplicadas(conn, cargas, contexto):
+    """Máscaras de cargas repetidas en el archivo (en el lote o en uno anterior) y de ya
+    registradas (vehículo, fecha, km, litros)"""
+    clave = ["vehiculo_id", "fecha", "km", "litros"]
+    en_archivo = cargas.duplicated(clave, keep="first").to_numpy() | _repetidas_entre_lotes(conn, cargas)
+    existentes = contexto.loc[contexto["fila"] == -1, clave].drop_duplicates()
+    en_base = cargas[clave].merge(
+        existentes, on=clave, how="left", indicator=True
+    )["_merge"].eq("both").to_numpy()
+    return en_archivo, en_base
+
+
+# ==========================================
+# IMPORTACIÓN
+# ==========================================
+COLUMNAS_INSERCION = ("vehiculo_id", "fecha", "km", "litros", "costo_total", "precio_litro",
+                      "tipo_combustible", "estacion", "conductor_id", "rendimiento", "observaciones")
+
+
+def _filas_insercion(cargas):
+    tabla = cargas[list(COLUMNAS_INSERCION)].astype(object)
+    tabla = tabla.where(tabla.notna(), None)
+    tabla["vehiculo_id"] = cargas["vehiculo_id"].astype(int).to_numpy()
+    tabla["km"] = cargas["km"].round().astype(int).to_numpy()
+    tabla["conductor_id"] = [None if pd.isna(c) else int(c) for c in cargas["conductor_id"]]
+    return list(tabla.itertuples(index=False, name=None))
+
+
+def _insertar(conn, cargas, tamano_insercion):
+    filas = _filas_insercion(cargas)
+    for i in range(0, len(filas), tamano_insercion):
+        conn.executemany(f"""
+            INSERT INTO combustible ({', '.join(COLUMNAS_INSERCION)})
+            VALUES ({', '.join('?' * len(COLUMNAS_INSERCION))})
+        """, filas[i:i + tamano_insercion])
+        conn.commit()
+    return len(filas)
+
+
+def importar_cargas(archivo, nombre=None, dry_run=False, tamano_lote=TAMANO_LOTE,
+                    tamano_insercion=TAMANO_LOTE_INSERCION, conn=None):
+    """Importa un resumen de tarjeta lote por lote; devuelve ResultadoImportacion.
+
+    Las filas con errores no se importan; las advertencias sí. El km_actual de
+    cada vehículo solo se actualiza si la importación lo aumenta.
+    """
+    inicio = time.perf_counter()
+    columnas_reporte = ["fila", "patente", "motivo"]
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        vehiculos, conductores = _indices(conn)
+        _preparar_temporales(conn)
+        # Lo insertado por lotes anteriores entra al contexto desde la tabla temporal de aceptadas,
+        # igual con dry_run o sin él
+        tope_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM combustible").fetchone()[0]
+        errores, advertencias, muestra = [], [], []
+        leidas = validas = insertadas = afectadas = en_muestra = 0
+        km_maximo, desde = {}, None
+
+        for lote in leer_lotes(archivo, nombre, tamano_lote):
+            # +2: encabezado y numeración desde 1, como en la planilla
+            cargas, errores_lote = _validar_lote(_renombrar(lote), leidas + 2, vehiculos, conductores)
+            leidas += len(lote)
+            errores.append(errores_lote)
+            if cargas.empty:
+                continue
+
+            cargas["km"] = cargas["km"].round().astype(int)
+            cargas["vehiculo_id"] = cargas["vehiculo_id"].astype(int)
+            contexto = _contexto(conn, cargas, tope_id)
+            en_archivo, en_base = _duplicadas(conn, cargas, contexto)
+            errores.append(cargas.loc[en_archivo, ["fila", "patente"]].assign(motivo="Repetida en el archivo"))
+            errores.append(cargas.loc[en_base & ~en_archivo, ["fila", "patente"]].assign(motivo="Ya registrada"))
+            cargas = cargas[~(en_archivo | en_base)]
+            if cargas.empty:
+                continue
+
+            cargas, advertencias_lote, afectadas_lote = _calcular(cargas, contexto)
+            advertencias.append(advertencias_lote)
+            afectadas += afectadas_lote
+            _aceptar(conn, cargas)
+            validas += len(cargas)
+            if en_muestra < MAX_MUESTRA:
+                muestra.append(cargas.head(MAX_MUESTRA - en_muestra))
+                en_muestra += len(muestra[-1])
+
+            if not dry_run:
+                insertadas += _insertar(conn, cargas, tamano_insercion)
+                for vid, km in cargas.groupby("vehiculo_id")["km"].max().items():
+                    km_maximo[int(vid)] = max(km_maximo.get(int(vid), 0), int(km))
+                fecha_minima = cargas["fecha"].min()
+                desde = fecha_minima if desde is None else min(desde, fecha_minima)
+
+        muestra = _rendimiento_final(conn, pd.concat(muestra, ignore_index=True), tope_id) if muestra else None
+        if afectadas:
+            advertencias.append(pd.DataFrame([{
+                "fila": None, "patente": None,
+                "motivo": f"{afectadas} cargas ya registradas quedan después de cargas importadas; "
+                          "su rendimiento se recalcula al importar",
+            }]))
+
+        if insertadas:
+            # Recalcula las importadas y las ya registradas que quedaron después
+            recalcular_rendimiento(list(km_maximo), desde=desde, conn=conn)
+            conn.executemany(
+                "UPDATE vehiculos SET km_actual = ? WHERE id = ? AND COALESCE(km_actual, 0) < ?",
+                [(km, vid, km) for vid, km in km_maximo.items()]
+            )
+            conn.commit()
+            detectar_anomalias(conn=conn)
+        else:
+            # Cierra la transacción abierta por las tablas temporales
+            conn.commit()
+    finally:
+        if propia:
+            conn.close()
+
+    errores = [e for e in errores if not e.empty]
+    advertencias = [a for a in advertencias if not a.empty]
+    errores = pd.concat(errores, ignore_index=True) if errores else pd.DataFrame(columns=columnas_reporte)
+    advertencias = pd.concat(advertencias, ignore_index=True) if advertencias else pd.DataFrame(columns=columnas_reporte)
+    cargas = muestra.sort_values("fila") if muestra is not None else pd.DataFrame()
+    return ResultadoImportacion(
+        leidas=leidas,
+        validas=validas,
+        insertadas=insertadas,
+        errores=errores.sort_values("fila", kind="stable").reset_index(drop=True),
+        advertencias=advertencias.reset_index(drop=True),
+        cargas=cargas.reset_index(drop=True),
+        dry_run=dry_run,
+        duracion_seg=round(time.perf_counter() - inicio, 3),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importación masiva de cargas de combustible")
+    parser.add_argument("archivo", help="Resumen de la tarjeta (.csv o .xlsx)")
+    parser.add_argument("--dry-run", action="store_true", help="Validar y calcular sin insertar")
+    args = parser.parse_args()
+
+    resultado = importar_cargas(args.archivo, dry_run=args.dry_run)
+    print(f"{'🔎' if resultado.dry_run else '✅'} {resultado.leidas:,} filas leídas, {resultado.validas:,} válidas, "
+          f"{resultado.insertadas:,} insertadas en {resultado.duracion_seg}s")
+    for motivo, cantidad in resultado.errores["motivo"].value_counts().items():
+        print(f"❌ {motivo}: {cantidad:,}")
+    for motivo, cantidad in resultado.advertencias["motivo"].value_counts().items():
+        print(f"⚠️ {motivo}: {cantidad:,}")
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# services/kpis.py - INDICADORES DEL DASHBOARD PRINCIPAL
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from utils.helpers import get_db_connection
+
+
+class ResumenFlota(NamedTuple):
+    """Foto de los KPIs de flota y cumplimiento documental"""
+    total: int
+    activos: int
+    en_reparacion: int
+    detenidos: int
+    bajas: int
+    docs_total: int
+    docs_vencidos: int
+
+    @property
+    def cumplimiento(self):
+        """% de documentos vigentes sobre vehículos que no están de baja"""
+        if self.docs_total == 0:
+            return 100
+        return round((self.docs_total - self.docs_vencidos) / self.docs_total * 100, 1)
+
+
+# Una sola sentencia: un recorrido agrupado de vehiculos y uno de vencimientos
+SQL_RESUMEN = """
+    SELECT
+        f.total, f.activos, f.en_reparacion, f.detenidos, f.bajas,
+        d.docs_total, d.docs_vencidos
+    FROM (
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM(estado = 'activo'), 0) AS activos,
+            COALESCE(SUM(estado = 'en_reparacion'), 0) AS en_reparacion,
+            COALESCE(SUM(estado = 'detenido'), 0) AS detenidos,
+            COALESCE(SUM(estado = 'baja'), 0) AS bajas
+        FROM vehiculos
+    ) f,
+    (
+        SELECT
+            COUNT(*) AS docs_total,
+            COALESCE(SUM(v.fecha_vencimiento < date('now')), 0) AS docs_vencidos
+        FROM vencimientos v
+        JOIN vehiculos ve ON v.vehiculo_id = ve.id
+        WHERE ve.estado != 'baja'
+    ) d
+"""
+
+SQL_ALERTAS_PROXIMAS = """
+    SELECT
+        v.patente,
+        'Vencimiento' as tipo,
+        ve.tipo as item,
+        ve.fecha_vencimiento as fecha,
+        julianday(ve.fecha_vencimiento) - julianday('now') as dias
+    FROM vencimientos ve
+    JOIN vehiculos v ON ve.vehiculo_id = v.id
+    WHERE v.estado = 'activo'
+    AND ve.fecha_vencimiento <= date('now', '+' || :dias || ' days')
+
+    UNION ALL
+
+    SELECT
+        v.patente,
+        'Mantenimiento' as tipo,
+        m.tipo as item,
+        m.prox_fecha as fecha,
+        julianday(m.prox_fecha) - julianday('now') as dias
+    FROM mantenimientos m
+    JOIN vehiculos v ON m.vehiculo_id = v.id
+    WHERE v.estado = 'activo'
+    AND m.prox_fecha IS NOT NULL
+    AND m.prox_fecha <= date('now', '+' || :dias || ' days')
+
+    ORDER BY dias
+"""
+
+
+def obtener_resumen_flota(conn=None):
+    """Calcula todos los contadores del dashboard en una sola consulta"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        fila = conn.execute(SQL_RESUMEN).fetchone()
+        return ResumenFlota(*(int(valor or 0) for valor in fila))
+    finally:
+        if propia:
+            conn.close()
+
+
+def obtener_alertas_proximas(conn=None, dias=30):
+    """Vencimientos y mantenimientos por fecha de vehículos activos en los próximos días"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        df = pd.read_sql_query(SQL_ALERTAS_PROXIMAS, conn, params={"dias": dias})
+    finally:
+        if propia:
+            conn.close()
+
+    dias_col = df['dias'].to_numpy()
+    df['Estado'] = np.select(
+        [dias_col < 0, dias_col < 7],
+        ["🔴 VENCIDO", "🟠 URGENTE"],
+        default="🟡 PRÓXIMO"
+    )
+    df['Días'] = df['dias'].astype(int).astype(str) + " días"
+    return df
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# services/motor_alertas.py - MOTOR DE ALERTAS VECTORIZADO
+#
+# Calcula todas las alertas de flota como una sola tabla columnar (una fila
+# por alerta) con dos consultas: un UNION ALL para vehículos/mantenimientos y
+# los conductores activos, cuyas cuatro columnas de documentos se despivotean
+# con un melt. Días y prioridades se calculan sobre columnas completas.
+#
+# Diferencias con el cálculo anterior (iterrows):
+#   - Los días de vencimientos de vehículos y de mantenimientos por fecha son
+#     días de calendario contra la fecha local, como ya se hacía con los
+#     conductores. Antes se truncaba julianday(fecha) - julianday('now') en
+#     UTC, así que durante el día daba uno menos (3 donde ahora da 4).
+#   - La tabla sale ordenada por urgencia con desempates fijos. En el formato
+#     legado los conductores van agrupados por conductor (por nombre y DNI, antes
+#     en orden de alta) y sus documentos en el orden de DOCUMENTOS_CONDUCTOR.
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from utils.helpers import get_db_connection
+
+DIAS_AVISO = 30
+KM_AVISO = 2000
+
+# (límite crítico, límite urgente): por debajo de cada uno cambia la prioridad
+UMBRAL_DIAS = (0, 7)
+UMBRAL_KM = (0, 500)
+
+# Columna de conductores -> nombre del documento en la alerta
+DOCUMENTOS_CONDUCTOR = {
+    "licencia_venc": "Licencia",
+    "licencia_cargas_peligrosas": "Cargas Peligrosas",
+    "examen_psicofisico": "Examen Psicofísico",
+    "curso_iram": "Curso IRAM",
+}
+
+_ORDEN_DOCUMENTO = {documento: i for i, documento in enumerate(DOCUMENTOS_CONDUCTOR.values())}
+
+CATEGORIAS = ("vehiculos_vencidos", "mantenimientos_urgentes", "conductores_vencidos", "vehiculos_detenidos")
+
+COLUMNAS = ["categoria", "criterio", "patente", "nombre", "dni", "tipo", "fecha",
+            "dias", "km_actual", "proximo", "faltantes", "estado", "observaciones", "prioridad"]
+
+# (categoria, criterio) -> columna de la tabla -> clave del dict legado
+FORMATO_LEGADO = {
+    ("vehiculos_vencidos", "fecha"): {
+        "patente": "patente", "tipo": "tipo", "fecha": "vencimiento", "dias": "dias", "prioridad": "prioridad",
+    },
+    ("mantenimientos_urgentes", "km"): {
+        "patente": "patente", "tipo": "tipo", "km_actual": "km_actual", "proximo": "proximo",
+        "faltantes": "faltantes", "prioridad": "prioridad",
+    },
+    ("mantenimientos_urgentes", "fecha"): {
+        "patente": "patente", "tipo": "tipo", "fecha": "fecha", "dias": "dias", "prioridad": "prioridad",
+    },
+    ("conductores_vencidos", "fecha"): {
+        "nombre": "nombre", "dni": "dni", "tipo": "documento", "fecha": "vencimiento",
+        "dias": "dias", "prioridad": "prioridad",
+    },
+    ("vehiculos_detenidos", "estado"): {
+        "patente": "patente", "estado": "estado", "observaciones": "observaciones",
+    },
+}
+
+# Filtros sargables: se comparan fechas ISO contra :limite (hoy + DIAS_AVISO)
+SQL_ALERTAS_VEHICULOS = """
+    SELECT 'vehiculos_vencidos' AS categoria, 'fecha' AS criterio,
+           v.patente, ve.tipo, ve.fecha_vencimiento AS fecha,
+           NULL AS km_actual, NULL AS proximo, NULL AS faltantes,
+           NULL AS estado, NULL AS observaciones
+    FROM vencimientos ve
+    JOIN vehiculos v ON ve.vehiculo_id = v.id
+    WHERE v.estado = 'activo'
+    AND ve.fecha_vencimiento <= :limite
+
+    UNION ALL
+
+    SELECT 'mantenimientos_urgentes', 'km',
+           v.patente, m.tipo, NULL,
+           v.km_actual, m.prox_km, m.prox_km - v.km_actual,
+           NULL, NULL
+    FROM mantenimientos m
+    JOIN vehiculos v ON m.vehiculo_id = v.id
+    WHERE v.estado = 'activo'
+    AND m.prox_km IS NOT NULL
+    AND v.km_actual IS NOT NULL
+    AND m.prox_km - v.km_actual <= :km_aviso
+
+    UNION ALL
+
+    SELECT 'mantenimientos_urgentes', 'fecha',
+           v.patente, m.tipo, m.prox_fecha,
+           NULL, NULL, NULL,
+           NULL, NULL
+    FROM mantenimientos m
+    JOIN vehiculos v ON m.vehiculo_id = v.id
+    WHERE v.estado = 'activo'
+    AND m.prox_fecha IS NOT NULL
+    AND m.prox_fecha <= :limite
+
+    UNION ALL
+
+    SELECT 'vehiculos_detenidos', 'estado',
+           patente, NULL, NULL,
+           NULL, NULL, NULL,
+           estado, observaciones
+    FROM vehiculos
+    WHERE estado IN ('detenido', 'en_reparacion')
+"""
+
+SQL_CONDUCTORES = f"""
+    SELECT nombre, dni, {', '.join(DOCUMENTOS_CONDUCTOR)}
+    FROM conductores
+    WHERE estado = 'activo'
+"""
+
+
+def clasificar(valores, umbrales):
+    """CRÍTICO / URGENTE / ADVERTENCIA para un array de días o km faltantes"""
+    critico, urgente = umbrales
+    return np.select([valores < critico, valores < urgente], ["CRÍTICO", "URGENTE"], default="ADVERTENCIA")
+
+
+def _dias_hasta(fechas, hoy):
+    """Días de calendario hasta cada fecha 'YYYY-MM-DD' (NaN si falta o es inválida)"""
+    fechas = pd.to_datetime(fechas, format="%Y-%m-%d", errors="coerce")
+    return (fechas - pd.Timestamp(hoy)).dt.days
+
+
+def _alertas_conductores(df_cond, hoy):
+    """Una fila por documento de conductor a vencer o vencido"""
+    docs = df_cond.melt(
+        id_vars=["nombre", "dni"],
+        value_vars=list(DOCUMENTOS_CONDUCTOR),
+        var_name="tipo",
+        value_name="fecha",
+    )
+    docs["dias"] = _dias_hasta(docs["fecha"], hoy)
+    docs = docs[docs["dias"] <= DIAS_AVISO].copy()
+    docs["tipo"] = docs["tipo"].map(DOCUMENTOS_CONDUCTOR)
+    docs["categoria"] = "conductores_vencidos"
+    docs["criterio"] = "fecha"
+    return docs
+
+
+def calcular_alertas(conn=None, hoy=None):
+    """Tabla de alertas (una fila por alerta, columnas en COLUMNAS) ordenada por urgencia.
+
+    A igual urgencia desempatan patente, nombre, DNI y tipo: el orden no
+    depende del plan de las consultas.
+    """
+    hoy = hoy or date.today()
+    params = {"limite": (hoy + timedelta(days=DIAS_AVISO)).isoformat(), "km_aviso": KM_AVISO}
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        df_veh = pd.read_sql_query(SQL_ALERTAS_VEHICULOS, conn, params=params)
+        df_cond = pd.read_sql_query(SQL_CONDUCTORES, conn)
+    finally:
+        if propia:
+            conn.close()
+
+    df_veh["dias"] = _dias_hasta(df_veh["fecha"], hoy)
+    tabla = pd.concat([df_veh, _alertas_conductores(df_cond, hoy)], ignore_index=True)
+    tabla = tabla.reindex(columns=COLUMNAS)
+
+    for col in ("dias", "km_actual", "proximo", "faltantes"):
+        tabla[col] = pd.to_numeric(tabla[col]).astype("Int64")
+
+    criterio = tabla["criterio"].to_numpy()
+    dias = tabla["dias"].to_numpy(dtype=float, na_value=np.nan)
+    faltantes = tabla["faltantes"].to_numpy(dtype=float, na_value=np.nan)
+    tabla["prioridad"] = np.select(
+        [criterio == "fecha", criterio == "km"],
+        [clasificar(dias, UMBRAL_DIAS), clasificar(faltantes, UMBRAL_KM)],
+        default=None,
+    )
+
+    orden = pd.Categorical(tabla["categoria"], categories=CATEGORIAS, ordered=True)
+    return (
+        tabla.assign(_orden=orden, _criterio=(criterio == "fecha"))
+        .sort_values(["_orden", "_criterio", "faltantes", "dias", "patente", "nombre", "dni", "tipo"],
+                     kind="stable", na_position="last")
+        .drop(columns=["_orden", "_criterio"])
+        .reset_index(drop=True)
+    )
+
+
+def alertas_a_dict(tabla):
+    """Convierte la tabla al formato {categoria: [dict, ...]} de obtener_alertas_criticas.
+
+    Las alertas de conductores van agrupadas por conductor, como en el formato
+    original; el resto conserva el orden de la tabla.
+    """
+    conductores = (tabla["categoria"] == "conductores_vencidos").to_numpy()
+    if conductores.any():
+        por_conductor = tabla[conductores] \
+            .assign(_documento=tabla.loc[conductores, "tipo"].map(_ORDEN_DOCUMENTO)) \
+            .sort_values(["nombre", "dni", "_documento"], kind="stable") \
+            .drop(columns="_documento")
+        tabla = pd.concat([tabla[~conductores], por_conductor])
+    # Columnas como arrays de objetos Python (NA -> None) para armar los dicts sin pandas
+    valores = {col: tabla[col].to_numpy(dtype=object, na_value=None) for col in COLUMNAS}
+    categoria = tabla["categoria"].to_numpy(dtype=object)
+    criterio = tabla["criterio"].to_numpy(dtype=object)
+    alertas = {cat: [] for cat in CATEGORIAS}
+    for (cat, crit), columnas in FORMATO_LEGADO.items():
+        mascara = (categoria == cat) & (criterio == crit)
+        claves = list(columnas.values())
+        filas = zip(*(valores[col][mascara] for col in columnas))
+        alertas[cat].extend(dict(zip(claves, fila)) for fila in filas)
+    return alertas
+
+
+def dict_a_tabla(alertas):
+    """Inversa de alertas_a_dict: del formato legado a la tabla columnar"""
+    partes = []
+    for (cat, crit), columnas in FORMATO_LEGADO.items():
+        registros = alertas.get(cat, [])
+        if cat == "mantenimientos_urgentes":
+            # En el formato legado el criterio se distingue por la presencia de 'faltantes'
+            registros = [r for r in registros if ("faltantes" in r) == (crit == "km")]
+        if registros:
+            inversa = {clave: col for col, clave in columnas.items()}
+            partes.append(pd.DataFrame(registros).rename(columns=inversa).assign(categoria=cat, criterio=crit))
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS)
+    return pd.concat(partes, ignore_index=True).reindex(columns=COLUMNAS)
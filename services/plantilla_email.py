@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# services/plantilla_email.py - PLANTILLA HTML DEL EMAIL DE ALERTAS
+#
+# El layout y las filas son string.Template compilados al importar. Cada
+# sección se arma desde la tabla de services.motor_alertas en una pasada,
+# mostrando las MAX_FILAS_SECCION alertas más graves y un resumen del resto.
+# El cuerpo queda en caché por hash del conjunto de alertas; el saludo por
+# destinatario se inserta después, así previsualizar y enviar no re-renderiza.
+
+import hashlib
+from datetime import date
+from html import escape
+from string import Template
+
+import pandas as pd
+from utils.cache import CacheConsultas
+
+MAX_FILAS_SECCION = 50
+CACHE_TTL_SEG = 3600
+
+PRIORIDADES = ("CRÍTICO", "URGENTE", "ADVERTENCIA")
+_PLURALES = {"CRÍTICO": "críticas", "URGENTE": "urgentes", "ADVERTENCIA": "advertencias", "INFO": "informativas"}
+
+# Marcador que se reemplaza por el saludo de cada destinatario
+_MARCA_SALUDO = "<!--saludo-->"
+
+SECCIONES = {
+    "vehiculos_vencidos": "📅 Documentación de Vehículos",
+    "mantenimientos_urgentes": "🔧 Mantenimientos Preventivos",
+    "conductores_vencidos": "👨‍✈️ Documentación de Conductores",
+    "vehiculos_detenidos": "🛑 Vehículos Fuera de Servicio",
+}
+
+LAYOUT = Template("""
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; background-color: #f4f4f4; margin: 0; padding: 20px; }
+        .container { max-width: 800px; margin: 0 auto; background-color: white; padding: 30px;
+                     border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;
+                  padding: 20px; border-radius: 10px; text-align: center; margin-bottom: 30px; }
+        .header h1 { margin: 0; font-size: 28px; }
+        .alert-section { margin-bottom: 25px; border-left: 4px solid #667eea; padding-left: 15px; }
+        .alert-section h2 { color: #333; font-size: 20px; margin-bottom: 15px; }
+        .alert-item { background-color: #f9f9f9; padding: 12px; margin-bottom: 10px;
+                      border-radius: 5px; border-left: 3px solid #ccc; }
+        .alert-critico { border-left-color: #ff4444; background-color: #ffebee; }
+        .alert-urgente { border-left-color: #ffaa00; background-color: #fff8e1; }
+        .alert-advertencia { border-left-color: #ffdd00; background-color: #fffde7; }
+        .badge { display: inline-block; padding: 3px 8px; border-radius: 3px; font-size: 11px;
+                 font-weight: bold; margin-right: 5px; }
+        .badge-critico { background-color: #ff4444; color: white; }
+        .badge-urgente { background-color: #ffaa00; color: white; }
+        .badge-advertencia { background-color: #ffdd00; color: #333; }
+        .mas { color: #666; font-size: 13px; font-style: italic; padding: 6px 12px; }
+        .resumen { background-color: #e3f2fd; padding: 15px; border-radius: 5px; margin-bottom: 25px;
+                   text-align: center; }
+        .resumen h3 { margin: 0; color: #1976d2; font-size: 18px; }
+        .footer { text-align: center; color: #666; font-size: 12px; margin-top: 30px; padding-top: 20px;
+                  border-top: 1px solid #ddd; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🚛 Sistema de Gestión de Flota</h1>
+            <p>Reporte de Alertas - $fecha</p>
+        </div>
+        $saludo
+        <div class="resumen">
+            <h3>📊 Total de Alertas: $total</h3>
+        </div>
+        $secciones
+        <div class="footer">
+            <p><strong>Sistema Integral de Gestión de Flota</strong></p>
+            <p>Combustibles Tucumán - Argentina</p>
+            <p>Este es un email automático, por favor no responder.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+SECCION = Template("""
+        <div class="alert-section">
+            <h2>$titulo</h2>
+            $filas
+            $mas
+        </div>""")
+
+FILA = Template("""
+            <div class="alert-item alert-$clase">
+                <span class="badge badge-$clase">$etiqueta</span>
+                <strong>$titulo</strong>$subtitulo<br>
+                <small>$detalle</small>
+            </div>""")
+
+MAS = Template('<div class="mas">… y $cantidad alertas más ($detalle). Ver el detalle completo en el sistema.</div>')
+
+DIGEST = Template("""
+        <div class="alert-section">
+            <h2>📋 Sin cambios desde el último envío ($total)</h2>
+            <small>$lineas</small>
+        </div>""")
+
+SIN_ALERTAS = """
+        <div style="text-align: center; padding: 40px;">
+            <h2 style="color: #4caf50;">✅ ¡Excelente!</h2>
+            <p>No hay alertas críticas en este momento. Toda la flota está operativa y con documentación al día.</p>
+        </div>"""
+
+_cache = CacheConsultas(ttl=CACHE_TTL_SEG, max_entradas=32)
+
+
+def _estado_dias(dias, vencido="VENCIDO"):
+    return vencido if dias < 0 else f"Vence en {dias} días"
+
+
+def _campos_fila(categoria, a):
+    """Textos de una alerta (a = fila de la tabla como namedtuple)"""
+    if categoria == "vehiculos_vencidos":
+        return a.patente, f" - {a.tipo.upper()}", f"Vencimiento: {a.fecha} | {_estado_dias(a.dias)}"
+    if categoria == "mantenimientos_urgentes":
+        if a.criterio == "km":
+            estado = f"Faltan {a.faltantes:,} km" if a.faltantes > 0 else "VENCIDO POR KM"
+            detalle = f"Actual: {a.km_actual:,} km | Próximo: {a.proximo:,} km | {estado}"
+        else:
+            estado = f"Faltan {a.dias} días" if a.dias > 0 else "VENCIDO POR FECHA"
+            detalle = f"Fecha programada: {a.fecha} | {estado}"
+        return a.patente, f" - {a.tipo}", detalle
+    if categoria == "conductores_vencidos":
+        return a.nombre, f" (DNI: {a.dni})", f"{a.tipo} | Vencimiento: {a.fecha} | {_estado_dias(a.dias)}"
+    estado = "EN REPARACIÓN" if a.estado == "en_reparacion" else "DETENIDO"
+    return a.patente, f" - {estado}", a.observaciones or "Sin observaciones"
+
+
+def _render_seccion(categoria, grupo, max_filas):
+    # Las más graves primero; dentro de cada prioridad se respeta el orden de la tabla
+    rango = grupo["prioridad"].map({p: i for i, p in enumerate(PRIORIDADES)}).fillna(len(PRIORIDADES))
+    grupo = grupo.assign(_rango=rango).sort_values("_rango", kind="stable")
+    visibles = grupo.head(max_filas).astype(object)
+    visibles = visibles.where(visibles.notna(), None)
+
+    filas = []
+    for a in visibles.itertuples(index=False):
+        titulo, subtitulo, detalle = _campos_fila(categoria, a)
+        clase = a.prioridad.lower() if a.prioridad else "advertencia"
+        filas.append(FILA.substitute(
+            clase=clase, etiqueta=a.prioridad or "INFO",
+            titulo=escape(str(titulo)), subtitulo=escape(subtitulo), detalle=escape(str(detalle)),
+        ))
+
+    mas = ""
+    ocultas = grupo.iloc[max_filas:]
+    if len(ocultas):
+        conteo = ocultas["prioridad"].fillna("INFO").value_counts()
+        detalle = ", ".join(f"{conteo[p]} {nombre}" for p, nombre in _PLURALES.items() if p in conteo)
+        mas = MAS.substitute(cantidad=len(ocultas), detalle=escape(detalle))
+
+    return SECCION.substitute(titulo=SECCIONES[categoria], filas="".join(filas), mas=mas)
+
+
+def hash_alertas(tabla):
+    """Huella del conjunto de alertas (mismo contenido -> mismo hash)"""
+    huella = pd.util.hash_pandas_object(tabla, index=False).to_numpy().tobytes()
+    return hashlib.sha1(huella).hexdigest()
+
+
+def _render_digest(digest):
+    """Sección compacta con los conteos de alertas sin cambios por categoría y prioridad"""
+    lineas = []
+    for categoria, titulo in SECCIONES.items():
+        if categoria not in digest.index.get_level_values(0):
+            continue
+        conteo = digest.loc[categoria]
+        partes = ", ".join(f"{conteo[p]} {nombre}" for p, nombre in _PLURALES.items() if p in conteo.index)
+        lineas.append(f"{titulo}: {partes}")
+    return DIGEST.substitute(total=int(digest.sum()), lineas="<br>".join(lineas))
+
+
+def renderizar_cuerpo(tabla, max_filas=MAX_FILAS_SECCION, hoy=None, digest=None):
+    """HTML del email sin saludo (con _MARCA_SALUDO); se guarda en caché por hash de la tabla.
+
+    digest: conteos de alertas ya notificadas sin cambios (services.estado_alertas.resumen_sin_cambios)
+    """
+    hoy = hoy or date.today()
+    hay_digest = digest is not None and len(digest) > 0
+    clave = (hash_alertas(tabla), max_filas, hoy, tuple(digest.items()) if hay_digest else ())
+    cuerpo = _cache.obtener(clave, ())
+    if cuerpo is not None:
+        return cuerpo
+
+    secciones = [
+        _render_seccion(categoria, grupo, max_filas)
+        for categoria, grupo in tabla.groupby("categoria", sort=False)
+        if categoria in SECCIONES
+    ]
+    if hay_digest:
+        secciones.append(_render_digest(digest))
+    cuerpo = LAYOUT.substitute(
+        fecha=hoy.strftime('%d/%m/%Y'),
+        saludo=_MARCA_SALUDO,
+        total=len(tabla) + (int(digest.sum()) if hay_digest else 0),
+        secciones="".join(secciones) if secciones else SIN_ALERTAS,
+    )
+    _cache.guardar(clave, (), (), cuerpo)
+    return cuerpo
+
+
+def renderizar_email(tabla, destinatario=None, max_filas=MAX_FILAS_SECCION, digest=None):
+    """HTML final para un destinatario (el nombre solo cambia el saludo)"""
+    saludo = f"<p>Hola {escape(destinatario)},</p>" if destinatario else ""
+    return renderizar_cuerpo(tabla, max_filas, digest=digest).replace(_MARCA_SALUDO, saludo, 1)
+
+
+def estadisticas_plantilla():
+    return _cache.estadisticas()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# services/programador.py - PROGRAMADOR DE TAREAS EN PROCESO SEPARADO
+#
+# Proceso independiente de Streamlit (solo biblioteca estándar) que ejecuta
+# las tareas de tareas_programadas en su hora y días de la semana. El estado,
+# la próxima ejecución y el resultado de cada corrida quedan en SQLite, así la
+# app solo lee y escribe la configuración.
+#
+# Uso: python -m services.programador [--una-vez] [--intervalo 60]
+# La contraseña SMTP se toma de la variable de entorno FLOTA_SMTP_PASSWORD.
+
+import json
+import os
+import signal
+import time
+from datetime import datetime, timedelta
+
+from utils.helpers import conexion_db
+
+INTERVALO_MAX_SEG = 60
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+
+def _texto(momento):
+    return momento.strftime(FORMATO_FECHA)
+
+
+def calcular_proxima(hora, dias_semana, desde):
+    """Primer momento posterior a 'desde' con la hora "HH:MM" en uno de los días (0=Lunes)"""
+    if not dias_semana:
+        return None
+    horas, minutos = (int(parte) for parte in hora.split(":"))
+    candidata = desde.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+    if candidata <= desde:
+        candidata += timedelta(days=1)
+    while candidata.weekday() not in dias_semana:
+        candidata += timedelta(days=1)
+    return candidata
+
+
+def programar_tarea(nombre, hora, dias_semana, parametros=None, activo=True):
+    """Crea o actualiza una tarea y recalcula su próxima ejecución; devuelve la fila como dict"""
+    dias_semana = sorted({int(d) for d in dias_semana})
+    proxima = calcular_proxima(hora, dias_semana, datetime.now()) if activo else None
+    with conexion_db() as conn:
+        conn.execute("""
+            INSERT INTO tareas_programadas (nombre, hora, dias_semana, parametros, activo, proxima_ejecucion)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(nombre) DO UPDATE SET
+                hora = excluded.hora,
+                dias_semana = excluded.dias_semana,
+                parametros = excluded.parametros,
+                activo = excluded.activo,
+                proxima_ejecucion = excluded.proxima_ejecucion
+        """, (nombre, hora, ",".join(map(str, dias_semana)), json.dumps(parametros or {}),
+              int(activo), _texto(proxima) if proxima else None))
+        conn.commit()
+        return dict(conn.execute("SELECT * FROM tareas_programadas WHERE nombre = ?", (nombre,)).fetchone())
+
+
+# ==========================================
+# TAREAS DISPONIBLES
+# ==========================================
+def tarea_alertas_email(parametros):
+    """Calcula las alertas y las envía a los destinatarios activos"""
+    from services.email_alerts import SistemaAlertas, obtener_destinatarios_activos
+
+    destinatarios = obtener_destinatarios_activos(con_nombre=True)
+    if not destinatarios:
+        return True, "Sin destinatarios activos"
+    sistema = SistemaAlertas(
+        parametros.get("smtp_server", "smtp.gmail.com"),
+        parametros.get("smtp_port", 587),
+        parametros.get("usar_tls", True),
+    )
+    sistema.configurar_email(parametros.get("email_from"), os.environ.get("FLOTA_SMTP_PASSWORD"))
+    return sistema.enviar_alerta_email(destinatarios)
+
+
+def tarea_snapshot_analitico(parametros):
+    """Regenera el snapshot columnar de las tablas de historial (reports.snapshot)"""
+    from reports.snapshot import DIR_SNAPSHOTS, generar_snapshot
+
+    manifiesto = generar_snapshot(parametros.get("destino", DIR_SNAPSHOTS), parametros.get("tablas"))
+    filas = sum(datos["filas"] for datos in manifiesto["tablas"].values())
+    return True, f"{len(manifiesto['tablas'])} tablas, {filas:,} filas"
+
+
+def tarea_anomalias_combustible(parametros):
+    """Reanaliza el historial de combustible (toma también las cargas corregidas)"""
+    from services.anomalias_combustible import detectar_anomalias
+
+    r = detectar_anomalias(completo=parametros.get("completo", True))
+    return True, f"{r.cargas:,} cargas, {r.anomalias:,} anomalías en {r.duracion_seg}s"
+
+
+TAREAS = {
+    "alertas_email": tarea_alertas_email,
+    "snapshot_analitico": tarea_snapshot_analitico,
+    "anomalias_combustible": tarea_anomalias_combustible,
+}
+
+
+# ==========================================
+# EJECUCIÓN
+# ==========================================
+def _reclamar(conn, tarea, ahora):
+    """Avanza proxima_ejecucion solo si nadie lo hizo antes (evita corridas dobles)"""
+    dias = [int(d) for d in tarea['dias_semana'].split(",") if d]
+    siguiente = calcular_proxima(tarea['hora'], dias, ahora)
+    cursor = conn.execute("""
+        UPDATE tareas_programadas
+        SET proxima_ejecucion = ?, ultimo_estado = 'ejecutando'
+        WHERE nombre = ? AND proxima_ejecucion = ?
+    """, (_texto(siguiente) if siguiente else None, tarea['nombre'], tarea['proxima_ejecucion']))
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def ejecutar_tarea(conn, tarea):
+    """Corre una tarea y registra el resultado; devuelve (estado, resultado)"""
+    inicio = datetime.now()
+    id_ejecucion = conn.execute(
+        "INSERT INTO ejecuciones_tareas (tarea, inicio, estado) VALUES (?, ?, 'ejecutando')",
+        (tarea['nombre'], _texto(inicio))
+    ).lastrowid
+    conn.commit()
+
+    funcion = TAREAS.get(tarea['nombre'])
+    try:
+        if funcion is None:
+            raise KeyError(f"Tarea desconocida: {tarea['nombre']}")
+        exito, resultado = funcion(json.loads(tarea['parametros'] or "{}"))
+        estado = "ok" if exito else "error"
+    except Exception as e:
+        estado, resultado = "error", f"{type(e).__name__}: {e}"
+
+    fin = _texto(datetime.now())
+    conn.execute(
+        "UPDATE ejecuciones_tareas SET fin = ?, estado = ?, resultado = ? WHERE id = ?",
+        (fin, estado, resultado, id_ejecucion)
+    )
+    conn.execute("""
+        UPDATE tareas_programadas
+        SET ultima_ejecucion = ?, ultimo_estado = ?, ultimo_resultado = ?
+        WHERE nombre = ?
+    """, (_texto(inicio), estado, resultado, tarea['nombre']))
+    conn.commit()
+    return estado, resultado
+
+
+def ejecutar_pendientes(ahora=None):
+    """Ejecuta las tareas vencidas; devuelve [(nombre, estado, resultado)]"""
+    ahora = ahora or datetime.now()
+    ejecutadas = []
+    with conexion_db() as conn:
+        pendientes = conn.execute("""
+            SELECT * FROM tareas_programadas
+            WHERE activo = 1 AND proxima_ejecucion IS NOT NULL AND proxima_ejecucion <= ?
+        """, (_texto(ahora),)).fetchall()
+        for tarea in pendientes:
+            # Si el proceso estuvo caído se corre una sola vez y se reprograma desde ahora
+            if _reclamar(conn, tarea, ahora):
+                ejecutadas.append((tarea['nombre'],) + ejecutar_tarea(conn, tarea))
+    return ejecutadas
+
+
+def segundos_hasta_proxima(ahora=None, intervalo_max=INTERVALO_MAX_SEG):
+    """Espera hasta la próxima tarea, acotada para tomar cambios de configuración"""
+    ahora = ahora or datetime.now()
+    with conexion_db() as conn:
+        fila = conn.execute(
+            "SELECT MIN(proxima_ejecucion) FROM tareas_programadas WHERE activo = 1"
+        ).fetchone()
+    if not fila[0]:
+        return intervalo_max
+    proxima = datetime.strptime(fila[0], FORMATO_FECHA)
+    return min(max((proxima - ahora).total_seconds(), 0), intervalo_max)
+
+
+def bucle(intervalo_max=INTERVALO_MAX_SEG):
+    """Loop principal hasta SIGINT/SIGTERM"""
+    detener = []
+    signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+    signal.signal(signal.SIGINT, lambda *_: detener.append(True))
+
+    print(f"⏰ Programador iniciado (pid {os.getpid()})")
+    while not detener:
+        for nombre, estado, resultado in ejecutar_pendientes():
+            print(f"{_texto(datetime.now())} {'✅' if estado == 'ok' else '❌'} {nombre}: {resultado}")
+        espera = segundos_hasta_proxima(intervalo_max=intervalo_max)
+        # Dormir en pasos cortos para responder rápido a la señal de salida
+        limite = time.monotonic() + espera
+        while not detener and time.monotonic() < limite:
+            time.sleep(min(1.0, limite - time.monotonic()))
+    print("⏹️ Programador detenido")
+
+
+if __name__ == "__main__":
+    import argparse
+    from models import init_db
+
+    parser = argparse.ArgumentParser(description="Programador de tareas de la flota")
+    parser.add_argument("--una-vez", action="store_true", help="Ejecutar lo pendiente y salir")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_MAX_SEG,
+                        help="Máximo de segundos entre revisiones de la configuración")
+    args = parser.parse_args()
+
+    init_db()
+    if args.una_vez:
+        for nombre, estado, resultado in ejecutar_pendientes():
+            print(f"{'✅' if estado == 'ok' else '❌'} {nombre}: {resultado}")
+    else:
+        bucle(args.intervalo)
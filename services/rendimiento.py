@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# services/rendimiento.py - RECÁLCULO VECTORIZADO DEL RENDIMIENTO (KM/L)
+#
+# El rendimiento de una carga depende de las anteriores del mismo vehículo,
+# así que una carga retroactiva o corregida deja mal a todas las que siguen.
+# Este módulo lo recalcula sobre arrays ordenados por (vehículo, fecha, km):
+#   - carga completa: km desde la carga completa anterior / litros cargados
+#     desde entonces (incluye los de las cargas parciales intermedias);
+#   - carga parcial (combustible.parcial = 1): sin rendimiento;
+#   - si el odómetro retrocede (cambio de tablero o error de carga) se corta
+#     el tramo y esa carga queda sin rendimiento.
+# Solo se escriben las filas cuyo valor cambió, con executemany por lotes (o
+# en una sola transacción sin el trigger de resúmenes si son muchas).
+#
+# Uso: python -m services.rendimiento [--patente AA123BB] [--desde 2025-01-01] [--dry-run]
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from utils.helpers import get_db_connection
+
+TAMANO_LOTE = 20000
+# Desde esta cantidad de cambios se escribe sin el trigger de resúmenes (ver _escribir_masivo)
+UMBRAL_MASIVO = 50000
+TRIGGER_RESUMEN = "trg_resumen_combustible_update"
+# Diferencias menores se consideran iguales (el valor se guarda redondeado a 2 decimales)
+TOLERANCIA = 0.005
+
+
+class ResultadoRecalculo(NamedTuple):
+    vehiculos: int
+    cargas: int
+    cambiadas: int
+    duracion_seg: float
+
+
+def calcular_rendimiento(vehiculo_id, km, litros, parcial):
+    """km/l por carga sobre arrays ya ordenados por (vehículo, fecha, km); NaN si no aplica"""
+    n = len(km)
+    if n == 0:
+        return np.empty(0)
+    km = np.asarray(km, dtype=float)
+    litros = np.asarray(litros, dtype=float)
+    completa = ~np.asarray(parcial, dtype=bool)
+    indice = np.arange(n)
+
+    # Un tramo empieza con cada vehículo y cada vez que el odómetro retrocede
+    inicio = np.ones(n, dtype=bool)
+    inicio[1:] = (vehiculo_id[1:] != vehiculo_id[:-1]) | (km[1:] < km[:-1])
+    inicio_tramo = np.maximum.accumulate(np.where(inicio, indice, 0))
+
+    # Última carga completa estrictamente anterior (dentro del mismo tramo)
+    ultima_completa = np.maximum.accumulate(np.where(completa, indice, -1))
+    anterior = np.empty(n, dtype=np.int64)
+    anterior[0] = -1
+    anterior[1:] = ultima_completa[:-1]
+    valida = completa & (anterior >= inicio_tramo)
+
+    desde = np.where(valida, anterior, 0)
+    litros_acumulados = np.cumsum(litros)
+    litros_tramo = litros_acumulados - litros_acumulados[desde]
+    km_tramo = km - km[desde]
+    valida &= (km_tramo > 0) & (litros_tramo > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valida, np.round(km_tramo / litros_tramo, 2), np.nan)
+
+
+def _ids_temporales(conn, ids):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _vehiculos_rendimiento (id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp._vehiculos_rendimiento")
+    conn.executemany("INSERT INTO temp._vehiculos_rendimiento VALUES (?)", ((int(i),) for i in ids))
+
+
+def _cargar(conn, vehiculo_ids, desde):
+    """Cargas a recalcular; con 'desde' arranca en la última carga completa anterior de cada vehículo"""
+    condiciones = []
+    if vehiculo_ids is not None:
+        _ids_temporales(conn, vehiculo_ids)
+        condiciones.append("c.vehiculo_id IN (SELECT id FROM temp._vehiculos_rendimiento)")
+    if desde is not None:
+        # Carga completa anterior a 'desde' (una búsqueda por vehículo en el índice)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _anclas_rendimiento (vehiculo_id INTEGER PRIMARY KEY, fecha TEXT)")
+        conn.execute("DELETE FROM temp._anclas_rendimiento")
+        origen = "temp._vehiculos_rendimiento" if vehiculo_ids is not None else "vehiculos"
+        conn.execute(f"""
+            INSERT INTO temp._anclas_rendimiento
+            SELECT t.id, (
+                SELECT MAX(c.fecha) FROM combustible c
+                WHERE c.vehiculo_id = t.id AND c.fecha < :desde AND c.parcial = 0
+            )
+            FROM {origen} t
+        """, {"desde": str(desde)})
+        condiciones.append("""c.fecha >= COALESCE(
+            (SELECT a.fecha FROM temp._anclas_rendimiento a WHERE a.vehiculo_id = c.vehiculo_id), '')""")
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    filas = cursor.execute(f"""
+        SELECT c.id, c.vehiculo_id, c.fecha, c.km, c.litros, c.parcial, c.rendimiento
+        FROM combustible c
+        {where}
+    """).fetchall()
+    cursor.close()
+    return pd.DataFrame(filas, columns=["id", "vehiculo_id", "fecha", "km", "litros", "parcial", "rendimiento"])
+
+
+def _escribir_por_lotes(conn, filas, tamano_lote):
+    for i in range(0, len(filas), tamano_lote):
+        conn.executemany("UPDATE combustible SET rendimiento = ? WHERE id = ?", filas[i:i + tamano_lote])
+        conn.commit()
+
+
+def _escribir_masivo(conn, filas):
+    """Reescritura grande en una sola transacción.
+
+    El trigger de resúmenes haría cuatro upserts por fila; en su lugar se
+    suspende, se actualiza combustible y se aplica a resumen_vehiculo y
+    resumen_vehiculo_mes el delta agregado por vehículo y mes. El DDL es
+    transaccional: si algo falla el trigger vuelve con el ROLLBACK.
+    """
+    conn.commit()
+    trigger = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (TRIGGER_RESUMEN,)
+    ).fetchone()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _rendimiento_nuevo (id INTEGER PRIMARY KEY, rendimiento REAL)")
+        conn.execute("DELETE FROM temp._rendimiento_nuevo")
+        conn.executemany("INSERT INTO temp._rendimiento_nuevo (rendimiento, id) VALUES (?, ?)", filas)
+        if trigger:
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS _delta_rendimiento (
+                    vehiculo_id INTEGER, mes TEXT, suma REAL, cargas INTEGER,
+                    PRIMARY KEY (vehiculo_id, mes)
+                )
+            """)
+            conn.execute("DELETE FROM temp._delta_rendimiento")
+            conn.execute("""
+                INSERT INTO temp._delta_rendimiento
+                SELECT c.vehiculo_id, strftime('%Y-%m', c.fecha) AS mes,
+                       SUM(COALESCE(n.rendimiento, 0) - COALESCE(c.rendimiento, 0)) AS suma,
+                       SUM((n.rendimiento IS NOT NULL) - (c.rendimiento IS NOT NULL)) AS cargas
+                FROM temp._rendimiento_nuevo n
+                JOIN combustible c ON c.id = n.id
+                GROUP BY c.vehiculo_id, mes
+            """)
+            conn.execute(f"DROP TRIGGER {TRIGGER_RESUMEN}")
+        conn.execute("""
+            UPDATE combustible
+            SET rendimiento = (SELECT n.rendimiento FROM temp._rendimiento_nuevo n WHERE n.id = combustible.id)
+            WHERE id IN (SELECT id FROM temp._rendimiento_nuevo)
+        """)
+        if trigger:
+            conn.execute("""
+                UPDATE resumen_vehiculo_mes SET
+                    rend_suma = rend_suma + (SELECT d.suma FROM temp._delta_rendimiento d
+                        WHERE d.vehiculo_id = resumen_vehiculo_mes.vehiculo_id AND d.mes = resumen_vehiculo_mes.mes),
+                    rend_cargas = rend_cargas + (SELECT d.cargas FROM temp._delta_rendimiento d
+                        WHERE d.vehiculo_id = resumen_vehiculo_mes.vehiculo_id AND d.mes = resumen_vehiculo_mes.mes)
+                WHERE (vehiculo_id, mes) IN (SELECT vehiculo_id, mes FROM temp._delta_rendimiento)
+            """)
+            conn.execute("""
+                UPDATE resumen_vehiculo SET
+                    rend_suma = rend_suma + (SELECT SUM(d.suma) FROM temp._delta_rendimiento d
+                        WHERE d.vehiculo_id = resumen_vehiculo.vehiculo_id),
+                    rend_cargas = rend_cargas + (SELECT SUM(d.cargas) FROM temp._delta_rendimiento d
+                        WHERE d.vehiculo_id = resumen_vehiculo.vehiculo_id)
+                WHERE vehiculo_id IN (SELECT vehiculo_id FROM temp._delta_rendimiento)
+            """)
+            conn.execute(trigger[0])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def recalcular_rendimiento(vehiculo_ids=None, desde=None, dry_run=False, conn=None,
+                           tamano_lote=TAMANO_LOTE):
+    """Recalcula el rendimiento de la flota o de algunos vehículos y guarda solo lo que cambió.
+
+    vehiculo_ids: iterable de ids (None = toda la flota).
+    desde: fecha 'YYYY-MM-DD'; solo se reescriben cargas desde esa fecha (para
+           llamar después de insertar o editar una carga).
+    """
+    inicio = time.perf_counter()
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        if vehiculo_ids is not None:
+            vehiculo_ids = [int(v) for v in vehiculo_ids]
+        df = _cargar(conn, vehiculo_ids, desde)
+        if df.empty:
+            return ResultadoRecalculo(0, 0, 0, round(time.perf_counter() - inicio, 3))
+
+        # Fechas ISO: el orden de texto es el cronológico (los primeros 10 caracteres)
+        fecha = df["fecha"].astype(str).str[:10].to_numpy(dtype="U10")
+        vehiculo = df["vehiculo_id"].to_numpy()
+        km = df["km"].to_numpy(dtype=float)
+        orden = np.lexsort((df["id"].to_numpy(), km, fecha, vehiculo))
+        nuevo = np.empty(len(df))
+        nuevo[orden] = calcular_rendimiento(
+            vehiculo[orden], km[orden], df["litros"].to_numpy(dtype=float)[orden],
+            df["parcial"].fillna(0).to_numpy()[orden]
+        )
+
+        actual = df["rendimiento"].to_numpy(dtype=float)
+        cambio = np.where(
+            np.isnan(nuevo) | np.isnan(actual),
+            np.isnan(nuevo) != np.isnan(actual),
+            np.abs(nuevo - actual) > TOLERANCIA,
+        )
+        if desde is not None:
+            cambio &= fecha >= str(desde)[:10]
+
+        ids = df["id"].to_numpy()[cambio]
+        valores = nuevo[cambio]
+        if not dry_run:
+            filas = [(None if np.isnan(v) else float(v), int(i)) for v, i in zip(valores, ids)]
+            if len(filas) >= UMBRAL_MASIVO:
+                _escribir_masivo(conn, filas)
+            else:
+                _escribir_por_lotes(conn, filas, tamano_lote)
+        return ResultadoRecalculo(
+            vehiculos=len(np.unique(vehiculo)),
+            cargas=len(df),
+            cambiadas=len(ids),
+            duracion_seg=round(time.perf_counter() - inicio, 3),
+        )
+    finally:
+        if propia:
+            conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recálculo del rendimiento de combustible")
+    parser.add_argument("--patente", nargs="+", help="Solo estos vehículos (por defecto toda la flota)")
+    parser.add_argument("--desde", help="Reescribir solo cargas desde esta fecha (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="Contar cambios sin escribir")
+    args = parser.parse_args()
+
+    ids = None
+    if args.patente:
+        conn = get_db_connection()
+        try:
+            marcas = ",".join("?" * len(args.patente))
+            ids = [fila[0] for fila in conn.execute(
+                f"SELECT id FROM vehiculos WHERE patente IN ({marcas})", [p.upper() for p in args.patente]
+            )]
+        finally:
+            conn.close()
+    r = recalcular_rendimiento(ids, args.desde, args.dry_run)
+    print(f"{'🔎' if args.dry_run else '✅'} {r.vehiculos:,} vehículos, {r.cargas:,} cargas, "
+          f"{r.cambiadas:,} {'a corregir' if args.dry_run else 'corregidas'} en {r.duracion_seg}s")
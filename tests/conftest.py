@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# tests/conftest.py - BASE TEMPORAL PARA LAS PRUEBAS
+#
+# Cada prueba que pide 'db' corre contra una flota.db nueva en tmp_path con el
+# esquema completo (init_db aplica todas las migraciones). Los módulos leen la
+# ruta de utils.helpers.DB_PATH en cada conexión, así que alcanza con apuntarla
+# a la base temporal.
+#
+# Uso: python -m pytest -q
+
+import pytest
+
+import models
+from utils import helpers
+from utils.cache import limpiar_cache
+from utils.db import obtener_pool
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Ruta de una base temporal migrada a la última versión"""
+    ruta = tmp_path / "flota.db"
+    monkeypatch.setattr(helpers, "DB_PATH", ruta)
+    monkeypatch.setattr(models, "DB_PATH", ruta)
+    monkeypatch.setattr(models, "_schema_lista", False)
+    models.init_db()
+    # Las claves del cache no incluyen la ruta de la base
+    limpiar_cache()
+    yield ruta
+    limpiar_cache()
+    obtener_pool(ruta).cerrar_todas()
+
+
+@pytest.fixture
+def conn(db):
+    """Conexión del pool a la base temporal"""
+    conexion = helpers.get_db_connection()
+    yield conexion
+    conexion.close()
+
+
+def agregar_vehiculo(conn, patente, tipo="camion", km_actual=0, capacidad_tanque=None):
+    cursor = conn.execute(
+        "INSERT INTO vehiculos (patente, tipo, km_actual, capacidad_tanque) VALUES (?, ?, ?, ?)",
+        (patente, tipo, km_actual, capacidad_tanque),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def agregar_cargas(conn, vehiculo_id, cargas, tipo_combustible="diesel"):
+    """cargas: [(fecha, km, litros)] o [(fecha, km, litros, parcial)]; devuelve los ids"""
+    ids = []
+    for carga in cargas:
+        fecha, km, litros, parcial = (*carga, 0) if len(carga) == 3 else carga
+        cursor = conn.execute("""
+            INSERT INTO combustible (vehiculo_id, fecha, km, litros, costo_total, precio_litro,
+                                     tipo_combustible, parcial)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (vehiculo_id, fecha, km, litros, litros * 1000.0, 1000.0, tipo_combustible, parcial))
+        ids.append(cursor.lastrowid)
+    conn.commit()
+    return ids
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# tests/smtp_local.py - SERVIDOR SMTP LOCAL PARA LAS PRUEBAS DE ENTREGA
+#
+# Habla lo justo del protocolo (EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) sobre
+# un socket real en 127.0.0.1, sin TLS ni autenticación. Cada destinatario
+# puede tener un guion de respuestas para RCPT (códigos o "cortar" para cerrar
+# la conexión); agotado el guion se acepta con 250.
+
+import socketserver
+import threading
+
+
+class _Manejador(socketserver.StreamRequestHandler):
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode())
+
+    def handle(self):
+        servidor = self.server.smtp
+        with servidor.lock:
+            servidor.conexiones += 1
+        self._responder("220 localhost SMTP de prueba")
+        destinatarios = []
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode().strip()
+            verbo = comando[:4].upper()
+            if verbo in ("EHLO", "HELO"):
+                self._responder("250 localhost")
+            elif verbo in ("MAIL", "RSET"):
+                destinatarios = []
+                self._responder("250 OK")
+            elif verbo == "RCPT":
+                direccion = comando.split(":", 1)[1].strip().strip("<>")
+                with servidor.lock:
+                    guion = servidor.respuestas.get(direccion) or []
+                    respuesta = guion.pop(0) if guion else 250
+                if respuesta == "cortar":
+                    return
+                if respuesta == 250:
+                    destinatarios.append(direccion)
+                self._responder(f"{respuesta} {'OK' if respuesta == 250 else 'Rechazado'}")
+            elif verbo == "DATA":
+                self._responder("354 Fin con <CRLF>.<CRLF>")
+                for dato in self.rfile:
+                    if dato.rstrip(b"\r\n") == b".":
+                        break
+                with servidor.lock:
+                    servidor.recibidos.extend(destinatarios)
+                self._responder("250 OK")
+            elif verbo == "NOOP":
+                self._responder("250 OK")
+            elif verbo == "QUIT":
+                self._responder("221 Chau")
+                return
+            else:
+                self._responder("502 No implementado")
+
+
+class ServidorSMTPLocal:
+    """Uso: with ServidorSMTPLocal() as smtp: ... smtp.puerto, smtp.recibidos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conexiones = 0
+        self.recibidos = []
+        self.respuestas = {}
+        self._servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Manejador)
+        self._servidor.daemon_threads = True
+        self._servidor.smtp = self
+        self.puerto = self._servidor.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *_):
+        self._servidor.shutdown()
+        self._servidor.server_close()
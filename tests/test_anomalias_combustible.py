@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from services.anomalias_combustible import (
+    cargas_pendientes, detectar_anomalias, listar_anomalias, marcar_anomalias, mediana_mad_previas,
+)
+from tests.conftest import agregar_cargas, agregar_vehiculo
+
+
+def test_mediana_mad_de_las_cargas_previas_del_mismo_vehiculo():
+    vehiculo = np.array([1] * 7 + [2] * 6)
+    valores = np.array([10, 11, 9, 10, 12, 10, 30, 5, 5, 5, 5, 5, 5], dtype=float)
+    mediana, mad = mediana_mad_previas(vehiculo, valores, ventana=5, min_previas=5)
+    assert np.isnan(mediana[:5]).all()
+    # Previas de la fila 5: 10, 11, 9, 10, 12
+    assert (mediana[5], mad[5]) == (10, 1)
+    # Previas de la fila 6: 11, 9, 10, 12, 10
+    assert (mediana[6], mad[6]) == (10, 1)
+    # El vehículo 2 no hereda la ventana del 1
+    assert np.isnan(mediana[7:12]).all()
+    assert (mediana[12], mad[12]) == (5, 0)
+
+
+def _con_rendimiento(conn, vehiculo, rendimientos, desde_dia=1):
+    cargas = [(f"2024-01-{desde_dia + 2 * i:02d}", 1000 * (desde_dia + 2 * i), 40) for i in range(len(rendimientos))]
+    ids = agregar_cargas(conn, vehiculo, cargas)
+    conn.executemany("UPDATE combustible SET rendimiento = ? WHERE id = ?", zip(rendimientos, ids))
+    conn.commit()
+    return ids
+
+
+@pytest.fixture
+def flota(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA", capacidad_tanque=100)
+    ids = _con_rendimiento(conn, vehiculo, [10, 10.2, 9.8, 10.1, 9.9, 10, 4])
+    conn.execute("UPDATE combustible SET litros = 150 WHERE id = ?", (ids[2],))
+    conn.commit()
+    return vehiculo, ids
+
+
+def _detectadas(conn, estado="abierta"):
+    df = listar_anomalias(estado=estado, conn=conn)
+    return sorted(zip(df["combustible_id"], df["tipo"]))
+
+
+def test_corrida_completa(conn, flota):
+    _, ids = flota
+    r = detectar_anomalias(completo=True, conn=conn)
+    assert r.completo and r.cargas == 7
+    assert r.por_tipo == {"rendimiento_bajo": 1, "excede_tanque": 1}
+    assert _detectadas(conn) == [(ids[2], "excede_tanque"), (ids[6], "rendimiento_bajo")]
+    assert cargas_pendientes(conn) == 0
+
+
+def test_corrida_incremental_solo_mira_lo_nuevo(conn, flota):
+    vehiculo, _ = flota
+    detectar_anomalias(conn=conn)
+    (nueva,) = _con_rendimiento(conn, vehiculo, [25], desde_dia=20)
+    assert cargas_pendientes(conn) == 1
+
+    r = detectar_anomalias(conn=conn)
+    assert not r.completo
+    assert r.por_tipo == {"rendimiento_alto": 1}
+    assert (nueva, "rendimiento_alto") in _detectadas(conn)
+    assert len(_detectadas(conn)) == 3
+    assert detectar_anomalias(conn=conn).cargas == 0
+
+
+def test_revisadas_conservan_su_estado(conn, flota):
+    _, ids = flota
+    detectar_anomalias(conn=conn)
+    assert marcar_anomalias([(ids[6], "rendimiento_bajo")], "revisada", conn=conn) == 1
+    detectar_anomalias(completo=True, conn=conn)
+    assert _detectadas(conn) == [(ids[2], "excede_tanque")]
+    assert _detectadas(conn, "revisada") == [(ids[6], "rendimiento_bajo")]
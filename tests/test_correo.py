@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import smtplib
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+from services.correo import Despachador, _es_transitorio
+from tests.smtp_local import ServidorSMTPLocal
+
+
+@pytest.mark.parametrize("error, transitorio", [
+    (smtplib.SMTPRecipientsRefused({"a@x.com": (451, b"")}), True),
+    (smtplib.SMTPRecipientsRefused({"a@x.com": (451, b""), "b@x.com": (550, b"")}), False),
+    (smtplib.SMTPRecipientsRefused({"a@x.com": (550, b"")}), False),
+    (smtplib.SMTPDataError(421, b"ocupado"), True),
+    (smtplib.SMTPDataError(554, b"rechazado"), False),
+    (smtplib.SMTPAuthenticationError(535, b"credenciales"), False),
+    (smtplib.SMTPServerDisconnected("cortado"), True),
+    (smtplib.SMTPNotSupportedError("sin STARTTLS"), False),
+    (ConnectionRefusedError(), True),
+    (socket.timeout(), True),
+    (ValueError("otro"), False),
+])
+def test_clasificacion_de_errores(error, transitorio):
+    assert _es_transitorio(error) is transitorio
+
+
+def _mensajes(*destinatarios):
+    pares = []
+    for destinatario in destinatarios:
+        msg = EmailMessage()
+        msg["From"] = "flota@ejemplo.com"
+        msg["To"] = destinatario
+        msg["Subject"] = "Alertas"
+        msg.set_content("Prueba")
+        pares.append((destinatario, msg))
+    return pares
+
+
+@pytest.fixture
+def smtp():
+    with ServidorSMTPLocal() as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def despachador(smtp):
+    d = Despachador("127.0.0.1", smtp.puerto, usar_tls=False, max_workers=1, tamano_lote=10, espera_base=0)
+    yield d
+    d.cerrar()
+
+
+def _registro(conn):
+    return [tuple(fila) for fila in conn.execute(
+        "SELECT destinatario, estado, intentos FROM envios_email ORDER BY id")]
+
+
+def test_lote_por_una_sola_sesion(conn, smtp, despachador):
+    destinatarios = [f"d{i}@ejemplo.com" for i in range(5)]
+    resultados = despachador.enviar(_mensajes(*destinatarios), "Alertas")
+    assert [(r.destinatario, r.exito, r.intentos) for r in resultados] == [(d, True, 1) for d in destinatarios]
+    assert smtp.recibidos == destinatarios
+    assert smtp.conexiones == 1
+    assert _registro(conn) == [(d, "enviado", 1) for d in destinatarios]
+
+
+def test_reintenta_error_transitorio(conn, smtp, despachador):
+    smtp.respuestas["a@ejemplo.com"] = [451]
+    (r,) = despachador.enviar(_mensajes("a@ejemplo.com"))
+    assert (r.exito, r.intentos) == (True, 2)
+    assert smtp.recibidos == ["a@ejemplo.com"]
+    assert _registro(conn) == [("a@ejemplo.com", "enviado", 2)]
+
+
+def test_reintenta_desconexion(conn, smtp, despachador):
+    smtp.respuestas["a@ejemplo.com"] = ["cortar"]
+    (r,) = despachador.enviar(_mensajes("a@ejemplo.com"))
+    assert (r.exito, r.intentos) == (True, 2)
+    assert smtp.conexiones == 2
+
+
+def test_no_reintenta_error_permanente(conn, smtp, despachador):
+    smtp.respuestas["malo@ejemplo.com"] = [550]
+    resultados = despachador.enviar(_mensajes("malo@ejemplo.com", "b@ejemplo.com"))
+    assert [(r.exito, r.intentos) for r in resultados] == [(False, 1), (True, 1)]
+    assert "550" in resultados[0].error
+    assert smtp.recibidos == ["b@ejemplo.com"]
+    assert _registro(conn) == [("malo@ejemplo.com", "fallido", 1), ("b@ejemplo.com", "enviado", 1)]
+
+
+def test_agota_los_intentos(conn, smtp, despachador):
+    smtp.respuestas["a@ejemplo.com"] = [451, 451, 451]
+    (r,) = despachador.enviar(_mensajes("a@ejemplo.com"))
+    assert (r.exito, r.intentos) == (False, 3)
+    assert smtp.recibidos == []
+
+
+def test_servidor_caido(conn):
+    with socket.socket() as libre:
+        libre.bind(("127.0.0.1", 0))
+        puerto = libre.getsockname()[1]
+    d = Despachador("127.0.0.1", puerto, usar_tls=False, max_workers=1, intentos=2, espera_base=0)
+    try:
+        (r,) = d.enviar(_mensajes("a@ejemplo.com"))
+    finally:
+        d.cerrar()
+    assert (r.exito, r.intentos) == (False, 2)
+    assert _registro(conn) == [("a@ejemplo.com", "fallido", 2)]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+import pytest
+
+from services.estado_alertas import (
+    ESCALADA, NUEVA, SIN_CAMBIOS, clasificar_novedades, registrar_notificadas, resumen_sin_cambios,
+)
+from services.motor_alertas import calcular_alertas
+from tests.conftest import agregar_vehiculo
+
+HOY = date(2024, 6, 1)
+
+
+@pytest.fixture
+def flota(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    conn.executemany("INSERT INTO vencimientos (vehiculo_id, tipo, fecha_vencimiento) VALUES (?, ?, ?)",
+                     [(vehiculo, "VTV", "2024-06-20"), (vehiculo, "Seguro", "2024-06-05")])
+    detenido = agregar_vehiculo(conn, "BB000BB")
+    conn.execute("UPDATE vehiculos SET estado = 'detenido' WHERE id = ?", (detenido,))
+    conn.commit()
+    return vehiculo
+
+
+def _novedades(conn, hoy):
+    tabla = clasificar_novedades(calcular_alertas(conn, hoy), conn)
+    return tabla, {(p, t): n for p, t, n in zip(tabla["patente"], tabla["tipo"].fillna(""), tabla["novedad"])}
+
+
+def test_primer_envio_todo_nuevo_y_despues_sin_cambios(conn, flota):
+    tabla, novedades = _novedades(conn, HOY)
+    assert novedades == {("AA000AA", "Seguro"): NUEVA, ("AA000AA", "VTV"): NUEVA, ("BB000BB", ""): NUEVA}
+    assert registrar_notificadas(tabla, conn) == 3
+
+    tabla, novedades = _novedades(conn, HOY)
+    assert set(novedades.values()) == {SIN_CAMBIOS}
+    assert registrar_notificadas(tabla, conn) == 0
+    assert resumen_sin_cambios(tabla).to_dict() == {
+        ("vehiculos_vencidos", "URGENTE"): 1,
+        ("vehiculos_vencidos", "ADVERTENCIA"): 1,
+        ("vehiculos_detenidos", "INFO"): 1,
+    }
+
+
+def test_escalada_de_prioridad(conn, flota):
+    registrar_notificadas(_novedades(conn, HOY)[0], conn)
+    tabla, novedades = _novedades(conn, date(2024, 6, 15))
+    # VTV pasa de ADVERTENCIA a URGENTE y el seguro de URGENTE a CRÍTICO
+    assert novedades == {("AA000AA", "Seguro"): ESCALADA, ("AA000AA", "VTV"): ESCALADA, ("BB000BB", ""): SIN_CAMBIOS}
+    assert registrar_notificadas(tabla, conn) == 2
+    prioridades = dict(conn.execute("SELECT clave, prioridad FROM estado_alertas").fetchall())
+    assert sorted(p for p in prioridades.values() if p) == ["CRÍTICO", "URGENTE"]
+
+
+def test_bajar_de_prioridad_no_se_renotifica(conn, flota):
+    registrar_notificadas(_novedades(conn, HOY)[0], conn)
+    conn.execute("UPDATE estado_alertas SET prioridad = 'CRÍTICO' WHERE prioridad IS NOT NULL")
+    conn.commit()
+    assert set(_novedades(conn, HOY)[1].values()) == {SIN_CAMBIOS}
+
+
+def test_alerta_resuelta_se_olvida_y_vuelve_como_nueva(conn, flota):
+    registrar_notificadas(_novedades(conn, HOY)[0], conn)
+    conn.execute("UPDATE vencimientos SET fecha_vencimiento = '2025-06-05' WHERE tipo = 'Seguro'")
+    conn.commit()
+    registrar_notificadas(_novedades(conn, HOY)[0], conn)
+    assert conn.execute("SELECT COUNT(*) FROM estado_alertas").fetchone()[0] == 2
+
+    conn.execute("UPDATE vencimientos SET fecha_vencimiento = '2024-06-05' WHERE tipo = 'Seguro'")
+    conn.commit()
+    assert _novedades(conn, HOY)[1][("AA000AA", "Seguro")] == NUEVA
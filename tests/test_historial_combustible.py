@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from services.historial_combustible import FiltroHistorial, obtener_pagina, obtener_totales
+from tests.conftest import agregar_cargas, agregar_vehiculo
+
+
+@pytest.fixture
+def historial(conn):
+    """Dos vehículos con fechas y km repetidos para forzar empates en la clave"""
+    uno = agregar_vehiculo(conn, "AA000AA")
+    dos = agregar_vehiculo(conn, "BB000BB")
+    for dia in range(1, 8):
+        agregar_cargas(conn, uno, [(f"2024-01-{dia:02d}", 1000 * dia, 40), (f"2024-01-{dia:02d}", 1000 * dia, 10)])
+        agregar_cargas(conn, dos, [(f"2024-01-{dia:02d}", 1000 * dia, 30)], tipo_combustible="nafta")
+    return uno, dos
+
+
+def _todas(conn, filtro, tamano):
+    ids, cursor, paginas = [], None, 0
+    while True:
+        df, cursor = obtener_pagina(filtro, cursor, tamano, conn=conn)
+        assert len(df) <= tamano
+        ids += df["id"].tolist()
+        paginas += 1
+        if cursor is None:
+            return ids, paginas
+
+
+def _esperado(conn, where="", params=()):
+    return [fila[0] for fila in conn.execute(
+        f"SELECT id FROM combustible c {where} ORDER BY c.fecha DESC, c.km DESC, c.id DESC", params)]
+
+
+@pytest.mark.parametrize("tamano", [1, 4, 7, 21, 50])
+def test_paginas_recorren_todo_sin_repetir(conn, historial, tamano):
+    ids, paginas = _todas(conn, FiltroHistorial(), tamano)
+    assert ids == _esperado(conn)
+    assert paginas == max(1, -(-21 // tamano))
+
+
+def test_filtros(conn, historial):
+    uno, _ = historial
+    filtro = FiltroHistorial(vehiculo_id=uno, desde="2024-01-03", hasta="2024-01-05")
+    ids, _ = _todas(conn, filtro, 4)
+    assert ids == _esperado(conn, "WHERE vehiculo_id = ? AND fecha BETWEEN '2024-01-03' AND '2024-01-05'", (uno,))
+    assert len(ids) == 6
+
+    ids, _ = _todas(conn, FiltroHistorial(tipo_combustible="nafta"), 3)
+    assert ids == _esperado(conn, "WHERE tipo_combustible = 'nafta'")
+
+
+def test_hasta_incluye_fechas_con_hora(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-05 18:30:00", 1000, 40), ("2024-01-06", 1200, 40)])
+    df, _ = obtener_pagina(FiltroHistorial(hasta="2024-01-05"), conn=conn)
+    assert df["km"].tolist() == [1000]
+
+
+def test_totales_de_todo_el_rango(conn, historial):
+    uno, _ = historial
+    totales = obtener_totales(FiltroHistorial(vehiculo_id=uno), conn=conn)
+    assert (totales.cargas, totales.litros, totales.costo) == (14, 350, 350000)
+    assert totales.rendimiento_prom is None
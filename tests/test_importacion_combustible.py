@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from models.resumenes import verificar_resumenes
+from services.importacion_combustible import importar_cargas
+from tests.conftest import agregar_cargas, agregar_vehiculo
+
+
+def _csv(tmp_path, filas, sep=","):
+    ruta = tmp_path / "resumen.csv"
+    lineas = [sep.join(("patente", "fecha", "km", "litros", "costo_total"))]
+    lineas += [sep.join(str(v) for v in fila) for fila in filas]
+    ruta.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+    return ruta
+
+
+def _cargas(conn):
+    return [tuple(fila) for fila in conn.execute(
+        "SELECT fecha, km, litros, rendimiento FROM combustible ORDER BY fecha, km, id")]
+
+
+def test_importa_con_rendimiento_y_km_actual(conn, tmp_path):
+    vehiculo = agregar_vehiculo(conn, "AA000AA", km_actual=1000)
+    agregar_cargas(conn, vehiculo, [("2024-01-01", 1000, 50)])
+    archivo = _csv(tmp_path, [
+        ("aa 000 aa", "2024-01-10", 1500, 50, 50000),
+        ("AA-000-AA", "20/01/2024", 2100, "60,0", "60000"),
+    ], sep=";")
+
+    r = importar_cargas(archivo, conn=conn)
+    assert (r.leidas, r.validas, r.insertadas) == (2, 2, 2)
+    assert r.errores.empty
+    assert _cargas(conn) == [("2024-01-01", 1000, 50, None), ("2024-01-10", 1500, 50, 10.0),
+                             ("2024-01-20", 2100, 60, 10.0)]
+    assert conn.execute("SELECT km_actual FROM vehiculos").fetchone()[0] == 2100
+    assert verificar_resumenes(conn) == []
+
+
+@pytest.mark.parametrize("tamano_lote", [1, 2, 100])
+def test_repetidas_ya_registradas_y_desconocidas(conn, tmp_path, tamano_lote):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-01", 1000, 50)])
+    archivo = _csv(tmp_path, [
+        ("AA000AA", "2024-01-01", 1000, 50, 50000),
+        ("AA000AA", "2024-01-10", 1500, 50, 50000),
+        ("ZZ999ZZ", "2024-01-10", 1500, 50, 50000),
+        ("AA000AA", "10/01/2024", 1500, 50, 51000),
+    ])
+
+    r = importar_cargas(archivo, tamano_lote=tamano_lote, conn=conn)
+    assert list(zip(r.errores["fila"], r.errores["motivo"])) == [
+        (2, "Ya registrada"), (4, "Patente desconocida"), (5, "Repetida en el archivo"),
+    ]
+    assert (r.validas, r.insertadas) == (1, 1)
+    assert conn.execute("SELECT COUNT(*) FROM combustible").fetchone()[0] == 2
+
+
+def test_dry_run_no_inserta_y_coincide_con_el_real(conn, tmp_path):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-01", 1000, 50), ("2024-01-15", 1600, 20, 1), ("2024-02-01", 2400, 40)])
+    # Desordenado y repartido en lotes de 2: cada carga depende de otras de lotes posteriores
+    archivo = _csv(tmp_path, [
+        ("AA000AA", "2024-01-25", 2000, 30, 30000),
+        ("AA000AA", "2024-01-05", 1200, 25, 25000),
+        ("AA000AA", "2024-02-10", 2900, 50, 50000),
+        ("AA000AA", "2024-01-10", 1400, 20, 20000),
+    ])
+
+    simulado = importar_cargas(archivo, dry_run=True, tamano_lote=2, conn=conn)
+    assert (simulado.validas, simulado.insertadas) == (4, 0)
+    assert conn.execute("SELECT COUNT(*) FROM combustible").fetchone()[0] == 3
+
+    real = importar_cargas(archivo, tamano_lote=2, conn=conn)
+    assert real.insertadas == 4
+    guardado = {(fecha, km): rend for fecha, km, _, rend in _cargas(conn)}
+    for carga in simulado.cargas.itertuples():
+        esperado = guardado[(carga.fecha, carga.km)]
+        assert pd.isna(carga.rendimiento) if esperado is None else carga.rendimiento == esperado
+    assert simulado.cargas["rendimiento"].equals(real.cargas["rendimiento"])
+    assert verificar_resumenes(conn) == []
+
+
+def test_odometro_menor_advierte_y_no_tiene_rendimiento(conn, tmp_path):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-01", 90000, 50)])
+    r = importar_cargas(_csv(tmp_path, [("AA000AA", "2024-01-10", 500, 40, 40000)]), conn=conn)
+    assert r.insertadas == 1
+    assert r.advertencias["fila"].tolist() == [2]
+    assert _cargas(conn)[-1] == ("2024-01-10", 500, 40, None)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import models
+from models import migraciones
+from models.migraciones import SCHEMA_VERSION, version_actual
+
+
+def test_init_db_migra_una_sola_vez_por_proceso(db, monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(migraciones, "migrar", lambda *a, **k: llamadas.append(a) or [])
+    models.init_db()
+    assert llamadas == []
+
+
+def test_init_db_sin_ddl_si_la_version_esta_al_dia(db, monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(migraciones, "migrar", lambda *a, **k: llamadas.append(a) or [])
+    monkeypatch.setattr(models, "_schema_lista", False)
+    models.init_db()
+    assert llamadas == []
+    assert models._schema_lista
+
+
+def test_init_db_aplica_lo_pendiente(db, monkeypatch):
+    conn = sqlite3.connect(db)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+    conn.close()
+    monkeypatch.setattr(models, "_schema_lista", False)
+    models.init_db()
+    conn = sqlite3.connect(db)
+    try:
+        assert version_actual(conn) == SCHEMA_VERSION
+    finally:
+        conn.close()
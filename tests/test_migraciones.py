@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from models import crear_esquema
+from models.migraciones import MIGRACIONES, SCHEMA_VERSION, migrar, version_actual
+from models.resumenes import verificar_resumenes
+
+
+def _version(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        return version_actual(conn)
+    finally:
+        conn.close()
+
+
+def test_base_nueva_llega_a_la_ultima_version(tmp_path):
+    ruta = tmp_path / "flota.db"
+    pasos = migrar(ruta)
+    assert [p["version"] for p in pasos] == [m.version for m in MIGRACIONES]
+    assert {p["estado"] for p in pasos} == {"aplicada"}
+    assert _version(ruta) == SCHEMA_VERSION
+
+
+def test_migrar_de_nuevo_no_hace_nada(tmp_path):
+    ruta = tmp_path / "flota.db"
+    migrar(ruta)
+    assert migrar(ruta) == []
+
+
+def test_reaplicar_desde_cero_es_idempotente(tmp_path):
+    ruta = tmp_path / "flota.db"
+    migrar(ruta)
+    assert len(migrar(ruta, desde=0)) == len(MIGRACIONES)
+    assert _version(ruta) == SCHEMA_VERSION
+
+
+def test_dry_run_no_modifica(tmp_path):
+    ruta = tmp_path / "flota.db"
+    migrar(ruta, hasta=2)
+    pasos = migrar(ruta, dry_run=True)
+    assert [p["version"] for p in pasos] == list(range(3, SCHEMA_VERSION + 1))
+    assert {p["estado"] for p in pasos} == {"pendiente"}
+    assert _version(ruta) == 2
+
+
+def test_base_existente_conserva_datos_y_arma_resumenes(tmp_path):
+    ruta = tmp_path / "flota.db"
+    conn = sqlite3.connect(ruta)
+    crear_esquema(conn)
+    conn.execute("INSERT INTO vehiculos (id, patente, tipo) VALUES (1, 'AA000AA', 'camion')")
+    conn.executemany("""
+        INSERT INTO combustible (vehiculo_id, fecha, km, litros, costo_total, observaciones)
+        VALUES (1, ?, ?, ?, ?, ?)
+    """, [("2024-01-01", 1000, 50, 50000, None), ("2024-01-10", 1300, 20, 20000, "Carga parcial")])
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    pasos = migrar(ruta)
+    assert pasos[0]["version"] == 2
+
+    conn = sqlite3.connect(ruta)
+    try:
+        assert version_actual(conn) == SCHEMA_VERSION
+        parciales = [fila[0] for fila in conn.execute("SELECT parcial FROM combustible ORDER BY fecha")]
+        assert parciales == [0, 1]
+        assert conn.execute("SELECT comb_cargas, comb_litros FROM resumen_vehiculo").fetchone() == (2, 70)
+        assert verificar_resumenes(conn) == []
+    finally:
+        conn.close()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from models.resumenes import verificar_resumenes
+from services import rendimiento
+from services.rendimiento import calcular_rendimiento, recalcular_rendimiento
+from tests.conftest import agregar_cargas, agregar_vehiculo
+
+
+def _calcular(km, litros, parcial=None, vehiculo=None):
+    n = len(km)
+    vehiculo = np.ones(n, dtype=int) if vehiculo is None else np.asarray(vehiculo)
+    parcial = np.zeros(n, dtype=int) if parcial is None else np.asarray(parcial)
+    return calcular_rendimiento(vehiculo, km, litros, parcial)
+
+
+def test_cargas_completas():
+    rend = _calcular([1000, 1500, 2100], [50, 50, 60])
+    assert np.isnan(rend[0])
+    assert rend[1:].tolist() == [10.0, 10.0]
+
+
+def test_carga_parcial_acumula_litros_en_la_siguiente_completa():
+    rend = _calcular([1000, 1200, 1600], [50, 20, 30], parcial=[0, 1, 0])
+    assert np.isnan(rend[1])
+    # 600 km con 20 + 30 litros
+    assert rend[2] == 12.0
+
+
+def test_parciales_al_inicio_no_tienen_referencia():
+    rend = _calcular([1000, 1300, 1700], [20, 30, 40], parcial=[1, 1, 0])
+    assert np.isnan(rend).all()
+
+
+def test_odometro_que_retrocede_empieza_un_tramo():
+    rend = _calcular([90000, 90500, 100, 600], [50, 50, 40, 50])
+    assert rend[1] == 10.0
+    assert np.isnan(rend[2])
+    assert rend[3] == 10.0
+
+
+def test_tramo_no_cruza_de_vehiculo():
+    rend = _calcular([1000, 1500, 200, 700], [50, 50, 50, 50], vehiculo=[1, 1, 2, 2])
+    assert rend[1] == 10.0
+    assert np.isnan(rend[2])
+    assert rend[3] == 10.0
+
+
+def test_km_repetido_queda_sin_rendimiento():
+    rend = _calcular([1000, 1000], [50, 50])
+    assert np.isnan(rend).all()
+
+
+def _rendimientos(conn):
+    return {fila[0]: fila[1] for fila in conn.execute("SELECT id, rendimiento FROM combustible")}
+
+
+def test_recalcular_escribe_solo_lo_que_cambio(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    ids = agregar_cargas(conn, vehiculo, [
+        ("2024-01-01", 1000, 50),
+        ("2024-01-10", 1200, 20, 1),
+        ("2024-01-20", 1600, 30),
+        ("2024-02-01", 2100, 50),
+    ])
+    r = recalcular_rendimiento(conn=conn)
+    assert (r.vehiculos, r.cargas, r.cambiadas) == (1, 4, 2)
+    assert _rendimientos(conn) == {ids[0]: None, ids[1]: None, ids[2]: 12.0, ids[3]: 10.0}
+    assert recalcular_rendimiento(conn=conn).cambiadas == 0
+    assert verificar_resumenes(conn) == []
+
+
+def test_recalcular_dry_run_no_escribe(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-01", 1000, 50), ("2024-01-10", 1500, 50)])
+    assert recalcular_rendimiento(dry_run=True, conn=conn).cambiadas == 1
+    assert set(_rendimientos(conn).values()) == {None}
+
+
+def test_recalcular_desde_respeta_la_carga_anterior(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    ids = agregar_cargas(conn, vehiculo, [
+        ("2024-01-01", 1000, 50),
+        ("2024-01-10", 1500, 50),
+        ("2024-01-20", 2000, 25),
+    ])
+    r = recalcular_rendimiento(desde="2024-01-15", conn=conn)
+    # La carga del 10 sirve de referencia pero no se reescribe
+    assert (r.cargas, r.cambiadas) == (2, 1)
+    assert _rendimientos(conn) == {ids[0]: None, ids[1]: None, ids[2]: 20.0}
+
+
+def test_escritura_masiva_mantiene_resumenes(conn, monkeypatch):
+    monkeypatch.setattr(rendimiento, "UMBRAL_MASIVO", 1)
+    for n in range(3):
+        vehiculo = agregar_vehiculo(conn, f"AA00{n}AA")
+        agregar_cargas(conn, vehiculo, [(f"2024-01-{d:02d}", 1000 + 400 * d, 40) for d in range(1, 21)])
+    assert recalcular_rendimiento(conn=conn).cambiadas == 57
+    assert verificar_resumenes(conn) == []
+    triggers = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert rendimiento.TRIGGER_RESUMEN in triggers
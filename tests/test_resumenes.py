@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from models.resumenes import reconstruir_resumenes, verificar_resumenes
+from tests.conftest import agregar_cargas, agregar_vehiculo
+
+
+def _resumen_mes(conn, vehiculo_id):
+    return {fila[0]: tuple(fila[1:]) for fila in conn.execute("""
+        SELECT mes, comb_cargas, comb_litros, mant_cantidad, fallas_cantidad, fallas_criticas
+        FROM resumen_vehiculo_mes WHERE vehiculo_id = ?
+    """, (vehiculo_id,))}
+
+
+def _agregar_mantenimiento(conn, vehiculo_id, fecha, costo):
+    conn.execute("INSERT INTO mantenimientos (vehiculo_id, tipo, fecha, costo) VALUES (?, 'Aceite de Motor', ?, ?)",
+                 (vehiculo_id, fecha, costo))
+    conn.commit()
+
+
+def _agregar_falla(conn, vehiculo_id, fecha, gravedad):
+    cursor = conn.execute("""
+        INSERT INTO fallas (vehiculo_id, fecha, tipo_falla, gravedad, tiempo_inmovilizado_hrs, costo_reparacion)
+        VALUES (?, ?, 'Motor', ?, 5, 1000)
+    """, (vehiculo_id, fecha, gravedad))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_insert_suma_en_ambos_resumenes(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-05", 1000, 50), ("2024-02-05", 1500, 40)])
+    _agregar_mantenimiento(conn, vehiculo, "2024-01-20", 30000)
+    _agregar_falla(conn, vehiculo, "2024-02-10", "critica")
+
+    assert _resumen_mes(conn, vehiculo) == {
+        "2024-01": (1, 50, 1, 0, 0),
+        "2024-02": (1, 40, 0, 1, 1),
+    }
+    fila = conn.execute("SELECT comb_cargas, comb_litros, mant_costo, fallas_criticas FROM resumen_vehiculo").fetchone()
+    assert tuple(fila) == (2, 90, 30000, 1)
+    assert verificar_resumenes(conn) == []
+
+
+def test_update_mueve_la_fila_de_mes_y_de_vehiculo(conn):
+    uno = agregar_vehiculo(conn, "AA000AA")
+    dos = agregar_vehiculo(conn, "BB000BB")
+    (carga,) = agregar_cargas(conn, uno, [("2024-01-05", 1000, 50)])
+    falla = _agregar_falla(conn, uno, "2024-01-10", "leve")
+
+    conn.execute("UPDATE combustible SET vehiculo_id = ?, fecha = '2024-03-01', litros = 45, rendimiento = 9.5 WHERE id = ?",
+                 (dos, carga))
+    conn.execute("UPDATE fallas SET gravedad = 'critica' WHERE id = ?", (falla,))
+    conn.commit()
+
+    assert _resumen_mes(conn, uno)["2024-01"] == (0, 0, 0, 1, 1)
+    assert _resumen_mes(conn, dos) == {"2024-03": (1, 45, 0, 0, 0)}
+    assert verificar_resumenes(conn) == []
+
+
+def test_delete_resta(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    ids = agregar_cargas(conn, vehiculo, [("2024-01-05", 1000, 50), ("2024-01-20", 1500, 40)])
+    conn.execute("DELETE FROM combustible WHERE id = ?", (ids[0],))
+    conn.commit()
+    assert _resumen_mes(conn, vehiculo)["2024-01"] == (1, 40, 0, 0, 0)
+    assert verificar_resumenes(conn) == []
+
+
+def test_verificar_detecta_y_reconstruir_corrige(conn):
+    vehiculo = agregar_vehiculo(conn, "AA000AA")
+    agregar_cargas(conn, vehiculo, [("2024-01-05", 1000, 50)])
+    conn.execute("UPDATE resumen_vehiculo SET comb_litros = 0")
+    conn.commit()
+    assert verificar_resumenes(conn) != []
+    reconstruir_resumenes(conn)
+    conn.commit()
+    assert verificar_resumenes(conn) == []
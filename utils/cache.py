@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# utils/cache.py - CACHÉ DE CONSULTAS CON INVALIDACIÓN POR ESCRITURA
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from utils.db import al_confirmar_escritura
+from utils.helpers import get_db_connection
+
+TTL_SEG = 300
+MAX_ENTRADAS = 256
+
+# Tablas cuyo contenido cambia por triggers cuando se escribe en la de origen
+TABLAS_DERIVADAS = {
+    "combustible": ("resumen_vehiculo", "resumen_vehiculo_mes"),
+    "mantenimientos": ("resumen_vehiculo", "resumen_vehiculo_mes"),
+    "fallas": ("resumen_vehiculo", "resumen_vehiculo_mes"),
+}
+
+_TABLAS_EN_SQL = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+
+_versiones = {}
+_versiones_lock = threading.Lock()
+
+
+def version_tabla(tabla):
+    return _versiones.get(tabla, 0)
+
+
+@al_confirmar_escritura
+def invalidar(*tablas):
+    """Incrementa el contador de versión de cada tabla (y de sus derivadas)"""
+    with _versiones_lock:
+        for tabla in tablas:
+            for t in (tabla,) + TABLAS_DERIVADAS.get(tabla, ()):
+                _versiones[t] = _versiones.get(t, 0) + 1
+
+
+def tablas_de(sql):
+    """Tablas leídas por una consulta (FROM/JOIN)"""
+    return tuple(sorted({t.lower() for t in _TABLAS_EN_SQL.findall(sql)}))
+
+
+class CacheConsultas:
+    """LRU de resultados de consultas con TTL y validación por versión de tablas"""
+
+    def __init__(self, ttl=TTL_SEG, max_entradas=MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.invalidados = 0
+        self.desalojados = 0
+
+    def obtener(self, clave, tablas):
+        """Devuelve el valor guardado si sigue vigente, o None"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            valor, versiones, vence = entrada
+            if time.monotonic() > vence:
+                del self._entradas[clave]
+                self.expirados += 1
+                self.fallos += 1
+                return None
+            if any(version_tabla(t) != v for t, v in zip(tablas, versiones)):
+                del self._entradas[clave]
+                self.invalidados += 1
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, tablas, versiones, valor, ttl=None):
+        vence = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entradas[clave] = (valor, versiones, vence)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojados += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas * 100, 1) if consultas else 0.0,
+            "expirados": self.expirados,
+            "invalidados": self.invalidados,
+            "desalojados": self.desalojados,
+        }
+
+
+_cache = CacheConsultas()
+
+
+def consulta_cacheada(sql, params=(), tablas=None, ttl=None):
+    """pd.read_sql_query con caché; se invalida al confirmar escrituras en las tablas leídas.
+
+    Devuelve una copia: las vistas suelen agregar columnas al DataFrame.
+    """
+    tablas = tuple(tablas) if tablas is not None else tablas_de(sql)
+    clave = (sql, tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params))
+    df = _cache.obtener(clave, tablas)
+    if df is None:
+        # Versiones tomadas antes de leer: una escritura concurrente invalida la entrada
+        versiones = tuple(version_tabla(t) for t in tablas)
+        conn = get_db_connection()
+        try:
+            df = pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+        _cache.guardar(clave, tablas, versiones, df, ttl)
+    return df.copy()
+
+
+def estadisticas_cache():
+    return _cache.estadisticas()
+
+
+def limpiar_cache():
+    _cache.limpiar()
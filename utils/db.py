@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# utils/db.py - POOL DE CONEXIONES SQLITE
+
+import re
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+# PRAGMAs aplicados a cada conexión nueva del pool
+PRAGMAS = (
+    ("journal_mode", "WAL"),       # lectores no bloquean al escritor
+    ("synchronous", "NORMAL"),     # seguro con WAL, evita fsync por commit
+    ("cache_size", -16000),        # ~16 MB de caché de páginas por conexión
+    ("mmap_size", 268435456),      # 256 MB de lectura mapeada en memoria
+    ("temp_store", "MEMORY"),      # ORDER BY / GROUP BY temporales en RAM
+)
+
+BUSY_TIMEOUT_SEG = 10.0
+
+# Primera tabla escrita por una sentencia INSERT/REPLACE/UPDATE/DELETE
+_ESCRITURA = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+    re.IGNORECASE
+)
+
+# Funciones llamadas con las tablas modificadas tras cada commit exitoso
+_oyentes_escritura = []
+
+
+def al_confirmar_escritura(funcion):
+    """Registra funcion(*tablas) para que se llame después de cada commit con escrituras"""
+    if funcion not in _oyentes_escritura:
+        _oyentes_escritura.append(funcion)
+    return funcion
+
+
+# Funciones llamadas con cada conexión nueva del pool (instrumentación, benchmarks)
+_oyentes_apertura = []
+
+
+def al_abrir_conexion(funcion):
+    """Registra funcion(conn) para que se llame con cada conexión que abre un pool"""
+    if funcion not in _oyentes_apertura:
+        _oyentes_apertura.append(funcion)
+    return funcion
+
+
+class ConexionPool(sqlite3.Connection):
+    """Conexión SQLite reutilizable: close() la devuelve al pool en lugar de cerrarla"""
+
+    # callable(conn) -> Cursor usado por cursor(), execute() y pd.read_sql_query (ver utils/perfilador.py)
+    fabrica_cursor = sqlite3.Cursor
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+        self._usos = 0
+        self._tablas_modificadas = set()
+
+    def _registrar(self, sql):
+        m = _ESCRITURA.match(sql)
+        if m:
+            self._tablas_modificadas.add(m.group(1).lower())
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or self.fabrica_cursor)
+
+    def execute(self, sql, *args):
+        # Igual que sqlite3.Connection.execute, pero pasando por cursor()
+        self._registrar(sql)
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        self._registrar(sql)
+        return self.cursor().executemany(sql, *args)
+
+    def _notificar(self):
+        tablas, self._tablas_modificadas = self._tablas_modificadas, set()
+        if tablas:
+            for oyente in _oyentes_escritura:
+                oyente(*tablas)
+
+    def commit(self):
+        super().commit()
+        self._notificar()
+
+    def rollback(self):
+        super().rollback()
+        self._tablas_modificadas.clear()
+
+    def __exit__(self, tipo, valor, traza):
+        # "with conn:" confirma desde C sin pasar por commit(): avisar igual
+        resultado = super().__exit__(tipo, valor, traza)
+        if tipo is None:
+            self._notificar()
+        else:
+            self._tablas_modificadas.clear()
+        return resultado
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.liberar(self)
+
+    def cerrar_definitivamente(self):
+        """Cierra la conexión física (la saca del pool)"""
+        self._pool = None
+        super().close()
+
+
+class PoolConexiones:
+    """Mantiene una conexión abierta y configurada por hilo para una base de datos"""
+
+    def __init__(self, db_path, timeout=BUSY_TIMEOUT_SEG, pragmas=PRAGMAS):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self.pragmas = pragmas
+        self._local = threading.local()
+        self._abiertas = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, factory=ConexionPool)
+        conn.row_factory = sqlite3.Row
+        for nombre, valor in self.pragmas:
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        conn._pool = self
+        with self._lock:
+            self._abiertas.add(conn)
+        for oyente in _oyentes_apertura:
+            oyente(conn)
+        return conn
+
+    def obtener(self):
+        """Devuelve la conexión del hilo actual, abriéndola si todavía no existe"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._abrir()
+            self._local.conn = conn
+        conn._usos += 1
+        return conn
+
+    def liberar(self, conn):
+        """Marca un uso como terminado; al quedar libre descarta lo no confirmado"""
+        conn._usos = max(conn._usos - 1, 0)
+        if conn._usos == 0 and conn.in_transaction:
+            conn.rollback()
+
+    def cerrar_todas(self):
+        """Cierra todas las conexiones físicas abiertas por el pool"""
+        with self._lock:
+            conexiones = list(self._abiertas)
+            self._abiertas = weakref.WeakSet()
+        for conn in conexiones:
+            try:
+                conn.cerrar_definitivamente()
+            except sqlite3.ProgrammingError:
+                # Conexión creada en otro hilo: se cierra cuando ese hilo termina
+                pass
+        self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(db_path):
+    """Devuelve el pool asociado a una ruta de base de datos (uno por proceso)"""
+    clave = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = PoolConexiones(db_path)
+            _pools[clave] = pool
+        return pool
+
+
+@contextmanager
+def conexion(db_path):
+    """Context manager que presta la conexión del pool y la devuelve al salir"""
+    conn = obtener_pool(db_path).obtener()
+    try:
+        yield conn
+    finally:
+        conn.close()
@@ -1,12 +1,14 @@
 # utils/helpers.py
 from datetime import datetime, date
 from pathlib import Path
-import sqlite3
+from utils.db import obtener_pool, conexion
 DB_PATH = Path(__file__).parent.parent / "data" / "flota.db"
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Conexión del pool (una por hilo); close() la devuelve al pool"""
+    return obtener_pool(DB_PATH).obtener()
+def conexion_db():
+    """Uso: with conexion_db() as conn: ..."""
+    return conexion(DB_PATH)
 def dias_hasta(fecha_str):
     if not fecha_str:
         return 999
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+# utils/perfilador.py - PERFILADOR DE CONSULTAS POR RERUN Y REGISTRO DE LENTAS
+#
+# Mientras un hilo tiene un rerun activo (app.py llama a iniciar_rerun() al
+# principio del script y a finalizar_rerun() al final), las conexiones del
+# pool crean sus cursores con CursorPerfilado, que mide cada sentencia
+# (ejecución + lectura de filas, incluido pd.read_sql_query) y la atribuye a
+# la vista que la originó (el marco más externo de views/, o app.py) y a la
+# línea del proyecto que la ejecutó. Al finalizar, las que superan
+# UMBRAL_LENTA_MS se guardan con su EXPLAIN QUERY PLAN en consultas_lentas,
+# que conserva los últimos MAX_CONSULTAS_LENTAS registros. Fuera de un rerun
+# (programador, cola de exportación, benchmarks) se usa el cursor normal.
+#
+# Uso: python -m utils.perfilador [--db data/flota.db] [--limite 20] [--vista views.combustible]
+
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from utils.db import BUSY_TIMEOUT_SEG, al_abrir_conexion
+from utils.helpers import get_db_connection
+from utils.plan_consultas import analizar
+
+RAIZ = Path(__file__).parent.parent
+
+UMBRAL_LENTA_MS = 100.0
+MAX_CONSULTAS_LENTAS = 5000
+# Tope de sentencias guardadas por rerun (las siguientes sólo se cuentan)
+MAX_SENTENCIAS_RERUN = 5000
+
+_EXPLICABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|REPLACE|UPDATE|DELETE)\b", re.IGNORECASE)
+
+# Archivos que sólo intermedian la ejecución: no cuentan como origen de la sentencia
+_INTERMEDIARIOS = {
+    str(RAIZ / ruta)
+    for ruta in ("utils/db.py", "utils/helpers.py", "utils/cache.py", "utils/perfilador.py", "repositories/_lectura.py")
+}
+_DIR_VISTAS = str(RAIZ / "views")
+_APP = str(RAIZ / "app.py")
+_modulos = {}
+
+
+class Sentencia:
+    """Una sentencia medida; duracion_ms y filas crecen mientras se leen sus filas"""
+
+    __slots__ = ("sql", "parametros", "vista", "origen", "db_path", "duracion_ms", "filas")
+
+    def __init__(self, sql, parametros, vista, origen, db_path, duracion_ms, filas):
+        self.sql = sql
+        self.parametros = parametros
+        self.vista = vista
+        self.origen = origen
+        self.db_path = db_path
+        self.duracion_ms = duracion_ms
+        self.filas = filas
+
+
+class RegistroRerun:
+    """Sentencias ejecutadas por un hilo entre iniciar_rerun() y finalizar_rerun()"""
+
+    def __init__(self):
+        self.sentencias = []
+        self.descartadas = 0
+        self.inicio = time.perf_counter()
+        self.duracion_ms = None
+
+    def agregar(self, cursor, sql, parametros, segundos):
+        pool = getattr(cursor.connection, "_pool", None)
+        vista, origen = _ubicar()
+        sentencia = Sentencia(sql, parametros, vista, origen, pool.db_path if pool else None,
+                              segundos * 1000, max(cursor.rowcount, 0))
+        if len(self.sentencias) < MAX_SENTENCIAS_RERUN:
+            self.sentencias.append(sentencia)
+        else:
+            self.descartadas += 1
+        return sentencia
+
+    @property
+    def total_sql_ms(self):
+        return sum(s.duracion_ms for s in self.sentencias)
+
+
+_actual = threading.local()
+# Reruns que no llegaron a finalizar_rerun() (st.stop, st.rerun, excepción): se vuelcan en el próximo
+_sin_volcar = []
+_sin_volcar_lock = threading.Lock()
+
+
+def _modulo(archivo):
+    nombre = _modulos.get(archivo)
+    if nombre is None:
+        nombre = ".".join(Path(archivo).relative_to(RAIZ).with_suffix("").parts)
+        _modulos[archivo] = nombre
+    return nombre
+
+
+def _ubicar():
+    """(vista, origen) de la sentencia en curso según la pila de llamadas"""
+    vista = origen = None
+    marco = sys._getframe(2)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(_DIR_VISTAS):
+            vista = f"{_modulo(archivo)}.{marco.f_code.co_name}"
+        elif archivo == _APP and vista is None:
+            vista = "app"
+        if origen is None and archivo not in _INTERMEDIARIOS and archivo.startswith(str(RAIZ)) \
+                and "site-packages" not in archivo:
+            origen = f"{_modulo(archivo)}:{marco.f_lineno} {marco.f_code.co_name}"
+        marco = marco.f_back
+    return vista or "(sin vista)", origen or "(externo)"
+
+
+class CursorPerfilado(sqlite3.Cursor):
+    """Cursor que suma al rerun activo el tiempo de cada sentencia y de la lectura de sus filas"""
+
+    _sentencia = None
+
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._sentencia = _registrar(self, sql, parametros, time.perf_counter() - inicio)
+
+    def executemany(self, sql, parametros):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            # Los parámetros pueden ser un generador ya consumido: el plan se pide con NULL
+            self._sentencia = _registrar(self, sql, None, time.perf_counter() - inicio)
+
+    def _leido(self, inicio, filas):
+        if self._sentencia is not None:
+            self._sentencia.duracion_ms += (time.perf_counter() - inicio) * 1000
+            self._sentencia.filas += filas
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._leido(inicio, fila is not None)
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._leido(inicio, len(filas))
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._leido(inicio, len(filas))
+        return filas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        fila = super().__next__()
+        self._leido(inicio, 1)
+        return fila
+
+
+def _registrar(cursor, sql, parametros, segundos):
+    registro = getattr(_actual, "registro", None)
+    if registro is None:
+        return None
+    return registro.agregar(cursor, sql, parametros, segundos)
+
+
+def _fabrica_cursor(conn):
+    # El cursor se elige al crearlo: fuera de un rerun no hay costo por fila
+    if getattr(_actual, "registro", None) is None:
+        return sqlite3.Cursor(conn)
+    return CursorPerfilado(conn)
+
+
+@al_abrir_conexion
+def instrumentar(conn):
+    """Hace que la conexión del pool cree cursores perfilables"""
+    conn.fabrica_cursor = _fabrica_cursor
+
+
+# ==========================================
+# CICLO DEL RERUN
+# ==========================================
+def iniciar_rerun():
+    """Empieza a medir las sentencias del hilo actual; vuelca lo que quedó de reruns interrumpidos"""
+    hilo = threading.current_thread()
+    registro = RegistroRerun()
+    with _sin_volcar_lock:
+        # Sólo los del mismo hilo o de hilos terminados: los demás son reruns de otras sesiones en curso
+        pendientes = [(h, r) for h, r in _sin_volcar if h is hilo or not h.is_alive()]
+        _sin_volcar[:] = [p for p in _sin_volcar if p not in pendientes] + [(hilo, registro)]
+    for _, anterior in pendientes:
+        volcar_lentas(anterior.sentencias)
+    _actual.registro = registro
+    return registro
+
+
+def finalizar_rerun():
+    """Deja de medir, guarda las sentencias lentas y devuelve el RegistroRerun (o None)"""
+    registro = getattr(_actual, "registro", None)
+    if registro is None:
+        return None
+    _actual.registro = None
+    registro.duracion_ms = (time.perf_counter() - registro.inicio) * 1000
+    with _sin_volcar_lock:
+        _sin_volcar[:] = [p for p in _sin_volcar if p[1] is not registro]
+    volcar_lentas(registro.sentencias)
+    return registro
+
+
+def plan_de(conn, sql, parametros=None):
+    """(detalles, recorridos completos) de EXPLAIN QUERY PLAN; ([], []) si la sentencia no se puede explicar"""
+    if not _EXPLICABLE.match(sql):
+        return [], []
+    try:
+        return analizar(conn, sql, parametros)
+    except (sqlite3.Error, ValueError):
+        # Tablas temporales de otra conexión, parámetros con nombre faltantes, etc.
+        return [], []
+
+
+def volcar_lentas(sentencias, umbral_ms=UMBRAL_LENTA_MS, max_registros=MAX_CONSULTAS_LENTAS):
+    """Guarda en consultas_lentas las sentencias que superaron el umbral; devuelve cuántas guardó"""
+    por_base = {}
+    for s in sentencias:
+        if s.duracion_ms >= umbral_ms and s.db_path is not None:
+            por_base.setdefault(s.db_path, []).append(s)
+
+    guardadas = 0
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for db_path, lentas in por_base.items():
+        # Conexión aparte: no mezclar el registro con la transacción de quien ejecutó la sentencia
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SEG)
+        try:
+            filas = []
+            for s in lentas:
+                detalles, recorridos = plan_de(conn, s.sql, s.parametros)
+                filas.append((fecha, s.vista, s.origen, s.sql, round(s.duracion_ms, 3), s.filas,
+                              "\n".join(detalles) or None, ",".join(recorridos) or None))
+            with conn:
+                conn.executemany("""
+                    INSERT INTO consultas_lentas (fecha, vista, origen, sql, duracion_ms, filas, plan, recorridos)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, filas)
+                conn.execute("DELETE FROM consultas_lentas WHERE id <= (SELECT MAX(id) FROM consultas_lentas) - ?",
+                             (max_registros,))
+            guardadas += len(filas)
+        except sqlite3.Error:
+            # El registro de lentas nunca debe romper la página (base sin migrar, bloqueada, etc.)
+            pass
+        finally:
+            conn.close()
+    return guardadas
+
+
+# ==========================================
+# CONSULTAS PARA LA BARRA LATERAL
+# ==========================================
+def desglose(registro):
+    """DataFrame con una fila por (vista, origen, sql): sentencias, ms totales y máximos, filas"""
+    columnas = ["vista", "origen", "sql", "sentencias", "total_ms", "max_ms", "filas"]
+    if registro is None or not registro.sentencias:
+        return pd.DataFrame(columns=columnas)
+    df = pd.DataFrame({
+        "vista": [s.vista for s in registro.sentencias],
+        "origen": [s.origen for s in registro.sentencias],
+        "sql": [" ".join(s.sql.split()) for s in registro.sentencias],
+        "duracion_ms": [s.duracion_ms for s in registro.sentencias],
+        "filas": [s.filas for s in registro.sentencias],
+    })
+    agrupado = df.groupby(["vista", "origen", "sql"], sort=False).agg(
+        sentencias=("duracion_ms", "size"),
+        total_ms=("duracion_ms", "sum"),
+        max_ms=("duracion_ms", "max"),
+        filas=("filas", "sum"),
+    ).reset_index()
+    agrupado[["total_ms", "max_ms"]] = agrupado[["total_ms", "max_ms"]].round(1)
+    return agrupado.sort_values("total_ms", ascending=False, ignore_index=True)[columnas]
+
+
+def mas_lentas(registro, cantidad=5):
+    """Las 'cantidad' sentencias más lentas del rerun con su plan: [(Sentencia, detalles, recorridos)]"""
+    if registro is None:
+        return []
+    resultado = []
+    conexiones = {}
+    try:
+        for s in sorted(registro.sentencias, key=lambda s: s.duracion_ms, reverse=True)[:cantidad]:
+            if s.db_path is None:
+                resultado.append((s, [], []))
+                continue
+            conn = conexiones.get(s.db_path)
+            if conn is None:
+                conn = conexiones[s.db_path] = sqlite3.connect(s.db_path, timeout=BUSY_TIMEOUT_SEG)
+            resultado.append((s, *plan_de(conn, s.sql, s.parametros)))
+    finally:
+        for conn in conexiones.values():
+            conn.close()
+    return resultado
+
+
+def listar_lentas(limite=50, vista=None, conn=None):
+    """Consultas lentas registradas, las más recientes primero"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    try:
+        where, params = ("WHERE vista LIKE ?", [f"{vista}%"]) if vista else ("", [])
+        return pd.read_sql_query(f"""
+            SELECT fecha, vista, origen, duracion_ms, filas, recorridos, sql, plan
+            FROM consultas_lentas {where}
+            ORDER BY id DESC LIMIT ?
+        """, conn, params=params + [limite])
+    finally:
+        if propia:
+            conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import utils.helpers
+
+    parser = argparse.ArgumentParser(description="Consultas lentas registradas por el perfilador")
+    parser.add_argument("--db", default=str(utils.helpers.DB_PATH), help="Ruta de la base de datos")
+    parser.add_argument("--limite", type=int, default=20)
+    parser.add_argument("--vista", help="Prefijo de la vista (p. ej. views.combustible)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    try:
+        df = listar_lentas(args.limite, args.vista, conn)
+    finally:
+        conn.close()
+    if df.empty:
+        print("✅ No hay consultas lentas registradas")
+    for fila in df.itertuples():
+        marca = "🔴" if fila.recorridos else "🟡"
+        print(f"{marca} {fila.fecha} | {fila.duracion_ms:9.1f} ms | {fila.filas:>8} filas | {fila.vista} | {fila.origen}")
+        print(f"   {' '.join(fila.sql.split())[:160]}")
+        if fila.recorridos:
+            print(f"   SCAN completo: {fila.recorridos}")
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# utils/plan_consultas.py - AUDITORÍA DE PLANES DE CONSULTA (EXPLAIN QUERY PLAN)
+#
+# Recorre todos los .py del proyecto, extrae los literales SQL y los pasa por
+# EXPLAIN QUERY PLAN contra una copia de la base migrada a la última versión.
+# Marca los recorridos completos (SCAN) sobre tablas de historial.
+#
+# Uso: python -m utils.plan_consultas [--db data/flota.db] [--estricto]
+
+import ast
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).parent.parent
+DB_PATH = RAIZ / "data" / "flota.db"
+
+# Tablas que crecen con el historial: un SCAN sobre ellas es un problema
+TABLAS_HISTORIAL = {"combustible", "mantenimientos", "vencimientos", "fallas"}
+
+CARPETAS_EXCLUIDAS = {".git", "__pycache__", ".venv", "venv", "data"}
+
+_INICIO_SQL = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE)\b", re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (\w+)")
+_PARAMETRO_CON_NOMBRE = re.compile(r"(?<![:\w]):(\w+)")
+_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+_ORIGEN = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_PALABRAS_RESERVADAS = {
+    "where", "join", "left", "inner", "cross", "on", "group", "order", "limit",
+    "union", "having", "natural", "using", "set", "window",
+}
+
+
+def extraer_consultas(raiz=RAIZ):
+    """Devuelve [(archivo, linea, sql)] con cada literal SQL del proyecto"""
+    consultas = []
+    for archivo in sorted(raiz.rglob("*.py")):
+        if CARPETAS_EXCLUIDAS.intersection(archivo.relative_to(raiz).parts):
+            continue
+        if archivo.resolve() == Path(__file__).resolve():
+            continue
+        try:
+            arbol = ast.parse(archivo.read_text(encoding="utf-8"))
+        except SyntaxError:
+            continue
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.JoinedStr):
+                # f-strings: el SQL se arma en ejecución, no se puede analizar aquí
+                for parte in nodo.values:
+                    if isinstance(parte, ast.Constant):
+                        parte._en_fstring = True
+            if (isinstance(nodo, ast.Constant) and isinstance(nodo.value, str)
+                    and not getattr(nodo, "_en_fstring", False)
+                    and _INICIO_SQL.match(nodo.value)):
+                consultas.append((archivo.relative_to(raiz), nodo.lineno, nodo.value.strip()))
+    return consultas
+
+
+def preparar_base(db_origen):
+    """Copia la base a un temporal, la migra y borra las estadísticas.
+
+    Sin sqlite_stat1 el planificador asume tablas grandes, que es el escenario
+    que interesa auditar aunque la base local tenga pocas filas.
+    """
+    from models.migraciones import migrar
+
+    destino = Path(tempfile.mkdtemp()) / "plan.db"
+    origen = sqlite3.connect(f"file:{db_origen}?mode=ro", uri=True)
+    copia = sqlite3.connect(destino)
+    try:
+        origen.backup(copia)
+    finally:
+        origen.close()
+        copia.close()
+
+    migrar(destino)
+
+    conn = sqlite3.connect(destino)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        conn.execute("DELETE FROM sqlite_stat1")
+        conn.commit()
+    conn.close()
+    return destino
+
+
+def alias_de_tablas(sql):
+    """Mapa alias -> tabla (EXPLAIN QUERY PLAN informa el alias, no la tabla)"""
+    alias = {}
+    for tabla, nombre in _ORIGEN.findall(sql):
+        alias[tabla] = tabla
+        if nombre and nombre.lower() not in _PALABRAS_RESERVADAS:
+            alias[nombre] = tabla
+    return alias
+
+
+def analizar(conn, sql, parametros=None):
+    """Ejecuta EXPLAIN QUERY PLAN y devuelve (detalles, tablas_recorridas_completas)
+
+    Sin parametros se usa NULL en cada '?' o en cada ':nombre' (el plan no
+    depende de los valores).
+    """
+    if parametros is None:
+        nombres = _PARAMETRO_CON_NOMBRE.findall(sql)
+        if nombres and "?" not in sql:
+            parametros = dict.fromkeys(nombres)
+        else:
+            parametros = (None,) * sql.count("?")
+    filas = conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+    detalles = [fila[3] for fila in filas]
+    alias = alias_de_tablas(sql)
+    con_limit = bool(_LIMIT.search(sql))
+    recorridos = []
+    for detalle in detalles:
+        m = _SCAN.match(detalle)
+        # "SCAN x USING [COVERING] INDEX" recorre en orden de índice: solo se corta antes con LIMIT
+        if m and not (con_limit and "INDEX" in detalle) and not detalle.startswith("SCAN CONSTANT ROW"):
+            tabla = alias.get(m.group(1), m.group(1))
+            if not tabla.startswith("sqlite_"):
+                recorridos.append(tabla)
+    return detalles, recorridos
+
+
+def auditar(db_path=DB_PATH, raiz=RAIZ):
+    """Analiza todas las consultas; devuelve lista de dicts con el resultado"""
+    base = preparar_base(db_path)
+    conn = sqlite3.connect(base)
+    resultados = []
+    try:
+        for archivo, linea, sql in extraer_consultas(raiz):
+            try:
+                detalles, recorridos = analizar(conn, sql)
+                error = None
+            except sqlite3.Error as e:
+                detalles, recorridos, error = [], [], str(e)
+            resultados.append({
+                "archivo": str(archivo),
+                "linea": linea,
+                "sql": sql,
+                "plan": detalles,
+                "scan_historial": [t for t in recorridos if t in TABLAS_HISTORIAL],
+                "scan_otros": [t for t in recorridos if t not in TABLAS_HISTORIAL],
+                "error": error,
+            })
+    finally:
+        conn.close()
+        shutil.rmtree(base.parent, ignore_errors=True)
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Auditoría EXPLAIN QUERY PLAN del proyecto")
+    parser.add_argument("--db", default=str(DB_PATH), help="Base de datos de referencia")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el plan de cada consulta")
+    parser.add_argument("--estricto", action="store_true",
+                        help="Salir con código 1 si hay SCAN sobre tablas de historial")
+    args = parser.parse_args()
+
+    resultados = auditar(Path(args.db))
+    problemas = 0
+    for r in resultados:
+        if r["error"]:
+            print(f"⚠️  {r['archivo']}:{r['linea']} no se pudo analizar: {r['error']}")
+            continue
+        if r["scan_historial"]:
+            problemas += 1
+            print(f"🔴 {r['archivo']}:{r['linea']} SCAN completo de {', '.join(r['scan_historial'])}")
+        elif args.verbose and r["scan_otros"]:
+            print(f"🟡 {r['archivo']}:{r['linea']} SCAN de {', '.join(r['scan_otros'])}")
+        if args.verbose:
+            for detalle in r["plan"]:
+                print(f"      {detalle}")
+
+    print(f"\n📊 {len(resultados)} consultas analizadas, {problemas} con recorridos completos de historial")
+    sys.exit(1 if args.estricto and problemas else 0)
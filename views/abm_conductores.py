@@ -6,6 +6,7 @@ import pandas as pd
 import sqlite3
 from datetime import date, timedelta
 from utils.helpers import get_db_connection, dias_hasta
+from repositories import conductores, vehiculos
 
 def abm_conductores():
     """ABM completo de conductores con gestión de documentación"""
@@ -21,15 +22,7 @@ def abm_conductores():
         st.subheader("➕ Registrar Nuevo Conductor")
         
         # Obtener vehículos disponibles
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("""
-                SELECT id, patente FROM vehiculos 
-                WHERE estado = 'activo'
-                ORDER BY patente
-            """, conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar(estado="activo")
         
         vehiculos_dict = {"(Sin asignar)": None}
         vehiculos_dict.update({row['patente']: row['id'] for _, row in df_veh.iterrows()})
@@ -145,16 +138,7 @@ def abm_conductores():
     with tab2:
         st.subheader("✏️ Modificar Conductor Existente")
         
-        conn = get_db_connection()
-        try:
-            df_cond = pd.read_sql_query("""
-                SELECT c.*, v.patente
-                FROM conductores c
-                LEFT JOIN vehiculos v ON c.vehiculo_asignado = v.id
-                ORDER BY c.nombre
-            """, conn)
-        finally:
-            conn.close()
+        df_cond = conductores.listar()
         
         if df_cond.empty:
             st.info("ℹ️ No hay conductores registrados")
@@ -170,11 +154,7 @@ def abm_conductores():
         cond_data = df_cond[df_cond['nombre'] == conductor_sel].iloc[0]
         
         # Obtener vehículos
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("SELECT id, patente FROM vehiculos WHERE estado = 'activo'", conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar(estado="activo")
         
         vehiculos_dict = {"(Sin asignar)": None}
         vehiculos_dict.update({row['patente']: row['id'] for _, row in df_veh.iterrows()})
@@ -259,16 +239,7 @@ def abm_conductores():
         
         st.warning("⚠️ **ATENCIÓN:** Dar de baja un conductor cambiará su estado a 'inactivo'.")
         
-        conn = get_db_connection()
-        try:
-            df_activos = pd.read_sql_query("""
-                SELECT id, nombre, dni
-                FROM conductores 
-                WHERE estado = 'activo'
-                ORDER BY nombre
-            """, conn)
-        finally:
-            conn.close()
+        df_activos = conductores.listar(estado="activo")
         
         if df_activos.empty:
             st.info("ℹ️ No hay conductores activos")
@@ -316,59 +287,38 @@ def abm_conductores():
     with tab4:
         st.subheader("📋 Listado Completo de Conductores")
         
-        conn = get_db_connection()
-        try:
-            df_todos = pd.read_sql_query("""
-                SELECT 
-                    c.nombre,
-                    c.dni,
-                    c.telefono,
-                    c.licencia_tipo,
-                    c.licencia_venc,
-                    c.estado,
-                    v.patente as vehiculo
-                FROM conductores c
-                LEFT JOIN vehiculos v ON c.vehiculo_asignado = v.id
-                ORDER BY 
-                    CASE c.estado
-                        WHEN 'activo' THEN 1
-                        WHEN 'suspendido' THEN 2
-                        WHEN 'inactivo' THEN 3
-                    END,
-                    c.nombre
-            """, conn)
-            
-            if not df_todos.empty:
-                # Filtros
-                col1, col2 = st.columns(2)
-                
-                estados_filtro = ["Todos"] + sorted(df_todos['estado'].unique().tolist())
-                filtro_estado = col1.selectbox("Filtrar por estado", estados_filtro)
-                
-                # Aplicar filtros
-                df_filtrado = df_todos.copy()
-                
-                if filtro_estado != "Todos":
-                    df_filtrado = df_filtrado[df_filtrado['estado'] == filtro_estado]
-                
-                # Estadísticas
-                col1, col2, col3 = st.columns(3)
-                col1.metric("Total", len(df_filtrado))
-                col2.metric("Activos", len(df_filtrado[df_filtrado['estado'] == 'activo']))
-                col3.metric("Inactivos", len(df_filtrado[df_filtrado['estado'] == 'inactivo']))
-                
-                # Tabla
-                st.dataframe(
-                    df_filtrado,
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-            else:
-                st.info("ℹ️ No hay conductores registrados")
+        df_todos = conductores.listar(por_estado=True)[
+            ['nombre', 'dni', 'telefono', 'licencia_tipo', 'licencia_venc', 'estado', 'patente']
+        ].rename(columns={'patente': 'vehiculo'})
         
-        finally:
-            conn.close()
+        if not df_todos.empty:
+            # Filtros
+            col1, col2 = st.columns(2)
+            
+            estados_filtro = ["Todos"] + sorted(df_todos['estado'].unique().tolist())
+            filtro_estado = col1.selectbox("Filtrar por estado", estados_filtro)
+            
+            # Aplicar filtros
+            df_filtrado = df_todos.copy()
+            
+            if filtro_estado != "Todos":
+                df_filtrado = df_filtrado[df_filtrado['estado'] == filtro_estado]
+            
+            # Estadísticas
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total", len(df_filtrado))
+            col2.metric("Activos", len(df_filtrado[df_filtrado['estado'] == 'activo']))
+            col3.metric("Inactivos", len(df_filtrado[df_filtrado['estado'] == 'inactivo']))
+            
+            # Tabla
+            st.dataframe(
+                df_filtrado,
+                use_container_width=True,
+                hide_index=True
+            )
+            
+        else:
+            st.info("ℹ️ No hay conductores registrados")
     
     # ==========================================
     # TAB 5: VISTA DOCUMENTACIÓN
@@ -376,109 +326,94 @@ def abm_conductores():
     with tab5:
         st.subheader("📄 Estado de Documentación por Conductor")
         
-        conn = get_db_connection()
-        try:
-            df_docs = pd.read_sql_query("""
-                SELECT 
-                    nombre,
-                    dni,
-                    licencia_venc,
-                    licencia_cargas_peligrosas,
-                    examen_psicofisico,
-                    curso_iram,
-                    estado
-                FROM conductores
-                WHERE estado = 'activo'
-                ORDER BY nombre
-            """, conn)
-            
-            if not df_docs.empty:
-                # Crear tabla de estado de documentación
-                datos_tabla = []
+        df_docs = conductores.listar(estado="activo")[
+            ['nombre', 'dni', 'licencia_venc', 'licencia_cargas_peligrosas', 'examen_psicofisico', 'curso_iram', 'estado']
+        ]
+        
+        if not df_docs.empty:
+            # Crear tabla de estado de documentación
+            datos_tabla = []
+            
+            for _, cond in df_docs.iterrows():
+                # Licencia
+                if cond['licencia_venc']:
+                    dias_lic = dias_hasta(cond['licencia_venc'])
+                    estado_lic = "🔴" if dias_lic < 0 else "🟠" if dias_lic < 15 else "🟢"
+                else:
+                    estado_lic = "⚪"
+                    dias_lic = None
                 
-                for _, cond in df_docs.iterrows():
-                    # Licencia
-                    if cond['licencia_venc']:
-                        dias_lic = dias_hasta(cond['licencia_venc'])
-                        estado_lic = "🔴" if dias_lic < 0 else "🟠" if dias_lic < 15 else "🟢"
-                    else:
-                        estado_lic = "⚪"
-                        dias_lic = None
-                    
-                    # Cargas peligrosas
-                    if cond['licencia_cargas_peligrosas']:
-                        dias_cargas = dias_hasta(cond['licencia_cargas_peligrosas'])
-                        estado_cargas = "🔴" if dias_cargas < 0 else "🟠" if dias_cargas < 15 else "🟢"
-                    else:
-                        estado_cargas = "⚪"
-                        dias_cargas = None
-                    
-                    # Psicofísico
-                    if cond['examen_psicofisico']:
-                        dias_psico = dias_hasta(cond['examen_psicofisico'])
-                        estado_psico = "🔴" if dias_psico < 0 else "🟠" if dias_psico < 15 else "🟢"
-                    else:
-                        estado_psico = "⚪"
-                        dias_psico = None
-                    
-                    # IRAM
-                    if cond['curso_iram']:
-                        dias_iram = dias_hasta(cond['curso_iram'])
-                        estado_iram = "🔴" if dias_iram < 0 else "🟠" if dias_iram < 15 else "🟢"
-                    else:
-                        estado_iram = "⚪"
-                        dias_iram = None
-                    
-                    datos_tabla.append({
-                        "Conductor": cond['nombre'],
-                        "DNI": cond['dni'],
-                        "Licencia": f"{estado_lic} {cond['licencia_venc']}",
-                        "Días": dias_lic if dias_lic is not None else "-",
-                        "Cargas Pel.": f"{estado_cargas} {cond['licencia_cargas_peligrosas'] or 'N/A'}",
-                        "Días_2": dias_cargas if dias_cargas is not None else "-",
-                        "Psicofísico": f"{estado_psico} {cond['examen_psicofisico'] or 'N/A'}",
-                        "Días_3": dias_psico if dias_psico is not None else "-",
-                        "IRAM": f"{estado_iram} {cond['curso_iram'] or 'N/A'}",
-                        "Días_4": dias_iram if dias_iram is not None else "-"
-                    })
+                # Cargas peligrosas
+                if cond['licencia_cargas_peligrosas']:
+                    dias_cargas = dias_hasta(cond['licencia_cargas_peligrosas'])
+                    estado_cargas = "🔴" if dias_cargas < 0 else "🟠" if dias_cargas < 15 else "🟢"
+                else:
+                    estado_cargas = "⚪"
+                    dias_cargas = None
                 
-                df_vista = pd.DataFrame(datos_tabla)
+                # Psicofísico
+                if cond['examen_psicofisico']:
+                    dias_psico = dias_hasta(cond['examen_psicofisico'])
+                    estado_psico = "🔴" if dias_psico < 0 else "🟠" if dias_psico < 15 else "🟢"
+                else:
+                    estado_psico = "⚪"
+                    dias_psico = None
                 
-                st.dataframe(
-                    df_vista,
-                    use_container_width=True,
-                    hide_index=True
-                )
+                # IRAM
+                if cond['curso_iram']:
+                    dias_iram = dias_hasta(cond['curso_iram'])
+                    estado_iram = "🔴" if dias_iram < 0 else "🟠" if dias_iram < 15 else "🟢"
+                else:
+                    estado_iram = "⚪"
+                    dias_iram = None
                 
-                # Alertas
-                vencidos = []
-                for _, cond in df_docs.iterrows():
-                    docs_vencidos = []
-                    
-                    if cond['licencia_venc'] and dias_hasta(cond['licencia_venc']) < 0:
-                        docs_vencidos.append("Licencia")
-                    if cond['licencia_cargas_peligrosas'] and dias_hasta(cond['licencia_cargas_peligrosas']) < 0:
-                        docs_vencidos.append("Cargas Peligrosas")
-                    if cond['examen_psicofisico'] and dias_hasta(cond['examen_psicofisico']) < 0:
-                        docs_vencidos.append("Psicofísico")
-                    if cond['curso_iram'] and dias_hasta(cond['curso_iram']) < 0:
-                        docs_vencidos.append("IRAM")
-                    
-                    if docs_vencidos:
-                        vencidos.append(f"**{cond['nombre']}**: {', '.join(docs_vencidos)}")
+                datos_tabla.append({
+                    "Conductor": cond['nombre'],
+                    "DNI": cond['dni'],
+                    "Licencia": f"{estado_lic} {cond['licencia_venc']}",
+                    "Días": dias_lic if dias_lic is not None else "-",
+                    "Cargas Pel.": f"{estado_cargas} {cond['licencia_cargas_peligrosas'] or 'N/A'}",
+                    "Días_2": dias_cargas if dias_cargas is not None else "-",
+                    "Psicofísico": f"{estado_psico} {cond['examen_psicofisico'] or 'N/A'}",
+                    "Días_3": dias_psico if dias_psico is not None else "-",
+                    "IRAM": f"{estado_iram} {cond['curso_iram'] or 'N/A'}",
+                    "Días_4": dias_iram if dias_iram is not None else "-"
+                })
+            
+            df_vista = pd.DataFrame(datos_tabla)
+            
+            st.dataframe(
+                df_vista,
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            # Alertas
+            vencidos = []
+            for _, cond in df_docs.iterrows():
+                docs_vencidos = []
                 
-                if vencidos:
-                    st.error("🚨 **CONDUCTORES CON DOCUMENTACIÓN VENCIDA:**")
-                    for v in vencidos:
-                        st.markdown(f"- {v}")
-                else:
-                    st.success("✅ Todos los conductores tienen su documentación al día")
+                if cond['licencia_venc'] and dias_hasta(cond['licencia_venc']) < 0:
+                    docs_vencidos.append("Licencia")
+                if cond['licencia_cargas_peligrosas'] and dias_hasta(cond['licencia_cargas_peligrosas']) < 0:
+                    docs_vencidos.append("Cargas Peligrosas")
+                if cond['examen_psicofisico'] and dias_hasta(cond['examen_psicofisico']) < 0:
+                    docs_vencidos.append("Psicofísico")
+                if cond['curso_iram'] and dias_hasta(cond['curso_iram']) < 0:
+                    docs_vencidos.append("IRAM")
                 
+                if docs_vencidos:
+                    vencidos.append(f"**{cond['nombre']}**: {', '.join(docs_vencidos)}")
+            
+            if vencidos:
+                st.error("🚨 **CONDUCTORES CON DOCUMENTACIÓN VENCIDA:**")
+                for v in vencidos:
+                    st.markdown(f"- {v}")
             else:
-                st.info("ℹ️ No hay conductores activos")
-        
-        finally:
-            conn.close()
+                st.success("✅ Todos los conductores tienen su documentación al día")
+            
+        else:
+            st.info("ℹ️ No hay conductores activos")
 
 
 if __name__ == "__main__":
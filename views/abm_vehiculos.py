@@ -6,6 +6,7 @@ import pandas as pd
 import sqlite3
 from datetime import date
 from utils.helpers import get_db_connection
+from repositories import vehiculos
 
 def abm_vehiculos():
     """ABM completo de vehículos con plantillas de mantenimiento"""
@@ -42,7 +43,10 @@ def abm_vehiculos():
             chasis = col1.text_input("Nº Chasis", placeholder="Opcional")
             motor = col2.text_input("Nº Motor", placeholder="Opcional")
             
-            km_actual = st.number_input("Kilometraje Actual *", min_value=0, value=0, step=1000)
+            col1, col2 = st.columns(2)
+            km_actual = col1.number_input("Kilometraje Actual *", min_value=0, value=0, step=1000)
+            capacidad = col2.number_input("Capacidad del tanque (L)", min_value=0, value=0, step=10,
+                                          help="0 = desconocida (se estima con el historial de cargas)")
             
             st.markdown("### 🔧 Plantilla de Mantenimiento Inicial")
             st.info("💡 Configura los intervalos de mantenimiento según las especificaciones del fabricante")
@@ -95,9 +99,10 @@ def abm_vehiculos():
                     # Insertar vehículo
                     conn.execute("""
                         INSERT INTO vehiculos (patente, tipo, marca, modelo, anio, chasis, motor, 
-                                             centro_operativo, km_actual, observaciones)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (patente, tipo, marca, modelo, anio, chasis, motor, centro, km_actual, observaciones))
+                                             centro_operativo, km_actual, observaciones, capacidad_tanque)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (patente, tipo, marca, modelo, anio, chasis, motor, centro, km_actual, observaciones,
+                          capacidad or None))
                     
                     veh_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
                     
@@ -134,16 +139,7 @@ def abm_vehiculos():
     with tab2:
         st.subheader("✏️ Modificar Vehículo Existente")
         
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("""
-                SELECT id, patente, marca, modelo, tipo, anio, chasis, motor, 
-                       centro_operativo, km_actual, estado, observaciones
-                FROM vehiculos 
-                ORDER BY patente
-            """, conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar()
         
         if df_veh.empty:
             st.info("ℹ️ No hay vehículos registrados")
@@ -177,8 +173,13 @@ def abm_vehiculos():
             nuevo_chasis = col1.text_input("Nº Chasis", value=veh_data['chasis'] or "")
             nuevo_motor = col2.text_input("Nº Motor", value=veh_data['motor'] or "")
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             nuevo_km = col1.number_input("Kilometraje Actual", min_value=0, value=int(veh_data['km_actual']))
+            nueva_capacidad = col3.number_input(
+                "Capacidad del tanque (L)", min_value=0,
+                value=0 if pd.isna(veh_data['capacidad_tanque']) else int(veh_data['capacidad_tanque']),
+                help="0 = desconocida (se estima con el historial de cargas)"
+            )
             nuevo_estado = col2.selectbox("Estado", ["activo", "en_reparacion", "detenido", "baja"],
                                          index=["activo", "en_reparacion", "detenido", "baja"].index(veh_data['estado']))
             
@@ -198,11 +199,11 @@ def abm_vehiculos():
                     conn.execute("""
                         UPDATE vehiculos 
                         SET patente=?, tipo=?, marca=?, modelo=?, anio=?, chasis=?, motor=?,
-                            centro_operativo=?, km_actual=?, estado=?, observaciones=?
+                            centro_operativo=?, km_actual=?, estado=?, observaciones=?, capacidad_tanque=?
                         WHERE id=?
                     """, (nueva_patente, nuevo_tipo, nueva_marca, nuevo_modelo, nuevo_anio, 
                          nuevo_chasis, nuevo_motor, nuevo_centro, nuevo_km, nuevo_estado, 
-                         nuevas_obs, veh_data['id']))
+                         nuevas_obs, nueva_capacidad or None, veh_data['id']))
                     
                     conn.commit()
                     st.success(f"✅ Vehículo **{nueva_patente}** actualizado correctamente")
@@ -223,16 +224,7 @@ def abm_vehiculos():
         
         st.warning("⚠️ **ATENCIÓN:** Dar de baja un vehículo cambiará su estado pero NO eliminará su historial.")
         
-        conn = get_db_connection()
-        try:
-            df_activos = pd.read_sql_query("""
-                SELECT id, patente, marca, modelo, tipo, km_actual
-                FROM vehiculos 
-                WHERE estado != 'baja'
-                ORDER BY patente
-            """, conn)
-        finally:
-            conn.close()
+        df_activos = vehiculos.listar(excluir_bajas=True)
         
         if df_activos.empty:
             st.info("ℹ️ No hay vehículos activos")
@@ -281,69 +273,54 @@ def abm_vehiculos():
     with tab4:
         st.subheader("📋 Listado Completo de Vehículos")
         
-        conn = get_db_connection()
-        try:
-            df_todos = pd.read_sql_query("""
-                SELECT patente, tipo, marca, modelo, anio, estado, km_actual, 
-                       centro_operativo, fecha_alta
-                FROM vehiculos 
-                ORDER BY 
-                    CASE estado
-                        WHEN 'activo' THEN 1
-                        WHEN 'en_reparacion' THEN 2
-                        WHEN 'detenido' THEN 3
-                        WHEN 'baja' THEN 4
-                    END,
-                    patente
-            """, conn)
-            
-            if not df_todos.empty:
-                # Filtros
-                col1, col2, col3 = st.columns(3)
-                
-                tipos_filtro = ["Todos"] + sorted(df_todos['tipo'].unique().tolist())
-                filtro_tipo = col1.selectbox("Filtrar por tipo", tipos_filtro)
-                
-                estados_filtro = ["Todos"] + sorted(df_todos['estado'].unique().tolist())
-                filtro_estado = col2.selectbox("Filtrar por estado", estados_filtro)
-                
-                # Aplicar filtros
-                df_filtrado = df_todos.copy()
-                
-                if filtro_tipo != "Todos":
-                    df_filtrado = df_filtrado[df_filtrado['tipo'] == filtro_tipo]
-                
-                if filtro_estado != "Todos":
-                    df_filtrado = df_filtrado[df_filtrado['estado'] == filtro_estado]
-                
-                # Estadísticas
-                col1, col2, col3, col4 = st.columns(4)
-                col1.metric("Total", len(df_filtrado))
-                col2.metric("Activos", len(df_filtrado[df_filtrado['estado'] == 'activo']))
-                col3.metric("En Reparación", len(df_filtrado[df_filtrado['estado'] == 'en_reparacion']))
-                col4.metric("Detenidos", len(df_filtrado[df_filtrado['estado'] == 'detenido']))
-                
-                # Tabla con colores por estado
-                def color_estado(val):
-                    colors = {
-                        'activo': 'background-color: #d4edda',
-                        'en_reparacion': 'background-color: #fff3cd',
-                        'detenido': 'background-color: #f8d7da',
-                        'baja': 'background-color: #e2e3e5'
-                    }
-                    return colors.get(val, '')
-                
-                st.dataframe(
-                    df_filtrado.style.applymap(color_estado, subset=['estado']),
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-            else:
-                st.info("ℹ️ No hay vehículos registrados")
+        df_todos = vehiculos.listar(por_estado=True)[
+            ['patente', 'tipo', 'marca', 'modelo', 'anio', 'estado', 'km_actual', 'centro_operativo', 'fecha_alta']
+        ]
         
-        finally:
-            conn.close()
+        if not df_todos.empty:
+            # Filtros
+            col1, col2, col3 = st.columns(3)
+            
+            tipos_filtro = ["Todos"] + sorted(df_todos['tipo'].unique().tolist())
+            filtro_tipo = col1.selectbox("Filtrar por tipo", tipos_filtro)
+            
+            estados_filtro = ["Todos"] + sorted(df_todos['estado'].unique().tolist())
+            filtro_estado = col2.selectbox("Filtrar por estado", estados_filtro)
+            
+            # Aplicar filtros
+            df_filtrado = df_todos.copy()
+            
+            if filtro_tipo != "Todos":
+                df_filtrado = df_filtrado[df_filtrado['tipo'] == filtro_tipo]
+            
+            if filtro_estado != "Todos":
+                df_filtrado = df_filtrado[df_filtrado['estado'] == filtro_estado]
+            
+            # Estadísticas
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Total", len(df_filtrado))
+            col2.metric("Activos", len(df_filtrado[df_filtrado['estado'] == 'activo']))
+            col3.metric("En Reparación", len(df_filtrado[df_filtrado['estado'] == 'en_reparacion']))
+            col4.metric("Detenidos", len(df_filtrado[df_filtrado['estado'] == 'detenido']))
+            
+            # Tabla con colores por estado
+            def color_estado(val):
+                colors = {
+                    'activo': 'background-color: #d4edda',
+                    'en_reparacion': 'background-color: #fff3cd',
+                    'detenido': 'background-color: #f8d7da',
+                    'baja': 'background-color: #e2e3e5'
+                }
+                return colors.get(val, '')
+            
+            st.dataframe(
+                df_filtrado.style.map(color_estado, subset=['estado']),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+        else:
+            st.info("ℹ️ No hay vehículos registrados")
 
 
 if __name__ == "__main__":
@@ -2,40 +2,37 @@
 # views/combustible.py - MÓDULO DE COMBUSTIBLE
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import sqlite3
 from datetime import date
 from utils.helpers import get_db_connection
+from repositories import combustible as repo_combustible, conductores, vehiculos
+from services.importacion_combustible import importar_cargas
+from services.rendimiento import recalcular_rendimiento
+from services.anomalias_combustible import (
+    ETIQUETAS as ETIQUETAS_ANOMALIA, TIPOS as TIPOS_ANOMALIA, cargas_pendientes, detectar_anomalias,
+    listar_anomalias, marcar_anomalias, resumen_abiertas, ultimo_procesado
+)
+from services.historial_combustible import (
+    FiltroHistorial, TAMANO_PAGINA, TIPOS_COMBUSTIBLE, obtener_pagina, obtener_totales
+)
 
 def modulo_combustible():
     """Módulo completo de control de combustible"""
     
     st.header("⛽ Control de Combustible y Rendimiento")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["➕ Registrar Carga", "📋 Historial", "📊 Análisis", "🚨 Anomalías"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["➕ Registrar Carga", "📋 Historial", "📊 Análisis", "🚨 Anomalías", "📥 Importar"]
+    )
     
     # ==========================================
     # TAB 1: REGISTRAR CARGA
     # ==========================================
     with tab1:
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("""
-                SELECT id, patente, marca, modelo, km_actual, tipo 
-                FROM vehiculos 
-                WHERE estado = 'activo' 
-                ORDER BY patente
-            """, conn)
-            
-            df_cond = pd.read_sql_query("""
-                SELECT id, nombre, dni 
-                FROM conductores 
-                WHERE estado = 'activo' 
-                ORDER BY nombre
-            """, conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar(estado="activo")
+        
+        df_cond = conductores.listar(estado="activo")
         
         if df_veh.empty:
             st.warning("⚠️ No hay vehículos activos")
@@ -81,28 +78,25 @@ def modulo_combustible():
             st.info(f"💰 Precio por litro: ${precio_litro:.2f}")
             
             estacion = st.text_input("🏪 Estación de Servicio", placeholder="Ej: YPF Ruta 9, Shell Centro, etc.")
+            parcial = st.checkbox("⛽ Carga parcial (no se llenó el tanque)",
+                                  help="Las cargas parciales no tienen rendimiento propio: sus litros se "
+                                       "suman al de la próxima carga completa")
             
             # Calcular rendimiento si hay carga previa
-            conn = get_db_connection()
-            try:
-                ultima_carga = conn.execute("""
-                    SELECT km, fecha FROM combustible 
-                    WHERE vehiculo_id = ? 
-                    ORDER BY fecha DESC, km DESC 
-                    LIMIT 1
-                """, (veh_id,)).fetchone()
+            ultima_carga = repo_combustible.ultima_carga(veh_id)
+            
+            if parcial:
+                rendimiento_calc = None
+                st.info("ℹ️ Carga parcial: el rendimiento se calcula en la próxima carga completa")
+            elif ultima_carga and km_carga > ultima_carga['km']:
+                km_recorridos = km_carga - ultima_carga['km']
+                rendimiento_calc = round(km_recorridos / litros, 2)
                 
-                if ultima_carga and km_carga > ultima_carga['km']:
-                    km_recorridos = km_carga - ultima_carga['km']
-                    rendimiento_calc = round(km_recorridos / litros, 2)
-                    
-                    st.success(f"📊 **Rendimiento calculado:** {rendimiento_calc} km/litro")
-                    st.caption(f"🛣️ Km recorridos desde última carga: {km_recorridos:,} km")
-                else:
-                    rendimiento_calc = None
-                    st.info("ℹ️ Esta es la primera carga o el kilometraje no es mayor a la carga anterior")
-            finally:
-                conn.close()
+                st.success(f"📊 **Rendimiento calculado:** {rendimiento_calc} km/litro")
+                st.caption(f"🛣️ Km recorridos desde última carga: {km_recorridos:,} km")
+            else:
+                rendimiento_calc = None
+                st.info("ℹ️ Esta es la primera carga o el kilometraje no es mayor a la carga anterior")
             
             observaciones = st.text_area("📝 Observaciones", 
                                         placeholder="Ej: Tanque lleno, carga parcial, anomalía detectada, etc.")
@@ -119,29 +113,23 @@ def modulo_combustible():
                     conn.execute("""
                         INSERT INTO combustible 
                         (vehiculo_id, fecha, km, litros, costo_total, precio_litro, 
-                         tipo_combustible, estacion, conductor_id, rendimiento, observaciones)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                         tipo_combustible, estacion, conductor_id, rendimiento, observaciones, parcial)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (veh_id, fecha_carga, km_carga, litros, costo_total, precio_litro,
-                         tipo_combustible, estacion, cond_id, rendimiento_calc, observaciones))
+                         tipo_combustible, estacion, cond_id, rendimiento_calc, observaciones, int(parcial)))
                     
                     conn.commit()
+                    # Una carga retroactiva cambia el rendimiento de las siguientes
+                    recalcular_rendimiento([veh_id], desde=str(fecha_carga), conn=conn)
+                    detectar_anomalias(conn=conn)
                     st.success("✅ Carga de combustible registrada exitosamente")
                     st.success(f"✅ Kilometraje actualizado a {km_carga:,} km")
                     
                     if rendimiento_calc:
                         # Alertar si el rendimiento es anormal
-                        conn_check = get_db_connection()
-                        try:
-                            rend_prom = conn_check.execute("""
-                                SELECT AVG(rendimiento) as prom 
-                                FROM combustible 
-                                WHERE vehiculo_id = ? AND rendimiento IS NOT NULL
-                            """, (veh_id,)).fetchone()['prom']
-                            
-                            if rend_prom and rendimiento_calc < rend_prom * 0.7:
-                                st.warning(f"⚠️ **ATENCIÓN:** Rendimiento 30% inferior al promedio ({rend_prom:.2f} km/l). Revisar vehículo.")
-                        finally:
-                            conn_check.close()
+                        rend_prom = repo_combustible.rendimiento_promedio(veh_id)
+                        if rend_prom and rendimiento_calc < rend_prom * 0.7:
+                            st.warning(f"⚠️ **ATENCIÓN:** Rendimiento 30% inferior al promedio ({rend_prom:.2f} km/l). Revisar vehículo.")
                     
                     st.rerun()
                     
@@ -158,87 +146,80 @@ def modulo_combustible():
     with tab2:
         st.subheader("📋 Historial de Cargas")
         
+        # Filtros (se aplican en SQL sobre todo el historial)
+        df_patentes = vehiculos.listar()
+        patentes_dict = {"Todas": None}
+        patentes_dict.update(zip(df_patentes['patente'], df_patentes['id']))
+        
+        col1, col2, col3, col4 = st.columns(4)
+        filtro_patente = col1.selectbox("Patente", list(patentes_dict.keys()))
+        filtro_tipo = col2.selectbox("Combustible", ["Todos"] + list(TIPOS_COMBUSTIBLE))
+        fecha_desde = col3.date_input("Desde", value=date.today().replace(day=1))
+        fecha_hasta = col4.date_input("Hasta", value=date.today())
+        
+        filtro = FiltroHistorial(
+            vehiculo_id=patentes_dict[filtro_patente],
+            tipo_combustible=None if filtro_tipo == "Todos" else filtro_tipo,
+            desde=fecha_desde.isoformat(),
+            hasta=fecha_hasta.isoformat()
+        )
+        
+        # Pila de cursores: el último es el inicio de la página actual
+        if st.session_state.get('hist_comb_filtro') != filtro:
+            st.session_state['hist_comb_filtro'] = filtro
+            st.session_state['hist_comb_cursores'] = [None]
+        cursores = st.session_state['hist_comb_cursores']
+        
         conn = get_db_connection()
         try:
-            df_hist = pd.read_sql_query("""
-                SELECT 
-                    c.fecha,
-                    v.patente,
-                    c.km,
-                    c.litros,
-                    c.costo_total,
-                    c.precio_litro,
-                    c.rendimiento,
-                    c.tipo_combustible,
-                    c.estacion,
-                    co.nombre as conductor
-                FROM combustible c
-                JOIN vehiculos v ON c.vehiculo_id = v.id
-                LEFT JOIN conductores co ON c.conductor_id = co.id
-                ORDER BY c.fecha DESC, c.km DESC
-                LIMIT 200
-            """, conn)
-            
-            if not df_hist.empty:
-                # Filtros
-                col1, col2, col3, col4 = st.columns(4)
-                
-                patentes = ["Todas"] + sorted(df_hist['patente'].unique().tolist())
-                filtro_patente = col1.selectbox("Patente", patentes)
-                
-                tipos = ["Todos"] + sorted(df_hist['tipo_combustible'].unique().tolist())
-                filtro_tipo = col2.selectbox("Combustible", tipos)
-                
-                fecha_desde = col3.date_input("Desde", value=date.today().replace(day=1))
-                fecha_hasta = col4.date_input("Hasta", value=date.today())
-                
-                # Aplicar filtros
-                df_filtrado = df_hist.copy()
-                
-                if filtro_patente != "Todas":
-                    df_filtrado = df_filtrado[df_filtrado['patente'] == filtro_patente]
-                
-                if filtro_tipo != "Todos":
-                    df_filtrado = df_filtrado[df_filtrado['tipo_combustible'] == filtro_tipo]
-                
-                df_filtrado = df_filtrado[
-                    (pd.to_datetime(df_filtrado['fecha']) >= pd.to_datetime(fecha_desde)) &
-                    (pd.to_datetime(df_filtrado['fecha']) <= pd.to_datetime(fecha_hasta))
-                ]
-                
-                # Estadísticas
-                col1, col2, col3, col4 = st.columns(4)
-                col1.metric("📊 Total Cargas", len(df_filtrado))
-                col2.metric("⛽ Total Litros", f"{df_filtrado['litros'].sum():,.0f} L")
-                col3.metric("💰 Gasto Total", f"${df_filtrado['costo_total'].sum():,.2f}")
-                col4.metric("📈 Rendimiento Prom.", 
-                           f"{df_filtrado['rendimiento'].mean():.2f} km/l" 
-                           if df_filtrado['rendimiento'].notna().any() else "N/A")
-                
-                # Tabla
-                st.dataframe(
-                    df_filtrado[['fecha', 'patente', 'km', 'litros', 'costo_total', 
-                                'precio_litro', 'rendimiento', 'estacion', 'conductor']],
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "km": st.column_config.NumberColumn("KM", format="%d"),
-                        "litros": st.column_config.NumberColumn("Litros", format="%.1f L"),
-                        "costo_total": st.column_config.NumberColumn("Costo", format="$ %.2f"),
-                        "precio_litro": st.column_config.NumberColumn("$/L", format="$ %.2f"),
-                        "rendimiento": st.column_config.NumberColumn("Rend.", format="%.2f km/l")
-                    }
-                )
-                
-                # Exportar
-                if st.button("📥 Exportar a Excel"):
-                    st.info("🔄 Funcionalidad en desarrollo...")
-                
-            else:
-                st.info("ℹ️ No hay cargas registradas")
-        
+            totales = obtener_totales(filtro, conn)
+            df_pagina, siguiente = obtener_pagina(filtro, cursores[-1], conn=conn)
         finally:
             conn.close()
+        
+        if totales.cargas:
+            # Estadísticas del rango filtrado completo
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("📊 Total Cargas", f"{totales.cargas:,}")
+            col2.metric("⛽ Total Litros", f"{totales.litros:,.0f} L")
+            col3.metric("💰 Gasto Total", f"${totales.costo:,.2f}")
+            col4.metric("📈 Rendimiento Prom.", 
+                       f"{totales.rendimiento_prom:.2f} km/l" 
+                       if totales.rendimiento_prom is not None else "N/A")
+            
+            # Tabla
+            st.dataframe(
+                df_pagina[['fecha', 'patente', 'km', 'litros', 'costo_total', 
+                           'precio_litro', 'rendimiento', 'estacion', 'conductor']],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "km": st.column_config.NumberColumn("KM", format="%d"),
+                    "litros": st.column_config.NumberColumn("Litros", format="%.1f L"),
+                    "costo_total": st.column_config.NumberColumn("Costo", format="$ %.2f"),
+                    "precio_litro": st.column_config.NumberColumn("$/L", format="$ %.2f"),
+                    "rendimiento": st.column_config.NumberColumn("Rend.", format="%.2f km/l")
+                }
+            )
+            
+            # Navegación
+            pagina = len(cursores)
+            paginas = -(-totales.cargas // TAMANO_PAGINA)
+            col1, col2, col3 = st.columns([1, 2, 1])
+            if col1.button("⬅️ Anterior", disabled=pagina == 1):
+                cursores.pop()
+                st.rerun()
+            col2.caption(f"Página {pagina} de {paginas}")
+            if col3.button("Siguiente ➡️", disabled=siguiente is None):
+                cursores.append(siguiente)
+                st.rerun()
+            
+            # Exportar
+            if st.button("📥 Exportar a Excel"):
+                st.info("🔄 Funcionalidad en desarrollo...")
+            
+        else:
+            st.info("ℹ️ No hay cargas para los filtros seleccionados")
     
     # ==========================================
     # TAB 3: ANÁLISIS
@@ -246,100 +227,78 @@ def modulo_combustible():
     with tab3:
         st.subheader("📊 Análisis de Consumo y Rendimiento")
         
-        conn = get_db_connection()
-        try:
-            # Análisis por vehículo
-            df_analisis = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    v.tipo,
-                    COUNT(c.id) as total_cargas,
-                    SUM(c.litros) as total_litros,
-                    SUM(c.costo_total) as total_gastado,
-                    AVG(c.rendimiento) as rendimiento_promedio,
-                    MIN(c.rendimiento) as rendimiento_minimo,
-                    MAX(c.rendimiento) as rendimiento_maximo,
-                    AVG(c.precio_litro) as precio_promedio_litro
-                FROM vehiculos v
-                LEFT JOIN combustible c ON v.id = c.vehiculo_id
-                WHERE v.estado = 'activo'
-                GROUP BY v.id
-                HAVING total_cargas > 0
-                ORDER BY total_gastado DESC
-            """, conn)
+        # Análisis por vehículo
+        df_analisis = repo_combustible.consumo_por_vehiculo(estado="activo")
+        
+        if not df_analisis.empty:
+            # Gráficos
+            col1, col2 = st.columns(2)
             
-            if not df_analisis.empty:
-                # Gráficos
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Gasto por vehículo
-                    fig_gasto = px.bar(
-                        df_analisis.head(10),
-                        x='patente',
-                        y='total_gastado',
-                        title='Top 10 - Gasto en Combustible',
-                        labels={'total_gastado': 'Gasto Total (ARS)', 'patente': 'Patente'},
-                        color='total_gastado',
-                        color_continuous_scale='Reds'
-                    )
-                    fig_gasto.update_layout(height=400)
-                    st.plotly_chart(fig_gasto, use_container_width=True)
-                
-                with col2:
-                    # Rendimiento por vehículo
-                    fig_rend = px.bar(
-                        df_analisis.sort_values('rendimiento_promedio', ascending=False).head(10),
-                        x='patente',
-                        y='rendimiento_promedio',
-                        title='Top 10 - Mejor Rendimiento',
-                        labels={'rendimiento_promedio': 'Rendimiento (km/l)', 'patente': 'Patente'},
-                        color='rendimiento_promedio',
-                        color_continuous_scale='Greens'
-                    )
-                    fig_rend.update_layout(height=400)
-                    st.plotly_chart(fig_rend, use_container_width=True)
-                
-                # Consumo por tipo de vehículo
-                df_por_tipo = df_analisis.groupby('tipo').agg({
-                    'total_litros': 'sum',
-                    'total_gastado': 'sum',
-                    'rendimiento_promedio': 'mean'
-                }).reset_index()
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    fig_tipo_litros = px.pie(
-                        df_por_tipo,
-                        values='total_litros',
-                        names='tipo',
-                        title='Consumo por Tipo de Vehículo'
-                    )
-                    st.plotly_chart(fig_tipo_litros, use_container_width=True)
-                
-                with col2:
-                    fig_tipo_gasto = px.pie(
-                        df_por_tipo,
-                        values='total_gastado',
-                        names='tipo',
-                        title='Gasto por Tipo de Vehículo'
-                    )
-                    st.plotly_chart(fig_tipo_gasto, use_container_width=True)
-                
-                # Tabla resumen
-                st.subheader("📋 Resumen Detallado")
-                st.dataframe(
-                    df_analisis.round(2),
-                    use_container_width=True,
-                    hide_index=True
+            with col1:
+                # Gasto por vehículo
+                fig_gasto = px.bar(
+                    df_analisis.head(10),
+                    x='patente',
+                    y='total_gastado',
+                    title='Top 10 - Gasto en Combustible',
+                    labels={'total_gastado': 'Gasto Total (ARS)', 'patente': 'Patente'},
+                    color='total_gastado',
+                    color_continuous_scale='Reds'
                 )
-                
-            else:
-                st.info("ℹ️ No hay suficientes datos para análisis")
-        
-        finally:
-            conn.close()
+                fig_gasto.update_layout(height=400)
+                st.plotly_chart(fig_gasto, use_container_width=True)
+            
+            with col2:
+                # Rendimiento por vehículo
+                fig_rend = px.bar(
+                    df_analisis.sort_values('rendimiento_promedio', ascending=False).head(10),
+                    x='patente',
+                    y='rendimiento_promedio',
+                    title='Top 10 - Mejor Rendimiento',
+                    labels={'rendimiento_promedio': 'Rendimiento (km/l)', 'patente': 'Patente'},
+                    color='rendimiento_promedio',
+                    color_continuous_scale='Greens'
+                )
+                fig_rend.update_layout(height=400)
+                st.plotly_chart(fig_rend, use_container_width=True)
+            
+            # Consumo por tipo de vehículo
+            df_por_tipo = df_analisis.groupby('tipo').agg({
+                'total_litros': 'sum',
+                'total_gastado': 'sum',
+                'rendimiento_promedio': 'mean'
+            }).reset_index()
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                fig_tipo_litros = px.pie(
+                    df_por_tipo,
+                    values='total_litros',
+                    names='tipo',
+                    title='Consumo por Tipo de Vehículo'
+                )
+                st.plotly_chart(fig_tipo_litros, use_container_width=True)
+            
+            with col2:
+                fig_tipo_gasto = px.pie(
+                    df_por_tipo,
+                    values='total_gastado',
+                    names='tipo',
+                    title='Gasto por Tipo de Vehículo'
+                )
+                st.plotly_chart(fig_tipo_gasto, use_container_width=True)
+            
+            # Tabla resumen
+            st.subheader("📋 Resumen Detallado")
+            st.dataframe(
+                df_analisis.round(2),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+        else:
+            st.info("ℹ️ No hay suficientes datos para análisis")
     
     # ==========================================
     # TAB 4: ANOMALÍAS
@@ -352,17 +311,7 @@ def modulo_combustible():
             anomalias = []
             
             # 1. Vehículos con bajo rendimiento
-            df_bajo_rend = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    AVG(c.rendimiento) as rend_actual,
-                    (SELECT AVG(rendimiento) FROM combustible WHERE rendimiento IS NOT NULL) as rend_general
-                FROM vehiculos v
-                JOIN combustible c ON v.id = c.vehiculo_id
-                WHERE c.rendimiento IS NOT NULL
-                GROUP BY v.id
-                HAVING rend_actual < rend_general * 0.7
-            """, conn)
+            df_bajo_rend = repo_combustible.bajo_rendimiento(factor=0.7)
             
             if not df_bajo_rend.empty:
                 st.warning(f"⚠️ **{len(df_bajo_rend)} vehículos con rendimiento 30% inferior al promedio**")
@@ -371,78 +320,99 @@ def modulo_combustible():
                               f"(Promedio flota: {row['rend_general']:.2f} km/l)")
                     st.caption("💡 Revisar: filtros de aire, inyectores, presión de neumáticos, estilo de conducción")
             
-            # 2. Cargas sospechosas (alto consumo en poco tiempo)
-            df_alto_consumo = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    c.fecha,
-                    c.litros,
-                    c.km,
-                    LAG(c.km) OVER (PARTITION BY v.id ORDER BY c.fecha) as km_anterior,
-                    LAG(c.fecha) OVER (PARTITION BY v.id ORDER BY c.fecha) as fecha_anterior
-                FROM combustible c
-                JOIN vehiculos v ON c.vehiculo_id = v.id
-                ORDER BY c.fecha DESC
-                LIMIT 50
-            """, conn)
+            # 2. Eventos del motor de anomalías (todo el historial, persistidos)
+            st.markdown("---")
+            ultimo_id, actualizado = ultimo_procesado(conn)
+            pendientes = cargas_pendientes(conn)
+            col1, col2, col3 = st.columns([2, 1, 1])
+            col1.caption(f"Último análisis: {actualizado or 'nunca'} · {pendientes:,} cargas sin analizar")
+            if col2.button("🔄 Analizar cargas nuevas", use_container_width=True, disabled=pendientes == 0):
+                with st.spinner("Analizando cargas nuevas..."):
+                    r = detectar_anomalias(conn=conn)
+                st.success(f"✅ {r.cargas:,} cargas analizadas en {r.duracion_seg}s")
+            if col3.button("♻️ Reanalizar todo", use_container_width=True):
+                with st.spinner("Analizando todo el historial..."):
+                    r = detectar_anomalias(completo=True, conn=conn)
+                st.success(f"✅ {r.cargas:,} cargas analizadas en {r.duracion_seg}s")
             
-            if not df_alto_consumo.empty:
-                df_alto_consumo['km_recorridos'] = df_alto_consumo['km'] - df_alto_consumo['km_anterior']
-                df_alto_consumo['dias_transcurridos'] = (
-                    pd.to_datetime(df_alto_consumo['fecha']) - 
-                    pd.to_datetime(df_alto_consumo['fecha_anterior'])
-                ).dt.days
-                
-                # Cargas muy frecuentes
-                cargas_frecuentes = df_alto_consumo[
-                    (df_alto_consumo['dias_transcurridos'] < 2) & 
-                    (df_alto_consumo['litros'] > 50)
-                ]
+            df_resumen = resumen_abiertas(conn)
+            if not df_resumen.empty:
+                por_tipo = df_resumen.groupby('tipo')['cantidad'].sum()
+                columnas = st.columns(len(TIPOS_ANOMALIA))
+                for col, tipo in zip(columnas, TIPOS_ANOMALIA):
+                    col.metric(ETIQUETAS_ANOMALIA[tipo], f"{int(por_tipo.get(tipo, 0)):,}")
                 
-                if not cargas_frecuentes.empty:
-                    st.warning(f"⚠️ **{len(cargas_frecuentes)} cargas sospechosamente frecuentes detectadas**")
-                    for _, row in cargas_frecuentes.iterrows():
-                        st.markdown(f"🟡 **{row['patente']}** - {row['litros']:.0f}L cargados en menos de 2 días")
-            
-            # 3. Variaciones extremas de rendimiento
-            df_variacion = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    c.fecha,
-                    c.rendimiento,
-                    AVG(c.rendimiento) OVER (
-                        PARTITION BY v.id 
-                        ORDER BY c.fecha 
-                        ROWS BETWEEN 5 PRECEDING AND 1 PRECEDING
-                    ) as rend_promedio_previo
-                FROM combustible c
-                JOIN vehiculos v ON c.vehiculo_id = v.id
-                WHERE c.rendimiento IS NOT NULL
-                ORDER BY c.fecha DESC
-                LIMIT 100
-            """, conn)
-            
-            if not df_variacion.empty:
-                df_variacion['variacion_pct'] = (
-                    (df_variacion['rendimiento'] - df_variacion['rend_promedio_previo']) / 
-                    df_variacion['rend_promedio_previo'] * 100
+                col1, col2 = st.columns(2)
+                tipos_sel = col1.multiselect("Tipo", TIPOS_ANOMALIA, format_func=ETIQUETAS_ANOMALIA.get)
+                severidades_sel = col2.multiselect("Severidad", ["alta", "media"])
+                df_anomalias = listar_anomalias(tipos_sel, severidades_sel, conn=conn)
+                vista = df_anomalias.drop(columns=['combustible_id']).assign(
+                    tipo=df_anomalias['tipo'].map(ETIQUETAS_ANOMALIA)
                 )
+                vista.insert(0, 'revisada', False)
+                editado = st.data_editor(
+                    vista, disabled=[c for c in vista.columns if c != 'revisada'],
+                    use_container_width=True, hide_index=True
+                )
+                st.caption(f"Mostrando {len(df_anomalias):,} de {int(df_resumen['cantidad'].sum()):,} anomalías abiertas")
                 
-                variaciones_extremas = df_variacion[abs(df_variacion['variacion_pct']) > 30]
-                
-                if not variaciones_extremas.empty:
-                    st.warning(f"⚠️ **{len(variaciones_extremas)} variaciones extremas de rendimiento**")
-                    for _, row in variaciones_extremas.iterrows():
-                        color = "🔴" if row['variacion_pct'] < 0 else "🟢"
-                        st.markdown(f"{color} **{row['patente']}** - Variación: {row['variacion_pct']:.1f}% "
-                                  f"(Actual: {row['rendimiento']:.2f} km/l)")
+                marcadas = df_anomalias.loc[editado['revisada'].to_numpy()]
+                if not marcadas.empty and st.button(f"✔️ Marcar {len(marcadas)} como revisadas"):
+                    marcar_anomalias(zip(marcadas['combustible_id'], marcadas['tipo']), 'revisada', conn=conn)
+                    st.rerun()
             
-            if df_bajo_rend.empty and cargas_frecuentes.empty and variaciones_extremas.empty:
+            if df_bajo_rend.empty and df_resumen.empty:
                 st.success("✅ No se detectaron anomalías significativas")
         
         finally:
             conn.close()
+    
+    # ==========================================
+    # TAB 5: IMPORTACIÓN MASIVA
+    # ==========================================
+    with tab5:
+        st.subheader("📥 Importar Resumen de Tarjeta de Combustible")
+        st.caption("CSV (separado por ; o ,) o XLSX con columnas patente/dominio, fecha, km/odómetro, "
+                   "litros/cantidad e importe; opcionales: producto, estación, DNI del conductor.")
+        
+        archivo = st.file_uploader("Archivo del resumen", type=["csv", "xlsx"])
+        simular = st.checkbox("🔎 Solo simular (no guarda nada)", value=True)
+        
+        if archivo is not None and st.button("📥 Procesar archivo", use_container_width=True):
+            try:
+                with st.spinner("Procesando resumen..."):
+                    resultado = importar_cargas(archivo, archivo.name, dry_run=simular)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("📄 Filas leídas", f"{resultado.leidas:,}")
+                col2.metric("✅ Válidas", f"{resultado.validas:,}")
+                col3.metric("❌ Con errores", f"{len(resultado.errores):,}")
+                col4.metric("💾 Insertadas", f"{resultado.insertadas:,}")
+                
+                if resultado.dry_run:
+                    st.info(f"🔎 Simulación en {resultado.duracion_seg}s: no se guardó ninguna carga")
+                else:
+                    st.success(f"✅ {resultado.insertadas:,} cargas importadas en {resultado.duracion_seg}s")
+                
+                if not resultado.errores.empty:
+                    with st.expander(f"❌ Errores ({len(resultado.errores):,} filas no importadas)"):
+                        st.dataframe(resultado.errores['motivo'].value_counts().rename("filas"),
+                                     use_container_width=True)
+                        st.dataframe(resultado.errores.head(1000), use_container_width=True, hide_index=True)
+                
+                if not resultado.advertencias.empty:
+                    with st.expander(f"⚠️ Advertencias ({len(resultado.advertencias):,})"):
+                        st.dataframe(resultado.advertencias.head(1000), use_container_width=True, hide_index=True)
+                
+                if not resultado.cargas.empty:
+                    st.dataframe(
+                        resultado.cargas[['fila', 'patente', 'fecha', 'km', 'litros', 'costo_total',
+                                          'precio_litro', 'rendimiento', 'tipo_combustible']].head(500),
+                        use_container_width=True, hide_index=True
+                    )
 
 
 if __name__ == "__main__":
-    modulo_combustible()
\ No newline at end of file
+    modulo_combustible()
@@ -4,23 +4,15 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-from utils.helpers import get_db_connection, dias_hasta
+from utils.helpers import dias_hasta
+from repositories import combustible, conductores
 
 def mostrar_ficha_conductor():
     """Muestra la ficha completa de un conductor con toda su documentación"""
     
     st.header("👨‍✈️ Ficha Completa de Conductor")
     
-    conn = get_db_connection()
-    try:
-        df_cond = pd.read_sql_query("""
-            SELECT c.*, v.patente 
-            FROM conductores c
-            LEFT JOIN vehiculos v ON c.vehiculo_asignado = v.id
-            ORDER BY c.nombre
-        """, conn)
-    finally:
-        conn.close()
+    df_cond = conductores.listar()
     
     if df_cond.empty:
         st.warning("⚠️ No hay conductores registrados.")
@@ -134,25 +126,7 @@ def mostrar_ficha_conductor():
     # ========================================
     st.subheader("⛽ Historial de Cargas de Combustible")
     
-    conn = get_db_connection()
-    try:
-        df_comb = pd.read_sql_query("""
-            SELECT 
-                c.fecha,
-                v.patente,
-                c.km,
-                c.litros,
-                c.costo_total,
-                c.rendimiento,
-                c.estacion
-            FROM combustible c
-            JOIN vehiculos v ON c.vehiculo_id = v.id
-            WHERE c.conductor_id = ?
-            ORDER BY c.fecha DESC
-            LIMIT 30
-        """, conn, params=(conductor_info['id'],))
-    finally:
-        conn.close()
+    df_comb = combustible.de_conductor(conductor_info['id'], limite=30)
     
     if not df_comb.empty:
         col1, col2, col3, col4 = st.columns(4)
@@ -1,8 +1,8 @@
 # views/gestion_conductores.py
 import streamlit as st
-import pandas as pd
 from datetime import date
 from utils.helpers import get_db_connection
+from repositories import conductores, vehiculos
 
 def gestion_conductores():
     st.header("👨‍✈️ Gestión de Conductores")
@@ -10,11 +10,7 @@ def gestion_conductores():
 
     # === ALTA ===
     with tab1:
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("SELECT id, patente FROM vehiculos WHERE estado = 'activo'", conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar(estado="activo")
         veh_dict = {f"{r['patente']}": r["id"] for _, r in df_veh.iterrows()}
         veh_dict["(Sin asignar)"] = None
 
@@ -56,34 +52,21 @@ def gestion_conductores():
                         conn.close()
 
     # === EDICIÓN Y BAJA ===
-    conn = get_db_connection()
-    try:
-        df_cond = pd.read_sql_query("""
-            SELECT c.id, c.nombre, c.dni, v.patente as veh_patente
-            FROM conductores c
-            LEFT JOIN vehiculos v ON c.vehiculo_asignado = v.id
-        """, conn)
-    finally:
-        conn.close()
+    df_cond = conductores.listar()
     if df_cond.empty:
         st.info("ℹ️ No hay conductores")
         return
 
     with tab2:
         cond_sel = st.selectbox("Seleccionar conductor", df_cond["nombre"].tolist())
-        cond_id = df_cond[df_cond["nombre"] == cond_sel]["id"].iloc[0]
-        conn = get_db_connection()
-        try:
-            datos = conn.execute("SELECT * FROM conductores WHERE id = ?", (cond_id,)).fetchone()
-        finally:
-            conn.close()
-        if datos:
-            with st.form("editar_conductor"):
-                st.subheader(f"Editar: {cond_sel}")
-                # ... (similar al alta, con valores actuales)
-                # Por brevedad, asumo que completas los campos como en alta
-                # Guardar con UPDATE
-                pass  # (Implementación análoga a vehículos)
+        # conductores.listar() ya trae todas las columnas del conductor: no hace falta otra lectura
+        datos = df_cond[df_cond["nombre"] == cond_sel].iloc[0]
+        with st.form("editar_conductor"):
+            st.subheader(f"Editar: {datos['nombre']}")
+            # ... (similar al alta, con valores actuales)
+            # Por brevedad, asumo que completas los campos como en alta
+            # Guardar con UPDATE
+            pass  # (Implementación análoga a vehículos)
 
     with tab3:
         cond_baja = st.selectbox("Conductor a dar de baja", df_cond["nombre"].tolist(), key="baja_cond")
@@ -1,7 +1,7 @@
 # views/gestion_vehiculos.py
 import streamlit as st
-import pandas as pd
 from utils.helpers import get_db_connection
+from repositories import vehiculos
 
 def gestion_vehiculos():
     st.header("🚛 Gestión de Vehículos")
@@ -44,38 +44,30 @@ def gestion_vehiculos():
 
     # === EDICIÓN ===
     with tab2:
-        conn = get_db_connection()
-        try:
-            df = pd.read_sql_query("SELECT id, patente, marca, modelo, km_actual, estado FROM vehiculos ORDER BY patente", conn)
-        finally:
-            conn.close()
+        df = vehiculos.listar()
         if df.empty:
             st.info("ℹ️ No hay vehículos registrados")
             return
         patente_sel = st.selectbox("Seleccionar vehículo", df["patente"].tolist())
         veh = df[df["patente"] == patente_sel].iloc[0]
-        conn = get_db_connection()
-        try:
-            datos = conn.execute("SELECT * FROM vehiculos WHERE id = ?", (veh["id"],)).fetchone()
-        finally:
-            conn.close()
+        datos = vehiculos.obtener(veh["id"])
         if datos:
             with st.form("editar_vehiculo"):
                 st.subheader(f"Editar: {patente_sel}")
                 col1, col2, col3 = st.columns(3)
-                patente = col1.text_input("Patente", value=datos["patente"]).upper()
+                patente = col1.text_input("Patente", value=datos.patente).upper()
                 tipo = col2.selectbox("Tipo", ["camion", "camioneta", "auto", "utilitario"], 
-                                     index=["camion", "camioneta", "auto", "utilitario"].index(datos["tipo"]))
-                marca = col3.text_input("Marca", value=datos["marca"])
-                modelo = st.text_input("Modelo", value=datos["modelo"])
-                anio = st.number_input("Año", min_value=1980, max_value=2030, value=datos["anio"] or 2020)
-                chasis = st.text_input("Chasis", value=datos["chasis"] or "")
-                motor = st.text_input("Motor", value=datos["motor"] or "")
-                centro = st.text_input("Centro Operativo", value=datos["centro_operativo"] or "")
-                km = st.number_input("Kilometraje Actual", min_value=0, value=datos["km_actual"] or 0)
+                                     index=["camion", "camioneta", "auto", "utilitario"].index(datos.tipo))
+                marca = col3.text_input("Marca", value=datos.marca)
+                modelo = st.text_input("Modelo", value=datos.modelo)
+                anio = st.number_input("Año", min_value=1980, max_value=2030, value=datos.anio or 2020)
+                chasis = st.text_input("Chasis", value=datos.chasis or "")
+                motor = st.text_input("Motor", value=datos.motor or "")
+                centro = st.text_input("Centro Operativo", value=datos.centro_operativo or "")
+                km = st.number_input("Kilometraje Actual", min_value=0, value=datos.km_actual or 0)
                 estado = st.selectbox("Estado", ["activo", "en_reparacion", "detenido", "baja"],
-                                     index=["activo", "en_reparacion", "detenido", "baja"].index(datos["estado"]))
-                obs = st.text_area("Observaciones", value=datos["observaciones"] or "")
+                                     index=["activo", "en_reparacion", "detenido", "baja"].index(datos.estado))
+                obs = st.text_area("Observaciones", value=datos.observaciones or "")
                 if st.form_submit_button("💾 Actualizar", use_container_width=True):
                     conn = get_db_connection()
                     try:
@@ -84,7 +76,7 @@ def gestion_vehiculos():
                             patente=?, tipo=?, marca=?, modelo=?, anio=?, chasis=?, motor=?,
                             centro_operativo=?, km_actual=?, estado=?, observaciones=?
                             WHERE id=?
-                        """, (patente, tipo, marca, modelo, anio, chasis, motor, centro, km, estado, obs, datos["id"]))
+                        """, (patente, tipo, marca, modelo, anio, chasis, motor, centro, km, estado, obs, datos.id))
                         conn.commit()
                         st.success("✅ Vehículo actualizado")
                         st.rerun()
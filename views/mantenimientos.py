@@ -6,6 +6,7 @@ import pandas as pd
 import sqlite3
 from datetime import date, timedelta
 from utils.helpers import get_db_connection
+from repositories import mantenimientos, vehiculos
 
 def modulo_mantenimientos():
     """Módulo completo de gestión de mantenimientos preventivos"""
@@ -18,16 +19,7 @@ def modulo_mantenimientos():
     # TAB 1: REGISTRAR MANTENIMIENTO
     # ==========================================
     with tab1:
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("""
-                SELECT id, patente, marca, modelo, km_actual 
-                FROM vehiculos 
-                WHERE estado = 'activo' 
-                ORDER BY patente
-            """, conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar(estado="activo")
         
         if df_veh.empty:
             st.warning("⚠️ No hay vehículos activos")
@@ -162,78 +154,57 @@ def modulo_mantenimientos():
     with tab2:
         st.subheader("📋 Historial de Mantenimientos")
         
-        conn = get_db_connection()
-        try:
-            df_hist = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    m.fecha,
-                    m.tipo,
-                    m.categoria,
-                    m.km,
-                    m.costo,
-                    m.taller,
-                    m.prox_km,
-                    m.prox_fecha,
-                    m.observaciones
-                FROM mantenimientos m
-                JOIN vehiculos v ON m.vehiculo_id = v.id
-                ORDER BY m.fecha DESC
-                LIMIT 100
-            """, conn)
-            
-            if not df_hist.empty:
-                # Filtros
-                col1, col2, col3, col4 = st.columns(4)
-                
-                patentes = ["Todas"] + sorted(df_hist['patente'].unique().tolist())
-                filtro_patente = col1.selectbox("Filtrar por patente", patentes)
-                
-                tipos = ["Todos"] + sorted(df_hist['tipo'].unique().tolist())
-                filtro_tipo = col2.selectbox("Filtrar por tipo", tipos)
-                
-                categorias = ["Todas"] + sorted(df_hist['categoria'].unique().tolist())
-                filtro_cat = col3.selectbox("Filtrar por categoría", categorias)
-                
-                fecha_desde = col4.date_input("Desde", value=date.today() - timedelta(days=90))
-                
-                # Aplicar filtros
-                df_filtrado = df_hist.copy()
-                
-                if filtro_patente != "Todas":
-                    df_filtrado = df_filtrado[df_filtrado['patente'] == filtro_patente]
-                
-                if filtro_tipo != "Todos":
-                    df_filtrado = df_filtrado[df_filtrado['tipo'] == filtro_tipo]
-                
-                if filtro_cat != "Todas":
-                    df_filtrado = df_filtrado[df_filtrado['categoria'] == filtro_cat]
-                
-                df_filtrado = df_filtrado[pd.to_datetime(df_filtrado['fecha']) >= pd.to_datetime(fecha_desde)]
-                
-                # Estadísticas
-                col1, col2, col3, col4 = st.columns(4)
-                col1.metric("📊 Total Registros", len(df_filtrado))
-                col2.metric("💰 Costo Total", f"${df_filtrado['costo'].sum():,.2f}")
-                col3.metric("💵 Costo Promedio", f"${df_filtrado['costo'].mean():,.2f}")
-                col4.metric("🔧 Talleres", df_filtrado['taller'].nunique())
-                
-                # Tabla
-                st.dataframe(
-                    df_filtrado[['patente', 'fecha', 'tipo', 'categoria', 'km', 'costo', 'taller']],
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "km": st.column_config.NumberColumn("KM", format="%d"),
-                        "costo": st.column_config.NumberColumn("Costo", format="$ %.2f")
-                    }
-                )
-                
-            else:
-                st.info("ℹ️ No hay mantenimientos registrados")
+        df_hist = mantenimientos.recientes(limite=100)
         
-        finally:
-            conn.close()
+        if not df_hist.empty:
+            # Filtros
+            col1, col2, col3, col4 = st.columns(4)
+            
+            patentes = ["Todas"] + sorted(df_hist['patente'].unique().tolist())
+            filtro_patente = col1.selectbox("Filtrar por patente", patentes)
+            
+            tipos = ["Todos"] + sorted(df_hist['tipo'].unique().tolist())
+            filtro_tipo = col2.selectbox("Filtrar por tipo", tipos)
+            
+            categorias = ["Todas"] + sorted(df_hist['categoria'].unique().tolist())
+            filtro_cat = col3.selectbox("Filtrar por categoría", categorias)
+            
+            fecha_desde = col4.date_input("Desde", value=date.today() - timedelta(days=90))
+            
+            # Aplicar filtros
+            df_filtrado = df_hist.copy()
+            
+            if filtro_patente != "Todas":
+                df_filtrado = df_filtrado[df_filtrado['patente'] == filtro_patente]
+            
+            if filtro_tipo != "Todos":
+                df_filtrado = df_filtrado[df_filtrado['tipo'] == filtro_tipo]
+            
+            if filtro_cat != "Todas":
+                df_filtrado = df_filtrado[df_filtrado['categoria'] == filtro_cat]
+            
+            df_filtrado = df_filtrado[pd.to_datetime(df_filtrado['fecha']) >= pd.to_datetime(fecha_desde)]
+            
+            # Estadísticas
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("📊 Total Registros", len(df_filtrado))
+            col2.metric("💰 Costo Total", f"${df_filtrado['costo'].sum():,.2f}")
+            col3.metric("💵 Costo Promedio", f"${df_filtrado['costo'].mean():,.2f}")
+            col4.metric("🔧 Talleres", df_filtrado['taller'].nunique())
+            
+            # Tabla
+            st.dataframe(
+                df_filtrado[['patente', 'fecha', 'tipo', 'categoria', 'km', 'costo', 'taller']],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "km": st.column_config.NumberColumn("KM", format="%d"),
+                    "costo": st.column_config.NumberColumn("Costo", format="$ %.2f")
+                }
+            )
+            
+        else:
+            st.info("ℹ️ No hay mantenimientos registrados")
     
     # ==========================================
     # TAB 3: MANTENIMIENTOS PENDIENTES
@@ -241,94 +212,60 @@ def modulo_mantenimientos():
     with tab3:
         st.subheader("⚠️ Mantenimientos Pendientes")
         
-        conn = get_db_connection()
-        try:
-            # Por kilometraje
-            df_km = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    v.km_actual,
-                    m.tipo,
-                    m.km as ultimo_km,
-                    m.prox_km,
-                    (m.prox_km - v.km_actual) as km_faltantes,
-                    m.alerta_km
-                FROM mantenimientos m
-                JOIN vehiculos v ON m.vehiculo_id = v.id
-                WHERE v.estado = 'activo'
-                AND m.prox_km IS NOT NULL
-                AND v.km_actual IS NOT NULL
-                AND (m.prox_km - v.km_actual) <= m.alerta_km
-                ORDER BY km_faltantes
-            """, conn)
-            
-            # Por fecha
-            df_fecha = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    m.tipo,
-                    m.fecha as ultimo_mant,
-                    m.prox_fecha,
-                    julianday(m.prox_fecha) - julianday('now') as dias_faltantes
-                FROM mantenimientos m
-                JOIN vehiculos v ON m.vehiculo_id = v.id
-                WHERE v.estado = 'activo'
-                AND m.prox_fecha IS NOT NULL
-                AND julianday(m.prox_fecha) - julianday('now') <= 30
-                ORDER BY dias_faltantes
-            """, conn)
-            
-            if not df_km.empty or not df_fecha.empty:
-                total_pendientes = len(df_km) + len(df_fecha)
-                st.warning(f"⚠️ **{total_pendientes} mantenimientos requieren atención**")
+        # Por kilometraje
+        df_km = mantenimientos.pendientes_por_km()
+        
+        # Por fecha
+        df_fecha = mantenimientos.pendientes_por_fecha(dias=30)
+        
+        if not df_km.empty or not df_fecha.empty:
+            total_pendientes = len(df_km) + len(df_fecha)
+            st.warning(f"⚠️ **{total_pendientes} mantenimientos requieren atención**")
+            
+            # Pendientes por KM
+            if not df_km.empty:
+                st.subheader("🛣️ Pendientes por Kilometraje")
                 
-                # Pendientes por KM
-                if not df_km.empty:
-                    st.subheader("🛣️ Pendientes por Kilometraje")
+                for _, row in df_km.iterrows():
+                    km_falt = row['km_faltantes']
                     
-                    for _, row in df_km.iterrows():
-                        km_falt = row['km_faltantes']
-                        
-                        if km_falt < 0:
-                            color = "🔴"
-                            estado = "VENCIDO"
-                        elif km_falt < 500:
-                            color = "🟠"
-                            estado = "URGENTE"
-                        else:
-                            color = "🟡"
-                            estado = "PRÓXIMO"
-                        
-                        st.markdown(f"{color} **{row['patente']}** - {row['tipo']} | "
-                                  f"Actual: {row['km_actual']:,} km → Próximo: {row['prox_km']:,} km | "
-                                  f"Faltan: {km_falt:,} km | **{estado}**")
+                    if km_falt < 0:
+                        color = "🔴"
+                        estado = "VENCIDO"
+                    elif km_falt < 500:
+                        color = "🟠"
+                        estado = "URGENTE"
+                    else:
+                        color = "🟡"
+                        estado = "PRÓXIMO"
+                    
+                    st.markdown(f"{color} **{row['patente']}** - {row['tipo']} | "
+                              f"Actual: {row['km_actual']:,} km → Próximo: {row['prox_km']:,} km | "
+                              f"Faltan: {km_falt:,} km | **{estado}**")
+            
+            # Pendientes por Fecha
+            if not df_fecha.empty:
+                st.subheader("📅 Pendientes por Fecha")
                 
-                # Pendientes por Fecha
-                if not df_fecha.empty:
-                    st.subheader("📅 Pendientes por Fecha")
+                for _, row in df_fecha.iterrows():
+                    dias = int(row['dias_faltantes'])
+                    
+                    if dias < 0:
+                        color = "🔴"
+                        estado = "VENCIDO"
+                    elif dias < 7:
+                        color = "🟠"
+                        estado = "URGENTE"
+                    else:
+                        color = "🟡"
+                        estado = "PRÓXIMO"
                     
-                    for _, row in df_fecha.iterrows():
-                        dias = int(row['dias_faltantes'])
-                        
-                        if dias < 0:
-                            color = "🔴"
-                            estado = "VENCIDO"
-                        elif dias < 7:
-                            color = "🟠"
-                            estado = "URGENTE"
-                        else:
-                            color = "🟡"
-                            estado = "PRÓXIMO"
-                        
-                        st.markdown(f"{color} **{row['patente']}** - {row['tipo']} | "
-                                  f"Próximo: {row['prox_fecha']} | "
-                                  f"Faltan: {dias} días | **{estado}**")
-            
-            else:
-                st.success("✅ ¡Excelente! Todos los mantenimientos están al día")
+                    st.markdown(f"{color} **{row['patente']}** - {row['tipo']} | "
+                              f"Próximo: {row['prox_fecha']} | "
+                              f"Faltan: {dias} días | **{estado}**")
         
-        finally:
-            conn.close()
+        else:
+            st.success("✅ ¡Excelente! Todos los mantenimientos están al día")
 
 
 if __name__ == "__main__":
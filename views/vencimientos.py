@@ -2,10 +2,10 @@
 # views/vencimientos.py - MÓDULO DE VENCIMIENTOS
 
 import streamlit as st
-import pandas as pd
 import sqlite3
 from datetime import date, timedelta
 from utils.helpers import get_db_connection, dias_hasta
+from repositories import vehiculos, vencimientos
 
 def modulo_vencimientos():
     """Módulo completo de gestión de vencimientos"""
@@ -18,16 +18,7 @@ def modulo_vencimientos():
     # TAB 1: REGISTRAR NUEVO VENCIMIENTO
     # ==========================================
     with tab1:
-        conn = get_db_connection()
-        try:
-            df_veh = pd.read_sql_query("""
-                SELECT id, patente, marca, modelo 
-                FROM vehiculos 
-                WHERE estado = 'activo' 
-                ORDER BY patente
-            """, conn)
-        finally:
-            conn.close()
+        df_veh = vehiculos.listar(estado="activo")
         
         if df_veh.empty:
             st.warning("⚠️ No hay vehículos activos. Registre vehículos primero.")
@@ -121,114 +112,95 @@ def modulo_vencimientos():
     with tab2:
         st.subheader("📋 Todos los Vencimientos Activos")
         
-        conn = get_db_connection()
-        try:
-            df_venc = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    ve.tipo,
-                    ve.fecha_vencimiento,
-                    ve.fecha_ultimo,
-                    ve.alerta_dias,
-                    ve.costo_renovacion,
-                    julianday(ve.fecha_vencimiento) - julianday('now') as dias_faltantes,
-                    ve.observaciones
-                FROM vencimientos ve
-                JOIN vehiculos v ON ve.vehiculo_id = v.id
-                WHERE v.estado = 'activo' AND ve.estado = 'activo'
-                ORDER BY ve.fecha_vencimiento
-            """, conn)
+        df_venc = vencimientos.activos()
+        
+        if not df_venc.empty:
+            # Agregar columna de estado visual
+            def obtener_estado(dias):
+                if dias < 0:
+                    return "🔴 VENCIDO"
+                elif dias < 7:
+                    return "🟠 URGENTE"
+                elif dias < 30:
+                    return "🟡 PRÓXIMO"
+                else:
+                    return "🟢 VIGENTE"
             
-            if not df_venc.empty:
-                # Agregar columna de estado visual
-                def obtener_estado(dias):
-                    if dias < 0:
-                        return "🔴 VENCIDO"
-                    elif dias < 7:
-                        return "🟠 URGENTE"
-                    elif dias < 30:
-                        return "🟡 PRÓXIMO"
-                    else:
-                        return "🟢 VIGENTE"
-                
-                df_venc['Estado'] = df_venc['dias_faltantes'].apply(lambda x: obtener_estado(int(x)))
-                df_venc['dias_faltantes'] = df_venc['dias_faltantes'].apply(lambda x: f"{int(x)} días")
-                
-                # Renombrar columnas para mejor visualización
-                df_display = df_venc[[
-                    'Estado', 'patente', 'tipo', 'fecha_vencimiento', 
-                    'dias_faltantes', 'costo_renovacion', 'observaciones'
-                ]].rename(columns={
-                    'patente': 'Patente',
-                    'tipo': 'Documento',
-                    'fecha_vencimiento': 'Vencimiento',
-                    'dias_faltantes': 'Días Restantes',
-                    'costo_renovacion': 'Costo Renov.',
-                    'observaciones': 'Observaciones'
-                })
-                
-                # Filtros
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    filtro_estado = st.multiselect(
-                        "Filtrar por estado",
-                        ["🔴 VENCIDO", "🟠 URGENTE", "🟡 PRÓXIMO", "🟢 VIGENTE"],
-                        default=["🔴 VENCIDO", "🟠 URGENTE", "🟡 PRÓXIMO", "🟢 VIGENTE"]
-                    )
-                
-                with col2:
-                    patentes_unicas = df_display['Patente'].unique()
-                    filtro_patente = st.multiselect(
-                        "Filtrar por patente",
-                        patentes_unicas,
-                        default=patentes_unicas
-                    )
-                
-                with col3:
-                    tipos_unicos = df_display['Documento'].unique()
-                    filtro_tipo = st.multiselect(
-                        "Filtrar por tipo",
-                        tipos_unicos,
-                        default=tipos_unicos
-                    )
-                
-                # Aplicar filtros
-                df_filtrado = df_display[
-                    (df_display['Estado'].isin(filtro_estado)) &
-                    (df_display['Patente'].isin(filtro_patente)) &
-                    (df_display['Documento'].isin(filtro_tipo))
-                ]
-                
-                # Mostrar estadísticas
-                col1, col2, col3, col4 = st.columns(4)
-                col1.metric("📊 Total", len(df_filtrado))
-                col2.metric("🔴 Vencidos", len(df_filtrado[df_filtrado['Estado'] == "🔴 VENCIDO"]))
-                col3.metric("🟠 Urgentes", len(df_filtrado[df_filtrado['Estado'] == "🟠 URGENTE"]))
-                col4.metric("🟡 Próximos", len(df_filtrado[df_filtrado['Estado'] == "🟡 PRÓXIMO"]))
-                
-                st.dataframe(
-                    df_filtrado,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Costo Renov.": st.column_config.NumberColumn(
-                            "Costo Renov.",
-                            format="$ %.2f"
-                        )
-                    }
+            df_venc['Estado'] = df_venc['dias_faltantes'].apply(lambda x: obtener_estado(int(x)))
+            df_venc['dias_faltantes'] = df_venc['dias_faltantes'].apply(lambda x: f"{int(x)} días")
+            
+            # Renombrar columnas para mejor visualización
+            df_display = df_venc[[
+                'Estado', 'patente', 'tipo', 'fecha_vencimiento', 
+                'dias_faltantes', 'costo_renovacion', 'observaciones'
+            ]].rename(columns={
+                'patente': 'Patente',
+                'tipo': 'Documento',
+                'fecha_vencimiento': 'Vencimiento',
+                'dias_faltantes': 'Días Restantes',
+                'costo_renovacion': 'Costo Renov.',
+                'observaciones': 'Observaciones'
+            })
+            
+            # Filtros
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                filtro_estado = st.multiselect(
+                    "Filtrar por estado",
+                    ["🔴 VENCIDO", "🟠 URGENTE", "🟡 PRÓXIMO", "🟢 VIGENTE"],
+                    default=["🔴 VENCIDO", "🟠 URGENTE", "🟡 PRÓXIMO", "🟢 VIGENTE"]
                 )
-                
-                # Costo total de renovaciones próximas
-                costo_total = df_filtrado[df_filtrado['Estado'].isin(["🔴 VENCIDO", "🟠 URGENTE"])]['Costo Renov.'].sum()
-                if costo_total > 0:
-                    st.info(f"💰 **Costo estimado de renovaciones urgentes:** ${costo_total:,.2f}")
-                
-            else:
-                st.info("ℹ️ No hay vencimientos registrados")
-        
-        finally:
-            conn.close()
+            
+            with col2:
+                patentes_unicas = df_display['Patente'].unique()
+                filtro_patente = st.multiselect(
+                    "Filtrar por patente",
+                    patentes_unicas,
+                    default=patentes_unicas
+                )
+            
+            with col3:
+                tipos_unicos = df_display['Documento'].unique()
+                filtro_tipo = st.multiselect(
+                    "Filtrar por tipo",
+                    tipos_unicos,
+                    default=tipos_unicos
+                )
+            
+            # Aplicar filtros
+            df_filtrado = df_display[
+                (df_display['Estado'].isin(filtro_estado)) &
+                (df_display['Patente'].isin(filtro_patente)) &
+                (df_display['Documento'].isin(filtro_tipo))
+            ]
+            
+            # Mostrar estadísticas
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("📊 Total", len(df_filtrado))
+            col2.metric("🔴 Vencidos", len(df_filtrado[df_filtrado['Estado'] == "🔴 VENCIDO"]))
+            col3.metric("🟠 Urgentes", len(df_filtrado[df_filtrado['Estado'] == "🟠 URGENTE"]))
+            col4.metric("🟡 Próximos", len(df_filtrado[df_filtrado['Estado'] == "🟡 PRÓXIMO"]))
+            
+            st.dataframe(
+                df_filtrado,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Costo Renov.": st.column_config.NumberColumn(
+                        "Costo Renov.",
+                        format="$ %.2f"
+                    )
+                }
+            )
+            
+            # Costo total de renovaciones próximas
+            costo_total = df_filtrado[df_filtrado['Estado'].isin(["🔴 VENCIDO", "🟠 URGENTE"])]['Costo Renov.'].sum()
+            if costo_total > 0:
+                st.info(f"💰 **Costo estimado de renovaciones urgentes:** ${costo_total:,.2f}")
+            
+        else:
+            st.info("ℹ️ No hay vencimientos registrados")
     
     # ==========================================
     # TAB 3: PRÓXIMOS A VENCER (30 DÍAS)
@@ -236,64 +208,43 @@ def modulo_vencimientos():
     with tab3:
         st.subheader("⚠️ Documentos que Vencen en los Próximos 30 Días")
         
-        conn = get_db_connection()
-        try:
-            df_proximos = pd.read_sql_query("""
-                SELECT 
-                    v.patente,
-                    v.marca,
-                    v.modelo,
-                    ve.tipo,
-                    ve.fecha_vencimiento,
-                    julianday(ve.fecha_vencimiento) - julianday('now') as dias_faltantes,
-                    ve.costo_renovacion,
-                    ve.observaciones
-                FROM vencimientos ve
-                JOIN vehiculos v ON ve.vehiculo_id = v.id
-                WHERE v.estado = 'activo' 
-                AND ve.estado = 'activo'
-                AND julianday(ve.fecha_vencimiento) - julianday('now') BETWEEN 0 AND 30
-                ORDER BY dias_faltantes
-            """, conn)
+        df_proximos = vencimientos.proximos(dias=30)
+        
+        if not df_proximos.empty:
+            st.warning(f"⚠️ **{len(df_proximos)} documentos requieren atención inmediata**")
             
-            if not df_proximos.empty:
-                st.warning(f"⚠️ **{len(df_proximos)} documentos requieren atención inmediata**")
+            for idx, row in df_proximos.iterrows():
+                dias = int(row['dias_faltantes'])
                 
-                for idx, row in df_proximos.iterrows():
-                    dias = int(row['dias_faltantes'])
+                if dias < 0:
+                    color = "🔴"
+                    estado = "VENCIDO"
+                elif dias < 7:
+                    color = "🟠"
+                    estado = "URGENTE"
+                else:
+                    color = "🟡"
+                    estado = "PRÓXIMO"
+                
+                with st.expander(f"{color} {row['patente']} - {row['tipo']} ({dias} días) - {estado}"):
+                    col1, col2 = st.columns(2)
                     
-                    if dias < 0:
-                        color = "🔴"
-                        estado = "VENCIDO"
-                    elif dias < 7:
-                        color = "🟠"
-                        estado = "URGENTE"
-                    else:
-                        color = "🟡"
-                        estado = "PRÓXIMO"
+                    col1.write(f"**Vehículo:** {row['marca']} {row['modelo']}")
+                    col1.write(f"**Vencimiento:** {row['fecha_vencimiento']}")
                     
-                    with st.expander(f"{color} {row['patente']} - {row['tipo']} ({dias} días) - {estado}"):
-                        col1, col2 = st.columns(2)
-                        
-                        col1.write(f"**Vehículo:** {row['marca']} {row['modelo']}")
-                        col1.write(f"**Vencimiento:** {row['fecha_vencimiento']}")
-                        
-                        col2.write(f"**Días restantes:** {dias}")
-                        if row['costo_renovacion']:
-                            col2.write(f"**Costo estimado:** ${row['costo_renovacion']:,.2f}")
-                        
-                        if row['observaciones']:
-                            st.info(f"📝 {row['observaciones']}")
-                        
-                        # Botón de acción rápida
-                        if st.button(f"✅ Marcar como Renovado", key=f"renovar_{idx}"):
-                            st.info("🔄 Funcionalidad en desarrollo...")
-            
-            else:
-                st.success("✅ ¡Excelente! No hay documentos próximos a vencer en los próximos 30 días")
+                    col2.write(f"**Días restantes:** {dias}")
+                    if row['costo_renovacion']:
+                        col2.write(f"**Costo estimado:** ${row['costo_renovacion']:,.2f}")
+                    
+                    if row['observaciones']:
+                        st.info(f"📝 {row['observaciones']}")
+                    
+                    # Botón de acción rápida
+                    if st.button(f"✅ Marcar como Renovado", key=f"renovar_{idx}"):
+                        st.info("🔄 Funcionalidad en desarrollo...")
         
-        finally:
-            conn.close()
+        else:
+            st.success("✅ ¡Excelente! No hay documentos próximos a vencer en los próximos 30 días")
 
 
 if __name__ == "__main__":